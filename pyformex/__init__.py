@@ -51,6 +51,14 @@ started = False
 # Placeholder for excutable, filled in by startup.py
 executable = sys.executable
 
+# Profile the imports if requested (this should be done before importing
+# anything else)
+import_profile = None
+if '--startup-profile' in sys.argv:
+    from pyformex.importprofile import ImportProfiler
+    import_profile = ImportProfiler()
+    import_profile.install()
+
 #########  Check Python version #############
 
 # A single variable to flag Python 3+
@@ -170,7 +178,9 @@ if installtype in 'SG':
     def checkLibraries():
         # find extension used by compiled library (.so)
         import sysconfig
-        ext = sysconfig.get_config_var('SO')
+        ext = sysconfig.get_config_var('EXT_SUFFIX')
+        if ext is None:
+            ext = sysconfig.get_config_var('SO')
         if ext is None:
             ext = '.so'
         msg = ''
@@ -0,0 +1,629 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+"""Performance benchmarks.
+
+This module contains a collection of reproducible benchmarks for the
+pyFormex core kernels, file I/O and some of the examples. It is normally
+used through the ``pyformex --bench`` command line option, but the
+functions can also be used from a script.
+
+There are two kinds of benchmarks:
+
+- micro benchmarks time a single core operation (e.g. :meth:`Coords.fuse`)
+  on a generated model. The model size is scalable (``--benchscale``).
+  They are run in the pyFormex process itself.
+- example benchmarks run one of the pyFormex examples in a separate
+  pyFormex process with the GUI. They require a working GUI and display
+  (use e.g. ``xvfb-run`` on a headless machine).
+
+The results (time, peak memory, throughput) are returned as a dict that
+can be saved in JSON format, together with information about the
+machine and the software versions. Two such results can be compared with
+:func:`compare`, which flags the regressions.
+
+Example::
+
+  pyformex --bench --benchout base.json
+  # ... change the code ...
+  pyformex --bench fuse* --benchcompare base.json
+
+Default settings are found in the ``[bench]`` section of the configuration.
+"""
+from __future__ import absolute_import, division, print_function
+
+import os
+import sys
+import gc
+import json
+import time
+import fnmatch
+import platform
+import tempfile
+import subprocess
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pyformex as pf
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+_result_tag = 'BENCH-RESULT '
+
+_benchmarks = OrderedDict()
+
+
+class Benchmark(object):
+    """A parametrized benchmark.
+
+    Parameters:
+
+    - `name`: the unique name of the benchmark. By convention, this
+      is 'module.operation'.
+    - `setup`: a function taking a single int argument (the size) and
+      returning a tuple (func, nitems), where `func` is a callable
+      without arguments performing the timed operation, and `nitems`
+      is the number of items processed by one call of `func`. The tuple
+      may have a third item: a callable without arguments that is called
+      after the benchmark has finished, e.g. to remove temporary files.
+    - `size`: the default size for the benchmark. It is multiplied by
+      the scale factor when running the benchmark.
+    - `unit`: the name of the items processed, used in the throughput.
+    - `group`: the benchmark group: 'micro' or 'example'.
+    """
+
+    def __init__(self,name,setup,size=1,unit='items',group='micro'):
+        self.name = name
+        self.setup = setup
+        self.size = size
+        self.unit = unit
+        self.group = group
+
+
+    def scaledSize(self, scale):
+        """Return the size for the given scale factor"""
+        return max(1, int(round(self.size * scale)))
+
+
+    def run(self,scale=1.,repeat=3):
+        """Run the benchmark.
+
+        Parameters:
+
+        - `scale`: float: scale factor for the model size.
+        - `repeat`: int: number of times the operation is timed.
+
+        Returns a dict with the results: the best and all timings in
+        seconds, the peak memory in bytes allocated during the operation,
+        the throughput in items per second and a status.
+        """
+        size = self.scaledSize(scale)
+        res = OrderedDict([
+            ('group', self.group),
+            ('size', size),
+            ('unit', self.unit),
+            ])
+        cleanup = None
+        try:
+            setup = self.setup(size)
+            func, nitems = setup[:2]
+            if len(setup) > 2:
+                cleanup = setup[2]
+            times = []
+            for i in range(repeat):
+                times.append(_timeit(func))
+            res['nitems'] = int(nitems)
+            res['times'] = times
+            res['time'] = min(times)
+            res['throughput'] = nitems / max(res['time'], 1.e-9)
+            res['memory'] = _peakMemory(func)
+            res['status'] = 'ok'
+        except ImportError as e:
+            res['status'] = 'skipped'
+            res['message'] = str(e)
+        except Exception as e:
+            res['status'] = 'failed'
+            res['message'] = "%s: %s" % (e.__class__.__name__, e)
+        finally:
+            if cleanup is not None:
+                cleanup()
+        return res
+
+
+class ExampleBenchmark(Benchmark):
+    """A benchmark running a pyFormex example script.
+
+    The example is run in a new pyFormex process with the GUI, so that
+    it is executed the same way as when run by a user.
+    The time measured is that of the execution of the script, excluding
+    the startup of pyFormex. The peak memory is the maximum resident
+    set size of the process.
+
+    Parameters:
+
+    - `name`: the name of the example (the file name without the .py).
+    - `timeout`: maximum time in seconds to wait for the example to
+      finish.
+    """
+
+    def __init__(self,name,timeout=600):
+        Benchmark.__init__(self, 'example.'+name, None, group='example', unit='runs')
+        self.example = name
+        self.timeout = timeout
+
+
+    def run(self,scale=1.,repeat=1):
+        """Run the example benchmark.
+
+        The scale factor is not used: the example scripts have a fixed
+        model size. The example is run once for each repeat.
+        """
+        fn = os.path.join(pf.cfg['examplesdir'], self.example+'.py')
+        res = OrderedDict([
+            ('group', self.group),
+            ('size', 1),
+            ('unit', self.unit),
+            ])
+        if not os.path.exists(fn):
+            res['status'] = 'skipped'
+            res['message'] = "No such example: %s" % fn
+            return res
+        times = []
+        memory = 0
+        for i in range(repeat):
+            r = runExampleProcess(fn, self.timeout)
+            if r['status'] != 'ok':
+                res.update(r)
+                return res
+            times.append(r['time'])
+            memory = max(memory, r['memory'])
+        res['nitems'] = 1
+        res['times'] = times
+        res['time'] = min(times)
+        res['throughput'] = 1. / max(res['time'], 1.e-9)
+        res['memory'] = memory
+        res['status'] = 'ok'
+        return res
+
+
+def _timeit(func):
+    """Time a single call of func, with garbage collection disabled"""
+    gcold = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        t = _clock()
+        func()
+        return _clock() - t
+    finally:
+        if gcold:
+            gc.enable()
+
+
+def _peakMemory(func):
+    """Return the peak memory allocated during a call of func.
+
+    With Python3, this is the peak of the memory traced by
+    tracemalloc (which includes the numpy array data). Else, it is
+    the maximum resident set size of the process, which is only an upper
+    bound.
+    """
+    if tracemalloc is None:
+        import resource
+        func()
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    gc.collect()
+    started = tracemalloc.is_tracing()
+    if not started:
+        tracemalloc.start()
+    try:
+        tracemalloc.clear_traces()
+        base = tracemalloc.get_traced_memory()[0]
+        func()
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        if not started:
+            tracemalloc.stop()
+
+
+def benchmark(name,size=1,unit='items'):
+    """Decorator registering a setup function as a micro benchmark.
+
+    See :class:`Benchmark` for the parameters. The decorated function
+    is the `setup` function.
+    """
+    def decorator(setup):
+        _benchmarks[name] = Benchmark(name, setup, size, unit)
+        return setup
+    return decorator
+
+
+def _examples():
+    """Register the example benchmarks from the configuration"""
+    for name in pf.cfg['bench/examples']:
+        bm = ExampleBenchmark(name, timeout=pf.cfg['bench/timeout'])
+        if bm.name not in _benchmarks:
+            _benchmarks[bm.name] = bm
+
+
+def listBenchmarks(patterns=None):
+    """Return the benchmarks whose name matches any of the patterns.
+
+    Patterns are Unix shell style wildcards, such as 'mesh.*' or
+    '*fuse*'. A pattern that matches the group of a benchmark
+    ('micro' or 'example') selects the whole group. If no patterns
+    are specified, all benchmarks are returned.
+    """
+    _examples()
+    bms = list(_benchmarks.values())
+    if patterns:
+        bms = [ b for b in bms if [ p for p in patterns
+                    if p == b.group or fnmatch.fnmatch(b.name, p) ] ]
+    return bms
+
+
+def machineInfo():
+    """Return a dict with information about the machine and software"""
+    try:
+        from pyformex import lib
+        accelerated = sorted(set([ m.__name__ for m in lib.accelerated ]))
+    except Exception:
+        accelerated = []
+    return OrderedDict([
+        ('hostname', platform.node()),
+        ('platform', platform.platform()),
+        ('machine', platform.machine()),
+        ('processor', platform.processor()),
+        ('cpus', _cpuCount()),
+        ('python', platform.python_version()),
+        ('numpy', np.__version__),
+        ('pyformex', pf.__revision__),
+        ('accelerated', accelerated),
+        ])
+
+
+def _cpuCount():
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except Exception:
+        return 1
+
+
+def runBenchmarks(patterns=None,scale=1.,repeat=None,verbose=True):
+    """Run benchmarks and return the results.
+
+    Parameters:
+
+    - `patterns`: list of name patterns selecting the benchmarks to run
+      (see :func:`listBenchmarks`). Default is to run all benchmarks.
+    - `scale`: float: scale factor for the model size of the micro
+      benchmarks.
+    - `repeat`: int: number of timings per benchmark. Default is
+      taken from the configuration.
+    - `verbose`: if True, a line is printed for each finished benchmark.
+
+    Returns a dict with the date, the machine info, the scale and
+    a dict with the results of each benchmark (see :meth:`Benchmark.run`).
+    This dict can be saved with :func:`saveResults`.
+    """
+    if repeat is None:
+        repeat = pf.cfg['bench/repeat']
+    results = OrderedDict()
+    for bm in listBenchmarks(patterns):
+        res = bm.run(scale, repeat if bm.group == 'micro' else 1)
+        results[bm.name] = res
+        if verbose:
+            print(formatResult(bm.name, res))
+            sys.stdout.flush()
+    return OrderedDict([
+        ('date', datetime.now().isoformat()),
+        ('machine', machineInfo()),
+        ('scale', scale),
+        ('repeat', repeat),
+        ('results', results),
+        ])
+
+
+def formatResult(name, res):
+    """Format a benchmark result as a single line"""
+    if res['status'] != 'ok':
+        return "%-28s %s: %s" % (name, res['status'].upper(), res.get('message', ''))
+    return "%-28s %10.4f s %10.1f MB %12.4g %s/s" % (
+        name, res['time'], res['memory'] / 1.e6, res['throughput'], res['unit'])
+
+
+def saveResults(results, filename):
+    """Save benchmark results to a file in JSON format"""
+    with open(filename, 'w') as fil:
+        json.dump(results, fil, indent=1)
+
+
+def loadResults(filename):
+    """Load benchmark results from a JSON file"""
+    with open(filename, 'r') as fil:
+        return json.load(fil, object_pairs_hook=OrderedDict)
+
+
+def compare(base,new,tolerance=None,memory=True):
+    """Compare benchmark results against a baseline.
+
+    Parameters:
+
+    - `base`: the baseline results, as returned by :func:`runBenchmarks`
+      or :func:`loadResults`.
+    - `new`: the new results, in the same format.
+    - `tolerance`: float: relative increase of the time (or memory)
+      above which a benchmark is flagged as a regression. Default
+      is taken from the configuration.
+    - `memory`: if True, the peak memory is compared as well.
+
+    Only the benchmarks that succeeded in both results and have the same
+    size are compared.
+
+    Returns a list of tuples (name, quantity, ratio, flag), where quantity
+    is 'time' or 'memory', ratio is the new value divided by the baseline
+    value and flag is one of 'REGRESSION', 'improved' or 'ok'.
+    """
+    if tolerance is None:
+        tolerance = pf.cfg['bench/tolerance']
+    cmp = []
+    bres, nres = base['results'], new['results']
+    for name in nres:
+        if name not in bres:
+            continue
+        b, n = bres[name], nres[name]
+        if b['status'] != 'ok' or n['status'] != 'ok' or b['size'] != n['size']:
+            continue
+        quantities = ['time']
+        if memory:
+            quantities.append('memory')
+        for q in quantities:
+            if b[q] <= 0:
+                continue
+            ratio = n[q] / b[q]
+            if ratio > 1. + tolerance:
+                flag = 'REGRESSION'
+            elif ratio < 1. / (1. + tolerance):
+                flag = 'improved'
+            else:
+                flag = 'ok'
+            cmp.append((name, q, ratio, flag))
+    return cmp
+
+
+def reportComparison(cmp):
+    """Print the result of :func:`compare`.
+
+    Returns the number of regressions.
+    """
+    for name, q, ratio, flag in cmp:
+        print("%-28s %-6s %7.2f  %s" % (name, q, ratio, flag))
+    nreg = len([ c for c in cmp if c[3] == 'REGRESSION' ])
+    print("%s comparisons, %s regressions" % (len(cmp), nreg))
+    return nreg
+
+
+##########################################################################
+## Example benchmarks ##
+########################
+
+def runExampleProcess(fn,timeout=600):
+    """Run an example in a new pyFormex process and return the results.
+
+    Returns a dict with the status, and if ok the time of
+    the script execution and the peak memory of the process.
+    """
+    executable = pf.executable or sys.argv[0]
+    cmd = [ sys.executable, '-m', 'pyformex.startup', executable, '--gui',
+            '--nodefaultconfig', '--config', os.path.join(tempfile.gettempdir(), 'pyformex-bench.conf'),
+            '-c', "from pyformex import bench; bench.runExample(%r)" % fn ]
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(pf.pyformexdir)] + [ p for p in [env.get('PYTHONPATH', '')] if p ])
+    out = tempfile.TemporaryFile()
+    P = subprocess.Popen(cmd, stdout=out, stderr=subprocess.STDOUT, env=env, cwd=tempfile.gettempdir())
+    start = time.time()
+    while True:
+        pid, status, rusage = os.wait4(P.pid, os.WNOHANG)
+        if pid:
+            break
+        if time.time() - start > timeout:
+            P.kill()
+            pid, status, rusage = os.wait4(P.pid, 0)
+            return { 'status': 'failed', 'message': 'timeout after %s seconds' % timeout }
+        time.sleep(0.05)
+    out.seek(0)
+    lines = out.read().decode('utf-8', 'replace').split('\n')
+    out.close()
+    res = [ l[len(_result_tag):] for l in lines if l.startswith(_result_tag) ]
+    if not res:
+        msg = [ l for l in lines if l.strip(' *') ][-1:]
+        return { 'status': 'failed', 'message': 'no result (%s)' % ' '.join(msg) }
+    res = json.loads(res[-1])
+    if res['status'] == 'ok':
+        # ru_maxrss is in kilobytes on Linux
+        res['memory'] = rusage.ru_maxrss * 1024
+    return res
+
+
+def runExample(fn):
+    """Execute an example script and report the timing.
+
+    This is run inside the pyFormex process started by
+    :func:`runExampleProcess`. The script is executed as it would be
+    from the GUI, the result is printed on stdout, and the process is
+    terminated.
+    """
+    from pyformex import script
+    import traceback
+    g = script.Globals()
+    g.update({'__file__': fn, 'argv': []})
+    pf.scriptName = fn
+    res = { 'status': 'ok' }
+    try:
+        code = compile(open(fn).read() + '\n', fn, 'exec')
+        t = _clock()
+        exec(code, g)
+        res['time'] = _clock() - t
+    except SystemExit:
+        res['time'] = _clock() - t
+    except Exception as e:
+        traceback.print_exc()
+        res = { 'status': 'failed', 'message': "%s: %s" % (e.__class__.__name__, e) }
+    print(_result_tag + json.dumps(res))
+    sys.stdout.flush()
+    # Exit hard: we do not want to enter the GUI loop or save preferences
+    os._exit(0)
+
+
+##########################################################################
+## Micro benchmarks ##
+######################
+
+def _hexMesh(n):
+    """Create a fused hex8 Mesh with n*n*n elements"""
+    from pyformex import simple
+    return simple.cuboid().toMesh().subdivide(n, n, n).fuse()
+
+
+def _sphereSurface(n):
+    """Create a TriSurface sphere with about n triangles"""
+    from pyformex import simple
+    ndiv = max(1, int(round(np.sqrt(n / 20.))))
+    return simple.sphere(ndiv)
+
+
+@benchmark('coords.fuse', size=200000, unit='points')
+def _bench_fuse(n):
+    from pyformex.coords import Coords
+    X = np.random.RandomState(0).rand(n // 2, 3)
+    X = Coords(np.concatenate([X, X + 1.e-7]))
+    return X.fuse, len(X)
+
+
+@benchmark('connectivity.insertLevel', size=30, unit='elements')
+def _bench_insertLevel(n):
+    M = _hexMesh(n)
+    return (lambda: M.elems.insertLevel(1)), M.nelems()
+
+
+@benchmark('mesh.getBorder', size=30, unit='elements')
+def _bench_getBorder(n):
+    M = _hexMesh(n)
+    return M.getBorder, M.nelems()
+
+
+@benchmark('mesh.fuse', size=30, unit='elements')
+def _bench_meshfuse(n):
+    from pyformex import simple
+    M = simple.cuboid().toMesh().subdivide(n, n, n)
+    return M.fuse, M.nelems()
+
+
+def _tempfile(ext):
+    """Create a temporary file.
+
+    Returns the file name and a function removing the file.
+    """
+    fd, fn = tempfile.mkstemp(suffix=ext)
+    os.close(fd)
+    def remove():
+        if os.path.exists(fn):
+            os.remove(fn)
+    return fn, remove
+
+
+@benchmark('stl.write', size=200000, unit='triangles')
+def _bench_stlwrite(n):
+    S = _sphereSurface(n)
+    fn, remove = _tempfile('.stl')
+    return (lambda: S.write(fn, 'stlb')), S.nelems(), remove
+
+
+@benchmark('stl.read', size=200000, unit='triangles')
+def _bench_stlread(n):
+    from pyformex.trisurface import TriSurface
+    S = _sphereSurface(n)
+    fn, remove = _tempfile('.stl')
+    try:
+        S.write(fn, 'stlb')
+    except:
+        remove()
+        raise
+    return (lambda: TriSurface.read(fn)), S.nelems(), remove
+
+
+@benchmark('pgf.write', size=200000, unit='triangles')
+def _bench_pgfwrite(n):
+    from pyformex.geomfile import GeometryFile
+    S = _sphereSurface(n)
+    fn, remove = _tempfile('.pgf')
+    def func():
+        f = GeometryFile(fn, 'w')
+        f.write(S)
+        f.close()
+    return func, S.nelems(), remove
+
+
+@benchmark('pgf.read', size=200000, unit='triangles')
+def _bench_pgfread(n):
+    from pyformex.geomfile import GeometryFile
+    S = _sphereSurface(n)
+    fn, remove = _tempfile('.pgf')
+    try:
+        f = GeometryFile(fn, 'w')
+        f.write(S)
+        f.close()
+    except:
+        remove()
+        raise
+    return (lambda: GeometryFile(fn, 'r').read()), S.nelems(), remove
+
+
+@benchmark('isosurface', size=100, unit='voxels')
+def _bench_isosurface(n):
+    from pyformex.plugins.isosurface import isosurface
+    x = np.arange(n) - 0.5 * (n-1)
+    data = np.sqrt(x[:, None, None]**2 + x[None, :, None]**2 + x[None, None, :]**2)
+    return (lambda: isosurface(data, 0.4*n, nproc=1)), data.size
+
+
+@benchmark('actor.prepare', size=200000, unit='triangles')
+def _bench_actor(n):
+    from pyformex.opengl.drawable import Actor
+    S = _sphereSurface(n)
+    def func():
+        A = Actor(S)
+        A.b_normals
+        A.b_avgnormals
+        A.edges
+    return func, S.nelems()
+
+
+# End
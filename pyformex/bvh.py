@@ -0,0 +1,330 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+"""Bounding volume hierarchies for fast geometrical searches.
+
+A bounding volume hierarchy (BVH) is a tree of axis aligned boxes, where
+each box encloses the boxes of its children. The leaves of the tree hold
+a small number of geometrical primitives (triangles, segments, points...).
+Searching the tree for boxes overlapping with some other object allows
+to skip most of the primitives that are far away from it.
+
+The tree in this module is built from the bounding boxes of the
+primitives by sorting them along a space filling (Morton) curve through
+their centers. The sorted primitives are grouped into leaves of fixed
+size and the leaves form a complete binary tree. The boxes of all nodes
+at one level of the tree are stored in a single array, which allows all
+searches to process a full level of the tree in a single vectorized step.
+"""
+from __future__ import absolute_import, division, print_function
+
+from pyformex.arraytools import *
+
+
+def mortonCode(q):
+    """Compute the Morton code of integer grid points.
+
+    - `q`: int array (npts,3): the grid coordinates, in the range 0..1023.
+
+    Returns an int array (npts,) with the Morton codes, obtained by
+    interleaving the bits of the three coordinates. Sorting points on
+    their Morton code puts points that are close together in space also
+    close together in the sorted order.
+
+    >>> mortonCode(array([[1, 0, 0], [0, 1, 0], [0, 0, 1], [3, 3, 3]]))
+    array([ 1,  2,  4, 63])
+    """
+    q = asarray(q).astype(int64)
+    for shift, mask in [(16, 0xff0000ff), (8, 0x0f00f00f), (4, 0xc30c30c3), (2, 0x49249249)]:
+        q = (q | (q << shift)) & mask
+    return q[:, 0] | (q[:, 1] << 1) | (q[:, 2] << 2)
+
+
+def overlapping(lo1, hi1, lo2, hi2, atol=0.):
+    """Check whether pairs of boxes overlap.
+
+    - `lo1`, `hi1`: float arrays (n,3): the minimum and maximum corners
+      of the first boxes.
+    - `lo2`, `hi2`: float arrays (n,3): the same for the second boxes.
+    - `atol`: float: the boxes are considered to overlap if they are
+      not farther apart than this distance.
+
+    Returns a bool array (n,) with the result.
+    """
+    return ((lo1 <= hi2+atol) & (lo2 <= hi1+atol)).all(axis=-1)
+
+
+class BVH(object):
+    """A bounding volume hierarchy of axis aligned boxes.
+
+    Parameters:
+
+    - `bbox`: float array (n,2,3): the bounding boxes of the primitives,
+      with the minimum and maximum corners along the second axis. The
+      boxes of a set of simplices `x` of shape (n,nplex,3) can be obtained
+      with :func:`boxes`.
+    - `leafsize`: int: the maximum number of primitives in a leaf.
+
+    Attributes:
+
+    - `nboxes`: the number of primitives.
+    - `depth`: the depth of the tree: the leaves are at level `depth`,
+      the root is at level 0. Level k contains 2**k nodes. Node i at level k
+      has children 2*i and 2*i+1 at level k+1.
+    - `lo`, `hi`: lists of `depth+1` arrays with the minimum and maximum
+      corners of the nodes at each level. Empty nodes have boxes with
+      infinite inverted bounds, that do not overlap with anything.
+    - `order`: int array (nboxes,): the primitives sorted in leaf order.
+      Leaf i holds the primitives `order[i*leafsize:(i+1)*leafsize]`.
+
+    Example:
+
+    >>> x = arange(10.).reshape(-1, 1, 1) * ones((1, 2, 3))
+    >>> x[:, 1] += 0.5
+    >>> B = BVH(x, leafsize=2)
+    >>> B.depth, [ len(lo) for lo in B.lo ]
+    (3, [1, 2, 4, 8])
+    >>> B.overlapPairs(atol=0.5)
+    array([[0, 1],
+           [1, 2],
+           [2, 3],
+           [3, 4],
+           [4, 5],
+           [5, 6],
+           [6, 7],
+           [7, 8],
+           [8, 9]])
+    """
+
+    def __init__(self,bbox,leafsize=4):
+        """Create the tree."""
+        bbox = asarray(bbox, dtype=float64)
+        n = len(bbox)
+        self.nboxes = n
+        self.leafsize = leafsize
+        # Sort the boxes along the Morton curve through their centers
+        c = bbox.mean(axis=1) if n > 0 else zeros((0, 3))
+        if n > 0:
+            cmin, cmax = c.min(axis=0), c.max(axis=0)
+            scale = where(cmax > cmin, 1023. / (cmax-cmin+(cmax <= cmin)), 0.)
+            self.order = argsort(mortonCode((c-cmin)*scale), kind='mergesort')
+        else:
+            self.order = zeros(0, dtype=Int)
+        nleaves = max(1, (n+leafsize-1) // leafsize)
+        self.depth = int(ceil(log2(nleaves)))
+        size = leafsize << self.depth
+        lo = full((size, 3), inf)
+        hi = full((size, 3), -inf)
+        lo[:n] = bbox[self.order, 0]
+        hi[:n] = bbox[self.order, 1]
+        # The primitive boxes in leaf order, per axis
+        self._lo, self._hi = lo[:n].T.copy(), hi[:n].T.copy()
+        lo = lo.reshape(-1, leafsize, 3).min(axis=1)
+        hi = hi.reshape(-1, leafsize, 3).max(axis=1)
+        self.lo, self.hi = [lo], [hi]
+        while len(lo) > 1:
+            lo = lo.reshape(-1, 2, 3).min(axis=1)
+            hi = hi.reshape(-1, 2, 3).max(axis=1)
+            self.lo.insert(0, lo)
+            self.hi.insert(0, hi)
+
+
+    def leafPrimitives(self,leaves):
+        """Expand leaf numbers into the primitives they hold.
+
+        - `leaves`: int array (n,): leaf numbers.
+
+        Returns a tuple (row, pos) where `row` is the index in `leaves`
+        and `pos` the position of the primitive in leaf order. The
+        primitive numbers are `self.order[pos]`.
+        """
+        ls = self.leafsize
+        pos = (leaves.reshape(-1, 1)*ls + arange(ls)).ravel()
+        row = arange(len(leaves)).repeat(ls)
+        ok = pos < self.nboxes
+        return row[ok], pos[ok]
+
+
+    def overlapPairs(self,other=None,atol=0.,chunk=1<<16):
+        """Find the pairs of overlapping primitive boxes.
+
+        Parameters:
+
+        - `other`: another BVH. If not specified, the pairs of different
+          primitives of this tree are searched.
+        - `atol`: float: boxes closer than this distance are also
+          considered to overlap.
+        - `chunk`: int: the number of leaf pairs that are expanded at once.
+          This limits the memory usage.
+
+        Returns an int array (npairs,2) with the primitive numbers in
+        self and in other of the overlapping boxes. If `other` is not
+        specified, each pair is returned only once, with the lowest
+        number first. The pairs are sorted.
+        """
+        selfsearch = other is None
+        if selfsearch:
+            other = self
+        if self.nboxes == 0 or other.nboxes == 0:
+            return zeros((0, 2), dtype=Int)
+        a = b = zeros(1, dtype=Int)
+        la = lb = 0
+        while True:
+            ok = overlapping(self.lo[la][a], self.hi[la][a],
+                             other.lo[lb][b], other.hi[lb][b], atol)
+            a, b = a[ok], b[ok]
+            if la == self.depth and lb == other.depth:
+                break
+            # Descend in the tree(s) that have not yet reached the leaves
+            if la < self.depth and lb < other.depth:
+                a = (2*a.reshape(-1, 1) + [0, 0, 1, 1]).ravel()
+                b = (2*b.reshape(-1, 1) + [0, 1, 0, 1]).ravel()
+                la += 1
+                lb += 1
+                if selfsearch:
+                    ok = a <= b
+                    a, b = a[ok], b[ok]
+            elif la < self.depth:
+                a = (2*a.reshape(-1, 1) + [0, 1]).ravel()
+                b = b.repeat(2)
+                la += 1
+            else:
+                a = a.repeat(2)
+                b = (2*b.reshape(-1, 1) + [0, 1]).ravel()
+                lb += 1
+
+        # Expand the leaf pairs into primitive pairs
+        pairs = []
+        ls, lso = self.leafsize, other.leafsize
+        for i in range(0, len(a), chunk):
+            ai, bi = a[i:i+chunk], b[i:i+chunk]
+            pa = (ai.reshape(-1, 1, 1)*ls + arange(ls).reshape(-1, 1)).repeat(lso, axis=2).ravel()
+            pb = (bi.reshape(-1, 1, 1)*lso + arange(lso)).repeat(ls, axis=1).ravel()
+            ok = (pa < self.nboxes) & (pb < other.nboxes)
+            if selfsearch:
+                ok &= pa < pb
+            pa, pb = pa[ok], pb[ok]
+            # check one axis at a time, reducing the pairs at each step
+            for k in range(3):
+                ok = ((self._lo[k][pa] <= other._hi[k][pb]+atol) &
+                      (other._lo[k][pb] <= self._hi[k][pa]+atol))
+                pa, pb = pa[ok], pb[ok]
+            pairs.append(column_stack([self.order[pa], other.order[pb]]))
+        pairs = concatenate(pairs) if pairs else zeros((0, 2), dtype=Int)
+        if selfsearch:
+            pairs.sort(axis=-1)
+        return pairs[argsort(pairs[:, 0]*other.nboxes + pairs[:, 1])]
+
+
+    def linePairs(self,q,m,tmin=-inf,tmax=inf,atol=0.):
+        """Find the primitive boxes hit by a set of lines.
+
+        Parameters:
+
+        - `q`, `m`: float arrays (nlines,3): points and direction vectors
+          of the lines q + t*m.
+        - `tmin`, `tmax`: float or float arrays (nlines,): the range of the
+          parameter t to consider. The defaults give full lines; use
+          tmin=0 for rays and tmin=0, tmax=1 for the segments from q to q+m.
+        - `atol`: float: the boxes are enlarged with this distance.
+
+        Returns an int array (npairs,2) with the line numbers and the
+        primitive numbers of the boxes hit by the lines.
+        The pairs are sorted on the line number.
+
+        Example:
+
+        >>> x = arange(10.).reshape(-1, 1, 1) * ones((1, 2, 3))
+        >>> x[:, 1] += 0.5
+        >>> B = BVH(x, leafsize=2)
+        >>> B.linePairs([[0., 0., 0.], [9.2, 9.2, 0.]], [[1., 1., 1.], [0., 0., 1.]], tmin=0.)
+        array([[0, 0],
+               [0, 1],
+               [0, 2],
+               [0, 3],
+               [0, 4],
+               [0, 5],
+               [0, 6],
+               [0, 7],
+               [0, 8],
+               [0, 9],
+               [1, 9]])
+        """
+        q = asarray(q, dtype=float64).reshape(-1, 3)
+        m = asarray(m, dtype=float64).reshape(-1, 3)
+        nl = len(q)
+        if self.nboxes == 0 or nl == 0:
+            return zeros((0, 2), dtype=Int)
+        tmin = resize(asarray(tmin, dtype=float64), nl)
+        tmax = resize(asarray(tmax, dtype=float64), nl)
+        # The slab test: the line is inside the slab lo[k] <= x[k] <= hi[k]
+        # for t between (lo[k]-q[k])/m[k] and (hi[k]-q[k])/m[k].
+        # Lines parallel to the slab get huge values of the proper sign.
+        inv = (1. / where(abs(m) < 1.e-300, 1.e-300, m)).T
+        qlo, qhi = (q+atol).T, (q-atol).T
+
+        def hit(r, a, lo, hi):
+            tlo, thi = tmin[r], tmax[r]
+            for k in range(3):
+                ik = inv[k][r]
+                t1 = (lo[k][a] - qlo[k][r]) * ik
+                t2 = (hi[k][a] - qhi[k][r]) * ik
+                tlo = maximum(tlo, minimum(t1, t2))
+                thi = minimum(thi, maximum(t1, t2))
+            return tlo <= thi
+
+        r = arange(nl)
+        a = zeros(nl, dtype=Int)
+        for level in range(self.depth+1):
+            if level > 0:
+                r = r.repeat(2)
+                a = (2*a.reshape(-1, 1) + [0, 1]).ravel()
+                # skip the empty nodes
+                nodes = -(-self.nboxes // (self.leafsize << (self.depth-level)))
+                if nodes < 1 << level:
+                    ok = a < nodes
+                    r, a = r[ok], a[ok]
+            ok = hit(r, a, self.lo[level].T, self.hi[level].T)
+            r, a = r[ok], a[ok]
+        # Expand the leaves and check the primitive boxes
+        row, pos = self.leafPrimitives(a)
+        r = r[row]
+        ok = hit(r, pos, self._lo, self._hi)
+        return column_stack([r[ok], self.order[pos[ok]]])
+
+def boxes(x):
+    """Compute the bounding boxes of a set of simplices.
+
+    - `x`: float array (n,nplex,3): the vertex coordinates of n simplices.
+
+    Returns a float array (n,2,3) with the minimum and maximum corners.
+
+    >>> boxes([[[0., 0., 0.], [1., 2., 0.], [0., 1., -1.]]])
+    array([[[ 0.,  0., -1.],
+            [ 1.,  2.,  0.]]])
+    """
+    x = asarray(x)
+    return concatenate([x.min(axis=1, keepdims=True), x.max(axis=1, keepdims=True)], axis=1)
+
+
+# End
@@ -2038,6 +2038,53 @@ class Coords(ndarray):
         return (x, s.reshape(self.shape[:-1]))
 
 
+    def cluster(self,ppb=8,shift=0.5):
+        """Cluster the points on a regular grid of boxes.
+
+        This is a lossy variant of :meth:`fuse`: all the points that fall
+        in the same box of the grid created by :meth:`boxes` are replaced
+        with a single point at their centroid, regardless of their distance.
+        It is typically used to create a coarse approximation of a large
+        point set, e.g. for level-of-detail rendering.
+
+        Parameters:
+
+        - `ppb`: int: targeted mean number of points per box. Larger values
+          result in a coarser clustering.
+        - `shift`: float: relative shift to be applied on the boxes.
+
+        Returns a tuple of two arrays, like :meth:`fuse`:
+
+        - `coords`: the cluster points as a :class:`Coords` object with shape
+          (nclusters,3). The clusters are numbered in order of their box
+          numbers.
+        - `index`: an int array holding the cluster number for each of the
+          original points. Its shape is equal to self.pshape().
+
+        Example:
+
+          >>> X = Coords([[0.,0.,0.],[0.1,0.,0.],[1.,0.,0.],[0.9,0.,0.]])
+          >>> x,e = X.cluster(ppb=2)
+          >>> print(x)
+          [[ 0.05  0.    0.  ]
+           [ 0.95  0.    0.  ]]
+          >>> print(e)
+          [0 0 1 1]
+
+        """
+        if self.size == 0:
+            return self, array([], dtype=Int).reshape(self.pshape())
+
+        x = self.points()
+        ox, dx, nx = self.boxes(ppb=ppb, shift=shift)
+        ind = floor((x-ox)/dx).astype(Int).clip(0, nx-1)
+        val = (ind[:, 2] * nx[1] + ind[:, 1]) * nx[0] + ind[:, 0]
+        val, index = unique(val, return_inverse=True)
+        npts = bincount(index)
+        coords = column_stack([bincount(index, weights=x[:, i]) for i in range(3)]) / npts[:, newaxis]
+        return Coords(coords), index.reshape(self.pshape())
+
+
     def adjust(self,**kargs):
         """Find (almost) identical nodes and adjust them to be identical.
 
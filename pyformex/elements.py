@@ -54,6 +54,36 @@ def _sanitize(ent):
         return Connectivity(ent[1], eltype=ent[0])
 
 
+def _lagrange(*n):
+    """Exponents of a full tensor product polynomial of degrees n"""
+    return np.indices([i+1 for i in n]).reshape(len(n), -1).T
+
+
+def _serendipity(*n):
+    """Exponents of a tensor product polynomial of degrees n
+
+    Only the monomials where at most one exponent is higher than 1
+    are retained.
+    """
+    e = _lagrange(*n)
+    return e[(e > 1).sum(axis=-1) <= 1]
+
+
+def _simplex(ndim,degree,bubbles=()):
+    """Exponents of a polynomial in the barycentric coordinates of a simplex
+
+    Returns the exponents of all the monomials of the given total degree in
+    the ndim+1 barycentric coordinates, plus the bubble monomials for the
+    specified entity levels: 2 adds the face bubbles, 3 the volume bubble.
+    """
+    e = _lagrange(*[degree]*(ndim+1))
+    e = e[e.sum(axis=-1) == degree]
+    if bubbles:
+        b = _lagrange(*[1]*(ndim+1))
+        e = np.row_stack([e]+[ b[b.sum(axis=-1) == k+1] for k in bubbles ])
+    return e
+
+
 class ElementType(object):
     """Base class for element type classes.
 
@@ -83,6 +113,15 @@ class ElementType(object):
     - `faces`: a list of faces, each defined by a list of minimum 3 node
       numbers,
     - `element`: a list of all node numbers
+    - `shape`: a tuple (nbary,exponents) defining the shape functions of the
+      element. It is an optional attribute, required for the methods
+      :meth:`shapeFunctions` and :meth:`gaussPoints`. The shape functions
+      are the linear combinations of a set of monomials taking the value
+      1 in one of the vertices and 0 in all the others. The monomials are
+      products of powers of the variables (1-x-y-z, x, y, z), where the
+      first variable only considers the first `nbary` natural coordinates
+      and is omitted if nbary is 0. For `exponents` only the columns
+      corresponding with existing variables are given.
     - `drawfaces`: a list of faces to be drawn, if different from faces. This
       is an optional attribute. If defined, it will be used instead of the
       `faces` attribute to draw the element. This can e.g. be used to draw
@@ -254,6 +293,131 @@ class ElementType(object):
         return self.drawgl2faces
 
 
+    @classmethod
+    def corners(self):
+        """Return the corner vertices of the element.
+
+        The corners are the vertices having all their natural coordinates
+        equal to 0 or 1. These are the vertices of the linear element
+        of the same family.
+
+        Returns an int array with the vertex numbers of the corners.
+
+        Example:
+
+        >>> Tet10.corners()
+        array([0, 1, 2, 3])
+        >>> Hex27.corners()
+        array([ 0,  2,  6,  8, 18, 20, 24, 26])
+        """
+        v = self.vertices[:, :max(self.ndim, 1)]
+        return np.where(((v == 0.) | (v == 1.)).all(axis=-1))[0]
+
+
+    @classmethod
+    def _shapeBasis(self,x,deriv=False):
+        """Evaluate the monomials of the shape functions at points x
+
+        Returns an array (npts,nmono) with the monomial values, and if deriv
+        is True, also an array (npts,nmono,ndim) with the derivatives.
+        """
+        if not hasattr(self, 'shape'):
+            raise ValueError("No shape functions defined for element type %s" % self)
+        nbary, exp = self.shape
+        ndim = self.ndim
+        x = np.asarray(x, dtype=np.float64).reshape(-1, ndim)
+        D = np.eye(ndim)
+        if nbary:
+            x = np.column_stack([1.-x[:, :nbary].sum(axis=-1), x])
+            D = np.row_stack([-1.*(np.arange(ndim) < nbary), D])
+        P = x[:, np.newaxis, :] ** exp
+        phi = P.prod(axis=-1)
+        if not deriv:
+            return phi
+        # derivatives with respect to the variables
+        dP = np.where(exp > 0, exp * x[:, np.newaxis, :] ** np.maximum(exp-1, 0), 0.)
+        dphi = np.empty(P.shape)
+        for k in range(P.shape[-1]):
+            Pk = P.copy()
+            Pk[..., k] = dP[..., k]
+            dphi[..., k] = Pk.prod(axis=-1)
+        return phi, np.dot(dphi, D)
+
+
+    @classmethod
+    def shapeFunctions(self,x,deriv=False):
+        """Evaluate the shape functions of the element.
+
+        Parameters:
+
+        - `x`: float array (npts,ndim): natural coordinates of the points
+          where the shape functions are to be evaluated.
+        - `deriv`: bool: if True, also return the derivatives of the shape
+          functions with respect to the natural coordinates.
+
+        Returns a float array (npts,nplex) with the values of the shape
+        functions in the points, and if `deriv` is True, also a float
+        array (npts,nplex,ndim) with the derivatives.
+
+        Example:
+
+        >>> print(Quad4.shapeFunctions([[0.5,0.5],[0.,1.]]))
+        [[ 0.25  0.25  0.25  0.25]
+         [ 0.    0.    0.    1.  ]]
+        """
+        if not hasattr(self, '_shapecoeffs'):
+            V = self._shapeBasis(self.vertices[:, :self.ndim])
+            self._shapecoeffs = np.linalg.inv(V)
+        C = self._shapecoeffs
+        if deriv:
+            phi, dphi = self._shapeBasis(x, True)
+            return np.dot(phi, C), np.einsum('pmd,mn->pnd', dphi, C)
+        else:
+            return np.dot(self._shapeBasis(x), C)
+
+
+    @classmethod
+    def gaussPoints(self):
+        """Return the Gauss integration points of the element.
+
+        The number of points is sufficient to integrate the mass matrix of
+        a linear element and the stiffness matrix of a quadratic one.
+        Along the tensor directions, Gauss-Legendre quadrature is used
+        with one point more than the polynomial degree. On the triangles
+        and tetrahedrons, the 1-point rule is used for linear elements
+        and the 3 resp. 4-point rule for higher orders.
+
+        Returns a tuple (x,w) where x is a float array (npts,ndim) with
+        the natural coordinates of the integration points and w is a
+        float array (npts,) with the weights.
+
+        Example:
+
+        >>> x, w = Tri6.gaussPoints()
+        >>> print(w.sum())
+        0.5
+        >>> x, w = Hex8.gaussPoints()
+        >>> print(len(w), w.sum())
+        8 1.0
+        """
+        if not hasattr(self, 'shape'):
+            raise ValueError("No shape functions defined for element type %s" % self)
+        nbary, exp = self.shape
+        rules = []
+        if nbary:
+            degree = exp[:, :nbary+1].sum(axis=-1).max()
+            rules.append(_simplex_gauss[nbary][min(degree, 2)])
+            exp = exp[:, nbary+1:]
+        for n in exp.max(axis=0):
+            t, w = np.polynomial.legendre.leggauss(n+1)
+            rules.append(((t.reshape(-1, 1)+1.)/2., w/2.))
+        x, w = np.zeros((1, 0)), np.ones((1,))
+        for xi, wi in rules:
+            x = np.column_stack([x.repeat(len(wi), axis=0), np.tile(xi, (len(w), 1))])
+            w = np.outer(w, wi).ravel()
+        return x, w
+
+
     @classmethod
     def toMesh(self):
         """Convert the element type to a Mesh.
@@ -983,6 +1147,44 @@ Wedge6.degenerate = {
     }
 
 
+############################################################
+############ Shape functions ###############################
+
+Line2.shape = (0, _lagrange(1))
+Line3.shape = (0, _lagrange(2))
+Line4.shape = (0, _lagrange(3))
+Tri3.shape = (2, _simplex(2, 1))
+Tri6.shape = (2, _simplex(2, 2))
+Quad4.shape = (0, _lagrange(1, 1))
+Quad6.shape = (0, _lagrange(2, 1))
+Quad8.shape = (0, _serendipity(2, 2))
+Quad9.shape = (0, _lagrange(2, 2))
+Quad12.shape = (0, _serendipity(3, 3))
+Tet4.shape = (3, _simplex(3, 1))
+Tet10.shape = (3, _simplex(3, 2))
+Tet14.shape = (3, _simplex(3, 2, (2,)))
+Tet15.shape = (3, _simplex(3, 2, (2, 3)))
+Wedge6.shape = (2, np.column_stack([np.tile(_simplex(2, 1), (2, 1)), [0]*3+[1]*3]))
+Hex8.shape = (0, _lagrange(1, 1, 1))
+Hex16.shape = (0, _serendipity(2, 2, 1))
+Hex20.shape = (0, _serendipity(2, 2, 2))
+Hex27.shape = (0, _lagrange(2, 2, 2))
+
+# Gauss integration rules for triangles and tetrahedrons
+_simplex_gauss = {
+    2: {
+        1: (np.array([[1./3., 1./3.]]), np.array([1./2.])),
+        2: (np.array([[1./6., 1./6.], [2./3., 1./6.], [1./6., 2./3.]]),
+            np.array([1./6.]*3)),
+        },
+    3: {
+        1: (np.array([[0.25, 0.25, 0.25]]), np.array([1./6.])),
+        2: (np.array([[0.1381966011250105]*3]*4) + 0.4472135954999579*np.eye(4, 3),
+            np.array([1./24.]*4)),
+        },
+    }
+
+
 ##########################################################
 # Some exotic elements not meant for Finite Element applications
 # Therefore we only have one of each, with minimal node sets
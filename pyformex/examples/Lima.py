@@ -44,7 +44,7 @@ _topics = ['illustration']
 _techniques = ['dialog', 'lima']
 
 from pyformex.gui.draw import *
-from pyformex.plugins import lima, turtle
+from pyformex.plugins import lima
 from pyformex.odict import OrderedDict
 
 # return standard Turtle rules
@@ -97,10 +97,9 @@ limas = OrderedDict([
 def show(i,L,turtle_cmds,clear=True,text=True,color=0,lw=1.):
     """Show the current production of the Lima L."""
     global FA, TA
-    turtle_script = L.translate(turtle_cmds)
-    coords = turtle.play("reset();" + turtle_script)
-    if len(coords) > 0:
-        FB = draw(Formex(coords),color=color,linewidth=lw)
+    F = L.formex(turtle_cmds)
+    if F.nelems() > 0:
+        FB = draw(F,color=color,linewidth=lw)
         if clear:
             undraw(FA)
         FA = FB
@@ -131,7 +130,7 @@ def grow(rule='',clearing=True,text=True,ngen=-1,colors=True,viewports=False):
     if viewports:
         layout(g+1, ncols=(g+2)//2)
 
-    L = lima.Lima(a, r)
+    L = lima.LSystem(a, r)
     # show the axiom
     show(0, L, t, clearing, text, color=0)
     # show g generations
@@ -172,12 +172,11 @@ def projectPoints():
     X = simple.randomPoints(npts,N.bbox())
     draw(X,marksize=5)
 
-    for Xi in X:
-        u,P = N.projectPoint(Xi)
-        draw(Formex([[P,Xi]]),color=red)
-        if show_distance:
-            d = at.length(P-Xi)
-            drawText("%s" %d, 0.5*(P+Xi))
+    u,P,d,conv = N.projectPoints(X)
+    draw(connect([Formex(P),Formex(X)]),color=red)
+    if show_distance:
+        for Pi,Xi,di in zip(P,X,d):
+            drawText("%s" %di, 0.5*(Pi+Xi))
 
 
 def close():
@@ -0,0 +1,86 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+"""assembly: Assembly of element matrices into global system matrices
+
+The global matrices of a finite element model are obtained by summing
+the element matrices into the rows and columns of the element's degrees
+of freedom. This module does that for all the elements at once: the
+element matrices are collected in a coordinate (COO) format and converted
+to a compressed sparse row (CSR) matrix, in which the contributions to
+the same position are summed. The resulting matrices can be used directly
+by the eigensolvers in :mod:`fe.eigen`.
+
+The sparse assembly requires scipy (http://www.scipy.org/).
+The dense assembly only needs numpy.
+"""
+from __future__ import print_function
+
+from numpy import *
+
+
+def assemble(mats,dofs,n=None,sparse=True):
+    """Assemble element matrices into a global matrix.
+
+    Parameters:
+    mats: (nel,nd,nd) float array with the element matrices, or a single
+      (nd,nd) matrix that is used for all elements.
+    dofs: (nel,nd) int array with the global degree of freedom numbers
+      of the rows/columns of the element matrices.
+    n: number of global degrees of freedom. If not specified, it is set
+      to the highest dof number plus one.
+    sparse: if True, the global matrix is returned as a scipy.sparse CSR
+      matrix. If False, a dense numpy array is returned.
+
+    Returns the (n,n) global matrix.
+
+    Example:
+
+    >>> print(assemble(ones((2,2)),[[0,1],[1,2]],sparse=False))
+    [[ 1.  1.  0.]
+     [ 1.  2.  1.]
+     [ 0.  1.  1.]]
+    """
+    dofs = asarray(dofs,dtype=int)
+    nel,nd = dofs.shape
+    mats = asarray(mats,dtype=float)
+    if mats.ndim == 2:
+        mats = resize(mats,(nel,nd,nd))
+    if mats.shape != (nel,nd,nd):
+        raise ValueError("Shape of mats (%s) does not match dofs (%s)" % (mats.shape,dofs.shape))
+    if n is None:
+        n = dofs.max() + 1
+    rows = repeat(dofs,nd,axis=1).ravel()
+    cols = tile(dofs,(1,nd)).ravel()
+    vals = mats.ravel()
+    if sparse:
+        from scipy.sparse import coo_matrix
+        # Conversion to csr sums the duplicate entries
+        return coo_matrix((vals,(rows,cols)),shape=(n,n)).tocsr()
+    else:
+        A = zeros((n,n))
+        add.at(A,(rows,cols),vals)
+        return A
+
+
+# End
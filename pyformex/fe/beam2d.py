@@ -26,6 +26,7 @@
 """
 
 from numpy import *
+from pyformex.fe.assembly import assemble as assemble_matrix
 
 class Beam2d:
 
@@ -83,24 +84,27 @@ def cantilever_frequencies(rho,A,l,E,I):
     return c * coeffs**2 / 2 / pi
 
 
-def assemble(Ke,Me,ne):
-    """Assemble beam of ne identical elements Ke,Me"""
+def assemble(Ke,Me,ne,sparse=False):
+    """Assemble beam of ne identical elements Ke,Me
+
+    If sparse is True, K and M are returned as scipy.sparse CSR matrices,
+    else as dense arrays.
+    """
     n = 2*(ne+1)
-    K = zeros((n,n))
-    M = zeros((n,n))
-    for ie in range(ne):
-        i = 2*ie
-        K[i:i+4,i:i+4] += Ke
-        M[i:i+4,i:i+4] += Me
+    dofs = 2*arange(ne).reshape(-1,1) + arange(4)
+    K = assemble_matrix(Ke,dofs,n,sparse=sparse)
+    M = assemble_matrix(Me,dofs,n,sparse=sparse)
     return K,M
 
 
-def createBeam(lt,nel,addbc=True):
+def createBeam(lt,nel,addbc=True,sparse=False):
     """Create stiffness and mass matrices of a simple beam.
 
     lt: length of the beam (m)
     nel: number of element to use along the beam length
     addbc: if True, add cantilever boundary conditions
+    sparse: if True, return scipy.sparse matrices. This is recommended
+      for large values of nel.
     """
     # element length
     l = lt / nel
@@ -108,7 +112,7 @@ def createBeam(lt,nel,addbc=True):
     Ke = Beam2d.stiff(steel.E,IPE100.I,l)
     Me = Beam2d.mass(IPE100.rho,IPE100.A,l)
     # assemble the global stiffness and mass matrix
-    K,M = assemble(Ke,Me,nel)
+    K,M = assemble(Ke,Me,nel,sparse=sparse)
     if addbc:
         # Impose cantilever boundary conditions
         # This is done by adding a very stiff translational
@@ -47,7 +47,13 @@ by K-J Bathe (Prentice-Hall 1982).
 (C) 2016 Benedict Verhegghe (benedict.verhegghe@feops.com)
 This code is distributed under the GNU-GPL v 1.3 or later.
 
-The only non-standard Python module used is numpy (http://www.numpy.org/).
+The only non-standard Python module required is numpy
+(http://www.numpy.org/). If scipy (http://www.scipy.org/) is available,
+the stiffness and mass matrices may also be passed as scipy.sparse
+matrices. The factorization of the stiffness matrix is then done
+by a sparse LU decomposition. In all cases, the iterative solvers factorize
+the stiffness matrix only once and reuse the factorization in all
+iterations.
 
 Available functions for solving eigenproblems:
 - tjacobi: for small standard symmetric problems
@@ -71,6 +77,18 @@ prec = 6
 set_printoptions(precision=prec,linewidth=132)
 
 
+def _matrices(k,m):
+    """Convert stiffness and mass matrix to matrix or sparse matrix class.
+
+    If any of k and m is a scipy.sparse matrix, both are converted
+    to scipy.sparse CSR matrices, else both become numpy matrices.
+    """
+    if issparse(k) or issparse(m):
+        return tosparse(k),tosparse(m)
+    else:
+        return matrix(k),matrix(m)
+
+
 def vector(x):
     """Convert a single column matrix into a vector."""
     return asarray(x).squeeze()
@@ -82,6 +100,29 @@ def interleave(l1,l2):
     return list(chain(*zip(l1,l2)))
 
 
+def issparse(a):
+    """Check whether a is a scipy.sparse matrix.
+
+    Always returns False if scipy is not available.
+    """
+    try:
+        from scipy import sparse
+    except ImportError:
+        return False
+    return sparse.issparse(a)
+
+
+def tosparse(a):
+    """Convert a sparse matrix to the scipy.sparse CSR matrix format.
+
+    The matrix class is used (rather than the sparse array class)
+    to have the same semantics for the `*` operator as the numpy
+    matrix class used for dense matrices.
+    """
+    from scipy import sparse
+    return sparse.csr_matrix(a)
+
+
 def lu_decomp(A,ptol=1.e-20):
     """Perform an LU decomposition of A.
 
@@ -92,27 +133,77 @@ def lu_decomp(A,ptol=1.e-20):
     Unlike scipy's lu_factor function, this function does not perform any
     pivoting. Instead, as soon as a zero diagonal element is encountered,
     the function aborts.
+
+    The input matrix A is not changed.
     """
-    m,n = shape(A)
-    for i in arange(0,n):
+    A = array(A,dtype=float)
+    n = A.shape[0]
+    for i in range(n):
         pivot = A[i,i]
         if abs(pivot) < ptol:
             print('zero pivot encountered')
             break
-        for k in arange(i+1,n):
-            A[k,i] = A[k,i]/pivot
-            A[k,i+1:n] = A[k,i+1:n] - A[k,i]*A[i,i+1:n]
-            L = eye(n)+tril(A,-1)
-            U = triu(A)
+        # Eliminate column i from all rows below i in a single step
+        A[i+1:,i] /= pivot
+        A[i+1:,i+1:] -= outer(A[i+1:,i],A[i,i+1:])
+    L = eye(n)+tril(A,-1)
+    U = triu(A)
     return L,U
 
 
+def factorize(k):
+    """Factorize the matrix k for the repeated solution of k.x = b.
+
+    k: a dense (n,n) matrix or a scipy.sparse matrix.
+
+    The factorization is computed only once: the iterative eigensolvers
+    use it in all their iterations.
+    Sparse matrices are factorized with scipy's sparse LU decomposition,
+    dense matrices with scipy's lu_factor. If scipy is not available,
+    the inverse of the dense matrix is computed.
+
+    Returns a function solve(b) that returns the solution x (n,q) as a
+    matrix for a right hand side b (n,q).
+    """
+    if issparse(k):
+        from scipy.sparse.linalg import splu
+        lu = splu(k.tocsc())
+        return lambda b: matrix(lu.solve(asarray(b,dtype=float)))
+    try:
+        from scipy.linalg import lu_factor, lu_solve
+    except ImportError:
+        ki = matrix(linalg.inv(k))
+        return lambda b: ki * b
+    lu = lu_factor(asarray(k))
+    return lambda b: matrix(lu_solve(lu,asarray(b)))
+
+
 def count_neg_diag(a):
     """Compute the number of negative diagonal elements in LDLt decomposition
 
     Constructs the LDLt (or LU) decomposition of k and returns the number
     of negative diagonal elements.
+
+    If a is a scipy.sparse matrix, a sparse LU decomposition is used
+    with a symmetric permutation and diagonal pivoting. If the fill
+    reducing ordering leads to a zero pivot, the natural ordering is
+    tried. If that fails as well, the matrix is singular and a
+    ValueError is raised.
     """
+    if issparse(a):
+        from scipy.sparse.linalg import splu
+        a = a.tocsc()
+        for order in ['MMD_AT_PLUS_A', 'NATURAL']:
+            try:
+                lu = splu(a,permc_spec=order,diag_pivot_thresh=0.,
+                          options=dict(SymmetricMode=True))
+            except RuntimeError:
+                # exactly singular
+                break
+            if (lu.perm_r == lu.perm_c).all():
+                # Symmetric permutation: U has the same inertia as a
+                return (lu.U.diagonal() < 0.0).sum()
+        raise ValueError("Can not compute the inertia of a singular matrix")
     return (lu_decomp(a)[1].diagonal() < 0.0).sum()
 
 
@@ -129,6 +220,8 @@ def sturm_check(k,m,e,bound='lu',group=True,tol=0.01,verbose=False):
     the number of eigenvalues lower than s.
     This function uses that property to check the obtained eigenvalues.
 
+    k,m: the stiffness and mass matrices: dense matrices or
+      scipy.sparse matrices.
     e: the eigenvalues found for the eigenproblem (k,m)
     bound: either 'l', 'u' or 'lu': specifies if a shift at the lower bound,
       the upper bound, or both is to be performed.
@@ -155,14 +248,14 @@ def sturm_check(k,m,e,bound='lu',group=True,tol=0.01,verbose=False):
     elif bound == 'u':
         shift,count = ub,un
     else:
-        shift,count = interleave(lb,ub),interleave(ln,un)
+        shift,count = array(interleave(lb,ub)),array(interleave(ln,un))
     if group:
         if bound == 'l':
             shift,count = shift[:1],count[:1]
         elif bound == 'u':
             shift,count = shift[-1:],count[-1:]
         else:
-            shift,count = shift[[1,-1]],count[[1,-1]]
+            shift,count = shift[[0,-1]],count[[0,-1]]
 
     ok = True
     for s,c in zip(shift,count):
@@ -171,7 +264,7 @@ def sturm_check(k,m,e,bound='lu',group=True,tol=0.01,verbose=False):
         if n != c:
             ok = False
         if n != c or verbose:
-            print("Shift %.6f: %s expected, %s found, %s missing" % (s,n,c,n-c))
+            print("Shift %.6f: %s expected, %s found, %s missing" % (s,c,n,c-n))
     return ok
 
 
@@ -195,7 +288,7 @@ def reorder(e,x):
     return e[ind], x[:,ind]
 
 
-def orthonormalize(x,m=None,i=0):
+def orthonormalize(x,m=None,i=0,rtol=None):
     """Orthonormalize the vectors of x with respect to m.
 
     x: a set of p column vectors (n,p), p <= n
@@ -203,23 +296,32 @@ def orthonormalize(x,m=None,i=0):
     i: the first vector to be orthonormalized, i <= p. This can be used
       to speed up the operations in case the first i-1 vectors are already
       orthonormal. The operations will only be performed for vectors i..p.
+    rtol: if specified, a vector whose length after orthogonalization
+      is less than rtol times its original length, is considered to be
+      linearly dependent on the previous ones. It is then replaced with
+      a random vector, which is orthonormalized instead.
 
     Returns the orthogonalized vectors (n,p-i) and their length factors (p-i).
     """
     l = []
     for j in range(i,x.shape[1]):
         xj = x[:,j]
-        if m is None:
-            xm = xj.copy()
-        else:
-            xm = m * xj
-        # Orthogonalize to the previous j vectors
-        for k in range(j):
-            xk = x[:,k]
-            a = xk.T * xm
-            xj -= float(a) * xk
-        # Normalize vector j with respect to m
-        a = float(xj.T * xm)
+        while True:
+            if m is None:
+                xm = xj.copy()
+            else:
+                xm = m * xj
+            a0 = (xj.T * xm).item()
+            # Orthogonalize to the previous j vectors
+            for k in range(j):
+                xk = x[:,k]
+                a = (xk.T * xm).item()
+                xj -= a * xk
+            # Normalize vector j with respect to m
+            a = (xj.T * xm).item()
+            if rtol is None or a > rtol*rtol * a0:
+                break
+            xj[:] = random.rand(*xj.shape)
         a = sqrt(a)
         l.append(a)
         x[:,j] /= a
@@ -250,7 +352,7 @@ def initial_vectors(k,m,p,randx=False):
     n = k.shape[0]
     x = zeros((n,p))
     # First vector: the diagonal of the mass matrix
-    x[:,0] = m.diagonal()
+    x[:,0] = asarray(m.diagonal()).ravel()
 
     if p > 1:
         # Remainder are the dofs with the smallest kii/mii ratio:
@@ -258,7 +360,7 @@ def initial_vectors(k,m,p,randx=False):
         # First check where mii != 0
         ok = where(x[:,0] != 0.)[0]
         # compute ratios k/m
-        km = asarray(k).diagonal()[ok] / x[:,0][ok]
+        km = asarray(k.diagonal()).ravel()[ok] / x[:,0][ok]
         # find p-1 smallest values
         ind = argsort(km)[:p-1]
         ind = ok[ind]
@@ -422,8 +524,8 @@ def inverse(k,m,p=None,x=None,tol=1.e-3,maxit=20,verbose=True):
     inverse iteration.
 
     Parameters:
-    k: stiffness matrix (n,n)
-    m: mass matrix (n,n)
+    k: stiffness matrix (n,n), dense or scipy.sparse
+    m: mass matrix (n,n), dense or scipy.sparse
     p: number of eigenvalues to compute. Can be omitted if x is specified.
     x: initial guesses for the first p eigenvectors (n,p). If not specified,
        proper initial values are constructed automatically.
@@ -435,18 +537,18 @@ def inverse(k,m,p=None,x=None,tol=1.e-3,maxit=20,verbose=True):
     Returns e,x: the p smallest eigenvalues e(p) and corresponding
     eigenvectors x(n,p) in order of increasing absolute eigenvalue.
     """
-    k = matrix(k)
-    m = matrix(m)
+    k,m = _matrices(k,m)
     n = k.shape[0]
     if x is None:
         # Construct optimal initial vectors
         x = initial_vectors(k,m,p)
+    x = matrix(x)
+    # Factorize k once for all iterations
+    solve = factorize(k)
     # Perform simultaneous inverse iteration over all eigenvectors
     for i in range(maxit):
         # Solve for new approximations
-        # NOTE: the speed of this method can drastically be improved
-        # by moving the LDLt decomposition of k outside of the loop.
-        xi = linalg.solve(k,m*x)
+        xi = solve(m*x)
         # Orthonormalize the vectors with respect to the mass matrix
         # This also delivers the reciprocals of the eigenvalues
         xi,ei = orthonormalize(xi,m)
@@ -464,15 +566,15 @@ def inverse(k,m,p=None,x=None,tol=1.e-3,maxit=20,verbose=True):
     return reorder(e,x)
 
 
-def subspace(k,m,p,q=None,x=None,tol=1.e-6,maxit=20,verbose=False,check=True):
+def subspace(k,m,p,q=None,x=None,tol=1.e-6,maxit=40,verbose=False,check=True):
     """Find some eigenvectors and eigenvalues of k,m by subspace iteration.
 
     Solves for the p smallest eigenvalues (and corresponding eigenvectors)
     of the generalized eigenproblem k.x = e.m.x using subspace iteration.
 
     Parameters:
-    k: stiffness matrix (n,n)
-    m: mass matrix (n,n)
+    k: stiffness matrix (n,n), dense or scipy.sparse
+    m: mass matrix (n,n), dense or scipy.sparse
     p: number of eigenpairs to compute (p <= n)
     q: size of the subspace (p <= q <= n). If not specified and neither is
        x, it is set to min(2p,p+8,n), else to the number of columns in x.
@@ -486,29 +588,32 @@ def subspace(k,m,p,q=None,x=None,tol=1.e-6,maxit=20,verbose=False,check=True):
     Returns e,x: the p smallest eigenvalues e(p) and corresponding
     eigenvectors x(n,p) in order of increasing absolute eigenvalue.
     """
-    k = matrix(k)
-    m = matrix(m)
+    k,m = _matrices(k,m)
     n = k.shape[0]
     if q is None and x is None:
         # Sensible choice of subspace size
         q = min(2*p,p+8,n)
     if q is None:
         # x was specified, acknowledge it
-        mx = m*x
+        mx = m*matrix(x)
         q = mx.shape[1]
     else:
         # Construct optimal initial vectors
         if verbose: print('Size of subspace: %s' % q)
         mx = initial_vectors(k,m,q)
 
+    # Factorize k once for all iterations
+    solve = factorize(k)
     for i in range(maxit):
         # Compute q vectors to reduce space
-        # NOTE: just like for inverse iteration, performing LDLt decomposition
-        # of k before starting the loop can dramatically improve performance
-        xi = linalg.solve(k,mx)
+        xi = solve(mx)
+        # Orthonormalize the vectors with respect to m: this keeps the
+        # projected mass matrix well conditioned when some of the vectors
+        # become nearly parallel, as happens with large models
+        xi,dummy = orthonormalize(xi,m,rtol=1.e-6)
         # Project k,m on a smaller vector space
-        ki = xi.T * k * xi
-        mi = xi.T * m * xi
+        ki = xi.T * (k * xi)
+        mi = xi.T * (m * xi)
         # Solve reduced eigenproblem for all q eigenpairs
         ei,qi = gjacobi(ki,mi,tol=tol)
         # New full eigenvector approximations
@@ -546,8 +651,8 @@ def lanczos(k,m,p,q=None,randx=False,check=True,verbosity=0):
     of the generalized eigenproblem k.x = e.m.x using lanczos vectors.
 
     Parameters:
-    k: stiffness matrix (n,n)
-    m: mass matrix (n,n)
+    k: stiffness matrix (n,n), dense or scipy.sparse
+    m: mass matrix (n,n), dense or scipy.sparse
     p: number of eigenpairs to compute (p <= n)
     q: number of lanczos vectors to be used. Default q == p. Since each
        following eigenvalue is obtained with smaller accuracy, this should be
@@ -558,9 +663,12 @@ def lanczos(k,m,p,q=None,randx=False,check=True,verbosity=0):
     eigenvectors x(n,p) in order of increasing absolute eigenvalue.
 
     """
+    k,m = _matrices(k,m)
     n = k.shape[0]
     if q is None:
         q = min(2*p,p+8,n)
+    # Factorize k once for all lanczos vectors
+    solve = factorize(k)
     # Construct start vector
     if randx:
         # arbitrary
@@ -576,8 +684,8 @@ def lanczos(k,m,p,q=None,randx=False,check=True,verbosity=0):
     # associated problem
     for i in range(1,q+1):
         mx = m * matrix(x[:,i-1])
-        xbar = linalg.solve(k,mx)
-        alpha = float(xbar.T * mx)
+        xbar = solve(mx)
+        alpha = (xbar.T * mx).item()
         t[i-1,i-1] = alpha
         if i == q:
             break
@@ -587,7 +695,7 @@ def lanczos(k,m,p,q=None,randx=False,check=True,verbosity=0):
         #x[:,i],beta = orthonormalize(xtilde,m)
         x[:,i] = xtilde
         x[:,i],beta = orthonormalize(x[:,:i+1],m,i)
-        beta = float(beta)
+        beta = beta.item()
         t[i-1,i] = t[i,i-1] = beta
     # Now find the eigenvalues of the associated problem
     if verbosity > 0:
@@ -42,6 +42,22 @@ from pyformex import utils
 import pyformex.arraytools as at
 
 
+def _gaussToNodes(eltype):
+    """Return the matrix extrapolating Gauss point values to the nodes.
+
+    Returns a float array (nplex,ngp). If there are at least as many Gauss
+    points as nodes, the values are fitted with the shape functions of the
+    element, else with those of the linear element of the same family.
+    """
+    from pyformex.quality import linearElement
+    x = eltype.gaussPoints()[0]
+    if len(x) >= eltype.nplex():
+        return at.linalg.pinv(eltype.shapeFunctions(x))
+    lin,corners = linearElement(eltype)
+    N = lin.shapeFunctions(eltype.vertices[:,:eltype.ndim])
+    return at.dot(N,at.linalg.pinv(lin.shapeFunctions(x)))
+
+
 ##############################################################
 
 class Field(object):
@@ -94,7 +110,9 @@ class Field(object):
 
       The actually available field types depend on the type of the
       `geometry` object. :class:`Formex` type has only 'elemc' and 'elemn'.
-      `Mesh` currently has 'node', 'elemc' and 'elemn'.
+      `Mesh` has 'node', 'elemc', 'elemn' and 'elemg'. For 'elemg' fields
+      on a Mesh, the points are the Gauss points of the element type (see
+      :meth:`elements.ElementType.gaussPoints`).
 
     - `data`: an array with the field values defined at the specified
       points. The required shape of the array depends on `fldtype`:
@@ -280,6 +298,22 @@ class Field(object):
                     data = at.multiplex(self.data,self.geometry.nplex(),axis=1)
                 elif totype == 'node':
                     return self.convert('elemn').convert('node',toname)
+                elif totype == 'elemg':
+                    ngp = len(self.geometry.elType().gaussPoints()[1])
+                    data = at.multiplex(self.data,ngp,axis=1)
+            elif self.fldtype == 'elemg':
+                if totype == 'elemn':
+                    data = at.einsum('ng,eg...->en...',_gaussToNodes(self.geometry.elType()),self._gaussData())
+                elif totype == 'elemc':
+                    w = self.geometry.elType().gaussPoints()[1]
+                    data = at.einsum('g,eg...->e...',w/w.sum(),self._gaussData())
+                elif totype == 'node':
+                    return self.convert('elemn').convert('node',toname)
+
+            if totype == 'elemg' and self.fldtype in ['node','elemn']:
+                x = self.geometry.elType().gaussPoints()[0]
+                N = self.geometry.elType().shapeFunctions(x)
+                data = at.einsum('gn,en...->eg...',N,self.convert('elemn').data)
 
         if data is None:
             raise ValueError("Can not convert %s field data from '%s' to '%s'" % (self.geometry.__class__.__name__,self.fldtype,totype))
@@ -287,6 +321,92 @@ class Field(object):
         return Field(self.geometry,totype,data,toname)
 
 
+    def _gaussData(self):
+        """Return the data of an 'elemg' Field, checking the number of points"""
+        ngp = len(self.geometry.elType().gaussPoints()[1])
+        if self.data.shape[1] != ngp:
+            raise ValueError("Expected %s Gauss points for element type %s, got %s" % (ngp,self.geometry.elType(),self.data.shape[1]))
+        return self.data
+
+
+    def transfer(self,target,totype=None,toname=None,atol=None):
+        """Transfer a Field to another Mesh.
+
+        The field values are interpolated in the points of the target Mesh
+        where the target field is defined. This allows to map the results
+        between two non-matching meshes of the same domain.
+
+        Parameters:
+
+        - `target`: the Mesh to which the Field is transferred.
+        - `totype`: string: the type of the target field. Default is the
+          same type as the source field.
+        - `toname`: string: the name of the target field. If not specified,
+          an autoname is generated.
+        - `atol`: float: the tolerance used to locate the target points
+          in the source Mesh. See :func:`locate.locatePoints`.
+
+        The target points (nodes, element nodes, element centers or
+        Gauss points) are located in the source Mesh with
+        :func:`locate.locatePoints`, and the source field is interpolated
+        in these points with the shape functions of the source elements.
+        Field types other than 'elemc' are first converted to 'elemn'.
+        Target points that can not be located get the value NaN.
+
+        Returns a Field of type `totype` defined over `target`.
+
+        Example:
+
+        >>> from pyformex.mesh import Mesh
+        >>> M = Mesh(eltype='quad4').subdivide(2,2)
+        >>> f = Field(M,'node',M.coords[:,0]+2*M.coords[:,1])
+        >>> T = Mesh(eltype='tri3').scale(0.5).trl([0.2,0.2,0.])
+        >>> print(f.transfer(T).data)
+        [ 0.6  1.1  1.6]
+        """
+        from pyformex import locate
+
+        if totype is None:
+            totype = self.fldtype
+        if totype not in target.fieldtypes:
+            raise ValueError("Can not transfer a field of type '%s' to a %s" % (totype,target.__class__.__name__))
+
+        # The target points
+        tgtype = target.elType()
+        if totype == 'node':
+            P = target.coords
+        else:
+            if totype == 'elemn':
+                x = tgtype.vertices[:,:tgtype.ndim]
+            elif totype == 'elemc':
+                x = tgtype.vertices[:,:tgtype.ndim].mean(axis=0).reshape(1,-1)
+            else:
+                x = tgtype.gaussPoints()[0]
+            P = locate.elementPoints(target.coords,target.elems,tgtype,x)
+            if totype == 'elemc':
+                P = P[:,0]
+        shape = P.shape[:-1]
+        P = P.reshape(-1,3)
+
+        # Locate and interpolate
+        M = self.geometry
+        eltype = M.elType()
+        elem,xi,dist = locate.locatePoints(M.coords,M.elems,eltype,P,atol)
+        found = elem >= 0
+        if self.fldtype == 'elemc':
+            src = self.data
+            data = src[elem]
+        else:
+            src = self.convert('elemn').data
+            N = eltype.shapeFunctions(xi)
+            data = at.einsum('pn,pn...->p...',N,src[elem])
+        data = data.astype(at.promote_types(src.dtype,at.Float))
+        data[~found] = at.nan
+
+        data = data.reshape(shape+src.shape[1+(self.fldtype!='elemc'):])
+        return Field(target,totype,data,toname)
+
+
     def __str__(self):
         s = "Field '%s', type '%s', shape %s, nnodes=%s, nelems=%s, nplex=%s\n" % \
             ( self.fldname,self.fldtype,self.data.shape,self.geometry.nnodes(),
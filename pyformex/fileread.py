@@ -223,26 +223,22 @@ def read_stl_bin(fn):
     Returns a Coords with shape (ntri,4,3). The first item of each
     triangle is the normal, the other three are the vertices.
     """
-    def addTriangle(i):
-        x[i] = np.fromfile(file=fil, dtype=at.Float, count=12).reshape(4, 3)
-        fil.read(2)
-
     print("Reading binary .STL %s" % fn)
-    fil = open(fn, 'rb')
-    head = fil.read(80)
-    if head[:5] == 'solid':
-        raise ValueError("%s looks like an ASCII STL file!" % fn)
-    i = head.find('COLOR=')
-    if i >= 0 and i <= 70:
-        color = np.fromstring(head[i+6:i+10], dtype=np.uint8, count=4)
-    else:
-        color = None
-
-    ntri = np.fromfile(file=fil, dtype=at.Int, count=1)[0]
-    print("Number of triangles: %s" % ntri)
-    x = np.zeros((ntri, 4, 3), dtype=np.Float)
-    #nbytes = 12*4 + 2
-    [ addTriangle(it) for it in range(ntri) ]
+    with open(fn, 'rb') as fil:
+        head = fil.read(80)
+        if head[:5] == b'solid':
+            raise ValueError("%s looks like an ASCII STL file!" % fn)
+        i = head.find(b'COLOR=')
+        if i >= 0 and i <= 70:
+            color = np.frombuffer(head[i+6:i+10], dtype=np.uint8, count=4)
+        else:
+            color = None
+
+        ntri = np.fromfile(fil, dtype='<i4', count=1)[0]
+        print("Number of triangles: %s" % ntri)
+        # each triangle record is followed by a 2-byte attribute
+        rec = np.fromfile(fil, dtype=[('x', '<f4', (4, 3)), ('attr', '<u2')], count=ntri)
+    x = rec['x'].astype(at.Float)
     print("Finished reading binary stl")
     x = Coords(x)
     if color is not None:
@@ -245,28 +245,27 @@ def write_stl_bin(fn,x,color=None):
     if color is not None:
         #color = checkArray(color, shape=(4,), kind='i').astype(np.uint8)
         color = checkArray(color, shape=(4,), kind='u', allow='i').astype(np.uint8)
-    def addTriangle(i):
-        x[i].tofile(fil)
-        fil.write('\x00\x00')
 
     print("Writing binary STL %s" % fn)
     ver = pf.fullVersion()
     if len(ver) > 50:
         ver = ver[:50]
     if color is None:
-        color = ''
+        color = b''
     else:
-        color = "COLOR=%4s" % color.tostring()
-        print("Adding %s to the header" % color)
+        color = b"COLOR=" + color.tobytes()
+        print("Adding %r to the header" % color)
 
     with open(fn, 'wb') as fil:
-        head = "%-50s%-30s" % (ver, color)
+        head = ("%-50s" % ver).encode('ascii', 'replace') + color.ljust(30)
         fil.write(head)
         ntri = x.shape[0]
         print("Number of triangles: %s" % ntri)
-        np.array(ntri).astype(np.int32).tofile(fil)
-        x = x.astype(np.float32)
-        [ addTriangle(i) for i in range(ntri) ]
+        np.array(ntri).astype('<i4').tofile(fil)
+        # each triangle record is followed by a 2-byte attribute
+        rec = np.zeros(ntri, dtype=[('x', '<f4', (4, 3)), ('attr', '<u2')])
+        rec['x'] = x
+        rec.tofile(fil)
     print("Finished writing binary STL, %s bytes" % utils.fileSize(fn))
 
 
@@ -31,11 +31,13 @@ from __future__ import absolute_import, division, print_function
 
 import os
 import re
-from distutils.version import StrictVersion as Version
+import io
+import zlib
 import numpy as np
 
 import pyformex as pf
 from pyformex import utils
+from pyformex.software import SaneVersion as Version
 from pyformex import filewrite
 from pyformex.odict import OrderedDict
 from pyformex import arraytools as at
@@ -45,6 +47,228 @@ from pyformex.mesh import Mesh
 from pyformex.trisurface import TriSurface
 
 
+def _compressor(codec):
+    """Return the (compress, decompress) functions for a codec.
+
+    Available codecs are 'zlib', 'bz2' and 'lzma' (Python3 only).
+    The compress function takes the data and a compression level.
+    """
+    if codec == 'zlib':
+        return zlib.compress, zlib.decompress
+    elif codec == 'bz2':
+        import bz2
+        return bz2.compress, bz2.decompress
+    elif codec == 'lzma':
+        try:
+            import lzma
+        except ImportError:
+            raise ValueError("The 'lzma' codec requires Python 3")
+        return (lambda data, level: lzma.compress(data, preset=level)), lzma.decompress
+    else:
+        raise ValueError("Unknown codec '%s'" % codec)
+
+
+def _shuffle(data, itemsize):
+    """Byte-shuffle a bytes string with items of itemsize bytes.
+
+    The first bytes of all items are collected, then the second
+    bytes, etc. For numerical data, this groups the slowly varying
+    bytes and improves the compression.
+
+    Example:
+
+      >>> _shuffle(b'abcdefgh', 2) == b'acegbdfh'
+      True
+    """
+    if itemsize <= 1:
+        return data
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, itemsize).T.tobytes()
+
+
+def _unshuffle(data, itemsize):
+    """Revert the byte-shuffle done by :func:`_shuffle`.
+
+      >>> _unshuffle(_shuffle(b'abcdefgh', 2), 2) == b'abcdefgh'
+      True
+    """
+    if itemsize <= 1:
+        return data
+    return np.frombuffer(data, dtype=np.uint8).reshape(itemsize, -1).T.tobytes()
+
+
+def encodeArray(data,codec='zlib',level=5,chunksize=1<<20,shuffle=None):
+    """Encode an array as a sequence of compressed chunks.
+
+    The array is split along its first axis in chunks of at most
+    `chunksize` bytes. Each chunk is compressed independently, so that
+    chunks can be decoded separately and in parallel.
+
+    Parameters:
+
+    - `data`: a numerical array.
+    - `codec`: string: compression algorithm, one of 'zlib', 'bz2', 'lzma'.
+    - `level`: int: compression level.
+    - `chunksize`: int: maximum size in bytes of an uncompressed chunk.
+      A chunk contains at least one row of the array.
+    - `shuffle`: bool: if True, the bytes of the array items are shuffled
+      before compression (see :func:`_shuffle`). The default is to
+      shuffle int and float arrays with items of more than one byte.
+
+    Returns a tuple (header, chunks), where header is a dict with the
+    information needed to decode the chunks (see :class:`DataBlock`),
+    and chunks is a list of compressed bytes strings.
+    """
+    data = np.ascontiguousarray(data)
+    if shuffle is None:
+        shuffle = data.dtype.kind in 'iuf' and data.dtype.itemsize > 1
+    compress = _compressor(codec)[0]
+    rowsize = max(1, data[:1].nbytes) if data.ndim > 0 else data.nbytes
+    rows = max(1, chunksize // rowsize)
+    flat = data.reshape(1) if data.ndim == 0 else data
+    chunks, crc = [], []
+    for i in range(0, max(1, len(flat)), rows):
+        raw = flat[i:i+rows].tobytes()
+        crc.append(zlib.crc32(raw) & 0xffffffff)
+        if shuffle:
+            raw = _shuffle(raw, data.dtype.itemsize)
+        chunks.append(compress(raw, level))
+    header = OrderedDict([
+        ('block', codec),
+        ('dtype', data.dtype.str),
+        ('shape', data.shape),
+        ('shuffle', bool(shuffle)),
+        ('rows', rows),
+        ('csize', [ len(c) for c in chunks ]),
+        ('crc', crc),
+        ])
+    return header, chunks
+
+
+def _toBytes(s):
+    """Convert a string read from a PGF file to bytes"""
+    if isinstance(s, bytes):
+        return s
+    return s.encode('latin-1')
+
+
+def _fromBytes(b):
+    """Convert bytes to a string that can be written to a PGF file"""
+    if pf.PY3:
+        return b.decode('latin-1')
+    return b
+
+
+class DataBlock(object):
+    """A chunked and compressed array stored in a PGF file.
+
+    A DataBlock gives random access to the chunks of an array block
+    written by :meth:`GeometryFile.writeData` when a codec is used.
+    The block consists of a header line::
+
+      # block='zlib'; dtype='<f4'; shape=(1000, 3); shuffle=True; rows=256; csize=[...]; crc=[...]
+
+    followed by the concatenated compressed chunks and a newline.
+    Each chunk holds `rows` rows of the array (the last may hold less);
+    `csize` is the list of the compressed chunk sizes and `crc` the list
+    of CRC32 checksums of the uncompressed chunks. Thus the position of
+    any chunk is known without reading the preceding ones.
+
+    Parameters:
+
+    - `fil`: the open PGF file, positioned at the start of the chunk data
+      (just after the header line).
+    - the other parameters are the values decoded from the header line.
+    """
+
+    def __init__(self,fil,block,dtype,shape,shuffle,rows,csize,crc,**kargs):
+        self.fil = fil
+        self.offset = fil.tell()
+        self.codec = block
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self.shuffle = shuffle
+        self.rows = rows
+        self.csize = csize
+        self.crc = crc
+        self.start = np.concatenate([[0], np.cumsum(csize)]).astype(np.int64)
+        self.end = self.offset + int(self.start[-1]) + 1
+
+
+    @property
+    def nchunks(self):
+        return len(self.csize)
+
+
+    @property
+    def nrows(self):
+        return self.shape[0] if self.shape else 1
+
+
+    def readChunk(self, i):
+        """Read the compressed data of chunk i from the file"""
+        self.fil.seek(self.offset + int(self.start[i]))
+        return _toBytes(self.fil.read(self.csize[i]))
+
+
+    def decodeChunk(self, i, data):
+        """Decode the compressed data of chunk i.
+
+        Returns the chunk as an array with the rows of the chunk.
+        Raises a ValueError if the checksum does not match.
+        """
+        try:
+            raw = _compressor(self.codec)[1](data)
+        except Exception as e:
+            raise ValueError("Corrupt chunk %s in PGF data block: %s" % (i, e))
+        if self.shuffle:
+            raw = _unshuffle(raw, self.dtype.itemsize)
+        if zlib.crc32(raw) & 0xffffffff != self.crc[i]:
+            raise ValueError("Checksum error in chunk %s of PGF data block" % i)
+        return np.frombuffer(raw, dtype=self.dtype).reshape((-1,) + self.shape[1:])
+
+
+    def read(self,rows=None,nproc=-1):
+        """Read (part of) the array.
+
+        Parameters:
+
+        - `rows`: None or a tuple (start, stop) specifying a range of rows
+          to read. Only the chunks containing these rows are decoded.
+          Default is to read the full array.
+        - `nproc`: int: number of threads used to decompress the chunks.
+          If negative, it is set to the number of processors.
+
+        Returns the array (or the requested rows).
+        After reading, the file is positioned at the end of the block.
+        """
+        start, stop = (0, self.nrows) if rows is None else rows
+        first, last = start // self.rows, (max(stop, start+1) - 1) // self.rows + 1
+        chunks = list(range(first, min(last, self.nchunks)))
+        data = [ self.readChunk(i) for i in chunks ]
+        self.fil.seek(self.end)
+        if nproc < 0:
+            from multiprocessing import cpu_count
+            nproc = cpu_count()
+        if nproc > 1 and len(chunks) > 1:
+            # The compressors release the GIL, so threads suffice
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(min(nproc, len(chunks)))
+            try:
+                parts = pool.map(lambda a: self.decodeChunk(*a), zip(chunks, data))
+            finally:
+                pool.close()
+        else:
+            parts = [ self.decodeChunk(i, d) for i, d in zip(chunks, data) ]
+        if not self.shape:
+            return parts[0].reshape(())
+        if parts:
+            a = np.concatenate(parts)
+        else:
+            a = np.zeros((0,) + self.shape[1:], dtype=self.dtype)
+        ofs = first * self.rows
+        return a[start-ofs:stop-ofs]
+
+
 class GeometryFile(object):
     """A class to handle files in the pyFormex Geometry File format.
 
@@ -110,19 +334,42 @@ class GeometryFile(object):
     - `ifmt` and `ffmt` are present for historical and development reasons,
       but currently inactive.
     - `version`: if specified, write according to old version standard.
-      Available: '1.9', '2.0'(default)
+      Available: '1.9', '2.0'(default), '2.1'.
+    - `codec`: string, one of 'zlib', 'bz2' or 'lzma' (Python3 only):
+      if specified, all arrays are written as chunked data blocks, where
+      each chunk is compressed independently with the specified codec,
+      using the compression `level`. The data blocks contain a table with
+      the chunk sizes and checksums, allowing to read any chunk without
+      decompressing the others (see :class:`DataBlock`).
+      This requires (and defaults to) version '2.1'.
+      It is an alternative to the `compr` whole file compression, which
+      compresses less and does not allow partial loading.
+    - `chunksize`: int: maximum size in bytes of the uncompressed chunks
+      when using a `codec`.
+    - `shuffle`: bool: whether to byte-shuffle the array data before
+      compression when using a `codec`. The default (None) shuffles the
+      int and float arrays, which usually improves the compression.
     """
 
     _version_ = '2.0'
 
     def __init__(self,filename,mode=None,compr=None,level=5,delete_temp=True,
-                 sep=' ',ifmt=' ',ffmt=' ',version=None):
+                 sep=' ',ifmt=' ',ffmt=' ',version=None,codec=None,
+                 chunksize=1<<20,shuffle=None):
         """Create the GeometryFile object."""
         if version is None:
-            version = GeometryFile._version_
-        if not version in [ '1.9', '2.0' ]:
+            version = '2.1' if codec else GeometryFile._version_
+        if not version in [ '1.9', '2.0', '2.1' ]:
             raise ValueError("Can not write GeometryFile of version %s" % version)
+        if codec:
+            if Version(version) < Version('2.1'):
+                raise ValueError("Writing with a codec requires GeometryFile version 2.1")
+            _compressor(codec)
         self.version = version
+        self.codec = codec
+        self.level = level
+        self.chunksize = chunksize
+        self.shuffle = shuffle
 
         if mode is None:
             if os.path.exists(filename):
@@ -152,8 +399,23 @@ class GeometryFile(object):
         return self._autoname
 
 
+    def _textfile(self, fil):
+        """Make sure the file can hold the binary data blocks.
+
+        With Python3, the file is wrapped with a latin-1 encoding,
+        which maps each byte to a single character and vice versa.
+        The binary data blocks can then be written and read as strings,
+        and the file positions are byte positions.
+        """
+        if pf.PY3:
+            if hasattr(fil, 'buffer'):
+                fil = fil.buffer
+            fil = io.TextIOWrapper(fil, encoding='latin-1', newline='\n')
+        return fil
+
+
     def open(self):
-        self.fil = self.file.open()
+        self.fil = self._textfile(self.file.open())
         if self.writing:
             self.writeHeader()
         else:
@@ -165,7 +427,7 @@ class GeometryFile(object):
 
         The default mode for the reopen is 'r'
         """
-        self.fil = self.file.reopen(mode)
+        self.fil = self._textfile(self.file.reopen(mode))
         if self.writing:
             self.writeHeader()
         else:
@@ -176,6 +438,8 @@ class GeometryFile(object):
         """Close the file.
 
         """
+        if self.writing:
+            self.fil.flush()
         self.file.close()
 
 
@@ -207,12 +471,24 @@ class GeometryFile(object):
         the specified separator. If sep is an empty string, the data block
         is written in binary mode, leading to smaller files.
         If fmt is specified, each
+
+        If the GeometryFile has a codec, the data are written as a
+        chunked and compressed data block (see :class:`DataBlock`),
+        and sep is ignored.
         """
         if not self.writing:
             raise RuntimeError("File is not opened for writing")
+        if self.codec:
+            header, chunks = encodeArray(data, self.codec, self.level, self.chunksize, self.shuffle)
+            self.fil.write("# %s\n" % '; '.join([ "%s=%r" % i for i in header.items() ]))
+            for c in chunks:
+                self.fil.write(_fromBytes(c))
+            self.fil.write('\n')
+            return
         #kind = data.dtype.kind
         #if fmt is None:
         #    fmt = self.fmt[kind]
+        self.fil.flush()
         filewrite.writeData(self.fil, data, sep, end='\n')
 
 
@@ -691,7 +967,7 @@ class GeometryFile(object):
 
                         try:
                             # Read the color array
-                            color = at.readArray(self.fil, colortype, colorshape, sep=sep)
+                            color = self.readData(colortype, colorshape, sep)
                         except Exception as e:
                             print("Invalid color array on PGF file: skipped. Traceback: %s" % e)
                             color = None
@@ -717,11 +993,32 @@ class GeometryFile(object):
             self.results[name] = self.geometry = obj
 
 
+    def readData(self,dtype,shape,sep):
+        """Read an array of data from a pyFormex geometry file.
+
+        Reads an array with the specified dtype and shape, written with
+        separator sep. From version 2.1 on, the array may be stored as a
+        compressed data block, which is then decoded.
+
+        Returns the array read.
+        """
+        if Version(self.version) >= Version('2.1'):
+            pos = self.fil.tell()
+            s = self.fil.read(8)
+            self.fil.seek(pos)
+            if s == '# block=':
+                s = self.fil.readline()
+                block = DataBlock(self.fil, **self.decode(s[1:].strip()))
+                data = block.read()
+                return data.astype(dtype).reshape(shape)
+        return at.readArray(self.fil, dtype, shape, sep)
+
+
     def readField(self,field=None,fldtype=None,shape=None,sep=None,**kargs):
         """Read a Field defined on the last read geometry.
 
         """
-        data = at.readArray(self.fil, at.Float, shape, sep=sep)
+        data = self.readData(at.Float, shape, sep)
         self.geometry.addField(fldtype,data,field)
 
 
@@ -745,9 +1042,9 @@ class GeometryFile(object):
         From the coords and props a Formex is created and returned.
         """
         ndim = 3
-        f = at.readArray(self.fil, at.Float, (nelems, nplex, ndim), sep=sep)
+        f = self.readData(at.Float, (nelems, nplex, ndim), sep)
         if props:
-            p = at.readArray(self.fil, at.Int, (nelems,), sep=sep)
+            p = self.readData(at.Int, (nelems,), sep)
         else:
             p = None
         return Formex(f, p, eltype)
@@ -766,10 +1063,10 @@ class GeometryFile(object):
         """
 
         ndim = 3
-        x = at.readArray(self.fil, at.Float, (ncoords, ndim), sep=sep)
-        e = at.readArray(self.fil, at.Int, (nelems, nplex), sep=sep)
+        x = self.readData(at.Float, (ncoords, ndim), sep)
+        e = self.readData(at.Int, (nelems, nplex), sep)
         if props:
-            p = at.readArray(self.fil, at.Int, (nelems,), sep=sep)
+            p = self.readData(at.Int, (nelems,), sep)
         else:
             p = None
         M = Mesh(x, e, p, eltype)
@@ -780,7 +1077,7 @@ class GeometryFile(object):
                 clas = globals()[objtype]
             M = clas(M)
         if normals:
-            n = at.readArray(self.fil, at.Float, (nelems, nplex, ndim), sep=sep)
+            n = self.readData(at.Float, (nelems, nplex, ndim), sep)
             M.normals = n
         return M
 
@@ -793,7 +1090,7 @@ class GeometryFile(object):
         """
         from pyformex.plugins.curve import PolyLine
         ndim = 3
-        coords = at.readArray(self.fil, at.Float, (ncoords, ndim), sep=sep)
+        coords = self.readData(at.Float, (ncoords, ndim), sep)
         return PolyLine(control=coords, closed=closed)
 
 
@@ -805,7 +1102,7 @@ class GeometryFile(object):
         """
         from pyformex.plugins.curve import BezierSpline
         ndim = 3
-        coords = at.readArray(self.fil, at.Float, (ncoords, ndim), sep=sep)
+        coords = self.readData(at.Float, (ncoords, ndim), sep)
         return BezierSpline(control=coords, closed=closed, degree=degree)
 
 
@@ -818,8 +1115,8 @@ class GeometryFile(object):
         """
         from pyformex.plugins.nurbs import NurbsCurve
         ndim = 4
-        coords = at.readArray(self.fil, at.Float, (ncoords, ndim), sep=sep)
-        knots = at.readArray(self.fil, at.Float, (nknots,), sep=sep)
+        coords = self.readData(at.Float, (ncoords, ndim), sep)
+        knots = self.readData(at.Float, (nknots,), sep)
         return NurbsCurve(control=coords, knots=knots, closed=closed)
 
 
@@ -833,9 +1130,9 @@ class GeometryFile(object):
         """
         from pyformex.plugins.nurbs import NurbsSurface
         ndim = 4
-        coords = at.readArray(self.fil, at.Float, (ncoords, ndim), sep=sep)
-        uknots = at.readArray(self.fil, at.Float, (nuknots,), sep=sep)
-        vknots = at.readArray(self.fil, at.Float, (nvknots,), sep=sep)
+        coords = self.readData(at.Float, (ncoords, ndim), sep)
+        uknots = self.readData(at.Float, (nuknots,), sep)
+        vknots = self.readData(at.Float, (nvknots,), sep)
         return NurbsSurface(control=coords, knots=(uknots, vknots), closed=(uclosed, vclosed))
 
 
@@ -953,8 +1250,8 @@ class GeometryFile(object):
         """
         from pyformex.plugins.curve import BezierSpline
         ndim = 3
-        coords = at.readArray(self.fil, at.Float, (ncoords, ndim), sep=sep)
-        control = at.readArray(self.fil, at.Float, (nparts, 2, ndim), sep=sep)
+        coords = self.readData(at.Float, (ncoords, ndim), sep)
+        control = self.readData(at.Float, (nparts, 2, ndim), sep)
         return BezierSpline(coords, control=control, closed=closed)
 
 
@@ -1684,6 +1684,185 @@ def insideTriangle(x,P,method='bary'):
         return (d > 0).all(axis=-1)
 
 
+def segmentCrossesTriangle(S,T,atol=0.):
+    """Check whether segments cross triangles.
+
+    Parameters:
+
+    - `S`: float array (n,2,3): n line segments.
+    - `T`: float array (n,3,3): n triangles.
+    - `atol`: float: tolerance on the distances. Segments ending within
+      this distance from the plane of the triangle, or crossing it within
+      this distance from the border of the triangle, do not cross it.
+
+    Returns a bool array (n,) which is True where the segment crosses
+    the interior of the corresponding triangle: its end points are at
+    opposite sides of the plane of the triangle and the crossing point
+    is inside the triangle. Degenerate triangles are never crossed.
+
+    >>> T = [[[0., 0., 0.], [1., 0., 0.], [0., 1., 0.]]] * 3
+    >>> S = [[[0.2, 0.2, -1.], [0.2, 0.2, 1.]], [[0.2, 0.2, 0.], [0.2, 0.2, 1.]],
+    ...      [[1., 1., -1.], [1., 1., 1.]]]
+    >>> segmentCrossesTriangle(S, T)
+    array([ True, False, False], dtype=bool)
+    """
+    S = asarray(S, dtype=float64)
+    T = asarray(T, dtype=float64)
+    S = S - T[:, :1]
+    T = T - T[:, :1]
+    n = cross(T[:, 1], T[:, 2])
+    tol = atol * length(n)
+    d0 = (S[:, 0]*n).sum(axis=-1)
+    d1 = (S[:, 1]*n).sum(axis=-1)
+    ok = ((d0 > tol) & (d1 < -tol)) | ((d0 < -tol) & (d1 > tol))
+    # Check the crossing points of the segments crossing the planes
+    w = where(ok)[0]
+    S, T, n, tol, d0, d1 = S[w], T[w], n[w], tol[w], d0[w], d1[w]
+    x = S[:, 0] + (d0/(d0-d1)).reshape(-1, 1) * (S[:, 1]-S[:, 0])
+    for i, j in [(0, 1), (1, 2), (2, 0)]:
+        e = T[:, j] - T[:, i]
+        ok[w] &= (cross(e, x-T[:, i])*n).sum(axis=-1) > tol*length(e)
+    return ok
+
+
+def lineHitsTriangle(q,m,T):
+    """Watertight intersection of lines with triangles.
+
+    Parameters:
+
+    - `q`, `m`: float arrays (n,3): points and direction vectors of n
+      lines q + t*m.
+    - `T`: float array (n,3,3): n triangles.
+
+    Returns a tuple (hit, t, bc):
+
+    - `hit`: bool array (n,): True where the line hits the triangle,
+    - `t`: float array (n,): the parameter value of the intersection
+      point along the line,
+    - `bc`: float array (n,3): the barycentric coordinates of the
+      intersection point in the triangle.
+
+    Where hit is False, t and bc are NaN.
+
+    The test follows Woo, Benthin and Wald (2013): the coordinates are
+    transformed such that the line becomes the z-axis and then the 2D
+    edge functions of the projected triangle are evaluated. Since the
+    transformation only depends on the line, the edge functions of an edge
+    shared by two triangles are exactly opposite, so that a line can not
+    slip through the common edge. A line hitting exactly on an edge or
+    vertex hits all triangles sharing it. Lines lying in the plane of a
+    triangle do not hit it.
+
+    >>> T = [[[0., 0., 0.], [1., 0., 0.], [0., 1., 0.]]] * 3
+    >>> q = [[0.25, 0.5, 1.], [0.5, 0.5, 1.], [1., 1., 1.]]
+    >>> hit, t, bc = lineHitsTriangle(q, [[0., 0., -2.]] * 3, T)
+    >>> hit, t
+    (array([ True,  True, False], dtype=bool), array([ 0.5,  0.5,  nan]))
+    >>> bc[:2]
+    array([[ 0.25,  0.25,  0.5 ],
+           [ 0.  ,  0.5 ,  0.5 ]])
+    """
+    q = asarray(q, dtype=float64).reshape(-1, 3)
+    m = asarray(m, dtype=float64).reshape(-1, 3)
+    T = asarray(T, dtype=float64).reshape(-1, 3, 3)
+    n = arange(len(m))
+    # Permute the axes such that z is the largest component of m
+    kz = abs(m).argmax(axis=-1)
+    kx = (kz+1) % 3
+    ky = (kx+1) % 3
+    neg = m[n, kz] < 0.
+    kx[neg], ky[neg] = ky[neg], kx[neg]
+    mz = m[n, kz]
+    sx, sy, sz = m[n, kx] / mz, m[n, ky] / mz, 1. / mz
+    # Shear the vertices relative to q
+    V = T - q[:, newaxis]
+    Vz = V[n, :, kz]
+    Vx = V[n, :, kx] - sx[:, newaxis]*Vz
+    Vy = V[n, :, ky] - sy[:, newaxis]*Vz
+    # Edge functions
+    U = Vx[:, 2]*Vy[:, 1] - Vy[:, 2]*Vx[:, 1]
+    W = Vx[:, 1]*Vy[:, 0] - Vy[:, 1]*Vx[:, 0]
+    V = Vx[:, 0]*Vy[:, 2] - Vy[:, 0]*Vx[:, 2]
+    e = column_stack([U, V, W])
+    det = e.sum(axis=-1)
+    hit = (((e >= 0.).all(axis=-1) | (e <= 0.).all(axis=-1)) & (det != 0.))
+    with errstate(divide='ignore', invalid='ignore'):
+        bc = where(hit[:, newaxis], e / det[:, newaxis], nan)
+        t = where(hit, (e*Vz).sum(axis=-1)*sz / det, nan)
+    return hit, t, bc
+
+
+def _orient2D(p, q, r):
+    """Twice the signed area of the 2D triangles (p,q,r)"""
+    return (q[:, 0]-p[:, 0])*(r[:, 1]-p[:, 1]) - (q[:, 1]-p[:, 1])*(r[:, 0]-p[:, 0])
+
+
+def _trianglesOverlap2D(A, B):
+    """Check whether 2D triangles A and B have overlapping interiors"""
+    edges = [(0, 1), (1, 2), (2, 0)]
+    ok = zeros(len(A), dtype=bool)
+    # Properly crossing edges
+    for i, j in edges:
+        for k, l in edges:
+            ok |= ((_orient2D(A[:, i], A[:, j], B[:, k])*_orient2D(A[:, i], A[:, j], B[:, l]) < 0.) &
+                   (_orient2D(B[:, k], B[:, l], A[:, i])*_orient2D(B[:, k], B[:, l], A[:, j]) < 0.))
+    # Vertices strictly inside the other triangle
+    for P, Q in [(A, B), (B, A)]:
+        area = _orient2D(Q[:, 0], Q[:, 1], Q[:, 2])
+        for v in range(3):
+            inside = ones(len(A), dtype=bool)
+            for i, j in edges:
+                inside &= _orient2D(Q[:, i], Q[:, j], P[:, v])*area > 0.
+            ok |= inside
+    return ok
+
+
+def trianglesIntersect(T1,T2,atol=0.):
+    """Check whether pairs of triangles intersect.
+
+    Parameters:
+
+    - `T1`: float array (n,3,3): n triangles.
+    - `T2`: float array (n,3,3): n other triangles.
+    - `atol`: float: tolerance on the distances. Triangles touching each
+      other within this distance do not intersect.
+
+    Two triangles intersect if an edge of one of them crosses the other
+    one. If the triangles are coplanar (all vertices of T2 within `atol`
+    from the plane of T1), they intersect if an edge of one properly
+    crosses an edge of the other, or a vertex of one is inside the other.
+    Triangles merely touching each other (e.g. sharing a vertex or an
+    edge) do not intersect. Degenerate triangles never intersect.
+
+    Returns a bool array (n,).
+
+    >>> T1 = [[[0., 0., 0.], [2., 0., 0.], [0., 2., 0.]]] * 3
+    >>> T2 = [[[0.5, 0.5, -1.], [0.5, 0.5, 1.], [3., 3., 0.]],
+    ...       [[0.5, 0.5, 0.], [3., 0.5, 0.], [0.5, 3., 0.]],
+    ...       [[2., 0., 0.], [0., 2., 0.], [2., 2., 0.]]]
+    >>> trianglesIntersect(T1, T2)
+    array([ True,  True, False], dtype=bool)
+    """
+    T1 = asarray(T1, dtype=float64)
+    T2 = asarray(T2, dtype=float64)
+    edges = [(0, 1), (1, 2), (2, 0)]
+    res = zeros(len(T1), dtype=bool)
+    for i, j in edges:
+        res |= segmentCrossesTriangle(T1[:, [i, j]], T2, atol)
+        res |= segmentCrossesTriangle(T2[:, [i, j]], T1, atol)
+    # Coplanar triangles
+    n = cross(T1[:, 1]-T1[:, 0], T1[:, 2]-T1[:, 0])
+    ln = length(n)
+    d = ((T2-T1[:, :1])*n.reshape(-1, 1, 3)).sum(axis=-1)
+    cop = where((abs(d) <= atol*ln.reshape(-1, 1)).all(axis=-1) & (ln > 0.) & ~res)[0]
+    if len(cop) > 0:
+        # Project on the coordinate plane most parallel to the triangles
+        keep = array([[1, 2], [2, 0], [0, 1]])[abs(n[cop]).argmax(axis=-1)]
+        ind = (arange(len(cop)).reshape(-1, 1, 1), arange(3).reshape(1, -1, 1), keep.reshape(-1, 1, 2))
+        res[cop] = _trianglesOverlap2D(T1[cop][ind], T2[cop][ind])
+    return res
+
+
 ############# things that need fixing or be removed ##############
 
 
@@ -40,6 +40,7 @@ in vec3 vertexNormal;
 in vec3 vertexColor;
 in vec3 vertexOffset;       // offset for rendertype -1
 in vec2 vertexTexturePos;
+in vec3 vertexDisplacement; // displacement for useDisplacement
 in float vertexScalar;
 
 uniform bool pyformex;              // Is the shader being used in pyFormex
@@ -60,6 +61,11 @@ uniform int useObjectColor;  // 0 = no, 1 = single color, 2 = twosided color
 uniform vec3 objectColor;    // front and back color (1) or front color (2)
 uniform vec3 objectBkColor;  // back color (2)
 uniform int useTexture;    // 0: no texture, 1: single texture
+uniform int useDisplacement;     // 0: no, 1: add scaled vertexDisplacement
+uniform float displacementScale; // Scale factor for vertexDisplacement
+uniform int useScalarColor;      // 0: no, 1: color from vertexScalar
+uniform vec3 scalarRange;        // Values at start, middle, end of palette
+uniform vec3 scalarPalette[3];   // Colors at start, middle, end of palette
 
 uniform float ambient;     // Material ambient value
 uniform float diffuse;     // Material diffuse value
@@ -79,6 +85,23 @@ varying out vec4 fragColor;     // Final fragment color, including opacity
 varying out vec3 nNormal;       // normalized transformed normal
 varying out vec2 texCoord;      // Pass texture coordinate
 
+// Map a scalar value to a color
+// This should give the same result as postproc.scalarColors
+vec3 scalarColor(float val)
+{
+  float d;
+  float x;
+  if (val < scalarRange[1]) {
+    d = scalarRange[1] - scalarRange[0];
+    x = (d > 0.) ? clamp((scalarRange[1]-val)/d,0.,1.) : 1.;
+    return mix(scalarPalette[1],scalarPalette[0],x);
+  } else {
+    d = scalarRange[2] - scalarRange[1];
+    x = (d > 0.) ? clamp((val-scalarRange[1])/d,0.,1.) : ((val > scalarRange[1]) ? 1. : 0.);
+    return mix(scalarPalette[1],scalarPalette[2],x);
+  }
+}
+
 void main()
 {
   vec3 fragmentColor;
@@ -91,6 +114,9 @@ void main()
     if (highlight) {
       // Highlight color, currently hardwired yellow
       fragmentColor = vec3(1.,1.,0.);
+    } else if (useScalarColor > 0) {
+      // Color computed from the scalar value
+      fragmentColor = scalarColor(vertexScalar);
     } else if (useObjectColor == 2 && drawface == -1) {
       // Object color, front and back have different color, backside
       fragmentColor = objectBkColor;
@@ -158,7 +184,11 @@ void main()
   }
 
   // Transforming the vertex coordinates
-  vec4 position = vec4(vertexCoords,1.0);
+  vec3 coords = vertexCoords;
+  if (useDisplacement > 0) {
+    coords += displacementScale * vertexDisplacement;
+  }
+  vec4 position = vec4(coords,1.0);
 
   if (picking) {
     gl_Position = pickmat * projection * modelview * position;
@@ -29,6 +29,7 @@ from pyformex import zip
 
 from pyformex.opengl.colors import *
 from pyformex.utils import stuur
+import numpy as np
 
 # predefined color palettes
 Palette = {
@@ -46,6 +47,30 @@ Palette = {
     'WB': [ white, grey(0.5), black ],
 }
 
+def stuurArray(x,xval,yval,exp=2.5):
+    """Returns a (non)linear response on an array of input values.
+
+    This is a vectorized version of :func:`utils.stuur`, returning
+    the response for all values in the array x at once. NaN values
+    in x give a NaN response.
+
+    >>> print(stuurArray([-2.,0.,0.5,1.,3.],[-1.,0.,2.],[-1.,0.,1.],1.))
+    [-1.    0.    0.25  0.5   1.  ]
+    """
+    xmin, x0, xmax = xval
+    ymin, y0, ymax = yval
+    x = np.asarray(x, dtype=float)
+    lo = x < x0
+    d = np.where(lo, xmin-x0, xmax-x0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Values beyond a zero length range are at its limit
+        xr = np.where(d != 0., (x-x0) / np.where(d != 0., d, 1.), 1.)
+    xr = np.clip(xr, 0., 1.)
+    if exp != 1.0:
+        xr **= exp
+    return np.where(lo, y0+(ymin-y0)*xr, y0+(ymax-y0)*xr)
+
+
 class ColorScale(object):
     """Mapping floating point values into colors.
 
@@ -57,9 +82,14 @@ class ColorScale(object):
 
     The ColorLegend class provides a way to make the ColorScale visible
     on the canvas.
+
+    The :meth:`colorArray` method maps a whole array of values at once,
+    using a precomputed lookup table of colors. This should be used when
+    coloring large data sets, like the results of a finite element
+    analysis.
     """
 
-    def __init__(self,palet='RAINBOW',minval=0.,maxval=1.,midval=None,exp=1.0,exp2=None):
+    def __init__(self,palet='RAINBOW',minval=0.,maxval=1.,midval=None,exp=1.0,exp2=None,log=False,undercolor=None,overcolor=None,nancolor=None):
         """Create a colorscale to map a range of values into colors.
 
         The values range from minval to maxval (default 0.0..1.0).
@@ -83,6 +113,19 @@ class ColorScale(object):
         'stuur' function from the 'utils' module.
         If 2 exponents are given, mapping is done independently with exp
         in the range minval..midval and with exp2 in the range midval..maxval.
+
+        If log is True, the mapping is done on the logarithm of the
+        values. The minval should then be positive, and midval defaults
+        to the geometric mean of minval and maxval. Values <= 0 are
+        treated as values below minval.
+
+        A diverging scale is obtained with a palet having a light middle
+        color (e.g. 'BWR') and a midval at the value of interest.
+
+        Values outside the range minval..maxval get the color of the
+        nearest end of the range, unless undercolor, resp. overcolor are
+        set. The nancolor is used for NaN values (default is a middle grey).
+        These are only used by :meth:`colorArray`.
         """
         if isinstance(palet, str):
             self.palet = Palette.get(palet.upper(), Palette['RGB'])
@@ -92,12 +135,33 @@ class ColorScale(object):
             self.palet[1] = [ 0.5*(p+q) for p, q in zip(self.palet[0], self.palet[2]) ]
         self.xmin = minval
         self.xmax = maxval
+        self.log = log
         if midval is None:
-            self.x0 = 0.5*(minval+maxval)
+            if log:
+                self.x0 = np.sqrt(minval*maxval)
+            else:
+                self.x0 = 0.5*(minval+maxval)
         else:
             self.x0 = midval
         self.exp = exp
         self.exp2 = exp2
+        self.undercolor = undercolor
+        self.overcolor = overcolor
+        if nancolor is None:
+            nancolor = grey(0.5)
+        self.nancolor = nancolor
+        self._lut = None
+
+
+    def limits(self):
+        """Return the minval, midval and maxval of the mapping.
+
+        For a logarithmic scale, the logarithms of the values are returned.
+        """
+        if self.log:
+            return tuple(np.log10([self.xmin, self.x0, self.xmax]))
+        else:
+            return self.xmin, self.x0, self.xmax
 
 
     def scale(self, val):
@@ -110,13 +174,36 @@ class ColorScale(object):
         the intervals minval..midval and midval..maxval, mapped resp. using
         exp2 and exp onto the intervals -1..0 and 0..1.
         """
+        xmin, x0, xmax = self.limits()
+        if self.log:
+            val = np.log10(val) if val > 0. else -np.inf
         if self.exp2 is None:
-            return stuur(val, [self.xmin, self.x0, self.xmax], [-1., 0., 1.], self.exp)
+            return stuur(val, [xmin, x0, xmax], [-1., 0., 1.], self.exp)
 
-        if val < self.x0:
-            return stuur(val, [self.xmin, (self.x0+self.xmin)/2, self.x0], [-1., -0.5, 0.], self.exp2)
+        if val < x0:
+            return stuur(val, [xmin, (x0+xmin)/2, x0], [-1., -0.5, 0.], self.exp2)
         else:
-            return stuur(val, [self.x0, (self.x0+self.xmax)/2, self.xmax], [0., 0.5, 1.0], 1./self.exp)
+            return stuur(val, [x0, (x0+xmax)/2, xmax], [0., 0.5, 1.0], 1./self.exp)
+
+
+    def scaleArray(self, data):
+        """Scale an array of values to the range -1...1.
+
+        This is the vectorized version of :meth:`scale`, returning
+        an array with the same shape as data. NaN values remain NaN.
+        """
+        data = np.asarray(data, dtype=float)
+        xmin, x0, xmax = self.limits()
+        if self.log:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                data = np.log10(np.where(data > 0., data, 0.))
+        if self.exp2 is None:
+            return stuurArray(data, [xmin, x0, xmax], [-1., 0., 1.], self.exp)
+
+        lo = data < x0
+        x = stuurArray(data, [x0, (x0+xmax)/2, xmax], [0., 0.5, 1.0], 1./self.exp)
+        x[lo] = stuurArray(data[lo], [xmin, (x0+xmin)/2, x0], [-1., -0.5, 0.], self.exp2)
+        return x
 
 
     def color(self, val):
@@ -140,6 +227,74 @@ class ColorScale(object):
         return tuple( [ (1.-x)*p + x*q for p, q in zip(c0, c1) ] )
 
 
+    def lut(self, n=1024):
+        """Return a lookup table of colors.
+
+        Returns a float32 array (n,3) with the colors corresponding to
+        n equidistant values in the scaled range -1..1. The table is
+        computed once and stored with the ColorScale.
+        """
+        if self._lut is None or self._lut.shape[0] != n:
+            x = np.linspace(-1., 1., n).reshape(-1, 1)
+            c0 = np.asarray(self.palet[1], dtype=float)
+            c1 = np.where(x < 0., np.asarray(self.palet[0], dtype=float),
+                          np.asarray(self.palet[2], dtype=float))
+            self._lut = (c0 + np.abs(x) * (c1-c0)).astype(np.float32)
+        return self._lut
+
+
+    def colorArray(self, data, n=1024):
+        """Return the colors representing an array of values.
+
+        Parameters:
+
+        - `data`: float array of any shape.
+        - `n`: int: the number of entries in the color lookup table.
+
+        Returns a float32 array with shape data.shape+(3,), holding the
+        colors of the values. This gives the same result as applying
+        :meth:`color` on all values, but with the colors taken from
+        a lookup table with n entries (see :meth:`lut`). This is orders
+        of magnitude faster for large arrays.
+        Values outside the range and NaN values get the undercolor,
+        overcolor and nancolor if these are set.
+
+        >>> CS = ColorScale('RGB', 0., 4.)
+        >>> print(CS.colorArray([0., 1., 2., np.nan], n=5))
+        [[ 1.   0.   0. ]
+         [ 0.5  0.5  0. ]
+         [ 0.   1.   0. ]
+         [ 0.5  0.5  0.5]]
+        """
+        shape = np.shape(data)
+        data = np.asarray(data, dtype=float).reshape(-1)
+        lut = self.lut(n)
+        if self.exp == 1.0 and self.exp2 in [None, 1.0]:
+            # Piecewise linear mapping: compute the index directly
+            x = data
+            if self.log:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    x = np.log10(np.where(x > 0., x, 0.))
+            x = np.interp(x, self.limits(), [0., 0.5*(n-1), n-1])
+        else:
+            x = self.scaleArray(data)
+            x += 1.
+            x *= 0.5*(n-1)
+        nan = np.isnan(x)
+        if nan.any():
+            x[nan] = 0.
+        col = np.take(lut, np.rint(x).astype(np.int32), axis=0)
+        if self.undercolor is not None:
+            col[data < self.xmin] = self.undercolor
+        if self.overcolor is not None:
+            col[data > self.xmax] = self.overcolor
+        # Test the data: a log scale maps NaN to -inf
+        nan = np.isnan(data)
+        if nan.any():
+            col[nan] = self.nancolor
+        return col.reshape(shape+(3,))
+
+
 class ColorLegend(object):
     """A colorlegend divides a in a number of subranges.
 
@@ -153,6 +308,8 @@ class ColorLegend(object):
     is divided in ``n/2`` subranges. In each case the legend has ``n``
     subranges limited by ``n+1`` values. The ``n`` colors of the legend
     correspond to the middle value of each subrange.
+    For a logarithmic :class:`ColorScale`, the subranges have equal sizes
+    on the logarithmic scale.
     """
 
     def __init__(self, colorscale, n):
@@ -161,13 +318,19 @@ class ColorLegend(object):
         n = int(n)
         r = float(n)/2
         m = (n+1)//2
-        vals = [ (self.cs.xmin*(r-i)+self.cs.x0*i)/r for i in range(m) ]
-        val2 = [ (self.cs.xmax*(r-i)+self.cs.x0*i)/r for i in range(m) ]
+        xmin, x0, xmax = self.cs.limits()
+        vals = [ (xmin*(r-i)+x0*i)/r for i in range(m) ]
+        val2 = [ (xmax*(r-i)+x0*i)/r for i in range(m) ]
         val2.reverse()
         if n % 2 == 0:
-            vals += [ self.cs.x0 ]
+            vals += [ x0 ]
         vals += val2
         midvals = [ (vals[i] + vals[i+1])/2 for i in range(n) ]
+        if self.cs.log:
+            vals = [ 10.**v for v in vals ]
+            midvals = [ 10.**v for v in midvals ]
+            # keep the exact end values
+            vals[0], vals[-1] = self.cs.xmin, self.cs.xmax
         self.limits = vals
         self.colors = [self.cs.color(v) for v in midvals]
         self.underflowcolor = None
@@ -205,6 +368,41 @@ class ColorLegend(object):
         return self.colors[i-1]
 
 
+    def colorArray(self, data):
+        """Return the colors representing an array of values.
+
+        This is the vectorized version of :meth:`color`: each value gets
+        the color of the subrange holding the value, thus giving a
+        banded color scale. NaN values get the nancolor of the ColorScale.
+
+        Returns a float32 array with shape data.shape+(3,).
+
+        >>> CL = ColorLegend(ColorScale('RGB', 0., 4.), 2)
+        >>> print(CL.colorArray([0.5, 2., 3.]))
+        [[ 0.5  0.5  0. ]
+         [ 0.5  0.5  0. ]
+         [ 0.   0.5  0.5]]
+        >>> print(CL.colorArray(3.))
+        [ 0.   0.5  0.5]
+        """
+        shape = np.shape(data)
+        data = np.asarray(data, dtype=float).reshape(-1)
+        ind = np.searchsorted(self.limits, data, side='left')
+        nan = np.isnan(data)
+        ind[nan] = 1
+        under = ind == 0
+        over = ind >= len(self.limits)
+        table = np.asarray(self.colors, dtype=np.float32)
+        col = table[np.clip(ind-1, 0, len(table)-1)]
+        for flow, color in [(under, self.underflowcolor),
+                            (over, self.overflowcolor)]:
+            if flow.any():
+                col[flow] = self.overflow(color)
+        if nan.any():
+            col[nan] = self.cs.nancolor
+        return col.reshape(shape+(3,))
+
+
 if __name__ == '__main__':
 
     for palet in [ 'RGB', 'BW' ]:
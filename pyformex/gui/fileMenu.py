@@ -532,6 +532,23 @@ def createMovieInteractive():
     pf.GUI.setBusy(False)
 
 
+def startMovieRecording():
+    """Start recording a movie directly from the canvas."""
+    res = draw.askItems([
+        _I('filename', os.path.join(pf.cfg['workdir'], 'movie.mp4'), itemtype='filename', filter='all', exist=False),
+        _I('fps', 25),
+        _I('autosave', True, text='Record a frame on each draw'),
+        _I('options', pf.cfg['movie/options']),
+        ])
+    if res:
+        image.startMovie(**res)
+
+
+def stopMovieRecording():
+    """Stop recording the movie."""
+    image.stopMovie()
+
+
 
 #
 # TODO: this no longer works with the new webgl; should redo
@@ -686,6 +703,8 @@ MenuData = [
     (_('Save &Next Image'), image.saveNext),
     (_('Create &Movie'), createMovieInteractive),
     (_('&Stop MultiSave'), stopMultiSave),
+    (_('Start Movie &Recording'), startMovieRecording),
+    (_('Stop Movie Recording'), stopMovieRecording),
     (_('&Save as Icon'), saveIcon),
     (_('&Show Image'), showImage),
     ## (_('&Export as PGF'), exportPGF),
@@ -38,6 +38,12 @@ from pyformex.gui import QtGui
 from pyformex import utils
 from pyformex.gui.qtutils import relPos
 import os
+import tempfile
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 
 # The image formats recognized by pyFormex
@@ -74,8 +80,6 @@ def initialize():
     """Initialize the image module."""
     global image_formats_qt, image_formats_qtr, image_formats_gl2ps, image_formats_fromeps, gl2ps, _producer, _gl2ps_types
 
-    # Find interesting supporting software
-    utils.hasExternal('imagemagick')
     # Set some globals
     pf.debug("Loading Image Formats", pf.DEBUG.IMAGE)
     image_formats_qt = [str(f) for f in QtGui.QImageWriter.supportedImageFormats()]
@@ -446,6 +450,8 @@ def saveNext():
         names, format, quality, size, window, border, hotkey, autosave, grab = multisave
         name = names.next()
         save(name, window, False, hotkey, autosave, border, grab, format, quality, size, False)
+    if recorder:
+        recorder.grab()
 
 
 def changeBackgroundColorXPM(fn, color):
@@ -493,7 +499,7 @@ def autoSaveOn():
 
     Use this function instead of directly accessing the autosave variable.
     """
-    return multisave and multisave[-2]
+    return (multisave and multisave[-2]) or (recorder and recorder.autosave)
 
 
 def createMovie(files,encoder='convert',outfn='output',**kargs):
@@ -543,6 +549,205 @@ def createMovie(files,encoder='convert',outfn='output',**kargs):
     return P.sta
 
 
+class MovieRecorder(object):
+    """Record a movie by streaming frames directly into an encoder.
+
+    A MovieRecorder grabs the rendering of a canvas and writes the raw
+    RGB pixel data to the standard input of a persistent encoder process
+    (ffmpeg). Unlike :func:`createMovie`, no intermediate image files
+    are written.
+
+    Only the pixel readout is done in the calling (GUI) thread. The frames
+    are put on a bounded queue and passed to the encoder by a background
+    thread, so that drawing is not blocked by the encoding. If the
+    encoder can not keep up, :meth:`grab` will block until a place
+    in the queue becomes available.
+
+    Parameters:
+
+    - `filename`: name of the output movie file. The extension determines
+      the container format (e.g. .mp4, .avi, .mkv).
+    - `fps`: int: number of frames per second in the movie.
+    - `size`: tuple (w,h): if specified, the frames are rendered in an
+      offscreen buffer of this size (see :meth:`QtCanvas.image`).
+      The default is to grab the frames directly from the canvas
+      framebuffer at its current size. The size should not change
+      during the recording.
+    - `canvas`: the canvas to record. Default is the current canvas.
+    - `encoder`: the encoder program. It should accept the same options
+      as ffmpeg. Default is the value of the 'movie/encoder' setting.
+    - `options`: string: extra output options passed to the encoder,
+      e.g. '-c:v libx264 -crf 18 -pix_fmt yuv420p'.
+    - `queuesize`: int: maximum number of frames waiting to be encoded.
+    - `autosave`: bool: if True, a frame is recorded on each execution
+      of the 'draw' function (like in autosave multisave mode).
+
+    Example::
+
+      R = MovieRecorder('rotation.mp4',fps=30)
+      R.start()
+      for i in range(360):
+          pf.canvas.camera.rotate(1.,0.,1.,0.)
+          pf.canvas.update()
+          R.grab()
+      R.stop()
+
+    """
+
+    def __init__(self,filename,fps=25,size=None,canvas=None,encoder=None,options=None,queuesize=16,autosave=False):
+        if encoder is None:
+            encoder = pf.cfg.get('movie/encoder', 'ffmpeg')
+        if options is None:
+            options = pf.cfg.get('movie/options', '-pix_fmt yuv420p')
+        self.filename = filename
+        self.fps = fps
+        self.size = size
+        self.canvas = canvas
+        self.encoder = encoder
+        self.options = options
+        self.autosave = autosave
+        self.queue = queue.Queue(maxsize=queuesize)
+        self.process = self.thread = None
+        self.frames = 0
+        self.error = None
+
+
+    def command(self,w,h):
+        """Return the encoder command for frames of size w x h.
+
+        Returns the command as a list of arguments, so that the file name
+        may contain spaces.
+        """
+        import shlex
+        # The frames are read from the OpenGL buffers bottom-up
+        return shlex.split(self.encoder) + ['-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', '%dx%d' % (w, h), '-r', str(self.fps), '-i', '-', '-an', '-vf', 'vflip'] + shlex.split(self.options) + [self.filename]
+
+
+    def start(self):
+        """Start the encoder process and the writer thread."""
+        import subprocess
+        if self.process:
+            return
+        if self.canvas is None:
+            self.canvas = pf.canvas
+        if self.size is None:
+            w, h = self.canvas.getSize()
+        else:
+            w, h = self.canvas.saneSize(*self.size)
+        # Many encoders need even sizes
+        self.w, self.h = w - w % 2, h - h % 2
+        cmd = self.command(self.w, self.h)
+        pf.debug("Movie encoder: %s" % cmd, pf.DEBUG.IMAGE)
+        # The error output goes to a file: an undrained pipe could block
+        # the encoder, and thus the writer thread
+        self.log = tempfile.TemporaryFile()
+        self.process = utils.system(cmd, wait=False, stdin=subprocess.PIPE, stdout=open(os.devnull, 'w'), stderr=self.log)
+        if self.process.failed:
+            self.process = None
+            self.log.close()
+            raise RuntimeError("Could not start the movie encoder '%s'" % self.encoder)
+        self.thread = threading.Thread(target=self._write, name='MovieRecorder')
+        self.thread.daemon = True
+        self.thread.start()
+        print("Start recording movie %s (%sx%s, %s fps)" % (self.filename, self.w, self.h, self.fps))
+
+
+    def _write(self):
+        """Pass the queued frames to the encoder.
+
+        This runs in the background thread.
+        """
+        while True:
+            frame = self.queue.get()
+            try:
+                if frame is None:
+                    break
+                if not isinstance(frame, bytes):
+                    # A QImage from an offscreen rendering
+                    from pyformex.plugins.imagearray import qimage2numpy
+                    frame = qimage2numpy(frame, order='RGB', indexed=False)[0]
+                    frame = frame[:self.h, :self.w].tobytes()
+                self.process.stdin.write(frame)
+            except Exception as e:
+                # Keep draining the queue, so that grab does not block
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+
+    def grab(self):
+        """Grab the current rendering as the next frame of the movie."""
+        if self.process is None:
+            self.start()
+        if self.error:
+            raise RuntimeError("Movie recording failed: %s" % self.error)
+        canvas = self.canvas
+        if self.size is None:
+            canvas.makeCurrent()
+            GL.glFinish()
+            GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+            frame = GL.glReadPixels(0, 0, self.w, self.h, GL.GL_RGB, GL.GL_UNSIGNED_BYTE)
+            if not isinstance(frame, bytes):
+                frame = frame.tobytes()
+        else:
+            frame = canvas.image(self.w, self.h, False)
+        self.queue.put(frame)
+        self.frames += 1
+
+
+    def stop(self):
+        """Flush the remaining frames and close the encoder.
+
+        Returns the exit status of the encoder.
+        """
+        if self.process is None:
+            return 0
+        self.queue.put(None)
+        self.thread.join()
+        self.process.stdin.close()
+        sta = self.process.wait()
+        if sta:
+            self.log.seek(0)
+            print("The movie encoder failed with exit status %s:" % sta)
+            print(self.log.read().decode('utf-8', 'replace'))
+        self.log.close()
+        print("Recorded %s frames to movie %s" % (self.frames, self.filename))
+        self.process = self.thread = None
+        return sta
+
+
+# The active movie recorder
+recorder = None
+
+def startMovie(filename,**kargs):
+    """Start recording a movie from the canvas.
+
+    This creates and starts a :class:`MovieRecorder` as the active
+    recorder. While recording, each call to :func:`saveNext` will add
+    a frame to the movie. Parameters are like for :class:`MovieRecorder`.
+    Returns the recorder.
+    """
+    global recorder
+    if recorder:
+        stopMovie()
+    recorder = MovieRecorder(filename, **kargs)
+    recorder.start()
+    return recorder
+
+
+def stopMovie():
+    """Stop recording the movie started with :func:`startMovie`.
+
+    Returns the exit status of the encoder.
+    """
+    global recorder
+    sta = 0
+    if recorder:
+        sta = recorder.stop()
+        recorder = None
+    return sta
+
+
 def saveMovie(filename,format,windowname=None):
     """Create a movie from the pyFormex window."""
     if windowname is None:
@@ -354,6 +354,66 @@ class Menu(BaseMenu, QtGui.QMenu):
         self.parent.removeItem(self.title())
 
 
+class LazyMenu(Menu):
+    """A placeholder for a menu that is only created when it is used.
+
+    A LazyMenu has the title of the real menu, but no items. It is
+    inserted in its parent in place of the real menu. When the user
+    opens the menu for the first time, the `loader` function is called,
+    which should create the real menu with the same title in the same
+    parent. The placeholder is then replaced with the real menu, which
+    is opened instead.
+
+    This allows to build the menus from a minimal amount of static
+    information (the title) and to defer the import of the modules
+    defining the menus until they are really needed.
+
+    Parameters:
+
+    - `title`: string: the title of the real menu.
+    - `loader`: callable without arguments, that creates the real menu.
+    - `parent`, `before`: as in :class:`Menu`.
+    """
+
+    def __init__(self,title,loader,parent=None,before=None):
+        Menu.__init__(self, title, parent=parent, before=before)
+        self.loader = loader
+        self.aboutToShow.connect(self.defer_load)
+
+
+    def defer_load(self):
+        """Load the real menu after the current event is handled."""
+        if self.loader is not None:
+            QtCore.QTimer.singleShot(0, self.load)
+
+
+    def load(self):
+        """Replace the placeholder with the real menu.
+
+        Returns the real menu, or None if the loader did not create it.
+        """
+        if self.loader is None:
+            return None
+        loader, self.loader = self.loader, None
+        parent = self.parent
+        title = self.title()
+        before = parent.nextitem(title)
+        self.close()
+        parent.removeItem(title)
+        if self in parent._submenus_:
+            parent._submenus_.remove(self)
+        loader()
+        real = parent.item(title)
+        if isinstance(real, QtGui.QMenu):
+            if before is not None and parent.action(before) is not None:
+                # Put the real menu where the placeholder was
+                parent.removeAction(real.menuAction())
+                parent.insertMenu(parent.action(before), real)
+            if isinstance(parent, QtGui.QMenuBar):
+                parent.setActiveAction(real.menuAction())
+        return real
+
+
 class MenuBar(BaseMenu, QtGui.QMenuBar):
     """A menu bar allowing easy menu creation."""
 
@@ -1161,6 +1161,7 @@ class QtCanvas(QtOpenGL.QGLWidget, canvas.Canvas):
             self.state = [self.statex-w/2, self.statey-h/2 ]
 
         elif action == MOVE:
+            self.interacting = True
             w, h = self.getSize()
             # set all three rotations from mouse movement
             # tangential movement sets twist,
@@ -1190,6 +1191,7 @@ class QtCanvas(QtOpenGL.QGLWidget, canvas.Canvas):
             self.update()
 
         elif action == RELEASE:
+            self.interacting = False
             self.update()
             self.camera.saveModelView()
 
@@ -1204,6 +1206,7 @@ class QtCanvas(QtOpenGL.QGLWidget, canvas.Canvas):
             pass
 
         elif action == MOVE:
+            self.interacting = True
             w, h = self.getSize()
             dx, dy = float(self.statex-x)/w, float(self.statey-y)/h
             self.camera.transArea(dx, dy)
@@ -1211,6 +1214,7 @@ class QtCanvas(QtOpenGL.QGLWidget, canvas.Canvas):
             self.update()
 
         elif action == RELEASE:
+            self.interacting = False
             self.update()
             self.camera.saveModelView()
 
@@ -1225,6 +1229,7 @@ class QtCanvas(QtOpenGL.QGLWidget, canvas.Canvas):
             self.state = [self.camera.dist, self.camera.area.tolist(), pf.cfg['gui/dynazoom']]
 
         elif action == MOVE:
+            self.interacting = True
             w, h = self.getSize()
             dx, dy = float(self.statex-x)/w, float(self.statey-y)/h
             for method, state, value, size in zip(self.state[2], [self.statex, self.statey], [x, y], [w, h]):
@@ -1239,6 +1244,7 @@ class QtCanvas(QtOpenGL.QGLWidget, canvas.Canvas):
             self.update()
 
         elif action == RELEASE:
+            self.interacting = False
             self.update()
             self.camera.saveModelView()
 
@@ -0,0 +1,128 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+"""Profiling of the module imports during pyFormex startup.
+
+This module is activated by the ``--startup-profile`` command line option.
+It is imported by the pyformex package itself, before anything else gets
+imported, and should therefore not import any pyFormex modules.
+
+It installs a finder in sys.meta_path that measures the time spent in
+the execution of each imported module. The report shows for each module
+the cumulative time (including the time to import the modules it imports)
+and the self time.
+"""
+from __future__ import absolute_import, division, print_function
+
+import sys
+import time
+
+
+class ImportProfiler(object):
+    """Measure the import time of all modules.
+
+    The ImportProfiler is a meta path finder that wraps the loaders of
+    the modules found by the other finders, to measure the time spent
+    in executing the module code. It works with Python3 only.
+
+    Attributes:
+
+    - `start`: the time at which the profiler was created.
+    - `times`: a dict with the module names as keys and a list
+      [cumulative time, self time] as value.
+    """
+
+    def __init__(self):
+        self.start = time.time()
+        self.times = {}
+        self._stack = []
+
+
+    def install(self):
+        """Start profiling the imports"""
+        if sys.hexversion >= 0x03040000 and self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+
+    def uninstall(self):
+        """Stop profiling the imports"""
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+
+    def find_spec(self, name, path=None, target=None):
+        """Find the module spec with the other finders and wrap its loader"""
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Only wrap loaders that are created for a single module
+        if loader is not None and not isinstance(loader, type) and \
+               hasattr(loader, 'exec_module'):
+            loader.exec_module = self._timed(name, loader.exec_module)
+        return spec
+
+
+    def _timed(self, name, exec_module):
+        """Return a timed version of exec_module for module name"""
+        def timed_exec_module(module):
+            self._stack.append(0.)
+            t = time.time()
+            try:
+                exec_module(module)
+            finally:
+                cumul = time.time() - t
+                children = self._stack.pop()
+                if self._stack:
+                    self._stack[-1] += cumul
+                self.times[name] = [cumul, cumul - children]
+        return timed_exec_module
+
+
+    def report(self, count=25):
+        """Return a report of the import times.
+
+        Parameters:
+
+        - `count`: int: number of modules to list. The modules with the
+          highest self times are listed.
+
+        Returns a multiline string.
+        """
+        total = time.time() - self.start
+        imports = sum([ t[1] for t in self.times.values() ])
+        items = sorted(self.times.items(), key=lambda x: -x[1][1])[:count]
+        s = "Startup profile: %s modules imported in %.3f s; " \
+            "total startup time %.3f s\n" % (len(self.times), imports, total)
+        s += "%10s %10s  %s\n" % ('cumul(ms)', 'self(ms)', 'module')
+        for name, (cumul, own) in items:
+            s += "%10.1f %10.1f  %s\n" % (cumul*1000, own*1000, name)
+        return s
+
+
+# End
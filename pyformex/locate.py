@@ -0,0 +1,244 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+"""Locating points in the elements of a Mesh.
+
+This module finds the elements containing a set of points, together with
+the natural coordinates of the points in those elements. The candidate
+elements for each point are found with a bounding volume hierarchy
+(:class:`bvh.BVH`) of the element boxes. The natural coordinates are
+then computed by inverting the isoparametric mapping of the element
+(defined by the shape functions in :mod:`elements`) with a vectorized
+Gauss-Newton iteration over all the candidate pairs at once.
+
+Since the Gauss-Newton iteration minimizes the distance from the point
+to the element, the same procedure works for volume, surface and line
+elements: a point is located in an element if its distance to the
+element is within a given tolerance.
+"""
+from __future__ import absolute_import, division, print_function
+
+from pyformex.arraytools import *
+from pyformex.elements import elementType
+from pyformex import bvh
+
+
+def mapNatural(X,eltype,xi):
+    """Map natural coordinates to global coordinates.
+
+    Parameters:
+
+    - `X`: float array (n,nplex,3): the nodal coordinates of n elements.
+    - `eltype`: the element type or its name.
+    - `xi`: float array (n,ndim): one point in natural coordinates for
+      each of the elements.
+
+    Returns a float array (n,3) with the global coordinates of the points.
+
+    Example:
+
+    >>> X = [[[0.,0.,0.],[2.,0.,0.],[2.,1.,0.],[0.,1.,0.]]]
+    >>> print(mapNatural(X,'quad4',[[0.5,0.5]]))
+    [[ 1.   0.5  0. ]]
+    """
+    eltype = elementType(eltype)
+    N = eltype.shapeFunctions(xi)
+    return matmul(N[:, newaxis], asarray(X))[:, 0]
+
+
+def elementPoints(coords,elems,eltype,xi):
+    """Map a set of natural points into all the elements of a Mesh.
+
+    Parameters:
+
+    - `coords`, `elems`, `eltype`: the nodal coordinates, connectivity
+      and element type of a Mesh.
+    - `xi`: float array (npts,ndim): natural coordinates of some points.
+
+    Returns a float array (nelems,npts,3) with the global coordinates of
+    the points in each of the elements.
+    """
+    eltype = elementType(eltype)
+    N = eltype.shapeFunctions(xi)
+    return matmul(N, asarray(coords)[elems])
+
+
+def clipNatural(eltype,xi):
+    """Clip natural coordinates to the domain of an element type.
+
+    Coordinates in the tensor directions are clipped to [0,1]. The
+    coordinates of the simplex part are made non-negative and scaled down
+    if their sum exceeds 1.
+
+    Returns the clipped natural coordinates. Points inside the element
+    are not changed.
+    """
+    eltype = elementType(eltype)
+    nbary = eltype.shape[0]
+    xi = clip(xi, 0., 1.)
+    if nbary:
+        s = xi[:, :nbary].sum(axis=-1, keepdims=True)
+        xi[:, :nbary] /= maximum(s, 1.)
+    return xi
+
+
+def naturalCoords(X,eltype,P,maxiter=20,tol=1.e-10):
+    """Compute the natural coordinates of points in elements.
+
+    Parameters:
+
+    - `X`: float array (n,nplex,3): the nodal coordinates of n elements.
+    - `eltype`: the element type or its name.
+    - `P`: float array (n,3): one point for each of the elements.
+    - `maxiter`: int: maximum number of iterations.
+    - `tol`: float: convergence tolerance on the natural coordinates.
+
+    The natural coordinates are found by a Gauss-Newton iteration
+    minimizing the distance between P and the mapped point X(xi).
+    For points inside a volume element, this is the inverse of the
+    isoparametric mapping. For other points, the result is a (local)
+    closest point on the (infinitely extended) element.
+
+    Returns a tuple (xi,dist) where xi is a float array (n,ndim) with the
+    natural coordinates, clipped to the element domain, and dist is a
+    float array (n,) with the distance from P to the mapped clipped point.
+
+    Example:
+
+    >>> X = [[[0.,0.,0.],[2.,0.,0.],[3.,2.,0.],[0.,1.,0.]]]
+    >>> xi, d = naturalCoords(X,'quad4',[[2.,1.,0.]])
+    >>> print(mapNatural(X,'quad4',xi), d)
+    [[ 2.  1.  0.]] [ 0.]
+    """
+    eltype = elementType(eltype)
+    X = asarray(X, dtype=float64)
+    P = asarray(P, dtype=float64).reshape(-1, 3)
+    ndim = eltype.ndim
+    x0 = eltype.vertices[:, :ndim].mean(axis=0)
+    xi = resize(x0, (len(P), ndim)).astype(float64)
+    todo = arange(len(P))
+    eye = identity(ndim)
+    for it in range(maxiter):
+        if len(todo) == 0:
+            break
+        N, dN = eltype.shapeFunctions(xi[todo], deriv=True)
+        Xt = X[todo]
+        XtT = Xt.transpose(0, 2, 1)
+        r = matmul(XtT, N[..., newaxis]) - P[todo, :, newaxis]
+        J = matmul(XtT, dN)
+        JT = J.transpose(0, 2, 1)
+        A = matmul(JT, J)
+        # regularize degenerate elements
+        A += 1.e-14 * A.trace(axis1=1, axis2=2)[:, newaxis, newaxis] * eye + 1.e-300 * eye
+        dxi = -linalg.solve(A, matmul(JT, r))[..., 0]
+        # limit the steps to avoid running away on distorted elements
+        dxi = clip(dxi, -1., 1.)
+        xi[todo] += dxi
+        ok = isfinite(xi[todo]).all(axis=-1)
+        xi[todo[~ok]] = x0
+        todo = todo[ok & (abs(dxi) > tol).any(axis=-1)]
+    xi = clipNatural(eltype, xi)
+    dist = length(mapNatural(X, eltype, xi) - P)
+    return xi, dist
+
+
+def locatePoints(coords,elems,eltype,points,atol=None,chunk=1<<16):
+    """Find the elements containing a set of points.
+
+    Parameters:
+
+    - `coords`: float array (ncoords,3): the nodal coordinates of a Mesh.
+    - `elems`: int array (nelems,nplex): the element connectivity.
+    - `eltype`: the element type or its name.
+    - `points`: float array (npts,3): the points to locate.
+    - `atol`: float: the maximum distance of a point to an element for
+      the point to be located in that element. The default is 1.e-5 times
+      the size of the Mesh. For surface and line elements, this should be
+      large enough to account for the points not being exactly on the
+      elements.
+    - `chunk`: int: the number of candidate pairs processed at once.
+
+    For each point, the candidate elements are those whose bounding box
+    is not farther away than `atol`. Of these, the element with the
+    smallest distance to the point is selected. Points inside multiple
+    elements (e.g. on their common border) are located in the one with
+    the lowest number.
+
+    Returns a tuple (elem,xi,dist), where elem is an int array (npts,)
+    with the number of the element containing each point, or -1 if
+    it is not found, xi is a float array (npts,ndim) with the natural
+    coordinates of the points in those elements, and dist is the
+    distance of the points to the element (inf if not found).
+
+    Example:
+
+    >>> from pyformex.mesh import Mesh
+    >>> M = Mesh(eltype='quad4').subdivide(2,2)
+    >>> elem, xi, d = locatePoints(M.coords,M.elems,'quad4',
+    ...     [[0.25,0.25,0.],[0.75,0.5,0.],[1.5,0.5,0.]])
+    >>> print(elem)
+    [ 0  1 -1]
+    >>> print(xi)
+    [[ 0.5  0.5]
+     [ 0.5  1. ]
+     [ 0.   0. ]]
+    """
+    eltype = elementType(eltype)
+    coords = asarray(coords)
+    elems = asarray(elems)
+    points = asarray(points, dtype=float64).reshape(-1, 3)
+    npts = len(points)
+    if atol is None:
+        atol = 1.e-5 * length(coords.max(axis=0)-coords.min(axis=0)) if len(coords) else 0.
+    elem = -ones(npts, dtype=Int)
+    xi = zeros((npts, eltype.ndim))
+    dist = full(npts, inf)
+    if npts == 0 or len(elems) == 0:
+        return elem, xi, dist
+
+    X = coords[elems]
+    E = bvh.BVH(bvh.boxes(X))
+    Q = bvh.BVH(points.reshape(-1, 1, 3).repeat(2, axis=1))
+    pairs = E.overlapPairs(Q, atol=atol)
+    # process by point, so that the lowest element wins on ties
+    pairs = pairs[lexsort([pairs[:, 0], pairs[:, 1]])]
+    for i in range(0, len(pairs), chunk):
+        e, p = pairs[i:i+chunk].T
+        x, d = naturalCoords(X[e], eltype, points[p])
+        # keep the best candidate for each point
+        srt = lexsort([e, d, p])
+        e, p, x, d = e[srt], p[srt], x[srt], d[srt]
+        first = ones(len(p), dtype=bool)
+        first[1:] = p[1:] != p[:-1]
+        e, p, x, d = e[first], p[first], x[first], d[first]
+        better = d < dist[p]
+        e, p, x, d = e[better], p[better], x[better], d[better]
+        elem[p], xi[p], dist[p] = e, x, d
+
+    notfound = dist > atol
+    elem[notfound] = -1
+    dist[notfound] = inf
+    return elem, xi, dist
+
+
+# End
@@ -284,6 +284,37 @@ def run_pytest(modules):
                 print("No such test module: %s" % path)
 
 
+def run_bench():
+    """Run the performance benchmarks and/or compare results.
+
+    This processes the --bench* command line options. See the
+    :mod:`bench` module for the benchmarks.
+
+    Returns 1 if a comparison was requested and regressions were
+    found, else 0.
+    """
+    from pyformex import bench
+    opts = pf.options
+    files = opts.benchcompare or []
+    if len(files) > 2:
+        print("--benchcompare takes at most two files")
+        return 1
+    base = bench.loadResults(files[0]) if files else None
+    if len(files) == 2 and opts.bench is None:
+        new = bench.loadResults(files[1])
+    else:
+        print("Running benchmarks with scale %s" % opts.benchscale)
+        new = bench.runBenchmarks(opts.bench, opts.benchscale, opts.benchrepeat)
+        if opts.benchout:
+            bench.saveResults(new, opts.benchout)
+            print("Saved benchmark results to %s" % opts.benchout)
+    if base is None:
+        return 0
+    print("Comparing with baseline %s (%s)" % (files[0], base['date']))
+    nreg = bench.reportComparison(bench.compare(base, new))
+    return 1 if nreg > 0 else 0
+
+
 def doctest_module(module):
     """Run the doctests in the module's docstrings.
 
@@ -324,7 +355,7 @@ def migrateUserConfig():
     """
     if not os.path.exists(pf.cfg['userprefs']):
         # Check old place
-        olduserprefs = os.path.join(homedir, '.pyformex', 'pyformexrc')
+        olduserprefs = os.path.join(pf.cfg['homedir'], '.pyformex', 'pyformexrc')
         if os.path.exists(olduserprefs):
             print("Migrating your user preferences\n  from %s\n  to %s" % (olduserprefs, pf.cfg['userprefs']))
             # We move the user config from HOME/.pyformex/.pyformexrc
@@ -504,6 +535,10 @@ def parseArguments(args):
        action="store", dest="debuglevel", type=int, default=0,
        help="Display debugging info to sys.stdout. The value is an int with the bits of the requested debug levels set. A value of -1 switches on all debug info. If this option is used, it overrides the --debug option.",
        )
+    MO("--startup-profile",
+       action="store_true", dest="startup_profile", default=False,
+       help="Report the time spent in importing each module during the startup of pyFormex. Requires Python3.",
+       )
     MO("--mesa",
        action="store_true", dest="mesa", default=False,
        help="Force the use of software 3D rendering through the mesa libs. The default is to use hardware accelerated rendering whenever possible. This flag can be useful when running pyFormex remotely on another host. The hardware accelerated version will not work over remote X.",
@@ -588,6 +623,26 @@ def parseArguments(args):
        action="store", dest="pytest", default=None, metavar='MODULE', nargs='*',
        help="Run the pytest tests for the specified pyFormex modules and exit. MODULE name is specified in Python syntax, relative to pyformex package (e.g. coords, plugins.curve).",
        )
+    MO("--bench",
+       action="store", dest="bench", default=None, metavar='NAME', nargs='*',
+       help="Run the performance benchmarks and exit. If NAMEs are given, only the benchmarks matching any of them are run. NAME can contain shell style wildcards (e.g. 'mesh.*') or be the name of a benchmark group ('micro' or 'example'). A line with the time, peak memory and throughput is printed for each benchmark.",
+       )
+    MO("--benchscale",
+       action="store", dest="benchscale", type=float, default=1.0,
+       help="Scale factor for the model size in the micro benchmarks. The default is 1.0.",
+       )
+    MO("--benchrepeat",
+       action="store", dest="benchrepeat", type=int, default=None,
+       help="Number of timings of each micro benchmark. The best time is reported. The default is set in the configuration.",
+       )
+    MO("--benchout",
+       action="store", dest="benchout", default=None, metavar='FILE',
+       help="Save the benchmark results in JSON format to FILE. The results include information about the machine and the software versions.",
+       )
+    MO("--benchcompare",
+       action="store", dest="benchcompare", default=None, metavar='FILE', nargs='+',
+       help="Compare benchmark results against the baseline in the first FILE and report the regressions. If a second FILE is given, the results in that file are compared, else the benchmarks (by default all) are run first. The exit value is 1 if there are regressions.",
+       )
     MO("--docmodule",
        action="store", dest="docmodule", default=None, metavar='MODULE', nargs='*',
        help="Print the autogenerated documentation for module MODULE and exit. This is mostly useful during the generation of the pyFormex reference manual, as the produced result still needs to be run through the Sphinx documentation generator. MODULE is the name of a pyFormex module (Python syntax).",
@@ -792,6 +847,11 @@ def run(args=[]):
 
     ## Parse the arguments ##
     parseArguments(args)
+    if pf.options.startup_profile and pf.import_profile is None:
+        # Not started from the pyformex script: profile what remains
+        from pyformex.importprofile import ImportProfiler
+        pf.import_profile = ImportProfiler()
+        pf.import_profile.install()
 
     ## Process special options which do not start pyFormex ##
     if processReportOptions():
@@ -826,6 +886,10 @@ def run(args=[]):
         pf.options.uselib = pf.cfg['uselib']
     from pyformex import lib
 
+    ## Run the benchmarks ##
+    if pf.options.bench is not None or pf.options.benchcompare:
+        return run_bench()
+
     # TODO:
     # without this, we get a crash. Maybe config related?
     pf.cfg['gui/startup_warning'] = None
@@ -882,6 +946,9 @@ def run(args=[]):
     # Startup done
     pf.started = True
     print("pyFormex started from %s" % pf.executable)
+    if pf.options.startup_profile:
+        pf.import_profile.uninstall()
+        print(pf.import_profile.report())
 
     # Prepend the inline script
     if pf.options.script:
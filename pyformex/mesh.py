@@ -50,6 +50,7 @@ from pyformex.formex import Formex
 from pyformex.connectivity import Connectivity
 from pyformex.elements import elementType
 from pyformex.geometry import Geometry
+from pyformex.mydict import Dict
 
 
 ##############################################################
@@ -114,7 +115,7 @@ class Mesh(Geometry):
     ###################################################################
 
 
-    fieldtypes = ['node','elemc','elemn']
+    fieldtypes = ['node','elemc','elemn','elemg']
 
 
     def __init__(self,coords=None,elems=None,prop=None,eltype=None):
@@ -1844,6 +1845,43 @@ Mesh: %s nodes, %s elems, plexitude %s, ndim %s, eltype: %s
         return self.select(ind[ok])
 
 
+    def cluster(self,ppb=8,shift=0.5,return_index=False):
+        """Create a coarse approximation of the Mesh by vertex clustering.
+
+        The nodes of the Mesh are clustered on a regular grid of boxes
+        (see :meth:`Coords.cluster`) and the elements are renumbered to
+        the cluster points. Elements that become degenerate, and
+        duplicate elements, are removed. The result has the same element
+        type as the original and inherits the property numbers.
+
+        This is a fast, but rough, decimation method. It does not need
+        any connectivity information and is typically used to create
+        proxy objects for level-of-detail rendering.
+
+        Parameters:
+
+        - `ppb`: int: targeted mean number of nodes per box.
+        - `shift`: float: relative shift to be applied on the boxes.
+        - `return_index`: bool: if True, also returns the indices of the
+          retained elements in the original Mesh.
+
+        Returns the coarse Mesh, and if `return_index` is True, also an
+        int array with the original element numbers.
+        """
+        coords, index = self.coords.cluster(ppb=ppb, shift=shift)
+        elems = Connectivity(index[self.elems], eltype=self.elType())
+        keep = where(~elems.testDegenerate())[0]
+        ind, ok = elems[keep].testDuplicate()
+        keep = sort(keep[ind[ok]])
+        M = self.__class__(coords, elems[keep], eltype=self.elType())
+        if self.prop is not None:
+            M.setProp(self.prop[keep])
+        if return_index:
+            return M, keep
+        else:
+            return M
+
+
     def renumber(self,order='elems'):
         """Renumber the nodes of a Mesh in the specified order.
 
@@ -2337,6 +2375,89 @@ The dir,length are in the same order as in the translate method.""" % (dir, leng
             n = -n
         return self.clip(self.test(nodes=nodes, dir=n, min=p))
 
+
+    def cutWithPlane(self,p,n,side='',atol=None,newprops=None,compact=True):
+        """Cut a Mesh with the plane(s) (p,n).
+
+        This works for Meshes of element type 'line2', 'tri3', 'quad4'
+        and 'tet4'. See :func:`cutElementsAtPlane` for the details.
+
+        Parameters:
+
+        - `p`, `n`: a point and normal vector defining the cutting plane.
+          Both can have shape (3) or (nplanes,3), allowing to cut with
+          multiple planes. The positive part is then the part at the
+          positive side of all planes, the negative part is the rest.
+        - `side`: either an empty string, or one of '+' or '-'. In the
+          latter cases, only the part at the positive, resp. negative side
+          of the plane (as defined by its normal) is returned. The (default)
+          empty string makes both parts being returned as a list [pos,neg].
+        - `atol`: float: nodes at a distance not larger than `atol` from
+          the plane are projected on the plane, and no cutting is done
+          near these points. The default is 1.e-5 * self.dsize().
+        - `newprops`: list of property numbers to set on the new elements.
+          This is only used for Meshes of type 'line2' or 'tri3' and has
+          the same meaning as in :meth:`Formex.cutWithPlane`. The default
+          is to give all elements the property of the original element.
+        - `compact`: bool: if True (default), unused nodes are removed.
+          If False, the returned Meshes have the original nodes, followed
+          by the intersection points.
+
+        Returns a Mesh or a list of two Meshes. Elements that are not cut
+        are retained unaltered, the others are split up. Elements of type
+        'quad4' result in 'tri3' elements. The parts are conforming and
+        have the orientation of the original elements.
+
+        Example:
+
+        >>> M = Mesh(eltype='quad4').subdivide(2,1)
+        >>> P, N = M.cutWithPlane([0.75,0.,0.], [1.,0.,0.])
+        >>> print(P.elName(), P.nelems(), N.nelems())
+        tri3 2 4
+        >>> print(P.area(), N.area())
+        0.25 0.75
+        """
+        from pyformex.formex import _sane_side, _select_side
+        side = _sane_side(side)
+        if atol is None:
+            atol = 1.e-5*self.dsize()
+        p = asarray(p).reshape(-1, 3)
+        n = asarray(n).reshape(-1, 3)
+        p, n = broadcast_arrays(p, n)
+        M = self
+        if len(p) > 1 and M.elName() == 'quad4':
+            prop = None if M.prop is None else M.prop.repeat(2)
+            M = Mesh(M.coords, _fan(M.elems).reshape(-1, 3), prop=prop, eltype='tri3')
+        neg = []
+        for i in range(len(p)):
+            # Elements at the negative side of a later plane need no cutting
+            d = ((M.coords[:, newaxis] - p[i+1:]) * at.normalize(n[i+1:])).sum(axis=-1)
+            out = (d[M.elems] < -atol).all(axis=1).any(axis=-1)
+            if out.any():
+                prop = [ None, None ] if M.prop is None else [ M.prop[out], M.prop[~out] ]
+                if side in '-':
+                    neg.append((M.elems[out], prop[0]))
+                M = Mesh(M.coords, M.elems[~out], prop=prop[1], eltype=M.elName())
+            R = cutElementsAtPlane(M.coords, M.elems, M.elName(), p[i], n[i], atol)
+            prop = [ _cutProps(R, s, M.elems, M.prop, newprops) for s in [+1, -1] ]
+            if side in '-':
+                neg.append((R.neg, prop[1]))
+            M = Mesh(R.coords, R.pos, prop=prop[0], eltype=R.eltype)
+
+        pos = M
+        if side in '-':
+            prop = [ p for e, p in neg if p is not None ]
+            if len(prop) < len(neg):
+                prop = None
+            else:
+                prop = concatenate(prop)
+            neg = Mesh(M.coords, concatenate([ e for e, p in neg ]), prop=prop, eltype=M.elName())
+        if compact:
+            pos = pos.compact()
+            if side in '-':
+                neg = neg.compact()
+        return _select_side(side, [pos, neg])
+
     # GDS:
     # 1) toSurface converts to tri3. This is not the best in case of quadratic faces:
     #    e.g. each tri6 is converted into one single tri3, loosing the shape of it edges,
@@ -2529,6 +2650,67 @@ The dir,length are in the same order as in the translate method.""" % (dir, leng
         return self.reverse(self.volumes() < 0.)
 
 
+    def quality(self,metric='scaledjacobian',at='corners'):
+        """Compute a quality metric for all the elements of the Mesh.
+
+        Parameters:
+
+        - `metric`: string: the name of the quality metric. See
+          :mod:`quality` for the available metrics.
+        - `at`: string: where the Jacobian metrics are computed: 'corners',
+          'gauss' or 'all'.
+
+        Returns an (nelems,) float array with the quality values.
+
+        Example:
+
+        >>> M = Mesh(eltype='quad4').subdivide(2,2).scale([2.,1.,1.])
+        >>> print(M.quality('aspectratio'))
+        [ 2.  2.  2.  2.]
+        """
+        from pyformex import quality
+        return quality.elementQuality(self.coords,self.elems,self.elType(),metric,at)
+
+
+    def qualityReport(self,metrics=None,at='corners',bins=10,nworst=10):
+        """Return a summary of the element quality of the Mesh.
+
+        This computes some quality metrics for all the elements and returns
+        their range, histogram and worst elements.
+        See :func:`quality.qualityReport` for the parameters and the
+        returned value. The report can be formatted with
+        :func:`quality.formatReport`.
+        """
+        from pyformex import quality
+        return quality.qualityReport(self.coords,self.elems,self.elType(),metrics,at,bins,nworst)
+
+
+    def locate(self,points,atol=None):
+        """Find the elements containing some points.
+
+        Parameters:
+
+        - `points`: Coords (npts,3): the points to locate.
+        - `atol`: float: maximum distance of a point from an element to be
+          considered inside. See :func:`locate.locatePoints`.
+
+        Returns a tuple (elem,xi,dist): the element number (-1 if not
+        found), the natural coordinates of the point in that element
+        and the distance of the point from the element.
+
+        Example:
+
+        >>> M = Mesh(eltype='quad4').subdivide(2,2)
+        >>> e,xi,d = M.locate([[0.75,0.25,0.],[2.,0.,0.]])
+        >>> print(e)
+        [ 1 -1]
+        >>> print(xi[0])
+        [ 0.5  0.5]
+        """
+        from pyformex import locate
+        return locate.locatePoints(self.coords,self.elems,self.elType(),points,atol)
+
+
 ##########################################
     ## Field values ##
 
@@ -2607,6 +2789,337 @@ def mergeMeshes(meshes,fuse=True,**kargs):
     return coords, [Connectivity(i[e], eltype=e.eltype) for i, e in zip(index, elems)]
 
 
+_cut_tables = {}
+
+def _cutTable(eltype):
+    """_Return the plane cutting table for an element type_
+
+    The table is a dict with for every combination of vertex signs
+    (-1, 0 or +1) the local definition of the part at the positive side,
+    the part at the negative side and the section with the plane.
+    The combination is encoded as sum((s[i]+1) * 3**i).
+    Local points are the element nodes, followed by the intersection
+    points on the element edges.
+    Parts are a segment for level 1 elements, a polygon for level 2
+    elements and a list of outward oriented face polygons for level 3
+    elements. Sections are None, a segment or a polygon oriented along
+    the plane normal.
+    Tables are constructed by clipping the element on first use and then
+    cached.
+    """
+    eltype = elementType(eltype)
+    name = eltype.name()
+    if name in _cut_tables:
+        return _cut_tables[name]
+
+    nplex = eltype.nplex()
+    edges = [ tuple(e) for e in eltype.getEdges() ]
+    edgpt = dict([ (e, nplex+i) for i, e in enumerate(edges) ])
+    edgpt.update([ ((j, i), k) for (i, j), k in list(edgpt.items()) ])
+    if eltype.ndim == 1:
+        cycles = [ list(range(nplex)) ]
+    elif eltype.ndim == 2:
+        cycles = [ [ e[0] for e in edges ] ]
+    else:
+        cycles = [ list(f) for f in eltype.getFaces() ]
+
+    def clip(cycle, s, side):
+        """Clip a closed vertex cycle to one side of the plane"""
+        out = []
+        k = len(cycle)
+        for i in range(k):
+            a, b = cycle[i], cycle[(i+1)%k]
+            if s[a]*side >= 0:
+                out.append(a)
+            if s[a]*s[b] < 0 and (k > 2 or i == 0):
+                out.append(edgpt[(a, b)])
+        return out
+
+    def inplane(i, s):
+        return i >= nplex or s[i] == 0
+
+    def cap(faces, s):
+        """Close the in-plane edges of the faces into a polygon"""
+        nxt = {}
+        for f in faces:
+            k = len(f)
+            for i in range(k):
+                a, b = f[i], f[(i+1)%k]
+                if inplane(a, s) and inplane(b, s):
+                    nxt[b] = a
+        if len(nxt) < 3:
+            return None
+        start = min(nxt)
+        poly = [start]
+        while nxt[poly[-1]] != start:
+            poly.append(nxt[poly[-1]])
+        return poly
+
+    table = {}
+    for s in np.ndindex(*(3,)*nplex):
+        code = sum([ si * 3**i for i, si in enumerate(s) ])
+        s = [ si-1 for si in s ]
+        allzero = max([ abs(si) for si in s ]) == 0
+        parts = []
+        for side in [ +1, -1 ]:
+            if not allzero and max([ si*side for si in s ]) <= 0:
+                parts.append(None)
+                continue
+            if eltype.ndim == 3:
+                part = [ clip(c, s, side) for c in cycles ]
+                part = [ f for f in part if len(f) >= 3 and not all([ inplane(i, s) for i in f ]) ]
+                if not allzero:
+                    c = cap(part, s)
+                    if c is not None:
+                        part.append(c)
+            else:
+                part = clip(cycles[0], s, side)
+            parts.append(part)
+        section = None
+        if parts[0] is not None and parts[1] is not None and not allzero:
+            if eltype.ndim == 2:
+                P = parts[0]
+                k = len(P)
+                section = [ [P[i], P[(i+1)%k]] for i in range(k)
+                            if inplane(P[i], s) and inplane(P[(i+1)%k], s) ][0]
+            elif eltype.ndim == 3:
+                section = parts[0][-1][::-1]
+        table[code] = (parts[0], parts[1], section)
+
+    table = Dict(dict(nplex=nplex, ndim=eltype.ndim, edges=array(edges), table=table))
+    _cut_tables[name] = table
+    return table
+
+
+def _fan(G):
+    """_Split polygons into triangles by pulling from their lowest node_
+
+    G is an int array (npoly,k) with the node numbers of the polygons.
+    Returns an int array (npoly,k-2,3) with the triangles.
+    """
+    npoly, k = G.shape
+    roll = (G.argmin(axis=1).reshape(-1, 1) + arange(k)) % k
+    G = G[arange(npoly).reshape(-1, 1), roll]
+    return stack([ G[:, [0, i, i+1]] for i in range(1, k-1) ], axis=1)
+
+
+def _cutPart(L, part, ndim):
+    """_Create the elements of a part of cut elements_
+
+    L is an int array (nelems,npts) with the global numbers of the local
+    points of elements having the same case in the cutting table.
+    part is the local definition of the part, and ndim its level.
+    Returns an int array (nelems,m,nplex) with m elements per original
+    element, and a bool array (nelems,m) flagging the valid elements,
+    or None if all elements are valid.
+    """
+    if ndim == 1:
+        return L[:, part].reshape(len(L), 1, -1), None
+    elif ndim == 2:
+        return _fan(L[:, part]), None
+    # Pull the faces from the lowest node: faces containing that node
+    # result in flat tetrahedra and are skipped
+    v = L[:, unique(concatenate(part))].min(axis=1).reshape(-1, 1)
+    tri = concatenate([ _fan(L[:, f]) for f in part ], axis=1)
+    keep = [ ~(L[:, f] == v).any(axis=1).reshape(-1, 1) for f in part ]
+    keep = concatenate([ repeat(k, len(f)-2, axis=1) for k, f in zip(keep, part) ], axis=1)
+    v = repeat(v, tri.shape[1], axis=1).reshape(len(L), -1, 1)
+    return concatenate([ tri[:, :, [0, 2, 1]], v ], axis=-1), keep
+
+
+def cutElementsAtPlane(coords,elems,eltype,p,n,atol=0.):
+    """Cut elements with a plane.
+
+    This is the vectorized kernel behind the cutWithPlane methods of
+    :class:`Mesh`, :class:`Formex` and :class:`TriSurface`.
+    The nodes are classified as lying at the positive side, the negative
+    side or in the plane, and each element is split up according to
+    a precomputed table indexed by the signs of its vertices. The
+    work is done per case of the table, never per element.
+
+    Parameters:
+
+    - `coords`: Coords (nnod,3): the nodal coordinates.
+    - `elems`: int array (nelems,nplex): the element connectivity.
+    - `eltype`: element type: one of 'line2', 'tri3', 'quad4' or 'tet4'.
+    - `p`, `n`: a point and normal vector defining the cutting plane.
+    - `atol`: float: nodes at a distance not larger than `atol` from the
+      plane are considered to be lying in the plane, and are projected
+      on it.
+
+    Returns a Dict with the following items:
+
+    - `coords`: Coords (nnod+ncut,3): the original nodes (those in the
+      plane projected on it), followed by the intersection points of the
+      plane with the cut edges.
+    - `sign`: int array (nnod,): +1, -1 or 0 for the original nodes at
+      the positive side, the negative side or in the plane.
+    - `edges`: int array (ncut,2): the cut edges, as pairs of original
+      node numbers, lowest first. Node `nnod+i` is the intersection point
+      on edge `edges[i]`.
+    - `param`: float array (ncut,): the parameter value of the
+      intersection points along their edge.
+    - `eltype`: the element type of the parts. This is the input type,
+      except for 'quad4', which results in 'tri3'.
+    - `pos`, `neg`: int arrays with the elements of the parts at the
+      positive and negative side of the plane. Elements that are not
+      cut are kept unaltered (unless the type is 'quad4'). Elements lying
+      completely in the plane are included in both parts.
+    - `posorg`, `negorg`: int arrays with the number of the original
+      element of each element in `pos`, resp. `neg`.
+    - `possub`, `negsub`: int arrays with the sequence number of the
+      elements in their original element.
+    - `section`: int array with the section of the cut elements with the
+      plane: 'line2' elements for 'tri3' and 'quad4', 'tri3' elements
+      for 'tet4' (oriented along `n`), None for 'line2'.
+    - `sectionorg`: the original element number of the section elements.
+
+    The intersection points are unique per edge and polygonal pieces
+    are split up by pulling from their lowest numbered node, so that
+    the parts are conforming and have the orientation of the original
+    elements.
+
+    Example:
+
+    >>> R = cutElementsAtPlane([[0.,0.,0.],[1.,0.,0.],[0.,1.,0.]],
+    ...     [[0,1,2]], 'tri3', [0.5,0.,0.], [1.,0.,0.])
+    >>> print(R.edges)
+    [[0 1]
+     [1 2]]
+    >>> print(R.coords[3:])
+    [[ 0.5  0.   0. ]
+     [ 0.5  0.5  0. ]]
+    >>> print(R.pos)
+    [[1 4 3]]
+    >>> print(R.neg)
+    [[0 3 4]
+     [0 4 2]]
+    >>> print(R.section)
+    [[4 3]]
+    """
+    name = elementType(eltype).name()
+    if name not in [ 'line2', 'tri3', 'quad4', 'tet4' ]:
+        raise ValueError("Can not cut elements of type %s" % name)
+    T = _cutTable(name)
+    x = array(coords, dtype=np.float64).reshape(-1, 3)
+    elems = asarray(elems).reshape(-1, T.nplex)
+    nnod = x.shape[0]
+    nelems, nplex = elems.shape
+    p = asarray(p, dtype=np.float64).reshape(3)
+    n = at.normalize(asarray(n, dtype=np.float64).reshape(3))
+
+    # Classify and snap the nodes
+    d = dot(x-p, n)
+    s = where(d > atol, 1, where(d < -atol, -1, 0))
+    w = (s == 0) & (d != 0.)
+    x[w] -= outer(d[w], n)
+    d[s == 0] = 0.
+    S = s[elems]
+    code = dot(S+1, 3**arange(nplex))
+    cut = (S > 0).any(axis=1) & (S < 0).any(axis=1)
+
+    # Unique intersection points on the cut edges
+    E = T.edges
+    ecut = S[:, E[:, 0]] * S[:, E[:, 1]] < 0
+    ed = sort(elems[:, E][ecut], axis=-1).astype(np.int64)
+    key, inv = unique(ed[:, 0]*nnod + ed[:, 1], return_inverse=True)
+    edges = column_stack([key // nnod, key % nnod]).astype(Int)
+    da, db = d[edges[:, 0]], d[edges[:, 1]]
+    t = da / (da-db)
+    xa = x[edges[:, 0]]
+    x = concatenate([x, xa + t.reshape(-1, 1) * (x[edges[:, 1]]-xa)])
+
+    # Local to global point numbers
+    L = -ones((nelems, nplex+len(E)), dtype=Int)
+    L[:, :nplex] = elems
+    L[:, nplex:][ecut] = nnod + inv
+
+    parts = { +1: [], -1: [], 0: [] }
+    if name == 'quad4':
+        todo = ones(nelems, dtype=bool)
+    else:
+        todo = cut
+        for side in [ +1, -1 ]:
+            w = where(~(S*side < 0).any(axis=1))[0]
+            parts[side].append((elems[w], w, zeros_like(w)))
+
+    for c in unique(code[todo]):
+        w = where(todo & (code == c))[0]
+        Lc = L[w]
+        for side, part in zip([ +1, -1, 0 ], T.table[c]):
+            if part is None:
+                continue
+            el, keep = _cutPart(Lc, part, T.ndim if side else T.ndim-1)
+            m = el.shape[1]
+            org = repeat(w, m).reshape(-1, m)
+            if keep is None:
+                keep = ones(org.shape, dtype=bool)
+            sub = cumsum(keep, axis=1) - 1
+            parts[side].append((el[keep], org[keep], sub[keep]))
+
+    R = Dict(dict(coords=Coords(x), sign=s, edges=edges, param=t,
+                  eltype='tri3' if name == 'quad4' else name))
+    nplex = dict(line2=2, tri3=3, quad4=3, tet4=4)[name]
+    for side, key in [ (+1, 'pos'), (-1, 'neg'), (0, 'section') ]:
+        if not parts[side]:
+            el = zeros((0, nplex if side else nplex-1), dtype=Int)
+            org = sub = zeros(0, dtype=Int)
+        else:
+            el, org, sub = [ concatenate(a) for a in zip(*parts[side]) ]
+            srt = lexsort((sub, org))
+            el, org, sub = el[srt].astype(Int), org[srt], sub[srt]
+        R[key] = el
+        R[key+'org'] = org
+        if side:
+            R[key+'sub'] = sub
+    if name == 'line2':
+        R.section = None
+    return R
+
+
+def _cutProps(R, side, elems, prop, newprops=None):
+    """_Return the property numbers of a part resulting from a cut_
+
+    R is the result of :func:`cutElementsAtPlane` on the elements elems
+    with properties prop. side is +1 or -1 for the positive or negative
+    part. See :meth:`Formex.cutWithPlane` for the use of newprops.
+    """
+    key = 'pos' if side > 0 else 'neg'
+    org = R[key+'org']
+    nplex = elems.shape[1]
+    if newprops is None or nplex == 4:
+        if prop is None:
+            return None
+        return prop[org]
+
+    S = R.sign[elems[org]]
+    cut = (S > 0).any(axis=1) & (S < 0).any(axis=1)
+    if nplex == 2:
+        i = 0 if side > 0 else 1
+        return where(cut, newprops[i+2], newprops[i]).astype(Int)
+
+    if prop is None:
+        return None
+    # make sure we have sane newprops
+    try:
+        newprops = newprops[:7]
+        for p in newprops:
+            if not (p is None or isinstance(p, int)):
+                raise ValueError
+    except:
+        newprops = arange(7)
+    V = (S == 0).sum(axis=1)
+    cat = -ones(len(org), dtype=Int)
+    w = cut & (V == 0)
+    cat[w] = where((S[w]*side > 0).sum(axis=1) == 1, 0, 1+R[key+'sub'][w])
+    cat[V == 1] = where(cut[V == 1], 4, 3)
+    cat[V == 2] = 5
+    cat[V == 3] = 6
+    newprops = array([ -1 if p is None else p for p in newprops ] + [-1])
+    newprops = newprops[cat]
+    return where(newprops < 0, prop[org], newprops).astype(Int)
+
+
 def unitAttractor(x,e0=0.,e1=0.):
     """Moves values in the range 0..1 closer to or away from the limits.
 
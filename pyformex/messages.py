@@ -107,6 +107,9 @@ mesh_notConnectedTo = "Mesh.notConnectedTo has been removed! It can be replaced
 warn_mesh_partitionbyangle = "The partitioning may be incorrect due to nonplanar 'quad4' elements"
 warn_mesh_reflect = "The Mesh.reflect will now by default reverse the elements after the reflection, since that is what the user will want in most cases. The extra reversal can be skipped by specifying 'reverse=False' in the argument list of the `reflect` operation."
 warn_mesh_removed_eltype = "The 'eltype' attribute of the Mesh class has been removed. The eltype is now stored solely in the elems attibute. To get the element type from the Mesh, use Mesh.elType() or Mesh.elName(). To set the element type of a Mesh, use Mesh.setType(eltype)."
+warn_fixnormals_nonorientable = "The surface has %s non-orientable component(s) (out of %s). Their normals can not be oriented consistently."
+warn_boolean_inconsistent = "Some triangle pairs have an inconsistent intersection. The intersection curve may be incomplete."
+warn_boolean_open_curve = "The intersection curve has open ends inside a triangle. This happens if one of the surfaces is not a closed manifold. The result of the boolean operation may be invalid."
 warn_mesh_reverse = "The meaning of Mesh.reverse has changed. Before, it would just reorder the nodes of the elements in backwards order (just like the Formex.reverse still does. The new definition of Mesh.reverse however is to reverse the line direction for 1D eltypes, to reverse the normals for 2D eltypes and to turn 3D volumes inside out. This definition may have more practical use. It can e.g. be used to fix meshes after a mirroring operation."
 
 warn_nurbs_curve = "Nurbs curves of degree > 7 can currently not be drawn! You can create some approximation by evaluating the curve at some points."
@@ -583,6 +583,7 @@ class Canvas(object):
         self.view_angles = views.ViewAngles()
         self.cursor = None
         self.focus = False
+        self.interacting = False  # True during interactive camera changes
         pf.debug("Canvas Setting:\n%s"% self.settings, pf.DEBUG.DRAW)
         self.makeCurrent()  # we need correct OpenGL context
         #print("CANVAS",glVersion())
@@ -181,6 +181,10 @@ def draw(F,
         This will make the object fully visible, even when it is hidden by
         other objects. If more than one objects is drawn with `ontop=True`
         the visibility of the object will depend on the order of drawing.
+      - `lod`: bool, int or list of ints: if set, coarse level-of-detail
+        proxies of the object are built in the background and rendered
+        instead of the full object during interactive camera changes.
+        See :meth:`Actor.buildLOD`.
 
     Options: these arguments modify the working of the draw functions.
       If None, they are filled in from the current viewport drawing options.
@@ -848,8 +852,7 @@ def drawField(fld,comp=0,scale='RAINBOW',symmetric_scale=False,cvalues=None,**ka
         multiplier = 0
 
     CS = ColorScale(scale, vmin, vmax, vmid, 1., 1.)
-    cval = np.array([CS.color(v) for v in data.flat])
-    cval = cval.reshape(data.shape+(3,))
+    cval = CS.colorArray(data)
     CLA = ColorLegend(CS, 256, 20, 20, 30, 200, scale=multiplier)
     drawActor(CLA)
     decorate(drawText(fld.fldname,(20, 250),size=18,color='black'))
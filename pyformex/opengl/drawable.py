@@ -43,6 +43,7 @@ from pyformex import arraytools as at
 from pyformex import utils
 import numpy as np
 from numpy import int32,float32
+import threading
 
 
 ### Drawable Objects ###############################################
@@ -154,7 +155,7 @@ class Drawable(Attributes):
         'cullface', 'subelems', 'color', 'name', 'highlight', 'opak',
         'linewidth', 'pointsize', 'lighting', 'offset', 'vbo', 'nbo', 'ibo',
         'alpha', 'drawface', 'objectColor', 'useObjectColor', 'rgbamode',
-        'texture', 'texcoords',
+        'texture', 'texcoords', 'dbo', 'sbo',
         ]
 
     def __init__(self,parent,**kargs):
@@ -363,6 +364,13 @@ class Drawable(Attributes):
             GL.glEnableVertexAttribArray(renderer.shader.attribute['vertexTexturePos'])
             GL.glVertexAttribPointer(renderer.shader.attribute['vertexTexturePos'], 2, GL.GL_FLOAT, False, 0, self.tbo)
 
+        if self.sbo:
+            self.sbo.bind()
+            GL.glEnableVertexAttribArray(renderer.shader.attribute['vertexScalar'])
+            GL.glVertexAttribPointer(renderer.shader.attribute['vertexScalar'], 1, GL.GL_FLOAT, False, 0, self.sbo)
+
+        self.bindDisplacement(renderer)
+
         if self.cullface == 'front':
             # Draw back faces
             GL.glEnable(GL.GL_CULL_FACE)
@@ -397,6 +405,10 @@ class Drawable(Attributes):
         if self.tbo:
             self.tbo.unbind()
             GL.glDisableVertexAttribArray(renderer.shader.attribute['vertexTexturePos'])
+        if self.sbo:
+            self.sbo.unbind()
+            GL.glDisableVertexAttribArray(renderer.shader.attribute['vertexScalar'])
+        self.unbindDisplacement(renderer)
         if self.nbo:
             self.nbo.unbind()
             GL.glDisableVertexAttribArray(renderer.shader.attribute['vertexNormal'])
@@ -426,6 +438,8 @@ class Drawable(Attributes):
         if self.ibo:
             self.ibo.bind()
 
+        self.bindDisplacement(renderer)
+
         if self.cullface == 'front':
             # Draw back faces
             GL.glEnable(GL.GL_CULL_FACE)
@@ -445,10 +459,26 @@ class Drawable(Attributes):
 
         if self.ibo:
             self.ibo.unbind()
+        self.unbindDisplacement(renderer)
         self.vbo.unbind()
         GL.glDisableVertexAttribArray(renderer.shader.attribute['vertexCoords'])
 
 
+    def bindDisplacement(self, renderer):
+        """Bind the displacement buffer, if the object has one."""
+        if self.dbo:
+            self.dbo.bind()
+            GL.glEnableVertexAttribArray(renderer.shader.attribute['vertexDisplacement'])
+            GL.glVertexAttribPointer(renderer.shader.attribute['vertexDisplacement'], 3, GL.GL_FLOAT, False, 0, self.dbo)
+
+
+    def unbindDisplacement(self, renderer):
+        """Unbind the displacement buffer, if the object has one."""
+        if self.dbo:
+            self.dbo.unbind()
+            GL.glDisableVertexAttribArray(renderer.shader.attribute['vertexDisplacement'])
+
+
     def __str__(self):
         keys = sorted(set(self.keys()) - set(('_default_dict_',)))
         print("Keys %s" % keys)
@@ -637,6 +667,15 @@ class Actor(BaseActor):
         self.vbo = VBO(self.fcoords)
         #print("GEOM SHAPE %s" % str(self.fcoords.shape))
 
+        # Level of detail proxies
+        self._lodkargs = dict(obj.attrib)
+        self._lodkargs.update(kargs)
+        self._lodkargs.pop('lod', None)
+        self._lod = {}
+        self._lodactors = {}
+        if self.lod:
+            self.buildLOD(self.lod)
+
 
 
     def getType(self):
@@ -780,6 +819,8 @@ class Actor(BaseActor):
         """Modify the actor according to the specified mode"""
         pf.debug("GEOMACTOR.changeMode", pf.DEBUG.DRAW)
         self.drawable = []
+        # The LOD proxies will be recreated in the new mode when needed
+        self._lodactors = {}
         self._prepareNormals(canvas)
         # ndim >= 2
         if (self.eltype is not None and self.eltype.ndim >= 2) or (self.eltype is None and self.object.nplex() >= 3):
@@ -827,6 +868,105 @@ class Actor(BaseActor):
 
 
 
+    def buildLOD(self,levels=None,background=True):
+        """Build decimated proxies of the actor for interactive rendering.
+
+        The proxies are coarse approximations of the actor's geometry,
+        created by vertex clustering (see :meth:`Mesh.cluster`). They are
+        used by the renderer instead of the full resolution actor while
+        the camera is being changed interactively with the mouse.
+        The proxy geometry is computed on the CPU only and is cached in
+        the actor. The drawables of the proxies are only created when they
+        are first rendered.
+
+        Parameters:
+
+        - `levels`: int or list of ints: the targeted mean number of nodes
+          clustered together in each of the proxies. Larger values give
+          coarser proxies. If None or True, the value of the configuration
+          variable 'render/lod_levels' is used.
+        - `background`: bool: if True (default), the proxies are computed
+          in a background thread and the method returns immediately.
+          The actor will be rendered at full resolution until the
+          proxies become available.
+
+        Returns the background thread, or None if `background` is False.
+        """
+        if levels is None or levels is True:
+            levels = pf.cfg['render/lod_levels']
+        if isinstance(levels, int):
+            levels = [levels]
+        levels = sorted(set(levels))
+
+        # Collect the input in the calling thread: the coords and elems
+        # of the actor may be computed lazily and are not thread safe
+        M = Mesh(self.coords, self.elems, eltype=self.eltype)
+        if isinstance(self.object, Mesh) or isinstance(self.object, Formex):
+            M.setProp(self.object.prop)
+
+        def build():
+            for ppb in levels:
+                if ppb not in self._lod:
+                    proxy = M.cluster(ppb=ppb, return_index=True)
+                    if proxy[0].nelems() < M.nelems():
+                        self._lod[ppb] = proxy
+            pf.debug("Built %s LOD proxies for %s" % (len(self._lod), self.name), pf.DEBUG.DRAW)
+
+        if background:
+            t = threading.Thread(target=build, name="LOD_%s" % self.name)
+            t.daemon = True
+            t.start()
+            return t
+        else:
+            build()
+
+
+    def lodActor(self, canvas):
+        """Return the actor to render during interactive camera changes.
+
+        Returns the finest LOD proxy with no more elements than the
+        configuration variable 'render/lod_maxelems', or the coarsest
+        proxy if all of them are larger. If the actor has no proxies
+        (yet), returns the actor itself.
+        """
+        levels = sorted(self._lod)
+        if not levels:
+            return self
+        maxelems = pf.cfg['render/lod_maxelems']
+        ok = [ ppb for ppb in levels if self._lod[ppb][0].nelems() <= maxelems ]
+        if ok:
+            ppb = ok[0]
+        else:
+            ppb = levels[-1]
+        if ppb not in self._lodactors:
+            M, index = self._lod[ppb]
+            kargs = dict(self._lodkargs)
+            kargs.pop('texture', None)
+            for key in [ 'color', 'bkcolor' ]:
+                color = kargs.get(key, None)
+                if isinstance(color, np.ndarray) and color.ndim > 1 and color.shape[0] == self.object.nelems():
+                    kargs[key] = color[index]
+            for key in [ 'visible', 'opak', 'mode', 'alpha', 'bkalpha', 'trl', 'rot', 'trl0' ]:
+                if self[key] is not None:
+                    kargs[key] = self[key]
+            kargs['name'] = self.name+"_lod%s" % ppb
+            A = self._lodProxy(M, index, kargs)
+            A.prepare(canvas)
+            A.changeMode(canvas)
+            self._lodactors[ppb] = A
+        return self._lodactors[ppb]
+
+
+    def _lodProxy(self, M, index, kargs):
+        """Create the actor for an LOD proxy Mesh.
+
+        M is the proxy Mesh, index holds the original element numbers of
+        its elements and kargs are the attributes for the new actor.
+        Subclasses holding extra state should override this.
+        """
+        return Actor(M, **kargs)
+
+
     def fullElems(self):
         """Return an elems index for the full coords set"""
         nelems, nplex = self.fcoords.shape[:2]
@@ -1194,6 +1334,177 @@ opak=True)
 
 
 
+class FieldActor(Actor):
+    """An Actor showing nodal result fields on a deformed Mesh.
+
+    The FieldActor is intended for the (animated) display of finite
+    element results. The base coordinates, a nodal displacement field
+    and a nodal scalar field are uploaded to the GPU only once.
+    The deformation and the coloring are done in the vertex shader.
+    A frame of an animation is set by the displacement scale factor and
+    the value range of the color scale, which are passed to the shader as
+    uniforms: changing them does not create any new buffers.
+    Results from another step or increment are shown by replacing only
+    the displacement or scalar buffer with :meth:`setDisplacement`
+    and :meth:`setValues`.
+
+    Parameters:
+
+    - `obj`: Mesh: the undeformed geometry.
+    - `displ`: float array (ncoords,3): the nodal displacements, or None.
+    - `val`: float array (ncoords,): the nodal scalar values, or None.
+    - `dscale`: float: the displacement scale factor.
+    - `vrange`: (vmin,vmax) or (vmin,vmid,vmax): the values corresponding
+      with the start, middle and end of the color palet. The default
+      is the range of `val`.
+    - `palet`: the name of one of the palets in :mod:`gui.colorscale`,
+      or a list of three colors.
+
+    Other parameters are passed to :class:`Actor`.
+
+    The :meth:`evaluate` method computes the deformed coordinates and
+    colors as the shader does, but with NumPy.
+    Picking is done on the deformed geometry.
+    """
+
+    def __init__(self,obj,displ=None,val=None,dscale=1.,vrange=None,palet='RAINBOW',**kargs):
+        if not isinstance(obj, Mesh):
+            raise ValueError("FieldActor requires a Mesh, got %s" % type(obj))
+        Actor.__init__(self, obj, **kargs)
+        from pyformex.gui.colorscale import ColorScale
+        self.scalarPalette = np.asarray(ColorScale(palet).palet, dtype=float32).ravel()
+        self.setScale(dscale)
+        self.setDisplacement(displ)
+        self.setValues(val, vrange)
+
+
+    def _nodalField(self, data, ncomp):
+        """Check a nodal field and return it as float32 array"""
+        data = np.asarray(data, dtype=float32)
+        shape = (self.coords.shape[0], ncomp) if ncomp > 1 else (self.coords.shape[0],)
+        if data.shape != shape:
+            raise ValueError("Expected a nodal field with shape %s, got %s" % (shape, data.shape))
+        return data
+
+
+    def setScale(self, dscale):
+        """Set the displacement scale factor."""
+        self.displacementScale = float(dscale)
+
+
+    def setRange(self, vrange):
+        """Set the value range of the color scale.
+
+        vrange is a tuple (vmin,vmax) or (vmin,vmid,vmax). The default vmid
+        is the middle of vmin and vmax.
+        """
+        vrange = [ float(v) for v in vrange ]
+        if len(vrange) == 2:
+            vrange.insert(1, 0.5*(vrange[0]+vrange[1]))
+        self.scalarRange = np.array(vrange, dtype=float32)
+
+
+    def setDisplacement(self, displ):
+        """Set or replace the nodal displacement field.
+
+        Only the displacement buffer is replaced. If displ is None, the
+        undeformed geometry is shown.
+        """
+        if displ is None:
+            self._displ = None
+            self.dbo = None
+            self.useDisplacement = 0
+        else:
+            self._displ = self._nodalField(displ, 3)
+            self.dbo = VBO(self._displ[self.elems])
+            self.useDisplacement = 1
+        self._lodactors = {}
+
+
+    def setValues(self, val, vrange=None):
+        """Set or replace the nodal scalar field.
+
+        Only the scalar buffer is replaced. If no vrange is given, the
+        current value range is kept, or if there is none, it is set to the
+        range of val. If val is None, the Actor's color is used.
+        """
+        if val is None:
+            self._val = None
+            self.sbo = None
+            self.useScalarColor = 0
+        else:
+            self._val = self._nodalField(val, 1)
+            self.sbo = VBO(self._val[self.elems])
+            self.useScalarColor = 1
+            if vrange is None and self.scalarRange is None:
+                vrange = (self._val.min(), self._val.max())
+        self._lodactors = {}
+        if vrange is not None:
+            self.setRange(vrange)
+
+
+    def _lodProxy(self, M, index, kargs):
+        """Create a FieldActor for an LOD proxy Mesh.
+
+        The nodal fields are transferred to the proxy nodes by averaging
+        the values of the original nodes of the retained elements.
+        """
+        def transfer(data):
+            if data is None:
+                return None
+            elems = M.elems.ravel()
+            data = data[self.elems[index]].reshape(len(elems), -1)
+            count = np.maximum(np.bincount(elems, minlength=M.ncoords()), 1)
+            res = np.column_stack([ np.bincount(elems, weights=d, minlength=M.ncoords()) for d in data.T ]) / count[:, np.newaxis]
+            return res if res.shape[1] > 1 else res[:, 0]
+
+        A = FieldActor(M, displ=transfer(self._displ), val=transfer(self._val), dscale=self.displacementScale, vrange=self.scalarRange, **kargs)
+        A.scalarPalette = self.scalarPalette
+        return A
+
+
+    def lodActor(self, canvas):
+        """Return the actor to render during interactive camera changes.
+
+        This is like :meth:`Actor.lodActor`, but the proxy follows the
+        current displacement scale and value range of the actor.
+        """
+        A = Actor.lodActor(self, canvas)
+        if A is not self:
+            A.setScale(self.displacementScale)
+            if self.scalarRange is not None:
+                A.setRange(self.scalarRange)
+        return A
+
+
+    def evaluate(self, dscale=None):
+        """Compute the deformed coordinates and the colors.
+
+        This does with NumPy what the shader does on the GPU.
+
+        Returns a tuple (coords,colors) with the deformed nodal coordinates
+        (ncoords,3) for the scale factor dscale (default is the current
+        scale) and the nodal colors (ncoords,3), or None if there
+        is no scalar field.
+        """
+        from pyformex.plugins.postproc import deformedCoords, scalarColors
+        if dscale is None:
+            dscale = self.displacementScale
+        coords = self.coords
+        if self._displ is not None:
+            coords = deformedCoords(coords, self._displ, dscale)
+        colors = None
+        if self._val is not None:
+            colors = scalarColors(self._val, self.scalarRange, self.scalarPalette)
+        return coords, colors
+
+
+    def bbox(self):
+        """Return the bbox of the deformed geometry"""
+        from pyformex.coords import Coords
+        return Coords(self.evaluate()[0]).bbox()
+
+
 # for compatibility
 GeomActor = Actor
 
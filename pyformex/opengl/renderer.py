@@ -105,6 +105,8 @@ class Renderer(object):
         self.shader.uniformFloat('lighting', self.canvas.settings.lighting)
         self.shader.uniformInt('useObjectColor', 1)
         self.shader.uniformInt('rgbamode', 0)
+        self.shader.uniformInt('useDisplacement', 0)
+        self.shader.uniformInt('useScalarColor', 0)
         self.shader.uniformVec3('objectColor', self.canvas.settings.fgcolor)
         self.shader.uniformVec3('objectBkColor', self.canvas.settings.fgcolor)
         self.shader.uniformFloat('pointsize', self.canvas.settings.pointsize)
@@ -179,6 +181,10 @@ class Renderer(object):
         actors = back(actors) + front(actors)
         actors =  [ o for o in actors if o.visible is not False ]
 
+        # use the LOD proxies during interactive camera changes
+        if self.canvas.interacting and not pick:
+            actors = [ a.lodActor(self.canvas) if hasattr(a, 'lodActor') else a for a in actors ]
+
         GL.glEnable(GL.GL_DEPTH_TEST)
         GL.glDepthMask (GL.GL_TRUE)
 
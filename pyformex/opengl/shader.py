@@ -110,6 +110,7 @@ class Shader(object):
     'vertexTexturePos',
     'vertexScalar',
     'vertexOffset',
+    'vertexDisplacement',
     ]
 
     # int and bool uniforms
@@ -124,6 +125,8 @@ class Shader(object):
         'drawface',
         'lighting',
         'nlights',
+        'useDisplacement',
+        'useScalarColor',
         ]
 
     uniforms_float = [
@@ -134,6 +137,7 @@ class Shader(object):
         'shininess',
         'alpha',
         'bkalpha',
+        'displacementScale',
         ]
 
     uniforms_vec3 = [
@@ -143,7 +147,9 @@ class Shader(object):
         'diffcolor',
         'speccolor',
         'lightdir',
-        'offset3'
+        'offset3',
+        'scalarRange',
+        'scalarPalette',
     ]
 
     uniforms = uniforms_int + uniforms_float +  uniforms_vec3 + [
@@ -30,7 +30,6 @@ from __future__ import absolute_import, division, print_function
 
 import pyformex as pf
 from pyformex import utils
-from pyformex import freetype as ft
 from pyformex import arraytools as at
 from pyformex.coords import Coords
 from pyformex.formex import Formex
@@ -41,6 +40,9 @@ from OpenGL import GL
 
 import numpy as np
 
+# freetype is only loaded when a FontTexture is created
+ft = utils.lazyImport('pyformex.freetype')
+
 
 class FontTexture(Texture):
     """A Texture class for text rendering.
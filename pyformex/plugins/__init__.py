@@ -28,6 +28,7 @@ plugin menus.
 """
 from __future__ import absolute_import, division, print_function
 
+import sys
 from types import ModuleType
 
 import pyformex as pf
@@ -90,6 +91,26 @@ def find_plugin_menus():
 
 plugin_menus = find_plugin_menus()
 
+# The titles of the plugin menus. This allows to put the menus in the
+# menu bar without importing the plugin modules (see loadConfiguredPlugins).
+plugin_titles = {
+    'geometry_menu': 'Geometry',
+    'formex_menu': 'Formex',
+    'surface_menu': 'Surface',
+    'tools_menu': 'Tools',
+    'draw2d_menu': 'Draw',
+    'nurbs_menu': 'Nurbs',
+    'dxf_menu': 'Dxf',
+    'bifmesh_menu': 'BifMesh',
+    'jobs_menu': 'Jobs',
+    'postproc_menu': 'Postproc',
+    }
+
+
+def isLoaded(plugin):
+    """Check whether the named plugin has been imported"""
+    return 'pyformex.plugins.'+plugin in sys.modules
+
 
 def pluginMenus():
     """Return a list of plugin name and description.
@@ -112,20 +133,46 @@ def create_plugin_menu(parent=None,before=None):
     return loadactions
 
 
+def lazyLoad(plugin):
+    """Show the menu of the named plugin without loading the plugin.
+
+    A placeholder menu with the title of the plugin menu is put in the
+    menu bar. The plugin is only loaded when that menu is opened.
+    """
+    from pyformex.gui import menu
+    title = plugin_titles[plugin]
+    if pf.GUI.menu.item(title) is None:
+        menu.LazyMenu(title, loader=lambda: load(plugin), parent=pf.GUI.menu, before='help')
+
+
 def loadConfiguredPlugins(ok_plugins=None):
+    """Show the configured plugin menus and close the others.
+
+    If the setting 'gui/lazyplugins' is True (default), the plugin modules
+    that have not been loaded yet are only loaded when their menu is
+    first opened.
+    """
     if ok_plugins is None:
         ok_plugins = pf.cfg['gui/plugins']
         pf.debug("Configured plugins: %s" % ok_plugins,pf.DEBUG.PLUGIN)
+    lazy = pf.cfg.get('gui/lazyplugins', True)
     for p in plugin_menus:
         pf.debug("Plugin menu: %s" % p,pf.DEBUG.PLUGIN)
         if p in ok_plugins:
-            pf.debug("  Loading plugin menu: %s" % p,pf.DEBUG.PLUGIN)
-            load(p)
+            if lazy and not isLoaded(p) and p in plugin_titles:
+                pf.debug("  Showing lazy plugin menu: %s" % p,pf.DEBUG.PLUGIN)
+                lazyLoad(p)
+            else:
+                pf.debug("  Loading plugin menu: %s" % p,pf.DEBUG.PLUGIN)
+                load(p)
         else:
             pf.debug("  Closing plugin menu: %s" % p,pf.DEBUG.PLUGIN)
             module = globals().get(p, None)
             if hasattr(module, 'close_menu'):
                 module.close_menu()
+            elif p in plugin_titles:
+                # Remove the placeholder of a lazy plugin menu
+                pf.GUI.menu.removeItem(plugin_titles[p])
 
 
 #################### EXPERIMENTAL STUFF BELOW !! ################
@@ -27,6 +27,10 @@
 
 Determine the (inner) voronoi diagram of a triangulated surface.
 Determine approximation for the centerline.
+
+The functions :func:`voronoi`, :func:`voronoiInner` and :func:`centerline`
+use the external program tetgen. The :func:`skeleton` function does the
+whole computation in process and requires SciPy.
 """
 from __future__ import absolute_import, division, print_function
 
@@ -38,8 +42,6 @@ from pyformex.trisurface import TriSurface
 from pyformex import utils
 from pyformex import coords
 from pyformex import connectivity
-from pyformex.plugins import tetgen
-from pyformex.arraytools import det4
 
 
 def encode2(i, j, n):
@@ -56,26 +58,21 @@ def circumcenter(nodes, elems):
 
     For a description of the method: http://mathworld.wolfram.com/Circumsphere.html
     The output are the circumcenters and the corresponding radii.
+    The computation is done relative to the first node of each tetrahedron,
+    which avoids the loss of precision for models far from the origin.
+    Degenerate (flat) tetrahedrons get an infinite radius.
     """
-    kwadSum = (nodes*nodes).sum(axis=-1)
-    one = zeros(nodes.shape[0])+1
-    nodesOne = append(nodes, one.reshape(-1, 1), 1)
-    nodesKwadOne = append(kwadSum.reshape(-1, 1), nodesOne, 1)
-    #construct necessary 4 by 4 arrays
-    Wx = nodesKwadOne[:, [0, 2, 3, 4]]
-    Wy = nodesKwadOne[:, [0, 1, 3, 4]]
-    Wz = nodesKwadOne[:, [0, 1, 2, 4]]
-    #calculate derminants of the 4 by 4 arrays
-    Dx = det4(Wx[elems])
-    Dy = -det4(Wy[elems])
-    Dz = det4(Wz[elems])
-    alfa = det4(nodesOne[elems[:]])
-    #circumcenters
-    centers = column_stack([Dx[:]/(2*alfa[:]), Dy[:]/(2*alfa[:]), Dz[:]/(2*alfa[:])])
-    #calculate radii of the circumscribed spheres
-    vec = centers[:]-nodes[elems[:, 0]]
+    x = asarray(nodes, dtype=float64)[elems]
+    x0 = x[:, 0]
+    a, b, c = [x[:, i]-x0 for i in [1, 2, 3]]
+    bc, ca, ab = cross(b, c), cross(c, a), cross(a, b)
+    d = 2.*(a*bc).sum(axis=-1)
+    num = (a*a).sum(axis=-1)[:, newaxis]*bc + (b*b).sum(axis=-1)[:, newaxis]*ca + (c*c).sum(axis=-1)[:, newaxis]*ab
+    with errstate(divide='ignore', invalid='ignore'):
+        vec = num / d[:, newaxis]
     radii = sqrt((vec*vec).sum(axis=-1))
-    return centers, radii
+    radii[~isfinite(radii)] = inf
+    return x0+vec, radii
 
 ## Voronoi: vor diagram is determined using Tetgen. Some of the vor nodes may fall outside the surface. This should be avoided as this may compromise the centerline determination. Therefore, we created a second definition to determine the inner voronoi diagram (voronoiInner).
 
@@ -86,6 +83,7 @@ def voronoi(fn):
     The voronoi diagram is determined by Tetgen.
     The output are the voronoi nodes and the corresponding radii of the voronoi spheres.
     """
+    from pyformex.plugins import tetgen
     S = TriSurface.read(fn)
     fn, ftype = os.path.splitext(fn)
     ftype = ftype.strip('.').lower()
@@ -109,6 +107,7 @@ def voronoiInner(fn):
     fn is the file name of a surface, including the extension (.off, .stl, .gts, .neu or .smesh)
     The output are the voronoi nodes and the corresponding radii of the voronoi spheres.
     """
+    from pyformex.plugins import tetgen
     S = TriSurface.read(fn)
     fn, ftype = os.path.splitext(fn)
     ftype = ftype.strip('.').lower()
@@ -138,6 +137,151 @@ def voronoiInner(fn):
     return nodesVorInner, radii
 
 
+def innerVoronoi(S,poles=True):
+    """Determine the inner voronoi diagram of a closed triangulated surface.
+
+    This is an in-process alternative for :func:`voronoiInner`, using the
+    Delaunay triangulation of the surface vertices (see
+    :func:`scipy_itf.delaunay`) instead of the external tetgen program.
+
+    Parameters:
+
+    - `S`: a closed :class:`TriSurface` with outward normals and fused
+      nodes, or the file name of such a surface.
+    - `poles`: bool. If True (default), only the inner poles are returned:
+      for each surface vertex the largest inner voronoi sphere passing
+      through it. This is a much smaller set of voronoi nodes which
+      still fully describes the medial axis. If False, all the inner
+      voronoi nodes are returned.
+
+    A voronoi node (the circumcenter of a Delaunay tetrahedron) is
+    considered inside the surface if it is at the inner side of the
+    average normals at all four vertices of the tetrahedron, and if a
+    ray cast from it first hits the surface from the inside (see
+    :func:`insidePoints`). Nearly flat tetrahedrons, whose circumcenter
+    can not be computed accurately, are skipped.
+
+    Returns a tuple (nodesVor,radii) with the voronoi nodes and the
+    corresponding radii of the voronoi spheres.
+    """
+    from pyformex.plugins import scipy_itf
+    if not isinstance(S, TriSurface):
+        S = TriSurface.read(S)
+    S = S.compact()
+    nodes = S.coords.astype(float64)
+    elems = scipy_itf.delaunay(nodes)
+    centers, radii = circumcenter(nodes, elems)
+    # skip degenerate tetrahedrons and spheres larger than the model
+    w = where(radii < S.dsize())[0]
+    # skip flat tetrahedrons: their sphere does not pass through
+    # all the vertices
+    d = sqrt(((nodes[elems[w]] - centers[w, newaxis])**2).sum(axis=-1))
+    w = w[(abs(d - radii[w, newaxis]) <= 1.e-6*radii[w, newaxis]).all(axis=1)]
+    # sum of the normals of the triangles at each vertex
+    NT = S.areaNormals()[1].astype(float64)
+    NP = column_stack([ bincount(S.elems.ravel(), weights=NT[:, i].repeat(3), minlength=len(nodes)) for i in range(3) ])
+    ie = ((nodes[elems[w]] - centers[w, newaxis])*NP[elems[w]]).sum(axis=-1) >= 0.
+    w = w[ie.all(axis=1)]
+    if poles:
+        # the largest sphere at each vertex
+        v = elems[w].ravel()
+        t = w.repeat(4)
+        srt = lexsort([radii[t], v])
+        v, t = v[srt], t[srt]
+        last = append(v[1:] != v[:-1], True)
+        w = unique(t[last])
+    w = w[insidePoints(S, centers[w])]
+    return centers[w], radii[w]
+
+
+def insidePoints(S, X):
+    """Test which points are inside a closed surface.
+
+    A ray is cast from each point (see :meth:`TriSurface.castRays`). The
+    point is inside if the first triangle hit by the ray is seen from
+    its inner side.
+
+    Parameters:
+
+    - `S`: a closed :class:`TriSurface` with outward normals.
+    - `X`: (npts,3) float array: the points.
+
+    Returns a bool array (npts,) that is True for the points inside.
+    """
+    X = asarray(X, dtype=float64).reshape(-1, 3)
+    # avoid a direction along the axes
+    m = resize([0.5345, 0.6172, 0.5774], X.shape)
+    ray, elem, t, bc = S.castRays(X, m, first=True)
+    inside = zeros(len(X), dtype=bool)
+    inside[ray] = (S.areaNormals()[1][elem] * m[ray]).sum(axis=-1) > 0.
+    return inside
+
+
+def selectMaxSpheres(nodes,radii,r1=1.,r2=2.,q=0.7,maxruns=-1):
+    """Select the local maxima of a set of spheres.
+
+    This is the sphere selection procedure of :func:`selectMaxVor`,
+    using a spatial index. The spheres are handled in order of decreasing
+    radius, skipping the ones that have been removed. The removal regions
+    are cubes, which are found as balls of the maximum norm in a
+    kd-tree of the sphere centers.
+
+    Parameters:
+
+    - `nodes`: (n,3) float array: the centers of the spheres.
+    - `radii`: (n,) float array: the radii of the spheres.
+    - `r1`, `r2`, `q`, `maxruns`: see :func:`selectMaxVor`.
+
+    Returns an int array with the indices of the selected spheres, in
+    order of selection (decreasing radius).
+    """
+    from scipy.spatial import cKDTree
+    nodes = asarray(nodes, dtype=float64).reshape(-1, 3)
+    radii = asarray(radii, dtype=float64).reshape(-1)
+    tree = cKDTree(nodes)
+    alive = ones(len(radii), dtype=bool)
+    selected = []
+    for i in argsort(-radii, kind='mergesort'):
+        if not alive[i]:
+            continue
+        if maxruns >= 0 and len(selected) >= maxruns:
+            break
+        R = radii[i]
+        selected.append(i)
+        alive[tree.query_ball_point(nodes[i], r1*R, p=inf)] = False
+        near = asarray(tree.query_ball_point(nodes[i], r2*R, p=inf), dtype=int)
+        alive[near[radii[near] < q*R]] = False
+    return asarray(selected, dtype=int)
+
+
+def connectSpheres(nodes, radii):
+    """Find the pairs of overlapping spheres.
+
+    Two spheres overlap if the distance between their centers is smaller
+    than the sum of their radii. The candidate pairs are found with radius
+    queries in a kd-tree of the sphere centers.
+
+    Returns an (npairs,2) int array with the indices of the overlapping
+    spheres, with the smallest index first, sorted.
+    """
+    from scipy.spatial import cKDTree
+    nodes = asarray(nodes, dtype=float64).reshape(-1, 3)
+    radii = asarray(radii, dtype=float64).reshape(-1)
+    if len(radii) < 2:
+        return zeros((0, 2), dtype=int)
+    tree = cKDTree(nodes)
+    nb = tree.query_ball_point(nodes, radii+radii.max())
+    cnt = array([len(j) for j in nb])
+    i = arange(len(nb)).repeat(cnt)
+    j = concatenate([asarray(k, dtype=int) for k in nb])
+    ok = i < j
+    i, j = i[ok], j[ok]
+    d = sqrt(((nodes[i]-nodes[j])**2).sum(axis=-1))
+    ok = d < radii[i]+radii[j]
+    pairs = column_stack([i[ok], j[ok]])
+    return removeDoubles(pairs).reshape(-1, 2)
+
+
 def selectMaxVor(nodesVor,radii,r1=1.,r2=2.,q=0.7,maxruns=-1):
     """Select the local maxima of the voronoi spheres.
 
@@ -154,33 +298,8 @@ def selectMaxVor(nodesVor,radii,r1=1.,r2=2.,q=0.7,maxruns=-1):
         b) the edge length which is 2*r2*R.
     4) These three operations are repeated until all nodes are deleted.
     """
-    nodesCent = array([])
-    radCent = array([])
-    run = 0
-    while nodesVor.shape[0] and (maxruns < 0 or run < maxruns):
-        #find maximum voronoi sphere in the record
-        w = where(radii[:] == radii[:].max())[0]
-        maxR = radii[w].reshape(-1)
-        maxP = nodesVor[w].reshape(-1)
-        #remove all the nodes within the first cube
-        t1 =  (nodesVor[:] > (maxP-r1*maxR)).all(axis=1)
-        t2 =  (nodesVor[:] < (maxP+r1*maxR)).all(axis=1)
-        ttot1 = t1*t2
-        radii = radii[-ttot1]
-        nodesVor = nodesVor[-ttot1]
-        #remove some of the nodes within the second cube
-        t3 =  (nodesVor[:] > (maxP-r2*maxR)).all(axis=1)
-        t4 =  (nodesVor[:] < (maxP+r2*maxR)).all(axis=1)
-        t5 = (radii<maxR*q)
-        ttot2 = t3*t4*t5
-        if ttot2.shape[0]:
-            radii = radii[-ttot2]
-            nodesVor = nodesVor[-ttot2]
-        #add local maximum to a list
-        nodesCent = append(nodesCent, maxP)
-        radCent = append(radCent, maxR)
-        run += 1
-    return nodesCent.reshape(-1, 1, 3), radCent
+    w = selectMaxSpheres(nodesVor, radii, r1, r2, q, maxruns)
+    return nodesVor.reshape(-1, 3)[w].reshape(-1, 1, 3), radii.reshape(-1)[w]
 
 
 def removeDoubles(elems):
@@ -207,24 +326,7 @@ def connectVorNodes(nodes, radii):
     is smaller than the sum of their corresponding radii.
     The output is an array containing the connectivity information.
     """
-    connections = array([]).astype(int)
-    v = 4
-    for i in range(nodes.shape[0]):
-        t1 =  (nodes[:] > (nodes[i]-v*radii[i])).all(axis=2)
-        t2 =  (nodes[:] < (nodes[i]+v*radii[i])).all(axis=2)
-        t = t1*t2
-        t[i] = False
-        w1 = where(t == 1)[0]
-        c = coords.Coords(nodes[w1])
-        d =c.distanceFromPoint(nodes[i]).reshape(-1)
-        w2 = d < radii[w1] + radii[i]
-        w = w1[w2]
-        for j in w:
-            connections = append(connections, i)
-            connections = append(connections, j)
-    connections = connections.reshape(-1, 2)
-    connections = removeDoubles(connections)
-    return connections.reshape(-1, 2)
+    return connectSpheres(nodes, radii)
 
 
 def removeTriangles(elems):
@@ -264,4 +366,42 @@ def centerline(fn):
     elemsC = removeTriangles(elemsC)
     return nodesC, elemsC, radii
 
+
+def skeleton(S,r1=1.,r2=2.,q=0.7,poles=True):
+    """Compute a skeleton of a closed triangulated surface.
+
+    This is an in-process version of :func:`centerline`: the inner voronoi
+    nodes are computed with :func:`innerVoronoi`, the maximal spheres are
+    selected with :func:`selectMaxSpheres` and connected with
+    :func:`connectSpheres`. Finally the triangles are removed from the
+    connection graph.
+
+    Parameters:
+
+    - `S`: a closed :class:`TriSurface` with outward normals, or the file
+      name of such a surface.
+    - `r1`, `r2`, `q`: parameters of the sphere selection, see
+      :func:`selectMaxVor`.
+    - `poles`: bool: passed to :func:`innerVoronoi`.
+
+    Returns a Mesh of type 'line2' with the centers of the selected spheres
+    as nodes. The radii of the spheres are stored in the Mesh as a nodal
+    :class:`Field` with name 'radius'.
+
+    For large surfaces, the computing time is dominated by the Delaunay
+    triangulation of the vertices: for a surface with 1e5 vertices,
+    skeleton takes about 25 seconds, of which 17 seconds are spent in the
+    Delaunay triangulation.
+    """
+    from pyformex.mesh import Mesh
+    nodes, radii = innerVoronoi(S, poles)
+    w = selectMaxSpheres(nodes, radii, r1, r2, q)
+    nodes, radii = nodes[w], radii[w]
+    elems = connectSpheres(nodes, radii)
+    if len(elems) > 0:
+        elems = removeTriangles(elems)
+    M = Mesh(nodes, elems, eltype='line2')
+    M.addField('node', radii.astype(coords.Float), 'radius')
+    return M
+
 # End
@@ -133,8 +133,74 @@ class Curve(Geometry):
         """
         raise NotImplementedError
 
+    def sub_derivs_2(self, t, j):
+        """Return the first derivatives at values,parts given by zip(t,j)
+
+        t and j can both be arrays, but should have the same length.
+        The default implementation uses central differences of the points.
+        """
+        t = asarray(t, dtype=float64)
+        j = asarray(j)
+        h = 1.e-3
+        tp = minimum(t+h, 1.)
+        tm = maximum(t-h, 0.)
+        X = self.pointsAt(concatenate([j+tp, j+tm]))
+        n = len(t)
+        return (X[:n] - X[n:]) / (tp-tm).reshape(-1, 1)
+
+
+    def derivsAt(self, t):
+        """Return the first derivatives at parameter values t.
+
+        Parameter values are floating point values. Their integer part
+        is interpreted as the curve segment number, and the decimal part
+        goes from 0 to 1 over the segment.
+        """
+        i, t = self.localParam(t)
+        return self.sub_derivs_2(t, i)
+
+
+    def arcLength(self):
+        """Return the arc length table of the curve.
+
+        Returns an :class:`ArcLength` object for the curve. The table is
+        computed on first use and kept with the curve, until its
+        coordinates are replaced.
+        """
+        table = getattr(self, '_arclength', None)
+        if table is None or table[0] is not self.coords:
+            A = ArcLength(self.derivsAt, arange(self.nparts+1))
+            self._arclength = table = (self.coords, A)
+        return table[1]
+
+
     def lengths(self):
-        raise NotImplementedError
+        """Return the length of the parts of the curve.
+
+        The lengths are computed with Gauss-Legendre quadrature from the
+        derivatives of the curve (see :class:`ArcLength`).
+        """
+        return self.arcLength().lengths()
+
+
+    def atLength(self, div):
+        """Returns the parameter values at given relative curve length.
+
+        ``div`` is a list of relative curve lengths (from 0.0 to 1.0).
+        As a convenience, a single integer value may be specified,
+        in which case the relative curve lengths are found by dividing
+        the interval [0.0,1.0] in the specified number of subintervals.
+
+        The function returns an array with the parameter values for the
+        points at the specified relative lengths. The values are found
+        by Newton iterations on the arc length (see :class:`ArcLength`).
+        """
+        if isInt(div):
+            div = arange(div+1) / float(div)
+        else:
+            div = asarray(div, dtype=float64)
+        A = self.arcLength()
+        return A.inverse(div * A.length())
 
 
     def charLength(self):
@@ -155,7 +221,9 @@ class Curve(Geometry):
         numbers and t the local parameter values (between 0 and 1).
         """
         # Do not use asarray here! We change it, so need a copy!
-        t = array(t).astype(Float).ravel()
+        # Use double precision to keep the local parameters accurate
+        # on curves with many parts
+        t = array(t).astype(float64).ravel()
         ti = floor(t).clip(min=0, max=self.nparts-1)
         t -= ti
         i = ti.astype(int)
@@ -299,9 +367,9 @@ class Curve(Geometry):
           over the curve. If False (default), the points are spread
           equally over the parameter space.
         - `npre`: integer: only used when `equidistant` is True:
-          number of segments per part of the curve used in the
-          pre-approximation. This pre-approximation is currently
-          required to compute curve lengths.
+          number of segments per part of the curve used in a
+          pre-approximation to compute the curve lengths. If not specified,
+          the lengths are computed accurately with :meth:`atLength`.
 
         """
         if ndiv is not None:
@@ -311,9 +379,10 @@ class Curve(Geometry):
             equidistant = False
         if equidistant:
             if npre is None:
-                npre = 100
-            S = self.approx(ndiv=npre)
-            at = S.atLength(nseg) / npre
+                at = self.atLength(nseg)
+            else:
+                S = self.approx(ndiv=npre)
+                at = S.atLength(nseg) / npre
 
         elif ndiv is not None:
             at = concatenate([[ 0. ]] + [ i + unitDivisor(n,1) for i,n in enumerate(ndiv) ])
@@ -353,36 +422,24 @@ class Curve(Geometry):
             else:
                 ndiv = 1
             at = self.atApproximate(nseg=ndiv*self.nparts)
-        charlen = self.approxAt(at).charLength()
-
-        # Split in handled and to-be-handled
-        at,bt = list(at[:1]),list(at[1:])
-
-        # Handle segment by segment
-        #
-        # THIS SHOULD BE CHANGED:
-        #    insert NO points of degree 1 (always correct)
-        #    insert 1 point at 1/2 for degree 2  (current implementation)
-        #    insert 2 points at 1/3 and 2/3 for degree 3
-        #    etc...
-        #
-        while len(bt) > 0:
-            c0,c2 = at[-1],bt[0]
-            if c2 > c0:
-                c1 = 0.5*(c0+c2)
-                X = self.pointsAt([c0,c1,c2])
-                XM = 0.5*(X[0]+X[2])
-                d = length(X[1]-XM) / charlen
-
-                if d >= chordal:
-                    # need refinement: put new point in front of todo list
-                    bt = [c1] + bt
-                    continue
-
-            # move on
-            at.append(bt.pop(0))
+        at = asarray(at, dtype=float64)
+        X = self.pointsAt(at)
+        charlen = PolyLine(X, closed=self.closed).charLength()
+
+        # Refine all the segments with a too large chordal error at once,
+        # by inserting their midpoint, until no more refinement is needed
+        while True:
+            c0, c2 = at[:-1], at[1:]
+            c1 = 0.5*(c0+c2)
+            XM = self.pointsAt(c1)
+            d = length(XM - 0.5*(X[:-1]+X[1:])) / charlen
+            bad = where((c2 > c0) & (d >= chordal))[0]
+            if len(bad) == 0:
+                break
+            at = insert(at, bad+1, c1[bad])
+            X = Coords(insert(X, bad+1, XM[bad], axis=0))
 
-        return at
+        return at.tolist()
 
 
     def approxAt(self,at):
@@ -429,9 +486,8 @@ class Curve(Geometry):
           `nseg` is not None and `equidistant` is True: the number of segments
           per part of the curve (like `ndiv`) used in a pre-approximation.
           If not specified, it is set to the degree of the curve for the
-          `chordal` method (1 for PolyLine), and to 100 in the `equidistant`
-          method (where the pre-approximation is currently used to compute
-          accurate curve lengths).
+          `chordal` method (1 for PolyLine), and no pre-approximation is
+          used in the `equidistant` method.
 
         """
         if nseg or ndiv or equidistant:
@@ -736,7 +792,7 @@ class PolyLine(Curve):
 
     def sub_points_2(self, t, j):
         """Return the points at value,part pairs (t,j)"""
-        j = int(j)
+        j = asarray(j).astype(Int)
         t = asarray(t).reshape(-1, 1)
         n = self.coords.shape[0]
         X0 = self.coords[j % n]
@@ -1634,6 +1690,30 @@ class BezierSpline(Curve):
         return X
 
 
+    def _sub_2(self, t, j, deriv=0):
+        """Return the points or first derivatives at value,part pairs (t,j)"""
+        t = asarray(t, dtype=float64).ravel()
+        j = asarray(j).astype(Int).ravel()
+        d = arange(self.degree+1)
+        P = self.coords[self.degree * j.reshape(-1, 1) + d]
+        if deriv:
+            U = d * t.reshape(-1, 1)**maximum(d-1, 0)
+        else:
+            U = t.reshape(-1, 1)**d
+        B = dot(U, asarray(self.coeffs))
+        return (B[:, :, newaxis] * P).sum(axis=1)
+
+
+    def sub_points_2(self, t, j):
+        """Return the points at value,part pairs (t,j)"""
+        return self._sub_2(t, j)
+
+
+    def sub_derivs_2(self, t, j):
+        """Return the first derivatives at value,part pairs (t,j)"""
+        return self._sub_2(t, j, deriv=1)
+
+
     def sub_directions(self, t, j):
         """Return the unit direction vectors at values t in part j."""
         P = self.part(j)
@@ -1670,20 +1750,6 @@ class BezierSpline(Curve):
         return length(T)
 
 
-    def lengths(self):
-        """Return the length of the parts of the curve."""
-        try:
-            from scipy.integrate import quad
-        except:
-            pf.warning("""..
-
-**The **lengths** function is not available.
-Most likely because 'python-scipy' is not installed on your system.""")
-            return
-        L = [ quad(self.length_intgrnd, 0., 1., args=(j,))[0] for j in range(self.nparts) ]
-        return array(L)
-
-
     def parts(self, j, k):
         """Return a curve containing only parts j to k (k not included).
 
@@ -1692,7 +1758,7 @@ Most likely because 'python-scipy' is not installed on your system.""")
         return BezierSpline(control=self.part(j,k), degree=self.degree, closed=False)
 
 
-    def atLength(self, l, approx=20):
+    def atLength(self, l, approx=None):
         """Returns the parameter values at given relative curve length.
 
         Parameters:
@@ -1702,20 +1768,22 @@ Most likely because 'python-scipy' is not installed on your system.""")
           in which case the relative curve lengths are found by dividing
           the interval [0.0,1.0] in the specified number of subintervals.
 
-        - `approx`: int or None. If not None, an approximate result is
+        - `approx`: int or None. If None (default), the parameter values
+          are computed accurately from the arc length (see
+          :meth:`Curve.atLength`). Else, an approximate result is
           returned obtained by approximating the curve first by a
           PolyLine with `approx` number of line segments per curve segment.
-          This is currently the only implemented method, and specifying
-          None will fail.
 
         The function returns a list with the parameter values for the points
         at the specified relative lengths.
         """
-        if isInt(approx) and approx > 0:
+        if approx is None:
+            return Curve.atLength(self, l)
+        elif isInt(approx) and approx > 0:
             P = self.approx(ndiv=approx)
             return P.atLength(l) / approx
         else:
-            raise ValueError("approx should be int and > 0")
+            raise ValueError("approx should be None or int and > 0")
 
 
 
@@ -2344,6 +2412,145 @@ class Spiral(Curve):
 ##############################################################################
 # Other functions
 
+_gauss_legendre = {}
+
+def gaussLegendre(n):
+    """Return the Gauss-Legendre quadrature rule of order n on [0,1].
+
+    Returns a tuple (x,w) of arrays with the n abscissas and weights.
+    The computed rules are stored in the module for reuse.
+
+    >>> x,w = gaussLegendre(2)
+    >>> print(x, w)
+    [ 0.21132487  0.78867513] [ 0.5  0.5]
+    """
+    if n not in _gauss_legendre:
+        from numpy.polynomial.legendre import leggauss
+        x, w = leggauss(n)
+        _gauss_legendre[n] = (0.5*(x+1.), 0.5*w)
+    return _gauss_legendre[n]
+
+
+class ArcLength(object):
+    """Arc length table of a parametric curve.
+
+    The ArcLength allows to compute the length along a curve and
+    to find the parameter values at given lengths.
+
+    Parameters:
+
+    - `deriv`: function returning the first derivatives of the curve
+      at an array of parameter values.
+    - `breaks`: increasing float array: the parameter values where the
+      curve may be non-smooth. For a :class:`Curve` these are the part
+      boundaries 0, 1, ..., nparts.
+    - `nsub`: int: each interval between breaks is divided in `nsub`
+      subintervals. The cumulative lengths at the ends of the
+      subintervals are stored in a table.
+    - `ngauss`: int: the order of the Gauss-Legendre quadrature used on
+      each subinterval.
+
+    The lengths of all subintervals are computed at once.
+    Lengths at other parameter values are found from the table and
+    a quadrature over the remaining part of a subinterval. The parameter
+    value at a given length is found with Newton iterations, starting
+    from a linear interpolation in the table.
+
+    >>> A = ArcLength(lambda t: column_stack([ones_like(t), 2*t]), [0.,1.])
+    >>> print(round(A.length(), 6))
+    1.478943
+    >>> print(A.inverse([0., A.length([0.5])[0]]))
+    [ 0.   0.5]
+    """
+
+    def __init__(self,deriv,breaks,nsub=4,ngauss=8):
+        self.deriv = deriv
+        self.ngauss = ngauss
+        breaks = asarray(breaks, dtype=float64)
+        sub = arange(nsub) / float(nsub)
+        t = breaks[:-1].reshape(-1, 1) + diff(breaks).reshape(-1, 1) * sub
+        self.t = append(t.ravel(), breaks[-1])
+        self.s = concatenate([[0.], self.integrate(self.t[:-1], self.t[1:]).cumsum()])
+        self.nsub = nsub
+
+
+    def integrate(self, t0, t1):
+        """Return the lengths of the curve between parameters t0 and t1.
+
+        t0 and t1 are arrays of the same length. The lengths are computed
+        with Gauss-Legendre quadrature over all intervals at once.
+        """
+        t0 = asarray(t0, dtype=float64).reshape(-1, 1)
+        h = asarray(t1, dtype=float64).reshape(-1, 1) - t0
+        x, w = gaussLegendre(self.ngauss)
+        t = (t0 + h * x).ravel()
+        v = length(self.deriv(t)).reshape(-1, self.ngauss)
+        return h.ravel() * dot(v, w)
+
+
+    def length(self, t=None):
+        """Return the length from the start of the curve to parameters t.
+
+        If t is None, returns the total length of the curve.
+        """
+        if t is None:
+            return self.s[-1]
+        t = asarray(t, dtype=float64).ravel()
+        k = self.t.searchsorted(t, side='right') - 1
+        k = k.clip(0, len(self.t)-2)
+        return self.s[k] + self.integrate(self.t[k], t)
+
+
+    def lengths(self):
+        """Return the lengths of the intervals between the breaks."""
+        return diff(self.s[::self.nsub])
+
+
+    def inverse(self,s,rtol=1.e-10,maxit=20):
+        """Return the parameter values at the given lengths.
+
+        Parameters:
+
+        - `s`: float array: lengths measured from the start of the curve.
+        - `rtol`: relative tolerance on the length, relative to the
+          total length.
+        - `maxit`: maximum number of Newton iterations.
+
+        Returns a float array with the parameter values.
+        """
+        s = asarray(s, dtype=float64).ravel()
+        k = self.s.searchsorted(s, side='right') - 1
+        k = k.clip(0, len(self.t)-2)
+        lo, hi = self.t[k], self.t[k+1]
+        s0, s1 = self.s[k], self.s[k+1]
+        ds = where(s1 > s0, s1-s0, 1.)
+        t = lo + (hi-lo) * ((s-s0) / ds).clip(0., 1.)
+        tol = rtol * self.length()
+        act = arange(len(s))
+        for it in range(maxit):
+            f = s0[act] + self.integrate(lo[act], t[act]) - s[act]
+            ok = abs(f) <= tol
+            act, f = act[~ok], f[~ok]
+            if len(act) == 0:
+                break
+            # keep the root bracketed
+            ta = t[act]
+            pos = f > 0.
+            hi[act[pos]] = ta[pos]
+            lo_act = where(pos, lo[act], ta)
+            d = length(self.deriv(ta))
+            tn = ta - f / where(d > 0., d, 1.)
+            # use bisection if Newton leaves the bracket
+            out = (tn <= lo_act) | (tn >= hi[act]) | (d <= 0.)
+            tn[out] = 0.5 * (lo_act[out] + hi[act][out])
+            # move the lower end of the bracket, keeping s0 at lo
+            neg = ~pos
+            lo[act[neg]] = ta[neg]
+            s0[act[neg]] = s[act[neg]] + f[neg]
+            t[act] = tn
+        return t
+
+
 def binomial(n, k):
     """Compute the binomial coefficient Cn,k.
 
@@ -29,14 +29,523 @@ in DXF format.
 from __future__ import absolute_import, division, print_function
 
 
+import io
+
 from pyformex.formex import *
+from pyformex.odict import OrderedDict
 from pyformex.plugins import curve
 from pyformex import utils
 
 
-# Avoid compilation problems
-def execSource(s, g):
-    exec(s, g)
+def dxfGroups(fil):
+    """Iterate over the group code/value pairs of a DXF file.
+
+    `fil`: an open DXF file (in text mode) or any other iterable of lines.
+
+    Yields tuples (code,value) with the integer group code and the
+    stripped value string.
+    """
+    lines = iter(fil)
+    for code in lines:
+        try:
+            value = next(lines)
+        except StopIteration:
+            raise ValueError("Unexpected end of DXF file")
+        yield int(code), value.strip()
+
+
+def ocsMatrix(n):
+    """Return the transformation matrix from OCS to WCS.
+
+    `n`: the extrusion direction of a DXF entity.
+
+    The object coordinate system (OCS) of a DXF entity is derived from
+    its extrusion direction with the 'arbitrary axis algorithm'. The
+    returned (3,3) matrix has the OCS axes as rows, so that WCS
+    coordinates are obtained as ``dot(x,mat)``.
+    """
+    n = normalize(asarray(n, dtype=float64))
+    if abs(n[0]) < 1./64 and abs(n[1]) < 1./64:
+        ax = cross([0., 1., 0.], n)
+    else:
+        ax = cross([0., 0., 1.], n)
+    ax = normalize(ax)
+    return row_stack([ax, cross(n, ax), n])
+
+
+def bulgePoints(x0,x1,bulge,n=[0.,0.,1.],chordal=0.01):
+    """Return points on the arc of a bulged polyline segment.
+
+    Parameters:
+
+    - `x0`, `x1`: (3,) float arrays: the end points of the segment.
+    - `bulge`: float: the bulge value of the segment: the tangent of a
+      quarter of the included angle of the arc. A positive value means
+      counterclockwise around `n`.
+    - `n`: (3,) float array: the normal on the plane of the arc.
+    - `chordal`: float: relative chordal tolerance for the approximation
+      of the arc, as in :meth:`curve.Arc.approx`.
+
+    Returns the points on the arc, excluding the end points.
+
+    >>> print(bulgePoints([1.,0.,0.], [-1.,0.,0.], 1., chordal=0.1).round(2))
+    [[ 0.71  0.71  0.  ]
+     [ 0.    1.    0.  ]
+     [-0.71  0.71  0.  ]]
+    """
+    x0 = asarray(x0, dtype=float64)
+    x1 = asarray(x1, dtype=float64)
+    n = normalize(asarray(n, dtype=float64))
+    theta = 4.*arctan(bulge)
+    c = x1 - x0
+    center = (x0+x1) / 2. + cross(n, c) / (2.*tan(theta/2.))
+    ndiv = int(ceil(abs(theta) / (2.*arccos(1.-chordal))))
+    a = theta * arange(1, ndiv) / ndiv
+    u = x0 - center
+    v = cross(n, u)
+    return Coords(center + outer(cos(a), u) + outer(sin(a), v))
+
+
+def _isSimilarity(mat):
+    """_Return the scale factor if mat is a similarity, else None_"""
+    g = dot(mat, mat.T)
+    s = g[0, 0]
+    if allclose(g, s*identity(3), atol=1.e-8*s):
+        return sqrt(s)
+
+
+class DxfImporter(object):
+    """Import geometry from a DXF file.
+
+    This is a pure Python streaming parser of the ASCII DXF format.
+    It reads the file group by group, collects the entities of the
+    ENTITIES and BLOCKS sections, and expands block references (INSERT
+    entities) with their transformation. Nested blocks and arrayed
+    inserts are supported. The file is read in a single pass and the
+    processing time is linear in the number of entities.
+
+    The following entities are recognized and converted to pyFormex
+    objects:
+
+    ===========  ==================================================
+    entity       object
+    ===========  ==================================================
+    LINE         :class:`plugins.curve.Line`
+    ARC          :class:`plugins.curve.Arc`
+    CIRCLE       :class:`plugins.curve.Arc`
+    LWPOLYLINE   :class:`plugins.curve.PolyLine`
+    POLYLINE     :class:`plugins.curve.PolyLine` or :class:`Mesh`
+    SPLINE       :class:`plugins.nurbs.NurbsCurve`
+    3DFACE       :class:`Mesh` ('tri3' or 'quad4')
+    ===========  ==================================================
+
+    Polylines with bulges get their arcs approximated by straight
+    segments. Polyface meshes and polygon meshes result in a Mesh.
+    Other entities are silently skipped.
+
+    Parameters:
+
+    - `merge`: bool: if True (default), all LINE entities and all 3DFACE
+      entities of a layer are collected in a single Mesh. This is
+      highly recommended for large files. If False, every entity
+      results in a separate object.
+    - `chordal`: float: relative chordal tolerance for the approximation
+      of arcs, see :meth:`curve.Arc.approx`.
+
+    All created objects get their entity number in the file as property
+    number and the name of the DXF entity type in an attribute `dxftype`.
+    Entities resulting from an INSERT get the entity number of the INSERT.
+    """
+
+    def __init__(self,merge=True,chordal=0.01):
+        self.merge = merge
+        self.chordal = chordal
+
+
+    def read(self, filename):
+        """Read a DXF file.
+
+        Returns an OrderedDict with the layer names as keys and the list
+        of objects on that layer as values.
+        """
+        self.blocks = {}
+        self.records = []
+        self.block = None
+        self.polyline = None
+        self.count = 0
+        section = None
+        entity = None
+        with io.open(filename, 'r', errors='replace') as fil:
+            for code, value in dxfGroups(fil):
+                if code == 0:
+                    if entity is not None:
+                        self.entity(entity[0], entity[1])
+                        entity = None
+                    if value == 'SECTION':
+                        section = ''
+                    elif value == 'ENDSEC':
+                        if self.polyline is not None:
+                            self.endPolyline()
+                        section = None
+                    elif value == 'EOF':
+                        break
+                    elif section in [ 'ENTITIES', 'BLOCKS' ]:
+                        entity = (value, [])
+                elif entity is not None:
+                    entity[1].append((code, value))
+                elif section == '' and code == 2:
+                    section = value
+        return self.collect()
+
+
+    def entity(self, typ, data):
+        """Process an entity with its list of groups"""
+        if typ == 'BLOCK':
+            d = dict(data)
+            self.block = d.get(2, '')
+            self.blocks[self.block] = (self._point(d, 10), [])
+            return
+        elif typ == 'ENDBLK':
+            self.block = None
+            return
+
+        if self.polyline is not None:
+            if typ == 'VERTEX':
+                self.polyline[1].append(data)
+                return
+            self.endPolyline()
+            if typ == 'SEQEND':
+                return
+
+        method = getattr(self, '_'+typ.lower(), None)
+        if method is not None:
+            count = self.count
+            if self.block is None:
+                self.count += 1
+            d = dict(data)
+            rec = method(d, data)
+            if typ == 'POLYLINE':
+                self.polyline = (d, [], count)
+            elif rec is not None:
+                self.add(rec[0], d.get(8, '0'), count, rec[1:])
+
+
+    def add(self, kind, layer, count, data):
+        """Add an entity record"""
+        rec = (kind, layer, count, data)
+        if self.block is None:
+            self.records.append(rec)
+        else:
+            self.blocks[self.block][1].append(rec)
+
+
+    @staticmethod
+    def _point(d, code, default=0.):
+        return array([ float(d.get(code+10*i, default)) for i in range(3) ])
+
+
+    @staticmethod
+    def _extrusion(d):
+        return [ float(d.get(c, v)) for c, v in [(210, 0.), (220, 0.), (230, 1.)] ]
+
+
+    def _line(self, d, data):
+        return 'line', array([self._point(d, 10), self._point(d, 11)])
+
+
+    def _arc(self, d, data):
+        n = self._extrusion(d)
+        o = ocsMatrix(n)
+        return 'arc', dot(self._point(d, 10), o), float(d[40]), o[2], o[0], float(d.get(50, 0.)), float(d.get(51, 360.))
+
+
+    _circle = _arc
+
+
+    def _3dface(self, d, data):
+        return 'face', array([ self._point(d, c) for c in range(10, 14) ])
+
+
+    def _lwpolyline(self, d, data):
+        x = []
+        bulge = []
+        for code, value in data:
+            if code == 10:
+                x.append([float(value), 0.])
+                bulge.append(0.)
+            elif code == 20:
+                x[-1][1] = float(value)
+            elif code == 42:
+                bulge[-1] = float(value)
+        x = column_stack([x, float(d.get(38, 0.))*ones(len(x))])
+        return self.polyPoints(x, bulge, int(d.get(70, 0)) & 1, self._extrusion(d))
+
+
+    def _polyline(self, d, data):
+        # Processed by endPolyline
+        pass
+
+
+    def _spline(self, d, data):
+        ctrl, fit, knots, wts = [], [], [], []
+        for code, value in data:
+            if code in [10, 11]:
+                (ctrl if code == 10 else fit).append([float(value), 0., 0.])
+            elif code in [20, 30]:
+                ctrl[-1][code//10-1] = float(value)
+            elif code in [21, 31]:
+                fit[-1][code//10-1] = float(value)
+            elif code == 40:
+                knots.append(float(value))
+            elif code == 41:
+                wts.append(float(value))
+        degree = int(d.get(71, 3))
+        if ctrl:
+            return 'spline', array(ctrl), array(wts) if wts else None, array(knots), degree
+        elif len(fit) > 1:
+            return 'fit', array(fit), degree
+
+
+    def _insert(self, d, data):
+        # Transformation from block to OCS, and from OCS to WCS
+        s = diag([ float(d.get(c, 1.)) for c in [41, 42, 43] ])
+        a = float(d.get(50, 0.)) * DEG
+        r = array([[cos(a), sin(a), 0.], [-sin(a), cos(a), 0.], [0., 0., 1.]])
+        o = ocsMatrix(self._extrusion(d))
+        mat = dot(dot(s, r), o)
+        vec = dot(self._point(d, 10), o)
+        ncol, nrow = int(d.get(70, 1)), int(d.get(71, 1))
+        dx, dy = float(d.get(44, 0.)), float(d.get(45, 0.))
+        offsets = [ dot(dot([i*dx, j*dy, 0.], r), o) for j in range(nrow) for i in range(ncol) ]
+        return 'insert', d.get(2, ''), mat, vec, offsets
+
+
+    def endPolyline(self):
+        """Process a POLYLINE with its VERTEX entities"""
+        d, vertices, count = self.polyline
+        self.polyline = None
+        flag = int(d.get(70, 0))
+        vertices = [ dict(v) for v in vertices ]
+        if flag & 64:
+            # polyface mesh
+            # vertex records have flag 64|128, face records only 128
+            vflag = [ int(v.get(70, 0)) for v in vertices ]
+            pts = [ self._point(v, 10) for v, f in zip(vertices, vflag) if f & 64 ]
+            faces = [ [ abs(int(v.get(c, 0))) for c in [71, 72, 73, 74] ] for v, f in zip(vertices, vflag) if f & 128 and not f & 64 ]
+            faces = array(faces, dtype=Int).reshape(-1, 4) - 1
+            faces[:, 3] = where(faces[:, 3] < 0, faces[:, 2], faces[:, 3])
+            rec = 'mesh', array(pts).reshape(-1, 3), faces
+        elif flag & 16:
+            # polygon mesh
+            m, n = int(d.get(71, 0)), int(d.get(72, 0))
+            pts = array([ self._point(v, 10) for v in vertices ]).reshape(m, n, 3)
+            i = arange(m if flag & 1 else m-1).reshape(-1, 1)
+            j = arange(n if flag & 32 else n-1)
+            i1, j1 = (i+1) % m, (j+1) % n
+            faces = column_stack([ (a*n+b).ravel() for a, b in [(i, j), (i1, j), (i1, j1), (i, j1)] ])
+            rec = 'mesh', pts.reshape(-1, 3), faces
+        else:
+            vertices = [ v for v in vertices if not int(v.get(70, 0)) & 16 ]
+            x = array([ self._point(v, 10) for v in vertices ]).reshape(-1, 3)
+            bulge = [ float(v.get(42, 0.)) for v in vertices ]
+            if flag & 8:
+                rec = self.polyPoints(x, [], flag & 1, [0., 0., 1.])
+            else:
+                x[:, 2] = float(d.get(30, 0.))
+                rec = self.polyPoints(x, bulge, flag & 1, self._extrusion(d))
+        self.add(rec[0], d.get(8, '0'), count, rec[1:])
+
+
+    def polyPoints(self, x, bulge, closed, n):
+        """Return a polyline record from OCS points and bulges"""
+        o = ocsMatrix(n)
+        if any(bulge):
+            npts = len(x)
+            pts = []
+            for i in range(npts if closed else npts-1):
+                pts.append(x[i:i+1])
+                if bulge[i]:
+                    pts.append(bulgePoints(x[i], x[(i+1)%npts], bulge[i], [0., 0., 1.], self.chordal))
+            if not closed:
+                pts.append(x[-1:])
+            x = concatenate(pts)
+        return 'poly', dot(x, o), bool(closed)
+
+
+    def expand(self,rec,mat=None,vec=None,layer=None,count=None,depth=0):
+        """Expand and transform an entity record.
+
+        Returns a list of records with inserts expanded.
+        """
+        kind, lay, cnt, data = rec
+        if layer is not None and lay == '0':
+            lay = layer
+        if count is not None:
+            cnt = count
+        if kind == 'insert':
+            name, m, v, offsets = data
+            if name not in self.blocks or depth > 16:
+                return []
+            base, recs = self.blocks[name]
+            res = []
+            for off in offsets:
+                v1 = v + off - dot(base, m)
+                if mat is not None:
+                    m1, v1 = dot(m, mat), dot(v1, mat) + vec
+                else:
+                    m1 = m
+                for r in recs:
+                    res.extend(self.expand(r, m1, v1, lay, cnt, depth+1))
+            return res
+        if mat is not None:
+            data = self.transform(kind, data, mat, vec)
+            if kind == 'arc' and len(data) == 2:
+                kind = 'poly'
+        return [ (kind, lay, cnt, data) ]
+
+
+    def transform(self, kind, data, mat, vec):
+        """Apply an affine transformation to the data of a record"""
+        if kind == 'arc':
+            C, r, N, U, a0, a1 = data
+            s = _isSimilarity(mat)
+            if s is None:
+                # not a circle anymore: approximate
+                x = self.arcObject(data).approx(chordal=self.chordal).coords
+                closed = (a1-a0) % 360. == 0.
+                if closed:
+                    x = x[:-1]
+                return dot(x, mat) + vec, closed
+            U1 = dot(U, mat) / s
+            V1 = dot(cross(N, U), mat) / s
+            return dot(C, mat) + vec, r*s, cross(U1, V1), U1, a0, a1
+        elif kind in [ 'spline', 'fit', 'mesh', 'poly', 'line', 'face' ]:
+            return (dot(data[0], mat) + vec, ) + tuple(data[1:])
+        return data
+
+
+    def arcObject(self, data):
+        """Create an Arc from an arc record"""
+        C, r, N, U, a0, a1 = data
+        if allclose(N, [0., 0., 1.]) and allclose(U, [1., 0., 0.]):
+            return curve.Arc(center=C, radius=r, angles=[a0, a1])
+        # Set the rotation of the x-axis in the plane of the arc
+        U0 = Coords([1., 0., 0.]).rotate(vectorRotation([0., 0., 1.], N))
+        da = arctan2(dot(cross(U0, U), N), dot(U0, U)) / DEG
+        A = curve.Arc(center=C, radius=r, angles=[a0+da, a1+da])
+        A.normal = N
+        A.coords = Coords([A.sub_points(array([0.]), 0)[0], C, A.sub_points(array([1.]), 0)[0]])
+        return A
+
+
+    def collect(self):
+        """Create the objects from the entity records"""
+        from pyformex.mesh import Mesh
+        from pyformex.plugins import nurbs
+
+        layers = OrderedDict()
+        lines = OrderedDict()
+        faces = OrderedDict()
+        for rec in self.records:
+            for kind, layer, count, data in self.expand(rec):
+                objs = layers.setdefault(layer, [])
+                if self.merge and kind == 'line':
+                    lines.setdefault(layer, []).append((data[0], count))
+                    continue
+                if self.merge and kind == 'face':
+                    faces.setdefault(layer, []).append((data[0], count))
+                    continue
+                if kind == 'line':
+                    obj = curve.Line(data[0])
+                    obj.dxftype = 'Line'
+                elif kind == 'arc':
+                    obj = self.arcObject(data)
+                    obj.dxftype = 'Arc'
+                elif kind == 'poly':
+                    obj = curve.PolyLine(data[0], closed=data[1])
+                    obj.dxftype = 'Polyline'
+                elif kind == 'spline':
+                    obj = nurbs.NurbsCurve(data[0], degree=data[3], wts=data[1], knots=data[2])
+                    obj.dxftype = 'Spline'
+                elif kind == 'fit':
+                    obj = nurbs.globalInterpolationCurve(data[0], degree=min(data[1], len(data[0])-1))
+                    obj.dxftype = 'Spline'
+                elif kind == 'face':
+                    obj = _faceMesh(data[0].reshape(1, 4, 3))
+                    obj.dxftype = '3DFace'
+                elif kind == 'mesh':
+                    obj = _faceMesh(data[0][data[1]])
+                    obj.dxftype = 'Polyline'
+                objs.append(_setProp(obj, count))
+
+        for layer, data in lines.items():
+            X, prop = zip(*data)
+            obj = Formex(array(X), prop).toMesh()
+            obj.dxftype = 'Line'
+            layers[layer].append(obj)
+        for layer, data in faces.items():
+            X, prop = zip(*data)
+            for obj in _faceMesh(array(X), prop, split=True):
+                obj.dxftype = '3DFace'
+                layers[layer].append(obj)
+        return layers
+
+
+def _setProp(obj, prop):
+    """_Set the property of an object_
+
+    NurbsCurves are not Geometry objects and have no setProp method.
+    """
+    if hasattr(obj, 'setProp'):
+        obj.setProp(prop)
+    else:
+        obj.prop = prop
+    return obj
+
+
+def _faceMesh(X,prop=None,split=False):
+    """_Create a Mesh from 4-point faces_
+
+    Faces with coinciding third and fourth point are triangles.
+    If split is True, a list with a 'tri3' and a 'quad4' Mesh is returned,
+    leaving out empty ones. Else, a single Mesh is returned, with the quads
+    split into triangles if there are any triangles.
+    """
+    from pyformex.mesh import Mesh
+    tri = (X[:, 2] == X[:, 3]).all(axis=-1)
+    if prop is not None:
+        prop = asarray(prop)
+    F = [ Formex(X[tri][:, :3], None if prop is None else prop[tri]),
+          Formex(X[~tri], None if prop is None else prop[~tri]) ]
+    if split:
+        return [ f.toMesh() for f in F if f.nelems() > 0 ]
+    if tri.all():
+        return F[0].toMesh()
+    elif tri.any():
+        return F[0].toMesh() + F[1].toMesh().convert('tri3')
+    else:
+        return F[1].toMesh()
+
+
+def parseDXF(filename,merge=True,chordal=0.01):
+    """Read the geometry from a DXF file.
+
+    This uses the pure Python :class:`DxfImporter`: no external program
+    is needed.
+
+    Parameters:
+
+    - `filename`: name of an ASCII DXF file.
+    - `merge`: bool: if True (default), the LINE and 3DFACE entities of
+      each layer are collected in a single Mesh per layer and element type.
+    - `chordal`: float: relative chordal tolerance for the approximation of
+      polyline arcs.
+
+    Returns an OrderedDict with the layer names as keys and lists of
+    pyFormex objects as values. See :class:`DxfImporter` for the created
+    objects.
+    """
+    return DxfImporter(merge, chordal).read(filename)
 
 
 def importDXF(filename):
@@ -47,23 +556,15 @@ def importDXF(filename):
     but has proven to be already very valuable for many users.
 
     `filename`: name of a DXF file.
-    The return value is a list of pyFormex objects.
-
-    Importing a DXF file is done in two steps:
-
-    - First the DXF file is scanned and the recognized entities are
-      formatted into a text with standard function calling syntax.
-      See :func:`readDXF`.
-    - Then the created text is executed as a Python script, producing
-      equivalent pyFormex objects.
-      See :func:`convertDXF`.
-
+    The return value is a list of pyFormex objects, in the order of the
+    entities in the file. Each object has its sequence number as property.
+    See :class:`DxfImporter` for the recognized entities.
     """
-    text = readDXF(filename)
-    if text:
-        return convertDXF(text)
-    else:
-        return []
+    parts = DxfImporter(merge=False).read(filename)
+    parts = sorted([ p for v in parts.values() for p in v ], key=lambda p: asarray(p.prop).min())
+    for i, p in enumerate(parts):
+        _setProp(p, i)
+    return parts
 
 
 def readDXF(filename):
@@ -92,9 +593,6 @@ def readDXF(filename):
         return ''
 
 
-Entities = []
-Vertices = []
-
 def convertDXF(text):
     """Convert a textual representation of a DXF format to pyFormex objects.
 
@@ -114,9 +612,9 @@ def convertDXF(text):
         Vertex(0.0,-3.0,0.0)
 
       Each line of the text defines a single entity or starts a multiple
-      component entity. The text should be well aligned to constitute a
-      proper Python script. Currently, the only defined entities are
-      'Arc', 'Line', 'Polyline', 'Vertex'.
+      component entity. The lines are parsed, not executed, so that the
+      text can not run any code. Currently, the only defined entities are
+      'Arc', 'Circle', 'Line', 'Polyline', 'Vertex'.
 
     Returns a list of pyFormex objects corresponding to the text. The
     returned objects are of the following type:
@@ -133,29 +631,18 @@ def convertDXF(text):
     vertices of a PolyLine.
 
     """
-    import types
-    global Entities, Vertices
-
     Entities = []
     Vertices = []
 
-    # Simple type (Line, Arc) create the object and append it to the
-    # Entities list
-    # Compound types (like Polyline) append the corresponding
-    # EndEntity function to the Entities list
-
-
-    def EndEntity():
-        global Entities, Vertices
-        if Entities:
-            f = Entities[-1]
-            if isinstance(f, types.FunctionType):
-                f()
+    def endEntity():
+        if Vertices and Vertices[0] is None:
+            part = curve.PolyLine(Vertices[1:]).setProp(len(Entities))
+            part.dxftype = 'Polyline'
+            Entities.append(part)
+        del Vertices[:]
 
     def Arc(x0, y0, z0, r, a0, a1):
-        global Entities, Vertices
-        count = len(Entities)
-        part = curve.Arc(center=[x0, y0, z0], radius=r, angles=[a0, a1]).setProp(count)
+        part = curve.Arc(center=[x0, y0, z0], radius=r, angles=[a0, a1]).setProp(len(Entities))
         part.dxftype = 'Arc'
         Entities.append(part)
 
@@ -163,34 +650,29 @@ def convertDXF(text):
         Arc(x0, y0, z0, r, 0., 360.)
 
     def Line(x0, y0, z0, x1, y1, z1):
-        global Entities, Vertices
-        count = len(Entities)
-        part = curve.Line([[x0, y0, z0], [x1, y1, z1]]).setProp(count)
+        part = curve.Line([[x0, y0, z0], [x1, y1, z1]]).setProp(len(Entities))
         part.dxftype = 'Line'
         Entities.append(part)
 
     def Polyline(n):
-        global Entities, Vertices
-        EndEntity()
-        Entities.append(EndPolyline)
-        Vertices = []
-
-    def EndPolyline():
-        global Entities, Vertices
-        count = len(Entities) - 1
-        part = curve.PolyLine(Vertices).setProp(count)
-        part.dxftype = 'Polyline'
-        Entities[-1] = part
-        Vertices = []
+        Vertices.append(None)
 
     def Vertex(x, y, z):
-        global Entities, Vertices
         Vertices.append([x, y, z])
 
-
-    l = {'Line':Line, 'Arc':Arc, 'Circle':Circle, 'Polyline':Polyline, 'EndPolyline':EndPolyline, 'Vertex':Vertex}
-    execSource(text, l)
-    EndEntity()
+    funcs = {'Line':Line, 'Arc':Arc, 'Circle':Circle, 'Polyline':Polyline, 'Vertex':Vertex}
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        name, sep, args = line.partition('(')
+        name = name.strip()
+        if name not in funcs or not args.endswith(')'):
+            raise ValueError("Invalid line in dxftext: %s" % line)
+        if name != 'Vertex':
+            endEntity()
+        funcs[name](*[ float(a) for a in args[:-1].split(',') ])
+    endEntity()
     return Entities
 
 
@@ -65,6 +65,13 @@ def importDxf(convert=False,keep=False):
     if not fn:
         return
 
+    if not (convert or keep):
+        pf.GUI.setBusy()
+        parts = dxf.importDXF(fn)
+        print("Imported %s entities" % len(parts))
+        pf.GUI.setBusy(False)
+        return importDxfParts(parts)
+
     pf.GUI.setBusy()
     text = dxf.readDXF(fn)
     pf.GUI.setBusy(False)
@@ -116,6 +123,11 @@ def importDxfText(text=None):
     parts = [ p for p in parts if not isinstance(p, types.FunctionType) ]
     print("Kept %s entities of type Arc, Line, PolyLine" % len(parts))
     pf.GUI.setBusy(False)
+    return importDxfParts(parts)
+
+
+def importDxfParts(parts):
+    """Export and draw a list of imported DXF entities."""
     export({'_dxf_import_':parts,'_dxf_sel_':parts})
     wireframe()
     drawDxf(zoom=True)
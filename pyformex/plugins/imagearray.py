@@ -369,6 +369,71 @@ _dicom_slope = 1
 
 if utils.checkModule('gdcm'):
 
+    from multiprocessing import cpu_count
+    from multiprocessing.pool import ThreadPool
+    import gdcm
+
+    def get_gdcm_to_numpy_typemap():
+        """Returns the GDCM Pixel Format to numpy array type mapping."""
+        _gdcm_np = {gdcm.PixelFormat.UINT8  :np.int8,
+                    gdcm.PixelFormat.INT8   :np.uint8,
+                    #gdcm.PixelFormat.UINT12 :np.uint12,
+                    #gdcm.PixelFormat.INT12  :np.int12,
+                    gdcm.PixelFormat.UINT16 :np.uint16,
+                    gdcm.PixelFormat.INT16  :np.int16,
+                    gdcm.PixelFormat.UINT32 :np.uint32,
+                    gdcm.PixelFormat.INT32  :np.int32,
+                    #gdcm.PixelFormat.FLOAT16:np.float16,
+                    gdcm.PixelFormat.FLOAT32:np.float32,
+                    gdcm.PixelFormat.FLOAT64:np.float64 }
+        return _gdcm_np
+
+
+    def get_numpy_array_type(gdcm_pixel_format):
+        """Returns a numpy array typecode given a GDCM Pixel Format."""
+        return get_gdcm_to_numpy_typemap()[gdcm_pixel_format]
+
+
+    def gdcm_to_numpy(image):
+        """Convert a GDCM image to a numpy array.
+
+        """
+        fmt = image.GetPixelFormat()
+
+        if fmt.GetScalarType() not in get_gdcm_to_numpy_typemap().keys():
+            raise ValueError("Unsupported Pixel Format\n%s"%fmt)
+
+        # GDCM dimensions are in order x,y,z: numpy shape is [z,]y,x
+        shape = (image.GetDimension(1), image.GetDimension(0))
+        if image.GetNumberOfDimensions() == 3:
+          shape = (image.GetDimension(2),) + shape
+        if fmt.GetSamplesPerPixel() != 1:
+            raise ValueError("Can not read images with multiple samples per pixel.")
+
+        dtype = get_numpy_array_type(fmt.GetScalarType())
+        gdcm_array = image.GetBuffer()
+        data = np.frombuffer(gdcm_array, dtype=dtype).reshape(shape)
+        spacing = np.array(image.GetSpacing())
+        origin = np.array(image.GetOrigin())
+        intercept = image.GetIntercept()
+        slope = image.GetSlope()
+        return data, spacing, origin, slope, intercept
+
+
+    def readDicomSlice(filename):
+        """Read a DICOM image and its geometry.
+
+        This is like :func:`loadImage_gdcm`, but does not set any global
+        variables, so that it can safely be used from multiple threads.
+
+        Returns a tuple (pix, spacing, origin, slope, intercept).
+        """
+        rdr = gdcm.ImageReader()
+        rdr.SetFileName(filename)
+        if not rdr.Read():
+            raise ValueError("Could not read image file '%s'" % filename)
+        return gdcm_to_numpy(rdr.GetImage())
+
 
     def loadImage_gdcm(filename):
         """Load a DICOM image into a numpy array.
@@ -389,62 +454,241 @@ if utils.checkModule('gdcm'):
         the pixel/slice spacing factors, resp. the origin, in order (x,y,z).
         It also sets the _dicom_slope, _dicom_intercept global variables.
         """
-        import gdcm
+        global _dicom_spacing, _dicom_origin, _dicom_slope, _dicom_intercept
+        pix, _dicom_spacing, _dicom_origin, _dicom_slope, _dicom_intercept = readDicomSlice(filename)
+        return pix
+
+
+    def scanDicomHeaders(files):
+        """Read the image geometry from the headers of DICOM files.
+
+        This uses a gdcm.Scanner to read only the needed header tags,
+        without decoding the pixel data.
+
+        Returns a list with a tuple (rows, columns, z) for each file,
+        where z is the z-value of the image position. Files that do not
+        have the required tags get a value None.
+        """
+        tags = [ gdcm.Tag(0x28, 0x10), gdcm.Tag(0x28, 0x11), gdcm.Tag(0x20, 0x32) ]
+        scanner = gdcm.Scanner()
+        for tag in tags:
+            scanner.AddTag(tag)
+        if not scanner.Scan(files):
+            raise ValueError("Could not scan the DICOM files")
+        res = []
+        for fn in files:
+            try:
+                rows, cols, pos = [ scanner.GetValue(fn, tag) for tag in tags ]
+                z = float(pos.split('\\')[2])
+                res.append((int(rows), int(cols), z))
+            except:
+                res.append(None)
+        return res
+
+
+    class DicomVolume(object):
+        """A lazily loaded volume from a stack of DICOM images.
+
+        The DicomVolume only reads the DICOM headers on creation.
+        They are used to sort the slices on their z-value and to determine
+        the size of the volume. The pixel data are only decoded when
+        slices of the volume are accessed, or when the full volume is
+        loaded with :meth:`load`. The decoding of multiple slices is
+        done in parallel, directly into a preallocated array, so that no
+        temporary copies of the volume are needed.
+
+        The volume is indexed as [z,y,x], which is the order expected
+        by :func:`plugins.isosurface.isosurface`.
+
+        Parameters:
+
+        - `files`: a list of file names of DICOM images of the same size,
+          or a directory containing such images (with extension .dcm).
+        - `dtype`: numpy data type of the volume. The default is the pixel
+          type of the first image. The raw pixel values are stored:
+          use :attr:`slope` and :attr:`intercept` to rescale them.
+        - `nproc`: number of threads used for decoding. Default is the
+          number of processors. The threads are created when they are
+          first needed and are kept until :meth:`close` is called.
+        - `reverse`: bool: if True, the slices are sorted on descending
+          z-value.
+
+        The volume can be used as a context manager, which closes the
+        decoding threads on exit.
+
+        Example::
+
+          V = DicomVolume('ctscan')
+          print(V.shape)
+          data = V.load(memmap='ctscan.raw')   # full volume, on disk
+          for z0,block in V.blocks(64):        # or by blocks of 64 slices
+              tri = isosurface(block,1200.)
+              tri[:,:,2] += z0
+
+        """
+
+        def __init__(self,files,dtype=None,nproc=-1,reverse=False):
+            """Initialize the DicomVolume."""
+            if isinstance(files, str):
+                files = utils.listTree(files, listdirs=False, includefiles="*.dcm")
+            headers = scanDicomHeaders(files)
+            ok = [ (h[2], f) for f, h in zip(files, headers) if h is not None ]
+            self.rejected = [ f for f, h in zip(files, headers) if h is None ]
+            if not ok:
+                raise ValueError("No valid DICOM images found")
+            sizes = set([ h[:2] for h in headers if h is not None ])
+            if len(sizes) > 1:
+                raise ValueError("The DICOM images do not have the same size: %s" % sizes)
+            ok.sort(reverse=reverse)
+            self.files = [ f for z, f in ok ]
+            self.z = np.array([ z for z, f in ok ])
+            rows, cols = sizes.pop()
+            self.shape = (len(self.files), rows, cols)
+            # read the first slice to get data type and geometry
+            pix, self.spacing, self.origin, self.slope, self.intercept = readDicomSlice(self.files[0])
+            self._check(0, pix)
+            if dtype is None:
+                dtype = pix.dtype
+            self.dtype = np.dtype(dtype)
+            if nproc < 1:
+                nproc = cpu_count()
+            self.nproc = nproc
+            self._pool = None
+
+
+        def __len__(self):
+            return self.shape[0]
+
+
+        def __enter__(self):
+            return self
 
-        def get_gdcm_to_numpy_typemap():
-            """Returns the GDCM Pixel Format to numpy array type mapping."""
-            _gdcm_np = {gdcm.PixelFormat.UINT8  :np.int8,
-                        gdcm.PixelFormat.INT8   :np.uint8,
-                        #gdcm.PixelFormat.UINT12 :np.uint12,
-                        #gdcm.PixelFormat.INT12  :np.int12,
-                        gdcm.PixelFormat.UINT16 :np.uint16,
-                        gdcm.PixelFormat.INT16  :np.int16,
-                        gdcm.PixelFormat.UINT32 :np.uint32,
-                        gdcm.PixelFormat.INT32  :np.int32,
-                        #gdcm.PixelFormat.FLOAT16:np.float16,
-                        gdcm.PixelFormat.FLOAT32:np.float32,
-                        gdcm.PixelFormat.FLOAT64:np.float64 }
-            return _gdcm_np
 
+        def __exit__(self, *args):
+            self.close()
 
-        def get_numpy_array_type(gdcm_pixel_format):
-            """Returns a numpy array typecode given a GDCM Pixel Format."""
-            return get_gdcm_to_numpy_typemap()[gdcm_pixel_format]
 
+        def __del__(self):
+            self.close()
 
-        def gdcm_to_numpy(image):
-            """Convert a GDCM image to a numpy array.
 
+        def close(self):
+            """Stop the decoding threads.
+
+            The volume remains usable: new threads are created if more
+            slices need to be decoded.
             """
-            fmt = image.GetPixelFormat()
+            pool = getattr(self, '_pool', None)
+            if pool is not None:
+                pool.terminate()
+                self._pool = None
 
-            if fmt.GetScalarType() not in get_gdcm_to_numpy_typemap().keys():
-                raise ValueError("Unsupported Pixel Format\n%s"%fmt)
 
-            shape = (image.GetDimension(0), image.GetDimension(1))
-            if image.GetNumberOfDimensions() == 3:
-              shape = shape + (image.GetDimension(2),)
-            if fmt.GetSamplesPerPixel() != 1:
-                raise ValueError("Can not read images with multiple samples per pixel.")
+        def _check(self, i, pix):
+            """Check that the decoded slice i matches the header size"""
+            if pix.shape != self.shape[1:]:
+                raise ValueError("DICOM image '%s' decodes to shape %s, but its header specifies Rows,Columns = %s" % (self.files[i], pix.shape, self.shape[1:]))
 
-            dtype = get_numpy_array_type(fmt.GetScalarType())
-            gdcm_array = image.GetBuffer()
-            data = np.frombuffer(gdcm_array, dtype=dtype).reshape(shape)
-            spacing = np.array(image.GetSpacing())
-            origin = np.array(image.GetOrigin())
-            intercept = image.GetIntercept()
-            slope = image.GetSlope()
-            return data, spacing, origin, slope, intercept
 
+        def _read(self, args):
+            """Read slice i into out[j]"""
+            i, out, j = args
+            pix = readDicomSlice(self.files[i])[0]
+            self._check(i, pix)
+            out[j] = pix
 
-        global _dicom_spacing, _dicom_origin, _dicom_slope, _dicom_intercept
-        rdr = gdcm.ImageReader()
-        rdr.SetFileName(filename)
 
-        if not rdr.Read():
-            raise ValueError("Could not read image file '%s'" % filename)
-        pix, _dicom_spacing, _dicom_origin, _dicom_slope, _dicom_intercept = gdcm_to_numpy(rdr.GetImage())
-        return pix
+        def read(self,sel,out=None):
+            """Decode a set of slices in parallel.
+
+            Parameters:
+
+            - `sel`: a slice or a list of slice numbers.
+            - `out`: optional array of shape (nsel,ny,nx) to store the result.
+
+            Returns an array of shape (nsel,ny,nx).
+            """
+            if isinstance(sel, slice):
+                sel = range(*sel.indices(len(self)))
+            sel = list(sel)
+            if out is None:
+                out = np.empty((len(sel),)+self.shape[1:], dtype=self.dtype)
+            tasks = [ (i, out, j) for j, i in enumerate(sel) ]
+            if self.nproc == 1 or len(tasks) == 1:
+                for t in tasks:
+                    self._read(t)
+            else:
+                if self._pool is None:
+                    self._pool = ThreadPool(self.nproc)
+                self._pool.map(self._read, tasks)
+            return out
+
+
+        def __getitem__(self,i):
+            """Return a (sliced) view of the volume.
+
+            The first index selects the slices that will be decoded.
+            Further indices are applied on the decoded slices.
+            """
+            if isinstance(i, tuple):
+                i, rest = i[0], i[1:]
+            else:
+                rest = ()
+            if isinstance(i, slice):
+                data = self.read(i)
+            else:
+                data = self.read([i])[0]
+            if rest:
+                data = data[(slice(None),)+rest] if isinstance(i, slice) else data[rest]
+            return data
+
+
+        def load(self,memmap=None):
+            """Load the full volume.
+
+            Parameters:
+
+            - `memmap`: optional file name. If specified, the volume is
+              stored in a numpy memory mapped file with this name,
+              allowing to handle volumes larger than the available memory.
+
+            Returns an array of shape (nz,ny,nx), possibly memory mapped.
+            """
+            if memmap:
+                out = np.memmap(memmap, dtype=self.dtype, mode='w+', shape=self.shape)
+            else:
+                out = np.empty(self.shape, dtype=self.dtype)
+            self.read(range(len(self)), out=out)
+            if memmap:
+                out.flush()
+            return out
+
+
+        def blocks(self,size,overlap=1):
+            """Iterate over the volume in blocks of slices.
+
+            Parameters:
+
+            - `size`: number of slices in each block.
+            - `overlap`: number of slices shared by consecutive blocks.
+              The default value 1 makes the blocks suitable for independent
+              isosurface or voxel processing.
+
+            Yields tuples (z0,block) where z0 is the index of the first
+            slice in the block.
+            """
+            step = max(1, size - overlap)
+            for z0 in range(0, max(1, len(self)-overlap), step):
+                yield z0, self.read(slice(z0, min(z0+size, len(self))))
+
+
+        def scale(self):
+            """Return the voxel size as a (3,) array in order (x,y,z)."""
+            scale = np.array(self.spacing, dtype=float)
+            if len(self) > 1:
+                scale[2] = abs(self.z[1]-self.z[0])
+            return scale
+
 
     readDicom = loadImage_gdcm
 
@@ -590,7 +834,12 @@ def dicom2numpy(files):
     # read and stack the images
     print("Using %s to read DICOM files" % readDicom.__name__)
 
-    pixar = np.dstack([ readDicom(f) for f in files ])
+    # fill a preallocated array, to avoid a copy of the whole volume
+    pix = readDicom(files[0])
+    pixar = np.empty(pix.shape+(len(files),), dtype=pix.dtype)
+    pixar[..., 0] = pix
+    for i, f in enumerate(files[1:]):
+        pixar[..., i+1] = readDicom(f)
     scale = _dicom_spacing
     return pixar, scale
 
@@ -23,11 +23,19 @@
 ##
 """Lindenmayer Systems
 
+This module provides two implementations of Lindenmayer systems.
+The :class:`Lima` class grows the product as a string, which can be
+translated into a turtle script and played with :func:`turtle.play`.
+The :class:`LSystem` class stores the product as an array of integer
+tokens, supports stochastic and parametric rules and draws the
+product with the compiled turtle engine in :mod:`plugins.turtle`,
+without evaluating any script. LSystem instances do not share any state.
 """
 from __future__ import absolute_import, division, print_function
 
 
 from pyformex.plugins import turtle
+import numpy as np
 
 class Lima(object):
     """A class for operations on Lindenmayer Systems."""
@@ -57,13 +65,10 @@ class Lima(object):
         in the rule set, will be kept unchanged.
         The default (keep=False) is to remove those atoms.
         """
-        product = ""
-        default = ""
-        for c in self.product:
-            if keep:
-                default=c
-            product += rule.get(c, default)
-        return product
+        if keep:
+            return ''.join([ rule.get(c, c) for c in self.product ])
+        else:
+            return ''.join([ rule.get(c, '') for c in self.product ])
 
     def grow (self, ngen=1):
         for gen in range(ngen):
@@ -71,6 +76,181 @@ class Lima(object):
             self.gen += 1
         return self.product
 
+class LSystem(object):
+    """A Lindenmayer system with a compiled product.
+
+    The product of the LSystem is stored as an int array of tokens, with
+    an optional float parameter for each token. All tokens of a generation
+    are rewritten at once with array operations.
+
+    Parameters:
+
+    - `axiom`: the initial product, a successor as described below.
+    - `rules`: dict: the production rules. The keys are the symbols, the
+      values are either a successor or a list of tuples (probability,
+      successor) for a stochastic rule. In the latter case, one of the
+      successors is chosen at random for each occurrence of the symbol.
+      Symbols without a rule are kept unchanged, with their parameter.
+    - `seed`: int: seed for the random generator used for the stochastic
+      rules. Each LSystem has its own random generator, so that
+      independent systems can be grown at the same time.
+
+    A successor is either a string, where each character is a symbol
+    without parameter, or a list of items. Each item is either a symbol or
+    a tuple (symbol,param). The param is a float or a function which
+    computes the parameter from the array of parameters of the
+    predecessors. This allows parametric rules without evaluating strings.
+
+    The parameters are used by the turtle commands in :meth:`segments`:
+    the parameter of a token replaces the argument of its command.
+
+    Example:
+
+    >>> L = LSystem('F', {'F': 'F*F//F*F'})
+    >>> print(L.grow(2))
+    F*F//F*F*F*F//F*F//F*F//F*F*F*F//F*F
+    >>> L = LSystem([('F',1.)], {'F': [('F',lambda x:x/3), '*',
+    ...     ('F',lambda x:x/3)]})
+    >>> print(L.grow(1))
+    F(0.333333)*F(0.333333)
+    """
+
+    def __init__(self,axiom,rules={},seed=None):
+        self.symbols = []
+        self.code = {}
+        self.rng = np.random.RandomState(seed)
+        self.rules = {}
+        for sym in rules:
+            rule = rules[sym]
+            if isinstance(rule, list) and len(rule) > 0 and isinstance(rule[0], tuple) and not isinstance(rule[0][0], str):
+                prob = np.array([ r[0] for r in rule ], dtype=float)
+                succ = [ self._compile(r[1]) for r in rule ]
+            else:
+                prob = np.ones(1)
+                succ = [ self._compile(rule) ]
+            self.rules[self._symbol(sym)] = (np.cumsum(prob) / prob.sum(), succ)
+        codes, params = self._compile(axiom)
+        self.axiom = (codes, np.array([ np.nan if p is None or callable(p) else p for p in params ]))
+        self.tokens, self.params = self.axiom
+        self.gen = 0
+
+
+    def _symbol(self, sym):
+        """Return the code of a symbol, adding it if it is new"""
+        if sym not in self.code:
+            self.code[sym] = len(self.symbols)
+            self.symbols.append(sym)
+        return self.code[sym]
+
+
+    def _compile(self, succ):
+        """Compile a successor into a (codes,params) tuple"""
+        if isinstance(succ, str):
+            succ = list(succ)
+        codes, params = [], []
+        for item in succ:
+            if isinstance(item, tuple):
+                sym, param = item
+            else:
+                sym, param = item, None
+            codes.append(self._symbol(sym))
+            params.append(param)
+        return np.array(codes, dtype=int), params
+
+
+    def grow(self, ngen=1):
+        """Grow the product over ngen generations.
+
+        Returns the product as a string (see :meth:`product`).
+        """
+        for gen in range(ngen):
+            self._rewrite()
+            self.gen += 1
+        return self.product()
+
+
+    def _rewrite(self):
+        """Rewrite all tokens of the product once"""
+        tokens, params = self.tokens, self.params
+        n = len(tokens)
+        # Select the successor for each token: the variants of all
+        # rules are numbered; variant -1 keeps the token.
+        variants = []
+        var = -np.ones(n, dtype=int)
+        for code in self.rules:
+            prob, succ = self.rules[code]
+            w = np.where(tokens == code)[0]
+            if len(succ) > 1:
+                choice = np.searchsorted(prob, self.rng.random_sample(len(w)), side='right')
+                choice = np.minimum(choice, len(succ)-1)
+            else:
+                choice = 0
+            var[w] = len(variants) + choice
+            variants.extend(succ)
+        # Lengths of the successors
+        length = np.array([ len(v[0]) for v in variants ] + [1], dtype=int)
+        out = length[var]
+        start = np.cumsum(out) - out
+        new_tokens = np.repeat(tokens, out)
+        new_params = np.full(out.sum(), np.nan)
+        keep = var < 0
+        new_params[start[keep]] = params[keep]
+        for i, (codes, pars) in enumerate(variants):
+            w = np.where(var == i)[0]
+            if len(w) == 0:
+                continue
+            for k, (code, par) in enumerate(zip(codes, pars)):
+                pos = start[w] + k
+                new_tokens[pos] = code
+                if callable(par):
+                    new_params[pos] = par(params[w])
+                elif par is not None:
+                    new_params[pos] = par
+        self.tokens, self.params = new_tokens, new_params
+
+
+    def product(self):
+        """Return the product as a string.
+
+        Tokens with a parameter are shown as symbol(param).
+        """
+        sym = np.array(self.symbols, dtype=object)[self.tokens]
+        return ''.join([ s if np.isnan(p) else "%s(%g)" % (s, p)
+                         for s, p in zip(sym, self.params) ])
+
+
+    def segments(self,turtlecmds,pos=(0.,0.),angle=0.):
+        """Draw the product with the turtle.
+
+        Parameters:
+
+        - `turtlecmds`: dict: maps symbols on turtle commands, as accepted
+          by :func:`turtle.compileCommand`. Symbols not in the dict are
+          ignored.
+        - `pos`, `angle`: the start position and direction of the turtle.
+
+        Returns a float array (nseg,2,3) with the line segments drawn by
+        the turtle.
+        """
+        cmds = turtle.compileCommands(turtlecmds)
+        kind = np.zeros(len(self.symbols), dtype=int)
+        value = np.zeros(len(self.symbols))
+        for i, sym in enumerate(self.symbols):
+            kind[i], value[i] = cmds.get(sym, (turtle.NOP, 0.))
+        value = np.where(np.isnan(self.params), value[self.tokens], self.params)
+        return turtle.segments(kind[self.tokens], value, pos, angle)
+
+
+    def formex(self,turtlecmds,pos=(0.,0.),angle=0.):
+        """Return the product drawn by the turtle as a Formex.
+
+        Parameters are like for :meth:`segments`. Returns a plex-2 Formex.
+        Use its toMesh method to get a Mesh.
+        """
+        from pyformex.formex import Formex
+        return Formex(self.segments(turtlecmds, pos, angle), eltype='line2')
+
+
 def lima(axiom,rules,level,turtlecmds,glob=None):
     """Create a list of connected points using a Lindenmayer system.
 
@@ -84,7 +264,22 @@ def lima(axiom,rules,level,turtlecmds,glob=None):
     single generation member. If you intend to draw multiple generations
     of the same Lima, it is better to use the grow() and translate() methods
     directly.
+
+    Returns a list of line segments, each a pair of 2D points.
+    If the turtle commands can be compiled (see
+    :func:`turtle.compileCommand`) and no glob is specified, the
+    segments are computed with the :class:`LSystem` engine. Otherwise
+    the turtle script is played.
     """
+    if glob is None:
+        try:
+            turtle.compileCommands(turtlecmds)
+        except ValueError:
+            pass
+        else:
+            A = LSystem(axiom, rules)
+            A.grow(level)
+            return A.segments(turtlecmds)[..., :2].tolist()
     A = Lima(axiom, rules)
     A.grow(level)
     scr = "reset();"+A.translate(turtlecmds, keep=False)
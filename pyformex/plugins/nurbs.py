@@ -234,9 +234,11 @@ class Geometry4(object):
     def __init__(self):
         """Initialize a Geometry4"""
         self.attrib = Attributes()
+        self._cache = {}
 
     def scale(self,*args,**kargs):
         self.coords[..., :3] = Coords(self.coords[..., :3]).scale(*args,**kargs)
+        self._cache = {}
         return self
 
 
@@ -1123,7 +1125,9 @@ class NurbsCurve(Geometry4):
 
         Parameters:
 
-        - `P`: Coords-like (npts,3): one or more points is space.
+        - `P`: Coords-like (3,): a point is space.
+
+        Other parameters are like in :meth:`projectPoints`.
 
         Returns a tuple (u,X):
 
@@ -1132,65 +1136,106 @@ class NurbsCurve(Geometry4):
         - `X`: Coords (3,): the base point of the projection of P
           on the NurbsCurve.
 
-        The algorithm is based on the from The Nurbs Book.
-
+        See :meth:`projectPoints` to project many points at once.
         """
         P = at.checkArray(P,(3,),'f','i')
+        u, X, d, conv = self.projectPoints(P.reshape(1, 3), eps1, eps2, maxit, nseed)
+        if not conv[0]:
+            print("Convergence not reached after %s iterations" % maxit)
+        return u[0], X[0]
 
-        # Determine start value from best match of nseed+1 points
-        umin,umax = self.knotu.val[[0,-1]]
-        u = at.uniformParamValues(nseed+1,umin,umax)
-        pts = self.pointsAt(u)
-        i = pts.distanceFromPoint(P).argmin()
-        u0,P0 = u[i],pts[i]
-        #print("Start at point %s : %s" % (u0,P0))
-
-        # Apply Newton's method to minimize distance
-        i = 0
-        ui = u0
-        while i < maxit:
-            i += 1
-            C = self.derivs([ui],2)
-            C0,C1,C2 = C[:,0]
-            CP = (C0-P)
-            CPxCP = np.dot(CP,CP)
-            C1xCP = np.dot(C1,CP)
-            C1xC1 = np.dot(C1,C1)
-            eps1sq = eps1*eps1
-            eps2sq = eps2*eps2
-            # Check convergence
-            chk1 = CPxCP <= eps1sq
-            chk2 = C1xCP / C1xC1 / CPxCP <= eps2sq
-
-            uj = ui - np.dot(C1,CP) / ( np.dot(C2,CP) + np.dot(C1,C1) )
-            # ensure that parameter stays in range
-            if self.closed:
-                while uj < umin:
-                    uj += umax - umin
-                while uj > umax:
-                    uj -= umax - umin
-            else:
-                if uj < umin:
-                    uj = umin
-                if uj > umax:
-                    uj = umax
-
-            # Check convergence
-            chk4 = (uj-ui)**2 * C1xC1 <= eps1sq
-            P0 = self.pointsAt([uj])[0]
-            #print("u[%s] = %s (P=%s) conv=%s" % (i,uj,P0,(chk1,chk2,chk4)))
-
-            if (chk1 or chk2) and chk4:
-                # Converged!
-                break
-            else:
-                # Prepare for next it
-                ui = uj
 
-        if i == maxit:
-            print("Convergence not reached after %s iterations" % maxit)
+    def _curveDerivs(self, u):
+        """Return the points and first and second derivatives at u.
+
+        Unlike :meth:`derivs`, this returns the correct derivatives for
+        rational curves.
+        """
+        ctrl = self.coords.astype(np.double)
+        knots = self.knotu.values().astype(np.double)
+        D = nurbs.curveDerivs(ctrl, knots, np.atleast_1d(u).astype(np.double), 2)
+        return rationalDerivs(D)
+
 
-        return u0,P0
+    def projectPoints(self, P, eps1=1.e-5, eps2=1.e-5, maxit=20, nseed=8):
+        """Project a set of points on the Nurbs curve.
+
+        This can also be used to find the parameter values of points
+        lying on the curve (point inversion).
+
+        Parameters:
+
+        - `P`: Coords-like (npts,3): the points to project.
+        - `eps1`: float: tolerance on the distance: a point P is considered
+          to be on the curve if its distance is smaller than eps1. The
+          iterations also stop if the change in the foot point is smaller
+          than eps1.
+        - `eps2`: float: tolerance on the cosine of the angle between the
+          tangent and the vector from the foot point to P.
+        - `maxit`: int: maximum number of Newton iterations.
+        - `nseed`: int: number of intervals per knot span in the tessellation
+          used to find the initial parameter values. The tessellation is
+          computed once and kept with the curve.
+
+        Returns a tuple (u,X,d,conv):
+
+        - `u`: float array (npts,): parameter values of the foot points.
+        - `X`: Coords (npts,3): the foot points of the projection of P
+          on the NurbsCurve.
+        - `d`: float array (npts,): the distances from P to X.
+        - `conv`: bool array (npts,): True for the points for which the
+          iterations converged.
+
+        All points are iterated together, using the compiled library for
+        the evaluation of the curve derivatives. The algorithm is based on
+        the point inversion from The Nurbs Book.
+
+        Example:
+
+        >>> C = NurbsCurve([[0.,0.,0.],[1.,1.,0.],[2.,0.,0.]],degree=2)
+        >>> u,X,d,conv = C.projectPoints([[1.,1.,0.],[0.,-1.,0.]])
+        >>> print(u, conv)
+        [ 0.5  0. ] [ True  True]
+        >>> print(X)
+        [[ 1.   0.5  0. ]
+         [ 0.   0.   0. ]]
+        >>> print(d)
+        [ 0.5  1. ]
+        """
+        P = Coords(P).reshape(-1, 3).astype(np.double)
+        if ('seeds', nseed) not in self._cache:
+            u = spanParamValues(self.knotu.values(), self.degree, nseed)
+            self._cache['seeds', nseed] = (u, self.pointsAt(u))
+        u, Y = self._cache['seeds', nseed]
+        i, t = closestOnPolyLine(P, Y)
+        u = (u[i] + t * (u[i+1]-u[i])).reshape(-1, 1)
+
+        def derivs(u):
+            C0, C1, C2 = self._curveDerivs(u[:, 0])
+            return C0, C1[:, np.newaxis], C2[:, np.newaxis, np.newaxis]
+
+        prange = [self.urange()]
+        u, conv = projectNewton(P, u, derivs, prange, [self.closed],
+                                eps1, eps2, maxit)
+        u = u[:, 0]
+        X = self.pointsAt(u)
+        d = at.length(X-P)
+        if not self.closed and at.length(Y[-1]-Y[0]) <= eps1:
+            # The curve is geometrically closed: points stuck at one end
+            # may have their foot point near the other end
+            umin, umax = prange[0]
+            w = np.where((u == umin) | (u == umax))[0]
+            if len(w) > 0:
+                u1 = np.where(u[w] == umin, umax, umin).reshape(-1, 1)
+                u1, conv1 = projectNewton(P[w], u1, derivs, prange, [False],
+                                          eps1, eps2, maxit)
+                u1 = u1[:, 0]
+                X1 = self.pointsAt(u1)
+                d1 = at.length(X1-P[w])
+                b = d1 < d[w]
+                w = w[b]
+                u[w], X[w], d[w], conv[w] = u1[b], X1[b], d1[b], conv1[b]
+        return u, X, d, conv
 
 
     def approx(self,ndiv=None,nseg=None,**kargs):
@@ -1200,20 +1245,63 @@ class NurbsCurve(Geometry4):
         through equidistant `ndiv+1` point in parameter space. These points
         may be far from equidistant in Cartesian space.
 
-        If `nseg` is given, a second approximation is computed with `nseg`
-        straight segments of nearly equal length. The lengths are computed
-        based on the first approximation with `ndiv` segments.
+        If `nseg` is given, the curve is approximated by a PolyLine with
+        `nseg` straight segments, through points at equal arc length
+        on the curve (see :meth:`atLength`). `ndiv` is then not used.
         """
         from pyformex.plugins.curve import PolyLine
+        if nseg is not None:
+            return PolyLine(self.pointsAt(self.atLength(nseg)))
         if ndiv is None:
             ndiv = self.N_approx
         umin,umax = self.urange()
         u = at.uniformParamValues(ndiv,umin,umax)
-        PL = PolyLine(self.pointsAt(u))
-        if nseg is not None:
-            u = PL.atLength(nseg)
-            PL = PolyLine(PL.pointsAt(u))
-        return PL
+        return PolyLine(self.pointsAt(u))
+
+
+    def arcLength(self):
+        """Return the arc length table of the curve.
+
+        Returns a :class:`curve.ArcLength` object for the curve, with
+        the distinct knot values as breaks. The table is computed on first
+        use and kept with the curve.
+        """
+        if 'arclength' not in self._cache:
+            umin, umax = self.urange()
+            knots = np.unique(self.knots)
+            breaks = knots[(knots >= umin) & (knots <= umax)]
+            deriv = lambda u: self._curveDerivs(u)[1]
+            self._cache['arclength'] = curve.ArcLength(deriv, breaks)
+        return self._cache['arclength']
+
+
+    def lengths(self):
+        """Return the lengths of the knot spans of the curve."""
+        return self.arcLength().lengths()
+
+
+    def length(self):
+        """Return the total length of the curve."""
+        return self.arcLength().length()
+
+
+    def atLength(self, div):
+        """Returns the parameter values at given relative curve length.
+
+        ``div`` is a list of relative curve lengths (from 0.0 to 1.0).
+        As a convenience, a single integer value may be specified,
+        in which case the relative curve lengths are found by dividing
+        the interval [0.0,1.0] in the specified number of subintervals.
+
+        The function returns an array with the parameter values for the
+        points at the specified relative lengths.
+        """
+        if at.isInt(div):
+            div = np.arange(div+1) / float(div)
+        else:
+            div = np.asarray(div, dtype=np.double)
+        A = self.arcLength()
+        return A.inverse(div * A.length())
 
 
     def actor(self,**kargs):
@@ -1424,6 +1512,79 @@ class NurbsSurface(Geometry4):
         return pts
 
 
+    def _surfaceDerivs(self, u):
+        """Return the points and derivatives up to order 2 at u.
+
+        Returns a float array (3,3,nu,3) like :meth:`derivs` with
+        m=(2,2). Unlike :meth:`derivs`, this returns the correct
+        derivatives for rational surfaces.
+        """
+        ctrl = self.coords.astype(np.double)
+        U = self.knotv.astype(np.double)
+        V = self.knotu.astype(np.double)
+        D = nurbs.surfaceDerivs(ctrl, U, V, np.asarray(u).astype(np.double), 2, 2)
+        return rationalDerivs(D)
+
+
+    def projectPoints(self, P, eps1=1.e-5, eps2=1.e-5, maxit=20, nseed=8):
+        """Project a set of points on the Nurbs surface.
+
+        This can also be used to find the parameter values of points
+        lying on the surface (point inversion).
+
+        Parameters:
+
+        - `P`: Coords-like (npts,3): the points to project.
+        - `eps1`: float: tolerance on the distance: a point P is considered
+          to be on the surface if its distance is smaller than eps1. The
+          iterations also stop if the change in the foot point is smaller
+          than eps1.
+        - `eps2`: float: tolerance on the cosine of the angles between the
+          tangents and the vector from the foot point to P.
+        - `maxit`: int: maximum number of Newton iterations.
+        - `nseed`: int: number of intervals per knot span in both
+          parametric directions of the tessellation used to find the
+          initial parameter values. The tessellation is computed once and
+          kept with the surface.
+
+        Returns a tuple (u,X,d,conv):
+
+        - `u`: float array (npts,2): parameter values of the foot points,
+          in the same order as used by :meth:`pointsAt`.
+        - `X`: Coords (npts,3): the foot points of the projection of P
+          on the NurbsSurface.
+        - `d`: float array (npts,): the distances from P to X.
+        - `conv`: bool array (npts,): True for the points for which the
+          iterations converged.
+
+        All points are iterated together, using the compiled library for
+        the evaluation of the surface derivatives.
+        """
+        P = Coords(P).reshape(-1, 3).astype(np.double)
+        # The first parameter of pointsAt runs over knotv
+        degree = self.degree[::-1]
+        closed = self.closed[::-1]
+        knots = (self.knotv, self.knotu)
+        if ('seeds', nseed) not in self._cache:
+            u, v = [ spanParamValues(k, d, nseed) for k, d in zip(knots, degree) ]
+            uv = np.stack(np.meshgrid(u, v, indexing='ij'), axis=-1).reshape(-1, 2)
+            self._cache['seeds', nseed] = (uv, self.pointsAt(uv))
+        u, X = self._cache['seeds', nseed]
+        u = u[closestPoints(P, X)]
+
+        def derivs(u):
+            D = self._surfaceDerivs(u)
+            S1 = np.stack([D[1,0], D[0,1]], axis=1)
+            S2 = np.stack([np.stack([D[2,0], D[1,1]], axis=1),
+                           np.stack([D[1,1], D[0,2]], axis=1)], axis=1)
+            return D[0,0], S1, S2
+
+        prange = [ [k[d], k[-1-d]] for k, d in zip(knots, degree) ]
+        u, conv = projectNewton(P, u, derivs, prange, closed, eps1, eps2, maxit)
+        X = self.pointsAt(u)
+        return u, X, at.length(X-P), conv
+
+
     def approx(self,ndiv=None,**kargs):
         """Return a Quad4 Mesh approximation of the Nurbs surface
 
@@ -1664,6 +1825,207 @@ def splitBezierCurve(P, u):
     return L,R
 
 
+def rationalDerivs(D):
+    """Compute the derivatives of a rational curve or surface.
+
+    Parameters:
+
+    - `D`: float array (nd,npts,4) or (nd,nd,npts,4): the points and
+      derivatives of a curve or surface in homogeneous coordinates, as
+      obtained from :func:`nurbs.curveDerivs` or :func:`nurbs.surfaceDerivs`.
+
+    Returns a float array (nd,npts,3) or (nd,nd,npts,3) with the points and
+    derivatives in cartesian coordinates. The algorithm is from
+    The Nurbs Book (A4.2 and A4.4).
+
+    >>> D = np.array([[[1.,2.,0.,2.]],[[1.,0.,0.,1.]]])
+    >>> print(rationalDerivs(D))
+    [[[ 0.5   1.    0.  ]]
+    <BLANKLINE>
+     [[ 0.25 -0.5   0.  ]]]
+    """
+    from math import factorial
+    def binomial(n, k):
+        return factorial(n) // factorial(k) // factorial(n-k)
+    A, w = D[..., :3], D[..., 3:]
+    R = np.zeros_like(A)
+    if D.ndim == 3:
+        for k in range(D.shape[0]):
+            v = A[k].copy()
+            for i in range(1, k+1):
+                v -= binomial(k, i) * w[i] * R[k-i]
+            R[k] = v / w[0]
+    else:
+        for k in range(D.shape[0]):
+            for l in range(D.shape[1]):
+                v = A[k,l].copy()
+                for j in range(1, l+1):
+                    v -= binomial(l, j) * w[0,j] * R[k,l-j]
+                for i in range(1, k+1):
+                    v -= binomial(k, i) * w[i,0] * R[k-i,l]
+                    for j in range(1, l+1):
+                        v -= binomial(k, i) * binomial(l, j) * w[i,j] * R[k-i,l-j]
+                R[k,l] = v / w[0,0]
+    return R
+
+
+def spanParamValues(knots,degree,n):
+    """Return parameter values subdividing all the knot spans.
+
+    Parameters:
+
+    - `knots`: float array: the knot vector.
+    - `degree`: int: the degree of the Nurbs.
+    - `n`: int: number of intervals in each (nonzero) knot span.
+
+    Returns a float array with the parameter values dividing each
+    of the knot spans in the valid range of the Nurbs in `n` equal
+    intervals.
+
+    >>> print(spanParamValues([0.,0.,0.,0.5,1.,1.,1.],2,2))
+    [ 0.    0.25  0.5   0.75  1.  ]
+    """
+    knots = np.asarray(knots, dtype=np.double)
+    kn = np.unique(knots[degree:len(knots)-degree])
+    t = np.arange(n) / float(n)
+    u = kn[:-1, np.newaxis] + t * np.diff(kn)[:, np.newaxis]
+    return np.append(u.ravel(), kn[-1])
+
+
+def closestPoints(X,Y,chunk=1000000):
+    """Find the point of Y closest to each of the points of X.
+
+    This is like :func:`geomtools.closest`, but can handle large numbers
+    of points, by processing X in parts, such that not more than
+    `chunk` distances are computed at once.
+
+    Returns an int array (nX,) with the index of the closest point in Y
+    for each point of X.
+    """
+    X = np.asarray(X, dtype=np.double).reshape(-1, 3)
+    Y = np.asarray(Y, dtype=np.double).reshape(-1, 3)
+    Y2 = (Y*Y).sum(axis=-1)
+    n = max(1, chunk // Y.shape[0])
+    ind = np.empty(X.shape[0], dtype=at.Int)
+    for i in range(0, X.shape[0], n):
+        # |X-Y|**2 - |X|**2
+        d = Y2 - 2. * np.dot(X[i:i+n], Y.T)
+        ind[i:i+n] = d.argmin(axis=-1)
+    return ind
+
+
+def closestOnPolyLine(X,Y,chunk=1000000):
+    """Find the closest point on a polyline for each of the points of X.
+
+    Parameters:
+
+    - `X`: float array (nX,3): the points.
+    - `Y`: float array (nY,3): the vertices of an open polyline.
+    - `chunk`: int: the maximum number of distances to compute at once.
+
+    Returns a tuple (ind,t) of arrays with shape (nX,): the index of the
+    closest segment of the polyline and the parameter value along that
+    segment (0 <= t <= 1) of the point closest to X.
+
+    >>> i,t = closestOnPolyLine([[0.5,-1.,0.],[2.,0.25,0.]],
+    ...     [[0.,0.,0.],[1.,0.,0.],[1.,1.,0.]])
+    >>> print(i, t)
+    [0 1] [ 0.5   0.25]
+    """
+    X = np.asarray(X, dtype=np.double).reshape(-1, 3)
+    Y = np.asarray(Y, dtype=np.double).reshape(-1, 3)
+    A = Y[:-1]
+    D = Y[1:] - A
+    D2 = (D*D).sum(axis=-1)
+    D2[D2 == 0.] = 1.
+    n = max(1, chunk // A.shape[0])
+    ind = np.empty(X.shape[0], dtype=at.Int)
+    par = np.empty(X.shape[0])
+    for i in range(0, X.shape[0], n):
+        XA = X[i:i+n, np.newaxis] - A
+        t = np.clip((XA*D).sum(axis=-1) / D2, 0., 1.)
+        d = ((XA - t[..., np.newaxis] * D)**2).sum(axis=-1)
+        j = d.argmin(axis=-1)
+        ind[i:i+n] = j
+        par[i:i+n] = t[np.arange(len(j)), j]
+    return ind, par
+
+
+def projectNewton(P,u,derivs,prange,closed,eps1=1.e-5,eps2=1.e-5,maxit=20):
+    """Project points on a curve or surface with Newton iterations.
+
+    This is the common engine of :meth:`NurbsCurve.projectPoints` and
+    :meth:`NurbsSurface.projectPoints`. All points are iterated together,
+    but points are removed from the iterations as soon as they
+    have converged.
+
+    Parameters:
+
+    - `P`: float array (npts,3): the points to project.
+    - `u`: float array (npts,npar): initial parameter values.
+    - `derivs`: function returning for an array of parameter values
+      (n,npar) a tuple (C,C1,C2) with the points (n,3), the first
+      derivatives (n,npar,3) and the second derivatives (n,npar,npar,3).
+    - `prange`: (npar,2) float array: the parameter ranges.
+    - `closed`: list of npar bools: whether the geometry is closed in the
+      parametric directions.
+    - `eps1`, `eps2`, `maxit`: see :meth:`NurbsCurve.projectPoints`.
+
+    Returns a tuple (u,conv) with the final parameter values (npts,npar)
+    and a bool array (npts,) flagging the converged points.
+    """
+    u = np.array(u, dtype=np.double)
+    npar = u.shape[1]
+    prange = np.asarray(prange, dtype=np.double).reshape(npar, 2)
+    conv = np.zeros(u.shape[0], dtype=bool)
+    act = np.arange(u.shape[0])
+    for it in range(maxit):
+        if len(act) == 0:
+            break
+        ua = u[act]
+        C, C1, C2 = derivs(ua)
+        r = C - P[act]
+        rr = at.length(r)
+        C1r = (C1 * r[:, np.newaxis]).sum(axis=-1)
+        C1l = at.length(C1)
+        # Point coincidence or zero cosine
+        ok = (rr <= eps1) | (np.abs(C1r) <= eps2 * C1l * rr[:, np.newaxis]).all(axis=-1)
+        # Newton step: solve H du = -C1r
+        J = (C1[:, :, np.newaxis] * C1[:, np.newaxis]).sum(axis=-1)
+        H = J + (C2 * r[:, np.newaxis, np.newaxis]).sum(axis=-1)
+        if npar == 1:
+            det = H[:, 0, 0]
+        else:
+            det = H[:, 0, 0] * H[:, 1, 1] - H[:, 0, 1] * H[:, 1, 0]
+        # Use Gauss-Newton where the Hessian is not positive definite
+        bad = (det <= 0.) | (H[:, 0, 0] <= 0.)
+        H[bad] = J[bad]
+        if npar == 1:
+            det = H[:, 0, 0]
+            Hinv = 1. / np.where(det > 0., det, 1.)
+            du = -(Hinv * C1r[:, 0]).reshape(-1, 1)
+        else:
+            det = H[:, 0, 0] * H[:, 1, 1] - H[:, 0, 1] * H[:, 1, 0]
+            Hinv = np.stack([H[:, 1, 1], -H[:, 0, 1], -H[:, 1, 0], H[:, 0, 0]], axis=-1).reshape(-1, 2, 2)
+            Hinv /= np.where(det > 0., det, 1.)[:, np.newaxis, np.newaxis]
+            du = -(Hinv * C1r[:, np.newaxis]).sum(axis=-1)
+        du[det <= 0.] = 0.
+        un = ua + du
+        # Keep the parameters in range
+        for i in range(npar):
+            umin, umax = prange[i]
+            if closed[i]:
+                un[:, i] = umin + np.mod(un[:, i] - umin, umax - umin)
+            else:
+                un[:, i] = np.clip(un[:, i], umin, umax)
+        u[act] = np.where(ok[:, np.newaxis], ua, un)
+        # Small change of the foot point
+        ok |= at.length(((un-ua)[:, :, np.newaxis] * C1).sum(axis=1)) <= eps1
+        conv[act[ok]] = True
+        act = act[~ok]
+    return u, conv
+
+
 def frenet(d1,d2,d3=None):
     """Compute Frenet vectors, curvature and torsion.
 
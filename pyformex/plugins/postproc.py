@@ -74,4 +74,67 @@ def frameScale(nframes=10,cycle='up',shape='linear'):
     return s.astype(float)/nframes
 
 
+# Evaluation of the deformation and coloring done by the FieldActor shader
+
+def deformedCoords(coords,displ,dscale=1.):
+    """Return the coordinates deformed by a scaled displacement field.
+
+    Parameters:
+
+    - `coords`: float array (ncoords,3): the undeformed coordinates.
+    - `displ`: float array (ncoords,3): the displacements.
+    - `dscale`: float: the displacement scale factor.
+
+    Returns a float32 array (ncoords,3) with the coordinates
+    ``coords + dscale * displ``. This is the same computation as done in
+    the vertex shader for a :class:`opengl.drawable.FieldActor`, and can
+    be used to check the results or to render without the shader.
+
+    >>> print(deformedCoords([[0.,0.,0.],[1.,0.,0.]],[[0.,1.,0.],[0.,2.,0.]],0.5))
+    [[ 0.   0.5  0. ]
+     [ 1.   1.   0. ]]
+    """
+    coords = asarray(coords, dtype=float32)
+    displ = asarray(displ, dtype=float32)
+    return coords + float32(dscale) * displ
+
+
+def scalarColors(val,vrange,palet):
+    """Map scalar values to colors using a three color palet.
+
+    Parameters:
+
+    - `val`: float array: the scalar values.
+    - `vrange`: (vmin,vmid,vmax): the values corresponding with the
+      three colors of the palet.
+    - `palet`: float array (3,3): the colors at vmin, vmid and vmax.
+
+    Returns a float32 array with shape val.shape+(3,): the colors are
+    interpolated linearly between vmin and vmid and between vmid and vmax.
+    Values outside the range get the color of the nearest end.
+    This is the same computation as done in the vertex shader for a
+    :class:`opengl.drawable.FieldActor`. It gives the same colors as
+    a linear :class:`gui.colorscale.ColorScale` with the same palet.
+
+    >>> print(scalarColors([-1.,0.,0.5,1.,2.,3.],(0.,1.,2.),
+    ...     [[1.,0.,0.],[0.,1.,0.],[0.,0.,1.]]))
+    [[ 1.   0.   0. ]
+     [ 1.   0.   0. ]
+     [ 0.5  0.5  0. ]
+     [ 0.   1.   0. ]
+     [ 0.   0.   1. ]
+     [ 0.   0.   1. ]]
+    """
+    val = asarray(val, dtype=float32)
+    vmin, vmid, vmax = asarray(vrange, dtype=float32)
+    palet = asarray(palet, dtype=float32).reshape(3, 3)
+    lo = val < vmid
+    d = where(lo, vmid-vmin, vmax-vmid)
+    # With a zero length range, values beyond vmid get the end color
+    x = where(d > 0., abs(val-vmid) / where(d > 0., d, 1.), val != vmid)
+    x = clip(x, 0., 1.)[..., newaxis]
+    c = where(lo[..., newaxis], palet[0], palet[2])
+    return ((1.-x)*palet[1] + x*c).astype(float32)
+
+
 # End
@@ -35,6 +35,7 @@ from pyformex.odict import OrderedDict
 from pyformex.formex import *
 from pyformex.gui.colorscale import ColorScale
 from pyformex.opengl.decors import ColorLegend
+from pyformex.opengl.drawable import FieldActor
 from pyformex.gui.draw import *
 from pyformex.opengl.colors import *
 from pyformex.plugins.postproc import *
@@ -299,7 +300,6 @@ def showResults(nodes,elems,displ,text,val,showref=False,dscale=100.,
             #print("MULTIPLIER %s" % multiplier)
 
         CS = ColorScale('RAINBOW', vmin, vmax, vmid, 1., 1.)
-        cval = array([CS.color(v) for v in val])
         CLA = ColorLegend(CS, 100, 20, 20, 30, 200, scale=multiplier)
         drawActor(CLA)
 
@@ -316,44 +316,38 @@ def showResults(nodes,elems,displ,text,val,showref=False,dscale=100.,
     lights(False)
     transparent(False)
 
-    # create the frames while displaying them
+    # Create one actor per element group. The geometry, displacements
+    # and values are uploaded once; the frames only change the
+    # displacement scale, which is applied in the shader.
+    vrange = None if val is None else scalev
+    actors = [ FieldActor(Mesh(nodes, el, eltype='quad%d'%el.shape[1]),
+                          displ=displ, val=val, vrange=vrange, color='blue')
+               for el in elems ]
     dscale = array(dscale)
-    frames = []   # a place to store the drawn frames
     bboxes = []
-    if sleeptime >= 0:
-        delay(sleeptime)
     for dsc in dscale.flat:
-
-        if displ is None:
-            dnodes = nodes
-        else:
-            dnodes = nodes + dsc * displ
-        deformed = [ Mesh(dnodes, el, eltype='quad%d'%el.shape[1]) for el in elems ]
-        bboxes.append(bbox(deformed))
-        # We store the changing parts of the display, so that we can
-        # easily remove/redisplay them
-        #print(val)
-        if val is None:
-            F = [ draw(df, color='blue', view=None, bbox='last', wait=False) for df in deformed ]
-        else:
-            #print([ df.report() + "\nCOLORS %s" % str(cval[el].shape)  for df,el in zip(deformed,elems) ])
-            F = [ draw(df, color=cval[el], view=None, bbox='last', wait=False) for df, el in zip(deformed, elems) ]
-        T = drawText('Deformation scale = %s' % dsc, (200, 10))
-
-        # remove the last frame
-        # This is a clever trick: we remove the old drawings only after
-        # displaying new ones. This makes the animation a lot smoother
-        # (though the code is less clear and compact).
-        if len(frames) > 0:
-            pf.canvas.removeActor(frames[-1][0])
-            pf.canvas.removeDecoration(frames[-1][2])
-        # add the latest frame to the stored list of frames
-        frames.append((F, [], T))
-        wait()
-
+        for A in actors:
+            A.setScale(dsc)
+            bboxes.append(A.bbox())
+    for A in actors:
+        drawActor(A)
     zoomBbox(bbox(bboxes))
 
-    animateScenes(frames, count, sleeptime)
+    if sleeptime >= 0:
+        delay(sleeptime)
+    T = None
+    while count > 0:
+        count -= 1
+        for dsc in dscale.flat:
+            for A in actors:
+                A.setScale(dsc)
+            # draw the new text before removing the old one
+            TN = drawText('Deformation scale = %s' % dsc, (200, 10))
+            if T is not None:
+                pf.canvas.removeDecoration(T)
+            T = TN
+            pf.canvas.update()
+            wait()
 
 
 def animateScenes(scenes,count=1,sleeptime=None):
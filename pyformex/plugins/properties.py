@@ -31,8 +31,9 @@ from __future__ import absolute_import, division, print_function
 
 import pyformex as pf
 from pyformex.flatkeydb import FlatDB
-from pyformex.mydict import Dict, CDict
+from pyformex.mydict import Dict, CDict, __newobj__
 from pyformex.arraytools import *
+from collections import OrderedDict
 import copy
 
 #################################################################
@@ -493,6 +494,262 @@ def RemoveListItem(l, p):
         del l[i]
 
 
+
+def setItems(value):
+    """Return the list of items in a property set.
+
+    A property set can be a single number, a single set name, or
+    a sequence of those. This always returns a list of the items.
+
+    Examples:
+
+      >>> setItems(3)
+      [3]
+      >>> setItems('Nset_1')
+      ['Nset_1']
+      >>> setItems([1,3,4])
+      [1, 3, 4]
+    """
+    if value is None:
+        return []
+    if isinstance(value, str) or isscalar(value):
+        return [ value ]
+    try:
+        return list(value)
+    except TypeError:
+        return [ value ]
+
+
+class Property(CDict):
+    """A property record in a :class:`PropertyDB`.
+
+    This is a :class:`CDict` that keeps the indexes of the PropertyDB
+    holding it up to date: setting or deleting an item on a Property
+    that is stored in a PropertyDB updates the database indexes.
+    Thus, a property can be freely modified after its creation, while
+    the queries on the database remain correct.
+    """
+
+    def _owner(self):
+        return self.__dict__.get('_owner_', None)
+
+
+    def __setitem__(self, key, value):
+        owner = self._owner()
+        if owner is None:
+            dict.__setitem__(self, key, value)
+        else:
+            owner.unindex(self, key)
+            dict.__setitem__(self, key, value)
+            owner.index(self, key)
+
+
+    def __delitem__(self, key):
+        if key in self:
+            owner = self._owner()
+            if owner is not None:
+                owner.unindex(self, key)
+            dict.__delitem__(self, key)
+
+
+    def update(self,data={},**kargs):
+        for d in (data, kargs):
+            for k in d:
+                self[k] = d[k]
+
+
+    def pop(self, key, *args):
+        if key in self:
+            owner = self._owner()
+            if owner is not None:
+                owner.unindex(self, key)
+        return dict.pop(self, key, *args)
+
+
+    def popitem(self):
+        if len(self) > 0:
+            key = next(iter(self))
+            return key, self.pop(key)
+        return dict.popitem(self)
+
+
+    def clear(self):
+        for key in list(self.keys()):
+            del self[key]
+
+
+    def __reduce__(self):
+        # The database index is not saved with the record
+        state = (dict(self), {'_default_': self._default_})
+        return (__newobj__, (self.__class__,), state)
+
+
+class PropertyIndex(object):
+    """Secondary indexes on a list of property records.
+
+    The index holds, for a list of properties:
+
+    - `attr`: a dict with for every key the positions of the records
+      having a non-None value for that key,
+    - `tag`, `name`, `set`: dicts mapping the tag values, the names and
+      the set items (node/element numbers or set names) to the positions
+      of the records having them.
+
+    The index is kept up to date when records are added with
+    :meth:`add`, and when :class:`Property` records are modified.
+    Records that are not a :class:`Property` (e.g. a plain CDict
+    appended directly to the list) can not report their changes: they
+    are kept apart and checked on every query.
+    """
+
+    fields = ('tag', 'name', 'set')
+
+    def __init__(self, props):
+        self.props = props
+        self.valid = True
+        self.n = 0
+        self.pos = {}
+        self.attr = {}
+        self.table = dict([ (f, {}) for f in self.fields ])
+        self.loose = set()
+        for p in props:
+            self.add(p)
+
+
+    def ok(self, props):
+        """Check that the index is still valid for the list props"""
+        return self.valid and props is self.props and self.n == len(props)
+
+
+    def add(self, p):
+        """Add the record p, which is the last item in the list"""
+        i = self.n
+        self.n += 1
+        self.pos[id(p)] = i
+        if isinstance(p, Property):
+            old = p._owner()
+            if old is not None and old is not self:
+                # A record can only report to one index
+                old.valid = False
+            p.__dict__['_owner_'] = self
+            for key in p:
+                self.index(p, key)
+        else:
+            self.loose.add(i)
+
+
+    def detach(self):
+        """Detach the index from its records"""
+        self.valid = False
+        for p in self.props:
+            if isinstance(p, Property) and p._owner() is self:
+                p.__dict__['_owner_'] = None
+
+
+    def _keys(self, p, key):
+        """Return the index keys for field key of record p"""
+        value = dict.get(p, key)
+        if key == 'set':
+            return setItems(value)
+        else:
+            return [ value ]
+
+
+    def _update(self, p, key, add):
+        i = self.pos[id(p)]
+        if dict.get(p, key) is None:
+            return
+        tables = [ (self.attr, [key]) ]
+        if key in self.fields:
+            tables.append((self.table[key], self._keys(p, key)))
+        for table, keys in tables:
+            for k in keys:
+                try:
+                    if add:
+                        table.setdefault(k, set()).add(i)
+                    else:
+                        s = table.get(k, None)
+                        if s is not None:
+                            s.discard(i)
+                            if not s:
+                                del table[k]
+                except TypeError:
+                    # unhashable values can not be looked up
+                    pass
+
+
+    def index(self, p, key):
+        """Add the field key of record p to the index"""
+        self._update(p, key, True)
+
+
+    def unindex(self, p, key):
+        """Remove the field key of record p from the index"""
+        self._update(p, key, False)
+
+
+    def _lookup(self, field, values):
+        table = self.table[field]
+        s = set()
+        for v in values:
+            try:
+                s |= table.get(v, set())
+            except TypeError:
+                pass
+        return s
+
+
+    def _match(self,p,tag=None,name=None,items=None,attr=[],noattr=[]):
+        """Check the query on a single record, without the index"""
+        if tag is not None and not ('tag' in p and p['tag'] in tag):
+            return False
+        if name is not None and not ('name' in p and p['name'] in name):
+            return False
+        if items is not None:
+            if not [ i for i in setItems(dict.get(p, 'set')) if i in items ]:
+                return False
+        for a in attr:
+            if a not in p or p[a] is None:
+                return False
+        for a in noattr:
+            if a in p and p[a] is not None:
+                return False
+        return True
+
+
+    def select(self,tag=None,name=None,items=None,attr=[],noattr=[]):
+        """Return the positions of the records matching a query.
+
+        Parameters are as in :meth:`PropertyDB.getProp`, except that
+        tag, name and items (the set argument of getProp) are lists
+        (or None).
+
+        Returns a sorted list of positions in the property list.
+        """
+        sel = None
+        for field, values in zip(self.fields, (tag, name, items)):
+            if values is not None:
+                s = self._lookup(field, values)
+                sel = s if sel is None else sel & s
+        for a in attr:
+            s = self.attr.get(a, set())
+            sel = set(s) if sel is None else sel & s
+        if noattr:
+            if sel is None:
+                sel = set(range(self.n))
+            for a in noattr:
+                sel -= self.attr.get(a, set())
+        if self.loose:
+            if sel is None:
+                return list(range(self.n))
+            sel -= self.loose
+            sel |= set([ i for i in self.loose if self._match(
+                self.props[i], tag, name, items, attr, noattr) ])
+        if sel is None:
+            return list(range(self.n))
+        return sorted(sel)
+
+
 class PropertyDB(Dict):
     """A database class for all properties.
 
@@ -511,6 +768,15 @@ class PropertyDB(Dict):
     Materials and sections use their own database for storing. They can be
     specified on creating the property database. If not specified, default
     ones are created from the files distributed with pyFormex.
+
+    The properties of each kind are kept in a list, in the order of their
+    creation. Secondary indexes on the tag, name, set items and attributes
+    of the properties (see :class:`PropertyIndex`) make the queries with
+    :meth:`getProp` independent of the total number of properties.
+    The indexes are maintained when properties are added with
+    :meth:`Prop` (or :meth:`nodeProp`, :meth:`elemProp`, :meth:`bulkProp`),
+    modified, or removed with :meth:`delProp`. If the property lists are
+    changed otherwise, the indexes are rebuilt on the next query.
     """
 
     bound_strings = [ 'XSYMM', 'YSYMM', 'ZSYMM', 'ENCASTRE', 'PINNED' ]
@@ -558,6 +824,18 @@ class PropertyDB(Dict):
             print(p)
 
 
+    def _propIndex(self, kind):
+        """Return the (valid) index for the properties of the given kind"""
+        prop = getattr(self, kind+'prop')
+        index = self.__dict__.setdefault('_index_', {})
+        idx = index.get(kind, None)
+        if idx is None or not idx.ok(prop):
+            if idx is not None:
+                idx.detach()
+            idx = index[kind] = PropertyIndex(prop)
+        return idx
+
+
     def Prop(self,kind='',tag=None,set=None,name=None,**kargs):
         """Create a new property, empty by default.
 
@@ -580,11 +858,12 @@ class PropertyDB(Dict):
         Besides these, any other fields may be defined and will be added
         without checking.
         """
-        d = CDict()
+        d = Property()
         # update with kargs first, to make sure tag,set and nr are sane
         d.update(dict(**kargs))
 
-        prop = getattr(self, kind+'prop')
+        idx = self._propIndex(kind)
+        prop = idx.props
         d.nr = len(prop)
         if tag is not None:
             d.tag = str(tag)
@@ -607,47 +886,179 @@ class PropertyDB(Dict):
             d.set = unique(set)
 
         prop.append(d)
+        idx.add(d)
         return d
 
 
+    def bulkProp(self,kind='',set=None,tag=None,name=None,**kargs):
+        """Create many properties at once.
+
+        This is a fast way to create a large number of properties of the
+        same kind, e.g. a concentrated load on each of a set of nodes.
+
+        Parameters:
+
+        - `kind`: the kind of properties: '', 'n' or 'e'.
+        - `set`: a sequence with a set for each of the new properties.
+          An int array with shape (nprop,) creates properties holding
+          each for a single node/element.
+        - `tag`: a tag for all the properties.
+        - `name`: None or a list of nprop names. If None, names are
+          generated automatically.
+        - `kargs`: the other fields of the properties. Each value is a
+          sequence or array with length nprop: item i is set in
+          property i. For node properties, the values for
+          'cload', 'displ', 'veloc' and 'accel' can be given as an
+          (nprop,6) array: they are converted to lists of (dofid, value)
+          tuples as in :meth:`nodeProp`.
+
+        Returns the list of created properties.
+
+        Example:
+
+          >>> P = PropertyDB()
+          >>> p = P.bulkProp('n',set=[3,5],cload=[[1.,0,0,0,0,0],[0,2.,0,0,0,0]])
+          >>> [ (q.name,q.set,q.cload) for q in p ]
+          [('Nset_0', array([3]), [(0, 1.0)]), ('Nset_1', array([5]), [(1, 2.0)])]
+          >>> P.getProp('n',set=5)[0].nr
+          1
+        """
+        data = dict(kargs)
+        if set is not None:
+            if isinstance(set, ndarray) and set.ndim == 1:
+                data['set'] = list(set.reshape(-1, 1))
+            else:
+                data['set'] = [ unique(setItems(s)) for s in set ]
+        if name is not None:
+            data['name'] = [ str(n) for n in name ]
+        if kind == 'n':
+            for key in [ 'cload', 'displ', 'veloc', 'accel' ]:
+                if key in data:
+                    v = asarray(data[key])
+                    if v.ndim == 2 and v.shape[1] == 6:
+                        v = v.astype(float)
+                        data[key] = [ [ (int(j), float(r[j])) for j in where(r != 0.0)[0] ] for r in v ]
+        nprop = [ len(data[k]) for k in data ]
+        if not nprop:
+            return []
+        nprop = nprop[0]
+        for k in data:
+            if len(data[k]) != nprop:
+                raise ValueError("Field '%s' should have length %s" % (k, nprop))
+        if tag is not None:
+            tag = str(tag)
+
+        idx = self._propIndex(kind)
+        prop = idx.props
+        nr0 = len(prop)
+        new = []
+        for i in range(nprop):
+            d = Property()
+            for k in data:
+                dict.__setitem__(d, k, data[k][i])
+            dict.__setitem__(d, 'nr', nr0+i)
+            if tag is not None:
+                dict.__setitem__(d, 'tag', tag)
+            if name is None:
+                dict.__setitem__(d, 'name', self.autoName(kind, nr0+i))
+            prop.append(d)
+            idx.add(d)
+            new.append(d)
+        return new
+
+
     # This should maybe change to operate on the property keys
     # and finally return the selected keys or properties?
 
-    def getProp(self,kind='',rec=None,tag=None,attr=[],noattr=[],delete=False):
+    def getProp(self,kind='',rec=None,tag=None,attr=[],noattr=[],delete=False,name=None,set=None):
         """Return all properties of type kind matching tag and having attr.
 
         kind is either '', 'n', 'e' or 'm'
         If rec is given, it is a list of record numbers or a single number.
         If a tag or a list of tags is given, only the properties having a
         matching tag attribute are returned.
+        Likewise, name is a name or a list of names, and set is a
+        node/element number or set name, or a list of those: only the
+        properties with a matching name, resp. with any of the given items
+        in their set, are returned.
 
         attr and noattr are lists of attributes. Only the properties having
         all the attributes in attr and none of the properties in noattr are
         returned.
         Attributes whose value is None are treated as non-existing.
 
+        The properties are returned in the order of their record numbers,
+        or in the order of rec if it is specified.
+        The lookup uses the database indexes, so that the query time
+        depends on the number of matching properties rather than on
+        the size of the database.
+
         If delete==True, the returned properties are removed from the database.
         """
-        prop = getattr(self, kind+'prop')
-        if rec is not None:
-            if not isinstance(rec, list):
-                rec = [ rec ]
-            rec = [ i for i in rec if i < len(prop) ]
-            prop = [ prop[i] for i in rec ]
+        idx = self._propIndex(kind)
+        prop = idx.props
         if tag is not None:
             if not isinstance(tag, list):
                 tag = [ tag ]
             tag = [str(t) for t in tag]  # tags are always converted to strings
-            prop = [ p for p in prop if 'tag' in p and p['tag'] in tag ]
-        for a in attr:
-            prop = [ p for p in prop if a in p and p[a] is not None ]
-        for a in noattr:
-            prop = [ p for p in prop if a not in p or p[a] is None ]
+        if name is not None:
+            if not isinstance(name, list):
+                name = [ name ]
+        if set is not None:
+            set = setItems(set)
+        sel = idx.select(tag, name, set, attr, noattr)
+        if rec is not None:
+            if not isinstance(rec, list):
+                rec = [ rec ]
+            if len(sel) < len(prop):
+                ok = dict.fromkeys(sel)
+                rec = [ i for i in rec if i in ok ]
+            sel = [ i for i in rec if i < len(prop) ]
+        prop = [ prop[i] for i in sel ]
         if delete:
             self._delete(prop, kind=kind)
         return prop
 
 
+    def groupProp(self,kind='',by='tag',**kargs):
+        """Return the properties of type kind grouped by the value of a field.
+
+        Parameters:
+
+        - `kind`: the kind of properties: '', 'n' or 'e'.
+        - `by`: the name of the field to group by. Properties not having
+          the field are grouped under the key None.
+        - `kargs`: any other arguments of :meth:`getProp`, to select the
+          properties to group.
+
+        Returns an OrderedDict where the keys are the field values, in
+        sorted order if they can be sorted, else in order of their first
+        appearance. The values are the lists of properties having that
+        field value, in order of their record number.
+
+        Example:
+
+          >>> P = PropertyDB()
+          >>> a = P.Prop(tag='step2',value=1)
+          >>> b = P.Prop(tag='step1',value=2)
+          >>> c = P.Prop(tag='step2')
+          >>> G = P.groupProp(attr=['value'])
+          >>> [ (k,[p.nr for p in G[k]]) for k in G ]
+          [('step1', [1]), ('step2', [0])]
+        """
+        groups = OrderedDict()
+        for p in self.getProp(kind, **kargs):
+            try:
+                groups.setdefault(dict.get(p, by), []).append(p)
+            except TypeError:
+                raise ValueError("Can not group by unhashable field '%s'" % by)
+        try:
+            keys = sorted(groups)
+        except TypeError:
+            return groups
+        return OrderedDict([ (k, groups[k]) for k in keys ])
+
+
     def _delete(self,plist,kind=''):
         """Delete the specified properties from the database.
 
@@ -657,9 +1068,12 @@ class PropertyDB(Dict):
         """
         prop = getattr(self, kind+'prop')
         if not isinstance(plist, list):
-            pdel = [ plist ]
-        for p in plist:
-            RemoveListItem(prop, p)
+            plist = [ plist ]
+        pdel = dict([ (id(p), p) for p in plist ])
+        idx = self.__dict__.get('_index_', {}).pop(kind, None)
+        if idx is not None:
+            idx.detach()
+        prop[:] = [ p for p in prop if id(p) not in pdel ]
         self._sanitize(kind)
 
 
@@ -781,6 +1195,12 @@ class PropertyDB(Dict):
             newdict[k] = copy.deepcopy(self[k], memo)
         return newdict
 
+
+    def __reduce__(self):
+        # The indexes are not saved, but rebuilt when needed
+        state = (dict(self), dict([ (k, v) for k, v in self.__dict__.items() if k != '_index_' ]))
+        return (__newobj__, (self.__class__,), state)
+
 ##################################### Test ###########################
 
 if __name__ == '__script__' or  __name__ == '__draw__':
@@ -34,15 +34,24 @@ from pyformex import utils
 import os
 from pyformex.multi import multitask
 
-if not utils.hasExternal('gts-bin'):
-    utils.warn("error_no_gts_bin")
-if not utils.hasExternal('gts-extra'):
-    utils.warn("error_no_gts_extra")
+
+def _checkGts(name):
+    """Warn once if the named gts package is not available.
+
+    The check is postponed until the first use of a gts command,
+    to avoid running the detection when this module is merely imported.
+    """
+    if name not in _gts_checked:
+        _gts_checked.add(name)
+        if not utils.hasExternal(name):
+            utils.warn("error_no_%s" % name.replace('-', '_'))
+
+_gts_checked = set()
 
 
 #
 # gts commands used:
-#   in Debian package: stl2gts gts2stl gtscheck
+#   in Debian package: stl2gts gts2stl
 #   not in Debian package: gtssplit gtscoarsen gtsrefine gtssmooth gtsinside
 #
 
@@ -80,8 +89,9 @@ def boolean(self,surf,op,check=False,verbose=False):
     - `filt`: a filter command to be executed on the gtsset output
     - `ext`: extension of the result file
     - `check`: boolean: check that the surfaces are not self-intersecting;
-      if one of them is, the set of self-intersecting faces is written
-      (as a GtsSurface) on standard output
+      if one of them is, the number of self-intersecting faces is printed
+      and None is returned. The check is done in-process, see
+      :meth:`TriSurface.intersectingFaces`.
     - `verbose`: boolean: print statistics about the surface
 
     Returns: a closed manifold TriSurface
@@ -103,8 +113,9 @@ def intersection(self,surf,check=False,verbose=False):
 
     - `surf`: a closed manifold surface
     - `check`: boolean: check that the surfaces are not self-intersecting;
-      if one of them is, the set of self-intersecting faces is written
-      (as a GtsSurface) on standard output
+      if one of them is, the number of self-intersecting faces is printed
+      and None is returned. The check is done in-process, see
+      :meth:`TriSurface.intersectingFaces`.
     - `verbose`: boolean: print statistics about the surface
 
     Returns: a list of intersection curves.
@@ -125,12 +136,15 @@ def gtsset(self,surf,op,filt='',ext='.tmp',curve=False,check=False,verbose=False
     """
     # import here to avoid circular import
     from pyformex.trisurface import TriSurface
+    _checkGts('gts-bin')
     op = {'+':'union', '-':'diff', '*':'inter'}[op]
+    if check:
+        from pyformex.plugins.surface_boolean import selfIntersecting
+        if selfIntersecting(self, surf):
+            return None
     options = ''
     if curve:
         options += '-i'
-    if check:
-        options += ' -s'
     if not verbose:
         options += ' -v'
     tmp = utils.tempFile(suffix='.gts').name
@@ -169,6 +183,7 @@ def gtsinside(self,pts,dir=0):
     This is not intended to be used directly. Use inside instead
     """
     import os
+    _checkGts('gts-extra')
     S = self.rollAxes(dir)
     P = pts.rollAxes(dir)
     tmp = utils.tempFile(suffix='.gts').name
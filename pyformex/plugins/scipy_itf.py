@@ -75,4 +75,40 @@ def convexHull(points):
 
     return Connectivity(hull,nplex=ndim,eltype='tri3' if ndim==3 else 'line2')
 
+
+def delaunay(points):
+    """Return the Delaunay triangulation of a set of points.
+
+    Parameters:
+
+    - `points`: float array (npoints, 2|3): a set of 2D or 3D point coordinates.
+
+    Returns a :class:`Connectivity` with the indices of the points forming
+    the simplices of the Delaunay triangulation of the point set: 'tet4'
+    elements for a 3D point set, 'tri3' elements for a 2D set.
+    The elements are oriented with a positive volume (area).
+
+    This requires SciPy version 0.12.0 or higher.
+    """
+    software.requireModule('scipy', '0.12.0')
+    from scipy.spatial import Delaunay
+
+    points = at.checkArray(points,ndim=2,kind='f')
+    ndim = points.shape[1]
+    if ndim not in [2,3]:
+        raise ValueError('Expected 2D or 3D coordinate array')
+
+    elems = Delaunay(points).simplices.astype(at.Int)
+    # make the orientation positive
+    x = points[elems].astype(at.float64)
+    x = x[:,1:] - x[:,:1]
+    if ndim == 3:
+        vol = (x[:,0]*at.cross(x[:,1],x[:,2])).sum(axis=-1)
+    else:
+        vol = x[:,0,0]*x[:,1,1] - x[:,0,1]*x[:,1,0]
+    neg = vol < 0.
+    elems[neg,:2] = elems[neg,1::-1]
+
+    return Connectivity(elems,nplex=ndim+1,eltype='tet4' if ndim==3 else 'tri3')
+
 # End
@@ -0,0 +1,946 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+"""Boolean operations on triangulated surfaces.
+
+This module provides the Boolean operations union, difference and
+intersection of the volumes enclosed by closed triangulated surfaces,
+and the computation of the intersection curve of two surfaces, without
+the need for any external program.
+
+The algorithm proceeds as follows:
+
+- The candidate pairs of intersecting triangles are found from a
+  bounding volume hierarchy (:mod:`bvh`).
+- Every edge of one surface that crosses a triangle of the other surface
+  creates an intersection point. These crossings are decided with exact
+  predicates (floating point filters with an exact rational fallback),
+  so that all triangles sharing an edge agree on the topology of the
+  intersection.
+- Each pair of intersecting triangles contributes a segment of the
+  intersection curve, joining two of these points.
+- The cut triangles are split along the intersection curve and
+  retriangulated.
+- The parts of each surface, separated by the intersection curve,
+  are classified as inside or outside the other surface with a winding
+  number test (:meth:`TriSurface.windingNumber`), and the proper parts
+  are stitched together.
+
+Degenerate configurations, like coplanar contacts or vertices of one
+surface lying on the other surface, are resolved by symbolic perturbation:
+the second surface is treated as if it were translated over an
+infinitesimal distance in the direction (1,e,e**2) (with e infinitesimal).
+The result is deterministic and topologically consistent. In the limit,
+the perturbation leaves zero area slivers and overlapping layers where
+the surfaces are coplanar. These are removed when the parts are stitched
+together: coincident faces with opposite normals are clipped with each
+other's edges in their common plane and their overlap is removed, zero
+area triangles are dropped, and the triangles are split at the
+T-junctions where the tessellations of both surfaces meet. The result
+is a closed manifold surface, also if the surfaces have a different
+tessellation in their coplanar regions.
+"""
+from __future__ import absolute_import, division, print_function
+
+from fractions import Fraction
+
+from pyformex import utils
+from pyformex import bvh
+from pyformex.arraytools import *
+
+_eps = 0.5 * finfo(float64).eps
+_orient3d_bound = (7. + 56.*_eps) * _eps
+_cross_bound = (3. + 16.*_eps) * _eps
+
+
+##################### Exact predicates ######################
+
+
+def _exactOrient3d(a, b, c, d):
+    """Exact sign of det[b-a, c-a, d-a] for a single set of points"""
+    a, b, c, d = [ [ Fraction(float(v)) for v in p ] for p in (a, b, c, d) ]
+    u = [ b[i]-a[i] for i in range(3) ]
+    v = [ c[i]-a[i] for i in range(3) ]
+    w = [ d[i]-a[i] for i in range(3) ]
+    det = (u[0]*(v[1]*w[2]-v[2]*w[1]) + u[1]*(v[2]*w[0]-v[0]*w[2]) +
+           u[2]*(v[0]*w[1]-v[1]*w[0]))
+    return (det > 0) - (det < 0)
+
+
+def orient3d(a, b, c, d):
+    """Compute the exact orientation of sets of four points.
+
+    Parameters:
+
+    - `a`, `b`, `c`, `d`: float arrays (n,3): n sets of four points.
+
+    Returns an int array (n,) with the sign of the determinant
+    det[b-a,c-a,d-a]: +1 if d is at the positive side of the plane
+    through a,b,c (where the positive side is the side to which the normal
+    (b-a)x(c-a) points), -1 if it is at the negative side and 0 if the
+    four points are coplanar.
+
+    The sign is first computed in floating point. Where the result is not
+    guaranteed by the error bound of the computation, it is recomputed
+    with exact rational arithmetic.
+
+    >>> a = zeros((3, 3))
+    >>> b, c = a + [1., 0., 0.], a + [0., 1., 0.]
+    >>> orient3d(a, b, c, [[0., 0., 1.], [0.3, 0.3, 0.], [0.1, 0.1, -1e-30]])
+    array([ 1,  0, -1])
+    """
+    a, b, c, d = [ asarray(x, dtype=float64).reshape(-1, 3) for x in (a, b, c, d) ]
+    u, v, w = b-a, c-a, d-a
+    t0, t1, t2 = v[:, 1]*w[:, 2], v[:, 2]*w[:, 0], v[:, 0]*w[:, 1]
+    s0, s1, s2 = v[:, 2]*w[:, 1], v[:, 0]*w[:, 2], v[:, 1]*w[:, 0]
+    det = u[:, 0]*(t0-s0) + u[:, 1]*(t1-s1) + u[:, 2]*(t2-s2)
+    perm = (abs(u[:, 0])*(abs(t0)+abs(s0)) + abs(u[:, 1])*(abs(t1)+abs(s1)) +
+            abs(u[:, 2])*(abs(t2)+abs(s2)))
+    s = sign(det).astype(int)
+    for i in where(abs(det) <= _orient3d_bound*perm)[0]:
+        s[i] = _exactOrient3d(a[i], b[i], c[i], d[i])
+    return s
+
+
+def crossSign(a0, a1, b0, b1):
+    """Compute the exact signs of the components of cross products.
+
+    Returns an int array (n,3) with the signs of the components of the
+    cross products (a1-a0) x (b1-b0), where all of a0, a1, b0, b1 are
+    float arrays (n,3). The computation is exact, like in :func:`orient3d`.
+
+    >>> crossSign([[0., 0., 0.]], [[1., 0., 0.]], [[0., 0., 0.]], [[0., 1., 0.]])
+    array([[0, 0, 1]])
+    """
+    a0, a1, b0, b1 = [ asarray(x, dtype=float64).reshape(-1, 3) for x in (a0, a1, b0, b1) ]
+    u, v = a1-a0, b1-b0
+    s = empty((len(u), 3), dtype=int)
+    for k in range(3):
+        i, j = (k+1) % 3, (k+2) % 3
+        p, q = u[:, i]*v[:, j], u[:, j]*v[:, i]
+        s[:, k] = sign(p-q)
+        for r in where(abs(p-q) <= _cross_bound*(abs(p)+abs(q)))[0]:
+            f = [ Fraction(float(x[r, m])) for x in (a0, a1, b0, b1) for m in (i, j) ]
+            c = (f[2]-f[0])*(f[7]-f[5]) - (f[3]-f[1])*(f[6]-f[4])
+            s[r, k] = (c > 0) - (c < 0)
+    return s
+
+
+def _firstNonzero(*signs):
+    """Return the first nonzero value of a sequence of sign arrays"""
+    res = signs[0].copy()
+    for s in signs[1:]:
+        res = where(res == 0, s, res)
+    return res
+
+
+def _planeSide(t0, t1, t2, x, xpert):
+    """Side of the points x wrt. the planes of the triangles (t0,t1,t2)
+
+    If xpert is True, the points are perturbed, else the triangles.
+    """
+    n = crossSign(t0, t1, t0, t2)
+    if not xpert:
+        n = -n
+    return _firstNonzero(orient3d(t0, t1, t2, x), n[:, 0], n[:, 1], n[:, 2])
+
+
+def _edgeSide(p, q, ti, tj, gi, gj, tpert):
+    """Orientation of the edge (p,q) wrt. the triangle edge (ti,tj)
+
+    If tpert is True, the triangle edge is perturbed, else the edge (p,q).
+    gi and gj are the global numbers of ti and tj, used as a final
+    (antisymmetric) tie break for parallel coplanar edges.
+    """
+    c = crossSign(ti, tj, p, q)
+    if not tpert:
+        c = -c
+    return _firstNonzero(orient3d(p, q, ti, tj), c[:, 0], c[:, 1], c[:, 2],
+                         where(gi < gj, 1, -1))
+
+
+def _edgeCrossesFace(X, edges, faces, epert):
+    """Check whether the edges cross the triangles.
+
+    edges and faces are global vertex numbers. If epert is True, the
+    edges belong to the perturbed surface, else the faces do.
+    Returns a bool array.
+    """
+    p, q = X[edges[:, 0]], X[edges[:, 1]]
+    t = X[faces]
+    ok = (_planeSide(t[:, 0], t[:, 1], t[:, 2], p, epert) !=
+          _planeSide(t[:, 0], t[:, 1], t[:, 2], q, epert))
+    w = where(ok)[0]
+    p, q, t, f = p[w], q[w], t[w], faces[w]
+    s = [ _edgeSide(p, q, t[:, i], t[:, j], f[:, i], f[:, j], not epert)
+          for i, j in [(0, 1), (1, 2), (2, 0)] ]
+    ok[w] = (s[0] == s[1]) & (s[1] == s[2])
+    return ok
+
+
+##################### Intersection ######################
+
+
+def _edges(F):
+    """Return the unique edges of triangles F and the face edge table.
+
+    The edges have their lowest vertex number first. Edge k of a face
+    goes from vertex k to vertex k+1.
+    """
+    e = sort(F[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=-1).astype(int64)
+    N = int(F.max()) + 1
+    ukey, inv = unique(e[:, 0]*N + e[:, 1], return_inverse=True)
+    return column_stack([ukey // N, ukey % N]).astype(Int), inv.reshape(-1, 3)
+
+
+class _Intersection(object):
+    """The intersection of two triangulated surfaces.
+
+    Attributes:
+
+    - `X`: float array: the coordinates of the vertices of A, followed by
+      those of B and the intersection points,
+    - `F`: a list of the two int arrays with the triangles of A and B,
+      in global vertex numbers,
+    - `edges`, `fe`: lists with the unique edges and face edge tables of
+      A and B,
+    - `epts`: list of tuples (edge, t, pid) with the intersection points
+      on the edges of A, resp. B: the edge number, the parameter value
+      along the edge and the global point number,
+    - `segs`: int array (nsegs,2): the segments of the intersection curve,
+    - `sface`: int array (nsegs,2): the faces of A and B containing the
+      segments.
+    """
+
+    def __init__(self, A, B):
+        XA = asarray(A.coords, dtype=float64)
+        XB = asarray(B.coords, dtype=float64)
+        nA, nB = len(XA), len(XB)
+        FA = asarray(A.elems).astype(Int)
+        FB = asarray(B.elems).astype(Int) + nA
+        X = concatenate([XA, XB])
+        self.F = [FA, FB]
+        eA, feA = _edges(FA)
+        eB, feB = _edges(FB)
+        self.edges, self.fe = [eA, eB], [feA, feB]
+        pairs = bvh.BVH(bvh.boxes(X[FA])).overlapPairs(bvh.BVH(bvh.boxes(X[FB])))
+        a, b = pairs.T
+        npt = nA + nB
+        pids = []
+        self.epts = []
+        # Edges of one surface crossing faces of the other
+        for edges, fe, e, f, Ff, nf, epert in [
+            (eA, feA, a, b, FB, len(FB), False),
+            (eB, feB, b, a, FA, len(FA), True)]:
+            key = unique((fe[e]*nf + f.reshape(-1, 1)).ravel())
+            ce, cf = key // nf, key % nf
+            ok = _edgeCrossesFace(X, edges[ce], Ff[cf], epert)
+            ce, cf = ce[ok], cf[ok]
+            # The intersection points
+            p, q = X[edges[ce, 0]], X[edges[ce, 1]]
+            t = X[Ff[cf]]
+            n = cross(t[:, 1]-t[:, 0], t[:, 2]-t[:, 0])
+            dp = (n*(p-t[:, 0])).sum(axis=-1)
+            dq = (n*(q-t[:, 0])).sum(axis=-1)
+            d = dp - dq
+            s = where(d != 0., dp / where(d != 0., d, 1.), 0.5).clip(0., 1.)
+            X = concatenate([X, p + s.reshape(-1, 1)*(q-p)])
+            pid = npt + arange(len(ce))
+            npt += len(ce)
+            self.epts.append((ce, s, pid))
+            # The points of the pairs
+            i = searchsorted(key[ok], fe[e]*nf + f.reshape(-1, 1)).clip(max=max(len(pid)-1, 0))
+            pp = -ones(fe[e].shape, dtype=Int)
+            if len(pid) > 0:
+                found = key[ok][i] == fe[e]*nf + f.reshape(-1, 1)
+                pp[found] = pid[i[found]]
+            pids.append(pp)
+        self.X = X
+        pp = column_stack(pids) if len(pairs) > 0 else zeros((0, 6), dtype=Int)
+        cnt = (pp >= 0).sum(axis=-1)
+        if (cnt % 2 != 0).any():
+            utils.warn("warn_boolean_inconsistent")
+        ok = cnt == 2
+        self.segs = sort(pp[ok], axis=-1)[:, -2:]
+        self.sface = pairs[ok]
+
+
+    def curve(self):
+        """Return the intersection curve as a Mesh of line segments"""
+        from pyformex.mesh import Mesh
+        from pyformex.coords import Coords
+        return Mesh(Coords(self.X), self.segs, eltype='line2').compact()
+
+
+    def split(self, i):
+        """Split the faces of surface i along the intersection curve.
+
+        Returns a tuple (F, org) with the triangles of the surface with
+        the cut faces replaced by their retriangulation, and the original
+        face number of each triangle.
+        """
+        F, fe, edges = self.F[i], self.fe[i], self.edges[i]
+        ce, s, pid = self.epts[i]
+        sf = self.sface[:, i]
+        cut = unique(sf)
+        # intersection points per edge, sorted along the edge
+        order = lexsort([s, ce])
+        ce, s, pid = ce[order], s[order], pid[order]
+        ptr = searchsorted(ce, arange(len(edges)+1))
+        # segments per face
+        order = argsort(sf, kind='mergesort')
+        segs, sf = self.segs[order], sf[order]
+        sptr = searchsorted(sf, cut)
+        sptr = append(sptr, len(sf))
+        tris = []
+        org = []
+        for k, f in enumerate(cut):
+            bnd = []
+            for j in range(3):
+                v0 = F[f, j]
+                e = fe[f, j]
+                bnd.append(v0)
+                pts = pid[ptr[e]:ptr[e+1]]
+                if edges[e, 0] != v0:
+                    pts = pts[::-1]
+                bnd.extend(pts)
+            t = _splitFace(self.X, F[f], bnd, segs[sptr[k]:sptr[k+1]])
+            tris.append(t)
+            org.append(full(len(t), f))
+        keep = ones(len(F), dtype=bool)
+        keep[cut] = False
+        if tris:
+            newF = concatenate([F[keep]] + tris)
+            org = concatenate([where(keep)[0]] + org)
+        else:
+            newF, org = F, arange(len(F))
+        return newF, org
+
+
+##################### Retriangulation ######################
+
+
+def _orient2d(p, q, r):
+    """Twice the signed area of the 2D triangle (p,q,r)"""
+    return (q[0]-p[0])*(r[1]-p[1]) - (q[1]-p[1])*(r[0]-p[0])
+
+
+def _chains(segs, boundary):
+    """Split a set of segments into chains and loops.
+
+    Chains start and end at points in the boundary set. Loops are closed
+    chains. Returns two lists of lists of point numbers.
+    """
+    nbrs = {}
+    for p, q in segs:
+        nbrs.setdefault(p, []).append(q)
+        nbrs.setdefault(q, []).append(p)
+    done = set()
+    chains, loops = [], []
+    starts = [ p for p in nbrs if p in boundary ]
+    for p in sorted(starts) + sorted(nbrs):
+        if p in done:
+            continue
+        chain = [p]
+        done.add(p)
+        while True:
+            nxt = [ q for q in nbrs[chain[-1]] if q not in done ]
+            if not nxt:
+                break
+            chain.append(nxt[0])
+            done.add(nxt[0])
+        if chain[0] in boundary:
+            if chain[-1] in boundary and len(chain) > 1:
+                chains.append(chain)
+            else:
+                utils.warn("warn_boolean_open_curve")
+        elif len(chain) > 2:
+            loops.append(chain)
+    return chains, loops
+
+
+def _pointInPolygon(x, poly):
+    """Check whether the 2D point x is inside the polygon (ray casting)"""
+    inside = False
+    n = len(poly)
+    for i in range(n):
+        p, q = poly[i-1], poly[i]
+        if (p[1] > x[1]) != (q[1] > x[1]):
+            if x[0] < p[0] + (x[1]-p[1]) * (q[0]-p[0]) / (q[1]-p[1]):
+                inside = not inside
+    return inside
+
+
+def _segmentsCross(p, q, r, s):
+    """Check whether the 2D segments (p,q) and (r,s) properly cross"""
+    return (_orient2d(p, q, r)*_orient2d(p, q, s) < 0. and
+            _orient2d(r, s, p)*_orient2d(r, s, q) < 0.)
+
+
+def _bridge(region, loop, P):
+    """Connect a hole to the outer boundary of a region.
+
+    region is the (counterclockwise) outer boundary, loop the clockwise
+    hole. Returns a single weakly simple polygon.
+    """
+    m = loop[0]
+    edges = list(zip(region, region[1:]+region[:1])) + list(zip(loop, loop[1:]+loop[:1]))
+    cand = sorted(range(len(region)), key=lambda i: ((P[region[i]]-P[m])**2).sum())
+    for i in cand:
+        v = region[i]
+        if not any(_segmentsCross(P[v], P[m], P[a], P[b]) for a, b in edges
+                   if v not in (a, b) and m not in (a, b)):
+            break
+    else:
+        i = cand[0]
+    return region[:i+1] + loop + [m] + region[i:]
+
+
+def _earClip(poly, P, avoid=()):
+    """Triangulate a (weakly) simple counterclockwise polygon.
+
+    `avoid` is a set of diagonals (as frozensets of two vertices) that
+    should not be created unless there is no other choice. These are
+    chords that might also be created in a neighboring region.
+    """
+    poly = list(poly)
+    tris = []
+    while len(poly) > 3:
+        n = len(poly)
+        best, bestkey = None, None
+        for i in range(n):
+            a, b, c = poly[i-1], poly[i], poly[(i+1) % n]
+            area = _orient2d(P[a], P[b], P[c])
+            free = frozenset((a, c)) not in avoid
+            u, w = P[a]-P[b], P[c]-P[b]
+            uw = dot(u, u) * dot(w, w)
+            if area*area <= 1.e-18*uw and (dot(u, w) > 0. or uw == 0.):
+                # a spike or a zero length edge: the ear covers nothing
+                ok = free = True
+            else:
+                ok = area > 0.
+            if ok and area > 0.:
+                for v in poly:
+                    if v in (a, b, c):
+                        continue
+                    x = P[v]
+                    if (_orient2d(P[a], P[b], x) >= 0. and _orient2d(P[b], P[c], x) >= 0. and
+                        _orient2d(P[c], P[a], x) >= 0.):
+                        ok = False
+                        break
+            key = (ok and free, free and area > 0., ok, area)
+            if bestkey is None or key > bestkey:
+                best, bestkey = i, key
+            if ok and free:
+                break
+        i = best
+        tris.append([poly[i-1], poly[i], poly[(i+1) % n]])
+        del poly[i]
+    tris.append(poly)
+    return tris
+
+
+def _splitFace(X, face, bnd, segs):
+    """Retriangulate a face along the segments of the intersection curve.
+
+    - `X`: the coordinates of all points,
+    - `face`: the three vertices of the triangle,
+    - `bnd`: the boundary of the triangle, including the intersection
+      points on its edges,
+    - `segs`: the segments of the intersection curve inside the face.
+
+    Returns an int array (ntri,3) with the new triangles.
+    """
+    # Project on the coordinate plane most parallel to the triangle,
+    # keeping the orientation
+    x = X[face]
+    n = cross(x[1]-x[0], x[2]-x[0])
+    k = abs(n).argmax()
+    ax = [(k+1) % 3, (k+2) % 3]
+    if n[k] < 0.:
+        ax = ax[::-1]
+    pts = unique(concatenate([bnd, segs.ravel()]))
+    P = dict(zip(pts, X[pts][:, ax]))
+    chains, loops = _chains(segs, set(bnd))
+    regions = [list(bnd)]
+    # Split the regions along the chains
+    for chain in chains:
+        p, q = chain[0], chain[-1]
+        for r, R in enumerate(regions):
+            if p in R and q in R:
+                i, j = R.index(p), R.index(q)
+                if i < j:
+                    R1 = R[i:j+1] + chain[-2:0:-1]
+                    R2 = R[j:] + R[:i+1] + chain[1:-1]
+                else:
+                    R1 = R[i:] + R[:j+1] + chain[-2:0:-1]
+                    R2 = R[j:i+1] + chain[1:-1]
+                regions[r:r+1] = [R1, R2]
+                break
+    # Insert the loops, largest first
+    area = lambda L: sum([ _orient2d(P[L[0]], P[L[i]], P[L[i+1]]) for i in range(1, len(L)-1) ])
+    for L in sorted(loops, key=lambda L: -abs(area(L))):
+        if area(L) < 0.:
+            L = L[::-1]
+        for r, R in enumerate(regions):
+            if _pointInPolygon(P[L[0]], [ P[v] for v in R ]):
+                break
+        else:
+            r = 0
+        regions[r] = _bridge(regions[r], L[::-1], P)
+        regions.append(L)
+    # Avoid chords between two points of the same chain or the same edge
+    avoid = set()
+    groups = chains + loops
+    ibnd = [ i for i, v in enumerate(bnd) if v in face ] + [len(bnd)]
+    bnd = list(bnd) + [bnd[0]]
+    groups += [ bnd[i:j+1] for i, j in zip(ibnd[:-1], ibnd[1:]) ]
+    for G in groups:
+        avoid.update(frozenset((G[i], G[j])) for i in range(len(G))
+                     for j in range(i+2, len(G)))
+    tris = []
+    for R in regions:
+        tris.extend(_earClip(R, P, avoid))
+    return array(tris, dtype=Int).reshape(-1, 3)
+
+
+##################### Classification ######################
+
+
+def _connected(n, a, b):
+    """Label the connected sets of n items connected by the pairs (a,b)
+
+    Returns an int array (n,) with the lowest item number of the set
+    containing each item.
+    """
+    label = arange(n)
+    while len(a) > 0:
+        m = minimum(label[a], label[b])
+        nlabel = label.copy()
+        minimum.at(nlabel, a, m)
+        minimum.at(nlabel, b, m)
+        nlabel = nlabel[nlabel]
+        if (nlabel == label).all():
+            break
+        label = nlabel
+    return label
+
+
+def _components(F, cut):
+    """Find the components of the triangles F separated by the cut edges"""
+    nf = len(F)
+    e = sort(F[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=-1).astype(int64)
+    N = int(max(F.max(), cut.max() if len(cut) > 0 else 0)) + 1
+    key = e[:, 0]*N + e[:, 1]
+    ckey = sort(cut, axis=-1).astype(int64)
+    ckey = ckey[:, 0]*N + ckey[:, 1]
+    free = ~in1d(key, ckey)
+    order = argsort(key, kind='mergesort')
+    skey = key[order]
+    # Only connect across manifold edges: in degenerate cases, a chord
+    # may be created in two regions of a split face
+    inv = unique(skey, return_inverse=True)[1].ravel()
+    manifold = (bincount(inv) == 2)[inv]
+    same = (skey[1:] == skey[:-1]) & free[order[1:]] & manifold[1:]
+    a, b = order[:-1][same] // 3, order[1:][same] // 3
+    return unique(_connected(nf, a, b), return_inverse=True)[1]
+
+
+def _inside(X, F, cut, S, shift):
+    """Classify the components of triangles F as inside/outside surface S.
+
+    The components are separated by the edges `cut`. The winding number
+    of S is evaluated at the centroid of the largest triangle of each
+    component, shifted over `shift`. The shift is taken in the direction
+    of the perturbation, so that a point on the surface S is classified
+    in accordance with the topology of the intersection.
+    Returns a tuple (comp, inside) with the component number of each
+    triangle and a bool array with the inside flag per component.
+    """
+    comp = _components(F, cut)
+    ncomp = comp.max() + 1
+    x = X[F]
+    area = length(cross(x[:, 1]-x[:, 0], x[:, 2]-x[:, 0]))
+    order = lexsort([-area, comp])
+    first = order[searchsorted(comp[order], arange(ncomp))]
+    ctr = x[first].mean(axis=1)
+    w = S.windingNumber(ctr + shift)
+    return comp, w > 0.5
+
+
+##################### Stitching ######################
+
+
+def _fuse(X, atol):
+    """Fuse the points X that are within a distance atol.
+
+    This works in double precision. Points closer than atol (in each
+    coordinate direction) are grouped, and each group is replaced with
+    its first point. Returns the unique points and the index of each
+    point in the unique points.
+    """
+    a, b = bvh.BVH(bvh.boxes(X[:, newaxis])).overlapPairs(atol=atol).T
+    first, inv = unique(_connected(len(X), a, b), return_inverse=True)
+    return X[first], inv.ravel()
+
+
+def _cancel(F, prop):
+    """Remove degenerate triangles and coincident opposite triangles"""
+    ok = (F[:, 0] != F[:, 1]) & (F[:, 1] != F[:, 2]) & (F[:, 2] != F[:, 0])
+    F, prop = F[ok], prop[ok]
+    if len(F) == 0:
+        return F, prop
+    srt = sort(F, axis=-1)
+    key, inv, cnt = unique(srt, axis=0, return_inverse=True, return_counts=True)
+    inv = inv.ravel()
+    rot = (F == srt[:, :1]).argmax(axis=-1)
+    odd = F[arange(len(F)), (rot+1) % 3] != srt[:, 1]
+    nodd = bincount(inv, weights=odd, minlength=len(key))
+    ok = ~((cnt == 2) & (nodd == 1))[inv]
+    return F[ok], prop[ok]
+
+
+def _height(x):
+    """The height of triangles x over their longest edge"""
+    e = roll(x, -1, axis=1) - x
+    return length(cross(e[:, 0], e[:, 1])) / length(e).max(axis=-1)
+
+
+def _clean(P, atol):
+    """Remove duplicate and collinear vertices from a planar polygon"""
+    P = list(P)
+    changed = True
+    while changed and len(P) >= 3:
+        changed = False
+        for k in range(len(P)):
+            a, v, b = P[k-1], P[k], P[(k+1) % len(P)]
+            u = b - a
+            L = length(u)
+            if L <= atol or length(cross(u, v-a)) <= atol * L:
+                del P[k]
+                changed = True
+                break
+    return P if len(P) >= 3 else []
+
+
+def _clip(P, a, m, atol):
+    """Clip a planar polygon P with the half space (x-a).m >= 0
+
+    m is a unit vector. Points within a distance atol of the plane are
+    considered to be inside.
+    """
+    if len(P) == 0:
+        return P
+    f = [ dot(p-a, m) for p in P ]
+    res = []
+    for k in range(len(P)):
+        p, q, fp, fq = P[k-1], P[k], f[k-1], f[k]
+        if (fp >= -atol) != (fq >= -atol):
+            res.append(p + fp / (fp-fq) * (q-p))
+        if fq >= -atol:
+            res.append(q)
+    return res
+
+
+def _subtract(P, T, n, atol):
+    """Subtract a coplanar triangle T from a convex polygon P.
+
+    n is the unit normal of the plane. Returns a list of convex polygons
+    covering P minus T. If T does not overlap P, returns [P].
+    """
+    s = sign(dot(cross(T[1]-T[0], T[2]-T[0]), n))
+    planes = [ (T[k], s*cross(n, T[(k+1) % 3]-T[k])) for k in range(3) ]
+    planes = [ (a, m/length(m)) for a, m in planes ]
+    inside = P
+    for a, m in planes:
+        inside = _clip(inside, a, m, -atol)
+    if not _clean(inside, atol):
+        return [P]
+    pieces = []
+    rest = P
+    for a, m in planes:
+        pieces.append(_clip(rest, a, -m, -atol))
+        rest = _clip(rest, a, m, atol)
+    return [ p for p in pieces if _clean(p, atol) ]
+
+
+def _removeOverlaps(X, F, prop, atol):
+    """Remove the overlap of coincident faces with opposite normals.
+
+    Where two coplanar faces with opposite normals overlap, each of them
+    is clipped with the edges of the other one and the overlapping part is
+    removed from both. This leaves T-junctions, which are removed by
+    :func:`_zip`.
+    """
+    x = X[F]
+    n = cross(x[:, 1]-x[:, 0], x[:, 2]-x[:, 0])
+    n /= length(n).reshape(-1, 1)
+    pairs = bvh.BVH(bvh.boxes(x)).overlapPairs(atol=atol)
+    i, j = pairs.T
+    ok = (n[i]*n[j]).sum(axis=-1) < -0.5
+    i, j = i[ok], j[ok]
+    di = abs(((x[i] - x[j][:, :1]) * n[j][:, newaxis]).sum(axis=-1)).max(axis=-1)
+    dj = abs(((x[j] - x[i][:, :1]) * n[i][:, newaxis]).sum(axis=-1)).max(axis=-1)
+    ok = (di <= atol) & (dj <= atol)
+    i, j = i[ok], j[ok]
+    if len(i) == 0:
+        return X, F, prop
+    other = {}
+    for a, b in zip(concatenate([i, j]), concatenate([j, i])):
+        other.setdefault(a, []).append(b)
+    newX = [X]
+    newF = []
+    newp = []
+    npts = len(X)
+    done = zeros(len(F), dtype=bool)
+    for f in sorted(other):
+        pieces = [ list(x[f]) ]
+        for g in other[f]:
+            pieces = [ q for p in pieces for q in _subtract(p, x[g], n[f], atol) ]
+        done[f] = True
+        for p in pieces:
+            p = _clean(p, atol)
+            if not p:
+                continue
+            newX.append(array(p))
+            ids = npts + arange(len(p))
+            npts += len(p)
+            newF.extend([ (ids[0], ids[k], ids[k+1]) for k in range(1, len(p)-1) ])
+            newp.extend([prop[f]] * (len(p)-2))
+    F = concatenate([F[~done], array(newF, dtype=Int).reshape(-1, 3)])
+    prop = concatenate([prop[~done], array(newp, dtype=prop.dtype)])
+    return concatenate(newX), F, prop
+
+
+def _zip(X, F, prop, atol):
+    """Remove T-junctions from a triangulated surface.
+
+    A T-junction is a vertex lying on an edge of a triangle that does not
+    have that vertex. This happens where the two surfaces of a boolean
+    operation meet in a coplanar region. The triangles are split at the
+    T-junction vertices, until all edges are shared by two triangles with
+    opposite edge direction, or until no more splits are possible.
+    """
+    while len(F) > 0:
+        e = F[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2).astype(int64)
+        N = len(X)
+        free = where(~in1d(e[:, 0]*N + e[:, 1], e[:, 1]*N + e[:, 0]))[0]
+        if len(free) == 0:
+            break
+        cand = unique(e[free])
+        xc = X[cand]
+        split = {}
+        for r in free:
+            f, k = r // 3, r % 3
+            if f in split:
+                continue
+            a, b = e[r]
+            u = X[b] - X[a]
+            L = length(u)
+            d = xc - X[a]
+            s = dot(d, u) / L
+            h = length(cross(d, u)) / L
+            on = (s > atol) & (s < L-atol) & (h <= atol)
+            if on.any():
+                w = where(on)[0]
+                w = w[argsort(s[w])]
+                split[f] = (k, cand[w])
+        if not split:
+            break
+        tris = []
+        props = []
+        for f in split:
+            k, pts = split[f]
+            chain = concatenate([[F[f, k]], pts, [F[f, (k+1) % 3]]])
+            c = F[f, (k+2) % 3]
+            tris.extend([ (chain[m], chain[m+1], c) for m in range(len(chain)-1) ])
+            props.extend([prop[f]] * (len(chain)-1))
+        keep = ones(len(F), dtype=bool)
+        keep[list(split)] = False
+        F = concatenate([F[keep], array(tris, dtype=F.dtype)])
+        prop = concatenate([prop[keep], array(props, dtype=prop.dtype)])
+    return F, prop
+
+
+def _stitch(X, F, prop, atol):
+    """Stitch the retained triangles of both surfaces together.
+
+    The points closer than atol are fused, and the degenerate triangles,
+    coincident faces with opposite normals and zero area slivers (created
+    where the surfaces are coplanar) are removed. Finally the triangles
+    are split at the T-junctions.
+    Returns the points, triangles and props.
+    """
+    X, inv = _fuse(X, atol)
+    F, prop = _cancel(inv[F], prop)
+    if len(F) == 0:
+        return X, F, prop
+    ok = _height(X[F]) > atol
+    X, F, prop = _removeOverlaps(X, F[ok], prop[ok], atol)
+    X, inv = _fuse(X, atol)
+    F, prop = _cancel(inv[F], prop)
+    if len(F) == 0:
+        return X, F, prop
+    ok = _height(X[F]) > atol
+    F, prop = _zip(X, F[ok], prop[ok], atol)
+    return X, F, prop
+
+
+##################### Public functions ######################
+
+
+def selfIntersecting(*surfaces):
+    """Check that none of the surfaces is self-intersecting.
+
+    For each self-intersecting surface, the number of self-intersecting
+    faces is printed (see :meth:`TriSurface.intersectingFaces`).
+    Returns True if any of the surfaces is self-intersecting.
+    """
+    res = False
+    for S in surfaces:
+        pairs = S.intersectingFaces()
+        if len(pairs) > 0:
+            print("The surface has %s self-intersecting faces" % len(unique(pairs)))
+            res = True
+    return res
+
+
+def boolean(self,surf,op,check=False,verbose=False,method='native'):
+    """Perform a boolean operation with another surface.
+
+    Boolean operations between surfaces are a basic operation in
+    free surface modeling. Both surfaces should be closed orientable
+    non-intersecting manifolds.
+    Use the :meth:`check` method to find out.
+
+    The boolean operations are set operations on the enclosed volumes:
+    union('+'), difference('-') or intersection('*').
+
+    Parameters:
+
+    - `surf`: a closed manifold surface
+    - `op`: boolean operation: one of '+', '-' or '*'.
+    - `check`: boolean: check that the surfaces are not self-intersecting;
+      if one of them is, the number of self-intersecting faces is printed
+      and None is returned.
+    - `verbose`: boolean: print statistics about the operation.
+    - `method`: 'native' (default) uses the in-process algorithm of this
+      module, 'gts' uses the external command 'gtsset'
+      (see :func:`pyformex_gts.boolean`).
+
+    Returns a closed manifold TriSurface. The props of the surfaces are
+    transferred to the triangles of the result.
+
+    Example:
+
+    >>> from pyformex.simple import sphere
+    >>> A = sphere(8)
+    >>> B = A.trl(0, 1.)
+    >>> U = A.boolean(B, '+')
+    >>> U.isClosedManifold(), abs(U.volume() - 7.014) < 0.001
+    (True, True)
+    >>> I = A.boolean(B, '*')
+    >>> abs(U.volume() + I.volume() - A.volume() - B.volume()) < 1.e-5
+    True
+    """
+    if method == 'gts':
+        from pyformex.plugins import pyformex_gts
+        return pyformex_gts.boolean(self, surf, op, check=check, verbose=verbose)
+    from pyformex.trisurface import TriSurface
+    if op not in '+-*' or len(op) != 1:
+        raise ValueError("Invalid boolean operation: %s" % op)
+    if check and selfIntersecting(self, surf):
+        return None
+    I = _Intersection(self, surf)
+    shift = -1.e-6 * self.dsize() * array([1., 1.e-3, 1.e-6])
+    parts = []
+    props = []
+    for i, (S, other) in enumerate([(self, surf), (surf, self)]):
+        F, org = I.split(i)
+        comp, inside = _inside(I.X, F, I.segs, other, shift if i == 0 else -shift)
+        if op == '+':
+            keep = ~inside
+        elif op == '*':
+            keep = inside
+        else:
+            keep = inside if i == 1 else ~inside
+        keep = keep[comp]
+        F, org = F[keep], org[keep]
+        if op == '-' and i == 1:
+            F = F[:, ::-1]
+        parts.append(F)
+        props.append(S.prop[org] if S.prop is not None else zeros(len(org), dtype=Int))
+    F = concatenate(parts)
+    prop = concatenate(props)
+    # The input and the result are single precision: anything smaller
+    # than that is merged
+    atol = 10. * finfo(float32).eps * max(self.dsize(), surf.dsize())
+    X, F, prop = _stitch(I.X, F, prop, atol)
+    S = TriSurface(X, F).compact()
+    if self.prop is not None or surf.prop is not None:
+        S.setProp(prop)
+    if verbose:
+        print("Boolean %s: %s intersection segments, %s triangles" % (op, len(I.segs), S.nelems()))
+    return S
+
+
+def intersection(self,surf,check=False,verbose=False,method='native'):
+    """Return the intersection curve of two surfaces.
+
+    Parameters:
+
+    - `surf`: a TriSurface
+    - `check`: boolean: check that the surfaces are not self-intersecting;
+      if one of them is, the number of self-intersecting faces is printed
+      and None is returned.
+    - `verbose`: boolean: print statistics about the intersection.
+    - `method`: 'native' (default) uses the in-process algorithm of this
+      module, 'gts' uses the external command 'gtsset'
+      (see :func:`pyformex_gts.intersection`).
+
+    Returns the intersection curve as a Mesh of line segments (with the
+    'gts' method: a plex-2 Formex). The surfaces need not be closed for
+    computing their intersection curve.
+
+    Example:
+
+    >>> from pyformex.simple import sphere
+    >>> A = sphere(8)
+    >>> C = A.intersection(A.trl(0, 1.))
+    >>> C.elName(), C.nelems() > 0
+    ('line2', True)
+    >>> abs(C.lengths().sum() - 2*pi*sqrt(0.75)) < 0.05
+    True
+    """
+    if method == 'gts':
+        from pyformex.plugins import pyformex_gts
+        return pyformex_gts.intersection(self, surf, check=check, verbose=verbose)
+    if check and selfIntersecting(self, surf):
+        return None
+    C = _Intersection(self, surf).curve()
+    if verbose:
+        print("Intersection curve with %s segments" % C.nelems())
+    return C
+
+
+# End
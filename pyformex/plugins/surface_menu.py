@@ -411,6 +411,22 @@ def showBorder():
             export({'border':coloredB})
         else:
             warning("The surface %s does not have a border" % selection[0])
+
+
+def diagnose():
+    """Check the surface for problems and draw the faces having them."""
+    S = selection.check(single=True)
+    if S:
+        D = S.diagnose()
+        print("Number of faces with problems:")
+        keys = [ k for k in sorted(D.counts) if k != 'border' ]
+        for k in keys:
+            print("  %s: %s" % (k, D.counts[k]))
+        clear()
+        draw(S, color='grey', alpha=0.3)
+        for i, k in enumerate(keys):
+            if D.counts[k] > 0:
+                draw(S.select(D[k]).setProp(i+1))
             forget('border')
     return S
 
@@ -1372,6 +1388,7 @@ def boolean():
     res = askItems([_I('surface 1', choices=surfs),
                     _I('surface 2', choices=surfs),
                     _I('operation', choices=ops),
+                    _I('method', choices=['native', 'gts']),
                     _I('check self intersection', False),
                     _I('verbose', False),
                     ], caption='Boolean Operation')
@@ -1380,7 +1397,7 @@ def boolean():
         SB = pf.PF[res['surface 2']]
         SC = SA.boolean(SB, op=res['operation'].strip()[0],
                         check=res['check self intersection'],
-                        verbose=res['verbose'])
+                        verbose=res['verbose'], method=res['method'])
         export({'__auto__':SC})
         selection.set('__auto__')
         selection.draw()
@@ -1395,6 +1412,7 @@ def intersection():
 
     res = askItems([_I('surface 1', choices=surfs),
                     _I('surface 2', choices=surfs),
+                    _I('method', choices=['native', 'gts']),
                     _I('check self intersection', False),
                     _I('verbose', False),
                     ], caption='Intersection Curve')
@@ -1402,7 +1420,7 @@ def intersection():
         SA = pf.PF[res['surface 1']]
         SB = pf.PF[res['surface 2']]
         SC = SA.intersection(SB, check=res['check self intersection'],
-                             verbose=res['verbose'])
+                             verbose=res['verbose'], method=res['method'])
         export({'__intersection_curve__':SC})
         draw(SC, color=red, linewidth=3)
 
@@ -1498,6 +1516,7 @@ def create_menu():
           ("&Show Feature Edges", showFeatureEdges),
           ]),
         ("&Show Border", showBorder),
+        ("&Diagnose Surface", diagnose),
         ("&Fill Border", fillBorders),
 #        ("&Fill Holes",fillHoles),
         ("&Delete Triangles", deleteTriangles),
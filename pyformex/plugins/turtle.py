@@ -40,11 +40,19 @@ The start conditions are: ``pos=(0,0), step=1., angle=0.``
 The followin example turtle script creates a unit square::
 
   fd();ro(90);fd();ro(90);fd();ro(90);fd()
+
+The functions :func:`reset`, :func:`fd`, ... operate on a single global
+turtle and scripts are played by evaluating them. The functions
+:func:`compileCommands` and :func:`segments` provide a turtle engine
+without global state: a sequence of commands is interpreted at once into
+an array of line segments.
 """
 from __future__ import absolute_import, division, print_function
 
 
 import math
+import re
+import numpy as np
 deg = math.pi/180.
 
 def sind(arg):
@@ -143,8 +151,7 @@ def play(scr,glob=None):
     If a dict `glob` is specified, it will be update with the turtle
     module's globals() after each turtle command.
     """
-    import string
-    for line in string.split(scr, ";"):
+    for line in scr.split(";"):
         if line:
             if glob:
                 glob.update(globals())
@@ -155,6 +162,192 @@ def play(scr,glob=None):
 
 reset()
 
+
+# The compiled turtle engine
+
+NOP, FD, MV, RO, PUSH, POP, ST = range(7)
+_cmd_kind = { '': NOP, 'fd': FD, 'mv': MV, 'ro': RO, 'push': PUSH, 'pop': POP, 'st': ST }
+_cmd_default = { NOP: 0., FD: np.nan, MV: np.nan, RO: 0., PUSH: 0., POP: 0., ST: 1. }
+_cmd_re = re.compile(r'^\s*(\w*)\s*(?:\(\s*([^)]*?)\s*\))?\s*;?\s*$')
+
+
+def compileCommand(cmd):
+    """Compile a single turtle command.
+
+    Parameters:
+
+    - `cmd`: a turtle command: either a string like ``'fd();'``,
+      ``'ro(60)'`` or ``''``, or a tuple (name,value), where name is
+      one of ``'fd', 'mv', 'ro', 'st', 'push', 'pop'`` and value is a
+      float argument.
+
+    Returns a tuple (kind,value) with the integer command kind and the
+    float argument. The default argument for 'fd' and 'mv' is NaN,
+    meaning that the current step is used (see :func:`fd`).
+    The commands are not evaluated: only the commands moving and
+    rotating the turtle, setting its step and saving or restoring its
+    state are allowed.
+
+    >>> compileCommand('ro(60);')
+    (3, 60.0)
+    >>> compileCommand('fd()')
+    (1, nan)
+    >>> compileCommand(('mv', 2))
+    (2, 2.0)
+    """
+    if isinstance(cmd, tuple):
+        name, value = cmd
+    else:
+        m = _cmd_re.match(cmd)
+        if m is None:
+            raise ValueError("Invalid turtle command: %r" % cmd)
+        name, value = m.groups()
+    if name not in _cmd_kind:
+        raise ValueError("Turtle command %r can not be compiled" % name)
+    kind = _cmd_kind[name]
+    if value is None or value == '':
+        value = _cmd_default[kind]
+    return kind, float(value)
+
+
+def compileCommands(cmds):
+    """Compile a dict of turtle commands.
+
+    `cmds` is a dict mapping symbols on turtle commands as accepted by
+    :func:`compileCommand`. Returns a dict with the same keys and
+    the compiled (kind,value) tuples.
+    """
+    return dict([ (k, compileCommand(cmds[k])) for k in cmds ])
+
+
+def _treeSum(delta, parent):
+    """Sum values along the chains of parents.
+
+    delta is an array (n,...) and parent an int array (n,) with the
+    index of the parent of each item, which is smaller than the index
+    of the item, or -1 if it has no parent. Returns an array with for each
+    item the sum of delta over the item and all its ancestors.
+    The sums are computed by pointer jumping.
+    """
+    val = delta.copy()
+    par = parent.copy()
+    while (par >= 0).any():
+        m = par >= 0
+        val[m] += val[par[m]]
+        par[m] = par[par[m]]
+    return val
+
+
+def _restore(raw, kind, match, ipop):
+    """Compute the turtle state from the cumulative increments.
+
+    raw (n,...) contains the cumulative increments of a state variable
+    over all the commands. At each pop, the state has to be restored to
+    the value at the matching push. Returns the corrected state after
+    each command.
+    """
+    npop = np.cumsum(kind == POP) - 1   # index of last pop <= t
+    if len(ipop) == 0:
+        return raw
+    # parent of each pop: the last pop before the matching push
+    parent = npop[match]
+    base = np.where((parent >= 0).reshape((-1,)+(1,)*(raw.ndim-1)),
+                    raw[ipop[parent]], 0.)
+    state = _treeSum(raw[match] - base, parent)
+    last = npop >= 0
+    res = raw.copy()
+    res[last] += state[npop[last]] - raw[ipop[npop[last]]]
+    return res
+
+
+def _steps(kind,value,match,ipop,step):
+    """Compute the turtle step after each command.
+
+    The step is set by the 'st' commands and by the 'fd' and 'mv'
+    commands with a nonzero argument, and is restored at each pop.
+    The step after a command is the value of its nearest setting
+    ancestor in the state history, which is found by pointer jumping.
+    """
+    n = len(kind)
+    setter = ((kind == FD) | (kind == MV)) & (value != 0.) & ~np.isnan(value) | (kind == ST)
+    # The state after a pop is the state after the matching push
+    parent = np.arange(n) - 1
+    parent[ipop] = match
+    anc = np.where(setter, np.arange(n), parent)
+    while True:
+        m = np.where(anc >= 0)[0]
+        m = m[~setter[anc[m]]]
+        if len(m) == 0:
+            break
+        anc[m] = anc[anc[m]]
+    return np.where(anc >= 0, value[np.maximum(anc, 0)], step)
+
+
+def segments(kind,value,pos=(0.,0.),angle=0.,step=1.):
+    """Interpret a sequence of compiled turtle commands.
+
+    Parameters:
+
+    - `kind`: int array (n,): the kinds of the commands (see
+      :func:`compileCommand`).
+    - `value`: float array (n,): the arguments of the commands.
+    - `pos`: (x,y): the start position of the turtle.
+    - `angle`: float: the start direction of the turtle, in degrees.
+    - `step`: float: the start step of the turtle.
+
+    Returns a float array (nseg,2,3) with the line segments drawn by the
+    turtle. The commands are interpreted all together with array
+    operations: the turtle state after each command is obtained from
+    cumulative sums, which are corrected at each pop for the state saved
+    by the matching push. As with :func:`play`, 'fd' and 'mv' without
+    (or with a zero) argument move over the current step, which is set by
+    the argument of the previous 'fd', 'mv' or 'st' command.
+    Unmatched pushes are allowed, an unmatched pop raises a ValueError.
+
+    >>> k, v = zip(*[ compileCommand(c) for c in
+    ...     ['fd()', 'push()', 'ro(90)', 'fd()', 'pop()', 'ro(-90)', 'fd(2)'] ])
+    >>> print(segments(k, v).round(3))
+    [[[ 0.  0.  0.]
+      [ 1.  0.  0.]]
+    <BLANKLINE>
+     [[ 1.  0.  0.]
+      [ 1.  1.  0.]]
+    <BLANKLINE>
+     [[ 1.  0.  0.]
+      [ 1. -2.  0.]]]
+    """
+    kind = np.asarray(kind, dtype=int)
+    value = np.asarray(value, dtype=float)
+    depth = np.cumsum(kind == PUSH) - np.cumsum(kind == POP)
+    if (depth < 0).any():
+        raise ValueError("Turtle pop without matching push")
+    if len(kind) > 0 and depth[-1] > 0:
+        # Close the unmatched pushes
+        kind = np.concatenate([kind, [POP]*depth[-1]])
+        value = np.concatenate([value, [0.]*depth[-1]])
+        depth = np.concatenate([depth, np.arange(depth[-1]-1, -1, -1)])
+    # Find the matching push for each pop:
+    # at each level, the k-th push matches the k-th pop
+    ipush = np.where(kind == PUSH)[0]
+    ipop = np.where(kind == POP)[0]
+    match = np.empty(len(ipop), dtype=int)
+    match[np.lexsort((ipop, depth[ipop]+1))] = ipush[np.lexsort((ipush, depth[ipush]))]
+    # Direction after each command
+    rot = np.where(kind == RO, value, 0.)
+    ang = _restore(np.cumsum(rot), kind, match, ipop) + angle
+    # Position after each command
+    move = (kind == FD) | (kind == MV)
+    step = np.where(move, _steps(kind, value, match, ipop, step), 0.)[:, np.newaxis]
+    disp = step * np.column_stack([np.cos(ang*deg), np.sin(ang*deg)])
+    P = _restore(np.cumsum(disp, axis=0), kind, match, ipop) + pos
+    # Store the drawn segments
+    draw = np.where(kind == FD)[0]
+    seg = np.zeros((len(draw), 2, 3))
+    seg[:, 0, :2] = P[draw] - disp[draw]
+    seg[:, 1, :2] = P[draw]
+    return seg
+
+
 if __name__ == '__main__':
     def test(txt):
         l = play(txt)
@@ -36,7 +36,6 @@ from __future__ import absolute_import, division, print_function
 
 
 from pyformex import utils
-utils.hasExternal('units')
 
 
 def convertUnits(From, To):
@@ -63,6 +62,8 @@ def convertUnits(From, To):
     """
     P = utils.system('units \"%s\" \"%s\"' % (From, To))
     if P.sta:
+        if not utils.hasExternal('units'):
+            raise RuntimeError("The 'units' command is not available")
         raise RuntimeError('Could not convert units from \"%s\" to \"%s\"' % (From, To))
     return str(P.out.split()[1])
 
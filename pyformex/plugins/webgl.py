@@ -48,6 +48,9 @@ from pyformex.geometry import Geometry
 import numpy as np
 import os
 import glob
+import gzip
+import json
+import struct
 
 exported_webgl = None
 
@@ -94,6 +97,234 @@ def saneSettings(k):
     return ok
 
 
+def weldVertices(data, elems):
+    """Merge identical vertices of an indexed data set.
+
+    Parameters:
+
+    - `data`: list of arrays with the same length, holding the vertex data
+      (coordinates, normals, colors, ...). All vertices for which all
+      the data are equal are merged into a single vertex.
+    - `elems`: int array with indices into the `data` arrays.
+
+    Returns a tuple (data, elems) where data is a list with the welded
+    vertex data and elems is the renumbered elems array.
+
+    Example:
+
+    >>> x = np.array([[0.,0.],[1.,0.],[0.,0.],[1.,1.]])
+    >>> c = np.array([[1],[2],[1],[2]])
+    >>> data, elems = weldVertices([x,c], np.array([[0,1],[2,3]]))
+    >>> print(data[0])
+    [[ 0.  0.]
+     [ 1.  0.]
+     [ 1.  1.]]
+    >>> print(elems)
+    [[0 1]
+     [0 2]]
+
+    """
+    nverts = len(data[0])
+    # create a contiguous byte key for each vertex
+    keys = np.concatenate([ np.ascontiguousarray(d).reshape(nverts, -1).view(np.uint8).reshape(nverts, -1) for d in data ], axis=1)
+    keys = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.shape[1]))).ravel()
+    keys, first, inv = np.unique(keys, return_index=True, return_inverse=True)
+    # keep the original vertex order
+    order = np.argsort(first)
+    renum = np.empty_like(order)
+    renum[order] = np.arange(len(order))
+    data = [ d[first[order]] for d in data ]
+    return data, renum[inv][elems]
+
+
+def packDrawable(coords, elems, normals=None, colors=None, quantize=False):
+    """Pack the geometry of a drawable into compact binary buffers.
+
+    Parameters:
+
+    - `coords`: float array (nverts,3): vertex coordinates.
+    - `elems`: int array (nelems,nplex): vertex indices of the elements.
+    - `normals`: float array (nverts,3), optional: vertex normals.
+    - `colors`: float array (nverts,3) or (nverts,4) with values in the
+      range 0..1, optional: vertex colors.
+    - `quantize`: bool: if True, the coordinates are stored as 16-bit
+      unsigned integers relative to their bounding box, and the normals
+      as 16-bit signed integers. Otherwise they are stored as 32-bit floats.
+
+    The colors are always stored as 8-bit unsigned integers. Vertices
+    with identical (quantized) data are welded. The elems are stored
+    as 16-bit or 32-bit unsigned integers, depending on the number of
+    remaining vertices.
+
+    Returns a dict with the arrays 'coords', 'elems' and optionally
+    'normals', 'colors', and the dequantization parameters 'scale' and
+    'offset' for the coordinates (real = offset + scale * stored).
+    All arrays are little-endian.
+    """
+    coords = np.asarray(coords, dtype=np.float32).reshape(-1, 3)
+    elems = np.asarray(elems).reshape(len(elems), -1)
+    res = {}
+    if quantize:
+        lo, hi = coords.min(axis=0), coords.max(axis=0)
+        scale = (hi-lo) / 65535.
+        scale[scale == 0.] = 1.
+        coords = np.round((coords-lo) / scale).astype('<u2')
+        res['offset'] = lo.tolist()
+        res['scale'] = scale.tolist()
+    else:
+        coords = coords.astype('<f4')
+    data = [coords]
+    names = ['coords']
+    if normals is not None:
+        normals = np.asarray(normals).reshape(-1, 3)
+        if quantize:
+            normals = np.round(normals.clip(-1., 1.) * 32767).astype('<i2')
+        else:
+            normals = normals.astype('<f4')
+        data.append(normals)
+        names.append('normals')
+    if colors is not None:
+        colors = np.asarray(colors)
+        colors = np.round(colors.reshape(-1, colors.shape[-1]).clip(0., 1.) * 255).astype('<u1')
+        data.append(colors)
+        names.append('colors')
+    data, elems = weldVertices(data, elems)
+    res.update(zip(names, data))
+    if len(data[0]) <= 65536:
+        res['elems'] = elems.astype('<u2')
+    else:
+        res['elems'] = elems.astype('<u4')
+    return res
+
+
+def writeBinaryScene(filename, drawables, compress=True):
+    """Write packed drawables to a single binary scene file.
+
+    Parameters:
+
+    - `filename`: name of the output file.
+    - `drawables`: dict where the keys are drawable names and the values
+      are dicts as returned by :func:`packDrawable`.
+    - `compress`: bool: if True (default), the file is gzip compressed.
+
+    The file starts with the 4 bytes 'PFWB', followed by a little-endian
+    uint32 giving the length of a JSON header. The header describes for
+    each drawable the position (offset and length, relative to the
+    start of the data section), dtype and shape of each array, as well
+    as the non-array values. The data section follows the header and
+    holds the arrays aligned on 4 bytes.
+
+    Returns the number of bytes in the uncompressed data.
+    """
+    header = {'version': 1, 'drawables': {}}
+    blocks = []
+    pos = 0
+    for name in drawables:
+        d = {}
+        for key, val in drawables[name].items():
+            if isinstance(val, np.ndarray):
+                data = val.tobytes()
+                d[key] = {
+                    'offset': pos,
+                    'length': len(data),
+                    'dtype': val.dtype.str,
+                    'shape': list(val.shape),
+                    }
+                pad = -len(data) % 4
+                blocks.append(data + b'\0' * pad)
+                pos += len(data) + pad
+            else:
+                d[key] = val
+        header['drawables'][name] = d
+    header = json.dumps(header, sort_keys=True).encode('ascii')
+    header += b' ' * (-len(header) % 4)
+    data = b''.join([b'PFWB', struct.pack('<I', len(header)), header] + blocks)
+    if compress:
+        fil = gzip.open(filename, 'wb')
+    else:
+        fil = open(filename, 'wb')
+    with fil:
+        fil.write(data)
+    return len(data)
+
+
+def readBinaryScene(filename):
+    """Read a binary scene file written by :func:`writeBinaryScene`.
+
+    Returns a dict like the `drawables` argument of
+    :func:`writeBinaryScene`.
+    """
+    if filename.endswith('.gz'):
+        fil = gzip.open(filename, 'rb')
+    else:
+        fil = open(filename, 'rb')
+    with fil:
+        data = fil.read()
+    if data[:4] != b'PFWB':
+        raise ValueError("%s is not a pyFormex binary WebGL scene" % filename)
+    hlen = struct.unpack('<I', data[4:8])[0]
+    header = json.loads(data[8:8+hlen].decode('ascii'))
+    start = 8 + hlen
+    drawables = {}
+    for name, d in header['drawables'].items():
+        res = {}
+        for key, val in d.items():
+            if isinstance(val, dict) and 'dtype' in val:
+                a = np.frombuffer(data, dtype=val['dtype'], count=int(np.prod(val['shape'])), offset=start+val['offset'])
+                val = a.reshape(val['shape'])
+            res[key] = val
+        drawables[name] = res
+    return drawables
+
+
+# Javascript functions to load a binary scene into X.mesh objects
+binary_loader_js = """
+var pfwb_types = {'<f4':Float32Array, '<u2':Uint16Array, '<i2':Int16Array,
+                  '<u1':Uint8Array, '|u1':Uint8Array, '<u4':Uint32Array};
+
+function pfwbLoad(url, callback) {
+  fetch(url).then(function(response) {
+    var stream = response.body;
+    if (url.slice(-3) == '.gz')
+      stream = stream.pipeThrough(new DecompressionStream('gzip'));
+    return new Response(stream).arrayBuffer();
+  }).then(function(buf) {
+    var hlen = new DataView(buf).getUint32(4, true);
+    var header = JSON.parse(new TextDecoder().decode(new Uint8Array(buf, 8, hlen)));
+    header.data = buf.slice(8 + hlen);
+    callback(header);
+  });
+}
+
+function pfwbArray(B, a) {
+  return new pfwb_types[a.dtype](B.data, a.offset, a.length / pfwb_types[a.dtype].BYTES_PER_ELEMENT);
+}
+
+function pfwbSet(m, B, key) {
+  var d = B.drawables[key];
+  var elems = pfwbArray(B, d.elems);
+  var x = pfwbArray(B, d.coords);
+  var n = d.normals ? pfwbArray(B, d.normals) : null;
+  var c = d.colors ? pfwbArray(B, d.colors) : null;
+  var nc = d.colors ? d.colors.shape[1] : 0;
+  var s = d.scale || [1., 1., 1.];
+  var o = d.offset || [0., 0., 0.];
+  var ns = d.scale ? 1./32767. : 1.;
+  var nplex = d.elems.shape[1];
+  m.type = ['POINTS', 'LINES', 'TRIANGLES'][nplex-1];
+  m.points = new X.triplets(3*elems.length);
+  if (n) m.normals = new X.triplets(3*elems.length);
+  if (c) m.colors = new X.triplets(3*elems.length);
+  for (var i = 0; i < elems.length; i++) {
+    var j = elems[i];
+    m.points.add(o[0]+s[0]*x[3*j], o[1]+s[1]*x[3*j+1], o[2]+s[2]*x[3*j+2]);
+    if (n) m.normals.add(ns*n[3*j], ns*n[3*j+1], ns*n[3*j+2]);
+    if (c) m.colors.add(c[nc*j]/255., c[nc*j+1]/255., c[nc*j+2]/255.);
+  }
+}
+"""
+
+
 def properties(o):
     """Return properties of an object
 
@@ -152,6 +383,17 @@ class WebGL(object):
       Some other formats (like .stl) may also be supported, but the use of
       the native formats is prefered, because they are a lot smaller.
       Default is to use the compressed '.pgf.gz' format.
+    - `binary`: bool: if True, the geometry of each scene is not written
+      as PGF files, but as a single compressed binary file with welded
+      vertices and indexed elements (see :func:`writeBinaryScene`).
+      This results in much smaller files that load a lot faster.
+      The front and back faces of an actor share the same data.
+      The `dataformat` is then ignored. The binary data are loaded by
+      a Javascript function included in the exported script. It needs
+      a browser supporting the DecompressionStream API.
+    - `quantize`: bool: only used with `binary=True`. If True, the
+      coordinates and normals are stored as 16-bit integers, relative
+      to the bounding box of each drawable, further reducing the size.
     - `urlprefix`: string: if specified, this string gets prepended to the
       exported .js filename in the .html file, and to the datafiles in the
       exported .js file. This can be used to serve the models from a web
@@ -183,6 +425,8 @@ class WebGL(object):
                  urlprefix=None,
                  gui=True,
                  cleanup=False,
+                 binary=False,
+                 quantize=False,
                  ):
         """Create a new (empty) WebGL model."""
 
@@ -219,9 +463,11 @@ class WebGL(object):
         self.sep = sep
         self.dataformat = dataformat
         self.urlprefix = urlprefix
+        self.binary = binary
+        self.quantize = quantize
         self.scenes = []
         if cleanup:
-            existing = glob.glob(self.name+'.html') + glob.glob(self.name+'.js') + glob.glob(self.name+'_*.pgf*') + glob.glob(self.name+'_*.stl*')
+            existing = glob.glob(self.name+'.html') + glob.glob(self.name+'.js') + glob.glob(self.name+'_*.pgf*') + glob.glob(self.name+'_*.stl*') + glob.glob(self.name+'_*.pfwb*')
             print("Removing existing files: %s" % existing)
             for f in existing:
                 os.remove(f)
@@ -251,6 +497,7 @@ class WebGL(object):
         """
         self._actors = List()
         self._gui = []
+        self._buffers = {}
 
         self.bgcolor = pf.canvas.settings.bgcolor
         print("Exporting %s actors from current scene" % len(pf.canvas.actors))
@@ -290,6 +537,17 @@ class WebGL(object):
         # add drawables
         for i, d in enumerate(actor.drawable):
             attrib = Attributes(d, default=actor)
+            if self.binary:
+                # the front and back faces share the same buffers
+                if attrib.name.endswith('_back') or attrib.name.endswith('_front'):
+                    attrib.buffers = actor.name + '_faces'
+                else:
+                    attrib.buffers = attrib.name
+                if attrib.buffers not in self._buffers:
+                    self._buffers[attrib.buffers] = self.packDrawable(attrib)
+                self.addDefaults(attrib)
+                drawables.append(attrib)
+                continue
             attrib.file = '%s_s%s_%s%s' % (self.name,len(self.scenes),actor.name,self.dataformat)
             # write the object to a .pgf file
             # we do not store the back faces, reuse the front faces file instead
@@ -315,14 +573,7 @@ class WebGL(object):
                 #print("WRITING %s" % attrib.name)
                 Geometry.write(obj, attrib.file, sep=self.sep)
 
-            # add missing attributes
-            if attrib.lighting is None:
-                attrib.lighting = pf.canvas.settings.lighting
-            if attrib.useObjectColor is None:
-                attrib.useObjectColor = 1
-                attrib.color = pf.canvas.settings.fgcolor
-            if attrib.alpha is None:
-                attrib.alpha = pf.canvas.settings.transparency
+            self.addDefaults(attrib)
             drawables.append(attrib)
 
         # add controllers
@@ -377,6 +628,34 @@ class WebGL(object):
             self._gui.append((actor.name, actor.caption, controllers))
 
 
+    def addDefaults(self, attrib):
+        """Add missing attributes of a drawable from the canvas settings."""
+        if attrib.lighting is None:
+            attrib.lighting = pf.canvas.settings.lighting
+        if attrib.useObjectColor is None:
+            attrib.useObjectColor = 1
+            attrib.color = pf.canvas.settings.fgcolor
+        if attrib.alpha is None:
+            attrib.alpha = pf.canvas.settings.transparency
+
+
+    def packDrawable(self, attrib):
+        """Pack the geometry buffers of a drawable for binary export."""
+        coords = np.asarray(attrib.vbo).reshape(-1, 3)
+        if attrib.ibo is not None:
+            elems = np.asarray(attrib.ibo)
+        else:
+            nelems, nplex = np.asarray(attrib.vbo).shape[:2]
+            elems = np.arange(nelems*nplex).reshape(nelems, nplex)
+        normals = colors = None
+        if attrib.nbo is not None and attrib.lighting is not False:
+            normals = np.asarray(attrib.nbo).reshape(-1, 3)
+        if attrib.cbo is not None and attrib.useObjectColor == 0:
+            colors = np.asarray(attrib.cbo)
+            colors = colors.reshape(-1, colors.shape[-1])
+        return packDrawable(coords, elems, normals, colors, self.quantize)
+
+
     def setCamera(self,**kargs):
         """Set the camera position and direction.
 
@@ -408,6 +687,8 @@ class WebGL(object):
                 else:
                     url = attr.file
                 s += "%s.file = '%s';\n" % (name, url)
+            if attr.buffers is not None:
+                s += "pfwbSet(%s, B, '%s');\n" % (name, attr.buffers)
             if attr.caption is not None:
                 s += "%s.caption = '%s';\n" % (name, attr.caption)
             if attr.useObjectColor == 2 and attr.drawface == -1:
@@ -505,6 +786,8 @@ var gui_global_alphablend = gui_global.add(r,'toggleAlphablend');
         s = "// Script generated by %s\n" % pf.fullVersion()
         if self.jsheader:
             s += str(self.jsheader)
+        if self.binary:
+            s += binary_loader_js
         s += """
 var the_renderer;
 var the_controls;
@@ -552,6 +835,15 @@ r.init();
         js_alphablend = str(pf.canvas.settings.alphablend).lower()
         s += "r.setAlphablend(%s);\n" % js_alphablend
 
+        if self.binary:
+            # write the scene data and defer the setup until they are loaded
+            datafile = '%s_s%s.pfwb.gz' % (self.name, len(self.scenes))
+            nbytes = writeBinaryScene(datafile, self._buffers)
+            print("Exported %s bytes of binary scene data to %s" % (nbytes, datafile))
+            if self.urlprefix:
+                datafile = self.urlprefix + datafile
+            s += "pfwbLoad('%s', function(B) {\n" % datafile
+
         s += '\n'.join([self.format_actor(a) for a in self._actors ])
         if self._gui:
             s += self.format_gui()
@@ -568,10 +860,10 @@ r.init();
             if 'fovy' in self._camera:
                 s +=  "r.camera.fovy = %s;\n" % self._camera.fovy
 
-        s += """
-r.render();
-};
-"""
+        s += "\nr.render();\n"
+        if self.binary:
+            s += "});\n"
+        s += "};\n"
         self.jsfile.write(s)
         self.scenes.append(name)
 
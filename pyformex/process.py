@@ -158,7 +158,7 @@ class Process(subprocess.Popen):
         else:
             t = None
 
-        if wait:
+        if wait and not self.failed:
             # Wait for the process to finish and retrieve its stdout/stdin
             out, err = self.communicate()
             if out is not None:
@@ -0,0 +1,490 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+"""Element quality metrics.
+
+This module computes quality measures for the elements of a Mesh,
+directly from the element definitions in :mod:`elements`. All the
+computations are vectorized over the elements and are done in chunks
+of elements to keep the memory usage limited on large models.
+
+The following metrics are available:
+
+- `jacobian`: the minimum determinant of the Jacobian matrix of the
+  isoparametric mapping, with respect to the natural coordinates of the
+  pyFormex element (which has a unit size reference element). For
+  surface elements, the sign is taken with respect to the element normal,
+  or the positive z-axis if the Mesh is planar. For line elements it is
+  the projection of the tangent on the chord.
+- `scaledjacobian`: the minimum Jacobian determinant divided by the
+  product of the lengths of the columns of the Jacobian matrix, and
+  scaled such that the ideal element has value 1. At the corners, the
+  columns are taken along the element edges at that corner. For
+  elements with triangular or tetrahedral parts, the determinant is
+  divided by the largest product of the edge lengths at any corner, as
+  in Verdict. Values range from -1 to 1. Values <= 0 indicate inverted
+  elements.
+- `aspectratio`: 1 for the ideal element, increasing for more elongated
+  elements. For triangles and tetrahedrons this is the normalized ratio
+  of the longest edge to the inscribed radius. For the other elements it
+  is the ratio of the longest to the shortest principal axis.
+- `skew`: the equiangle skewness: the maximum relative deviation of the
+  corner angles of the (faces of the) element from the ideal angle (60
+  degrees for triangles, 90 for quadrilaterals). It ranges from 0
+  (ideal) to 1 (degenerate).
+- `warpage`: the maximum angle (in degrees) between the normals of the
+  two triangles obtained by splitting a quadrilateral (face) along one of
+  its diagonals. It is 0 for planar faces and elements without
+  quadrilateral faces.
+- `taper`: the maximum taper of the quadrilateral (faces of the) element:
+  the length of the cross derivative vector relative to the shortest
+  principal axis. It is 0 for parallelograms and elements without
+  quadrilateral faces.
+- `minangle`, `maxangle`: the minimum and maximum corner angle (in
+  degrees) of the (faces of the) element.
+- `edgeratio`: the ratio of the longest to the shortest edge.
+
+All metrics except the Jacobian ones are computed from the corner
+nodes only, i.e. on the linear element of the same family. Only the
+first two metrics are defined for line elements.
+"""
+from __future__ import absolute_import, division, print_function
+
+from pyformex.arraytools import *
+from pyformex.elements import elementType
+from pyformex.mydict import Dict
+from pyformex.odict import OrderedDict
+
+
+# For each metric: True if large values are bad
+_metrics = OrderedDict([
+    ('jacobian', False),
+    ('scaledjacobian', False),
+    ('aspectratio', True),
+    ('skew', True),
+    ('warpage', True),
+    ('taper', True),
+    ('minangle', False),
+    ('maxangle', True),
+    ('edgeratio', True),
+    ])
+
+_linear_types = {
+    (1, 2): 'line2',
+    (2, 3): 'tri3',
+    (2, 4): 'quad4',
+    (3, 4): 'tet4',
+    (3, 6): 'wedge6',
+    (3, 8): 'hex8',
+    }
+
+
+def metrics(ndim=3):
+    """Return the names of the quality metrics for elements of level ndim"""
+    if ndim == 1:
+        return list(_metrics.keys())[:2]
+    return list(_metrics.keys())
+
+
+def linearElement(eltype):
+    """Return the linear element corresponding with an element type.
+
+    Parameters:
+
+    - `eltype`: an element type or element name.
+
+    Returns a tuple (lintype,corners), where lintype is the linear element
+    type of the same family and corners is an int array with the numbers
+    of the vertices of `eltype` that correspond with the vertices of
+    lintype.
+
+    Example:
+
+    >>> lin, corners = linearElement('hex27')
+    >>> print(lin.name(), corners)
+    hex8 [ 0  2  8  6 18 20 26 24]
+    """
+    eltype = elementType(eltype)
+    corners = eltype.corners()
+    try:
+        lin = elementType(_linear_types[(eltype.ndim, len(corners))])
+    except KeyError:
+        raise ValueError("No quality metrics for element type %s" % eltype)
+    v = eltype.vertices[corners]
+    d = ((lin.vertices[:, newaxis] - v)**2).sum(axis=-1)
+    return lin, corners[d.argmin(axis=1)]
+
+
+def _faces(lin):
+    """Return the triangular and quadrilateral faces of a linear element"""
+    if lin.ndim == 2:
+        faces = [arange(lin.nplex())]
+    else:
+        faces = [ f[sort(unique(f, return_index=True)[1])] for f in lin.faces ]
+    tris = array([ f for f in faces if len(f) == 3 ], dtype=int).reshape(-1, 3)
+    quads = array([ f for f in faces if len(f) == 4 ], dtype=int).reshape(-1, 4)
+    return tris, quads
+
+
+def _cornerFrames(lin):
+    """Return the natural edge directions at the corners of a linear element
+
+    Returns a float array (ncorners,ndim,ndim) where the columns of each
+    matrix are the natural vectors along the edges at the corner, ordered
+    to form a positive frame.
+    """
+    v = lin.vertices[:, :lin.ndim]
+    R = []
+    for k in range(lin.nplex()):
+        nb = [ e[1] if e[0] == k else e[0] for e in lin.edges if k in e ]
+        Rk = (v[nb] - v[k]).T
+        if linalg.det(Rk) < 0.:
+            Rk = Rk[:, [1, 0] + list(range(2, lin.ndim))]
+        R.append(Rk)
+    return array(R)
+
+
+def _scale(lin):
+    """Scale factor for the scaled Jacobian of the ideal element"""
+    nbary = lin.shape[0]
+    return {0: 1., 2: 2./sqrt(3.), 3: sqrt(2.)}[nbary]
+
+
+def _cross(a, b):
+    """Cross product of vectors in the last axis"""
+    a0, a1, a2 = a[..., 0], a[..., 1], a[..., 2]
+    b0, b1, b2 = b[..., 0], b[..., 1], b[..., 2]
+    c = empty(broadcast(a, b).shape)
+    c[..., 0] = a1*b2 - a2*b1
+    c[..., 1] = a2*b0 - a0*b2
+    c[..., 2] = a0*b1 - a1*b0
+    return c
+
+
+def _dot(a, b):
+    """Dot product of vectors in the last axis"""
+    return a[..., 0]*b[..., 0] + a[..., 1]*b[..., 1] + a[..., 2]*b[..., 2]
+
+
+def _length(a):
+    """Length of vectors in the last axis"""
+    return sqrt(_dot(a, a))
+
+
+def _jacobians(X, dN):
+    """Jacobian matrices of elements X (nel,nplex,3) at some points
+
+    dN is the (npts,nplex,ndim) array with the shape function derivatives
+    at the points. Returns an array (nel,npts,3,ndim).
+    """
+    nel, nplex = X.shape[:2]
+    npts, ndim = dN.shape[0], dN.shape[2]
+    J = dot(X.transpose(0, 2, 1).reshape(-1, nplex), dN.transpose(1, 0, 2).reshape(nplex, -1))
+    return J.reshape(nel, 3, npts, ndim).transpose(0, 2, 1, 3)
+
+
+def _det(J, ref):
+    """Determinants of Jacobian matrices (nel,npts,3,ndim)"""
+    ndim = J.shape[-1]
+    if ndim == 3:
+        return _dot(_cross(J[..., 0], J[..., 1]), J[..., 2])
+    elif ndim == 2:
+        return _dot(_cross(J[..., 0], J[..., 1]), ref[:, newaxis])
+    else:
+        return _dot(J[..., 0], ref[:, newaxis])
+
+
+def _angles(X, faces):
+    """Corner angles in degrees of polygonal faces (nel,nfaces,nplex)"""
+    P = X[:, faces]
+    a = roll(P, 1, axis=2) - P
+    b = roll(P, -1, axis=2) - P
+    return arctan2(_length(_cross(b, a)), _dot(a, b)) / DEG
+
+
+def _jacobianValues(X, eltype, at, scaled, ref):
+    """Compute the Jacobian at corners and/or Gauss points of elements X"""
+    lin, corners = linearElement(eltype)
+    ndim = eltype.ndim
+    values = []
+    frames = _cornerFrames(lin) if ndim > 1 else None
+    if at in ['corners', 'all']:
+        x = eltype.vertices[corners, :ndim]
+        N, dN = eltype.shapeFunctions(x, deriv=True)
+        J = _jacobians(X, dN)
+        if scaled and ndim > 1 and lin.shape[0] == 0:
+            # Take the columns along the edges at each corner
+            J = matmul(J, frames)
+        values.append(_scaledDet(J, lin, frames, ref) if scaled else _det(J, ref))
+    if at in ['gauss', 'all']:
+        x, w = eltype.gaussPoints()
+        N, dN = eltype.shapeFunctions(x, deriv=True)
+        J = _jacobians(X, dN)
+        values.append(_scaledDet(J, lin, frames, ref) if scaled else _det(J, ref))
+    if not values:
+        raise ValueError("Invalid value for at: %s" % at)
+    return concatenate(values, axis=1)
+
+
+def _scaledDet(J, lin, frames, ref):
+    """Scaled Jacobian determinants from Jacobian matrices (nel,npts,3,ndim)
+
+    For elements with simplex parts the determinant is divided, as in
+    Verdict, by the largest product of the lengths of the edges at any of
+    the corners, with the edges mapped by J. Else, it is divided by the
+    product of the lengths of the columns of J. The result is clipped
+    to [-1,1].
+    """
+    if lin.shape[0] > 0 and lin.ndim > 1:
+        J = matmul(J[:, :, newaxis], frames)
+        norm = _length(J.swapaxes(-1, -2)).prod(axis=-1).max(axis=-1)
+        d = _det(J[:, :, 0], ref) / norm * _scale(lin)
+    else:
+        d = _det(J, ref) / _length(J.swapaxes(-1, -2)).prod(axis=-1)
+    return clip(d, -1., 1.)
+
+
+def _reference(X, eltype, planar):
+    """Reference vectors for the sign of the Jacobian
+
+    For line elements, this is the unit vector along the chord,
+    for surface elements the unit normal at the center or the z-axis
+    if the model is planar.
+    """
+    lin, corners = linearElement(eltype)
+    if eltype.ndim == 1:
+        return normalize(X[:, corners[-1]] - X[:, corners[0]])
+    elif eltype.ndim == 2:
+        if planar:
+            return resize([0., 0., 1.], (X.shape[0], 3))
+        x = eltype.vertices[:, :2].mean(axis=0).reshape(1, 2)
+        N, dN = eltype.shapeFunctions(x, deriv=True)
+        J = _jacobians(X, dN)[:, 0]
+        return normalize(_cross(J[..., 0], J[..., 1]))
+
+
+def _quadMetrics(P):
+    """Warpage and taper of quadrilaterals P (...,4,3)"""
+    p0, p1, p2, p3 = [ P[..., i, :] for i in range(4) ]
+    warp = zeros(P.shape[:-2])
+    for a, b, c, d in [(p0, p1, p2, p3), (p1, p2, p3, p0)]:
+        n1 = normalize(_cross(b-a, c-a))
+        n2 = normalize(_cross(c-a, d-a))
+        cos = clip(_dot(n1, n2), -1., 1.)
+        warp = fmax(warp, arccos(cos) / DEG)
+    X1 = _length((p1-p0) + (p2-p3))
+    X2 = _length((p2-p1) + (p3-p0))
+    X12 = _length((p0-p1) + (p2-p3))
+    taper = X12 / minimum(X1, X2)
+    return warp, taper
+
+
+def _shapeValues(X, eltype, metric):
+    """Compute a shape metric from the corner nodes of elements X"""
+    lin, corners = linearElement(eltype)
+    X = X[:, corners]
+    nel = X.shape[0]
+    tris, quads = _faces(lin)
+
+    if metric == 'edgeratio':
+        L = _length(X[:, lin.edges[:, 1]] - X[:, lin.edges[:, 0]])
+        return L.max(axis=-1) / L.min(axis=-1)
+
+    elif metric == 'aspectratio':
+        if lin.name() in ['tri3', 'tet4']:
+            L = _length(X[:, lin.edges[:, 1]] - X[:, lin.edges[:, 0]])
+            E = X[:, 1:] - X[:, :1]
+            if lin.ndim == 2:
+                size = L.sum(axis=-1)
+                meas = _length(_cross(E[:, 0], E[:, 1])) / 2.
+                c = 4.*sqrt(3.)
+            else:
+                F = X[:, tris]
+                size = _length(_cross(F[:, :, 1]-F[:, :, 0], F[:, :, 2]-F[:, :, 0])).sum(axis=-1) / 2.
+                meas = abs(_dot(_cross(E[:, 0], E[:, 1]), E[:, 2])) / 6.
+                c = 6.*sqrt(6.)
+            return L.max(axis=-1) * size / (c*meas)
+        else:
+            x = lin.vertices[:, :lin.ndim].mean(axis=0).reshape(1, -1)
+            N, dN = lin.shapeFunctions(x, deriv=True)
+            J = _jacobians(X, dN)[:, 0]
+            L = _length(J.swapaxes(-1, -2))
+            return L.max(axis=-1) / L.min(axis=-1)
+
+    elif metric in ['skew', 'minangle', 'maxangle']:
+        A = []
+        if len(tris):
+            A.append((_angles(X, tris).reshape(nel, -1), 60.))
+        if len(quads):
+            A.append((_angles(X, quads).reshape(nel, -1), 90.))
+        if metric == 'minangle':
+            return column_stack([ a.min(axis=-1) for a, e in A ]).min(axis=-1)
+        elif metric == 'maxangle':
+            return column_stack([ a.max(axis=-1) for a, e in A ]).max(axis=-1)
+        else:
+            return column_stack([
+                maximum((a-e) / (180.-e), (e-a) / e).max(axis=-1)
+                for a, e in A ]).max(axis=-1)
+
+    elif metric in ['warpage', 'taper']:
+        if len(quads) == 0:
+            return zeros(nel)
+        warp, taper = _quadMetrics(X[:, quads])
+        if metric == 'warpage':
+            return warp.max(axis=-1)
+        else:
+            return taper.max(axis=-1)
+
+    raise ValueError("Invalid quality metric: %s" % metric)
+
+
+def elementQuality(coords,elems,eltype,metric='scaledjacobian',at='corners',chunk=1<<16):
+    """Compute a quality metric for all the elements of a mesh.
+
+    Parameters:
+
+    - `coords`: float array (ncoords,3): the nodal coordinates.
+    - `elems`: int array (nelems,nplex): the element connectivity.
+    - `eltype`: element type or element name.
+    - `metric`: string: one of the metrics returned by :func:`metrics`.
+    - `at`: string: for the Jacobian metrics, specifies where they are
+      computed: 'corners', 'gauss' (the integration points) or 'all'.
+    - `chunk`: int: the number of elements processed at once.
+
+    Returns a float array (nelems,) with the value of the metric for each
+    of the elements.
+
+    Example:
+
+    >>> from pyformex.mesh import Mesh
+    >>> M = Mesh(eltype='quad4').scale([2.,1.,1.])
+    >>> print(elementQuality(M.coords,M.elems,M.elType(),'aspectratio'))
+    [ 2.]
+    """
+    eltype = elementType(eltype)
+    if metric not in metrics(eltype.ndim):
+        raise ValueError("Invalid quality metric for %s elements: %s" % (eltype, metric))
+    coords = asarray(coords)
+    elems = asarray(elems)
+    planar = eltype.ndim == 2 and (coords[:, 2] == 0.).all()
+    q = empty((elems.shape[0],), dtype=float64)
+    with errstate(divide='ignore', invalid='ignore'):
+        for i in range(0, elems.shape[0], chunk):
+            X = coords[elems[i:i+chunk]].astype(float64)
+            if metric in ['jacobian', 'scaledjacobian']:
+                ref = _reference(X, eltype, planar)
+                d = _jacobianValues(X, eltype, at, metric=='scaledjacobian', ref)
+                q[i:i+chunk] = d.min(axis=-1)
+            else:
+                q[i:i+chunk] = _shapeValues(X, eltype, metric)
+    return q
+
+
+def worst(q,n=10,metric='scaledjacobian'):
+    """Return the worst elements for a quality metric.
+
+    Parameters:
+
+    - `q`: float array (nelems,): the quality values of the elements.
+    - `n`: int: the number of elements to return.
+    - `metric`: string: the name of the metric, used to decide whether
+      large or small values are bad.
+
+    Returns an int array with the numbers of the (at most) n worst elements,
+    the worst first. Non-finite values are considered the worst.
+
+    Example:
+
+    >>> worst([0.9, 0.2, 1.0, 0.5], 2)
+    array([1, 3])
+    """
+    q = asarray(q, dtype=float64)
+    if _metrics[metric]:
+        q = -q
+    q = where(isnan(q), -inf, q)
+    n = min(n, q.shape[0])
+    if n <= 0:
+        return zeros(0, dtype=int)
+    w = argpartition(q, n-1)[:n]
+    return w[argsort(q[w], kind='mergesort')]
+
+
+def qualityReport(coords,elems,eltype,metrics=None,at='corners',bins=10,nworst=10):
+    """Compute a summary of some quality metrics of a mesh.
+
+    Parameters:
+
+    - `coords`, `elems`, `eltype`, `at`: see :func:`elementQuality`.
+    - `metrics`: list of metric names. Default is all the metrics
+      defined for the element type.
+    - `bins`: int or sequence: the bins of the histograms, as in
+      :func:`numpy.histogram`.
+    - `nworst`: int: the number of worst elements to report.
+
+    Returns an OrderedDict where the keys are the metric names and the
+    values are Dicts with the following items: 'min', 'max', 'mean' of
+    the finite values, 'nbad': the number of non-finite values, 'hist'
+    and 'bins': the histogram counts and bin edges of the finite values,
+    'worst': the numbers of the worst elements (see :func:`worst`) and
+    'qworst': the corresponding quality values.
+    """
+    eltype = elementType(eltype)
+    if metrics is None:
+        metrics = globals()['metrics'](eltype.ndim)
+    report = OrderedDict()
+    for m in metrics:
+        q = elementQuality(coords, elems, eltype, m, at)
+        ok = isfinite(q)
+        qok = q[ok]
+        hist, edges = histogram(qok, bins=bins) if qok.size else (zeros(0, dtype=int), zeros(0))
+        w = worst(q, nworst, m)
+        report[m] = Dict(dict(
+            min = qok.min() if qok.size else nan,
+            max = qok.max() if qok.size else nan,
+            mean = qok.mean() if qok.size else nan,
+            nbad = q.size - qok.size,
+            hist = hist,
+            bins = edges,
+            worst = w,
+            qworst = q[w],
+            ))
+    return report
+
+
+def formatReport(report):
+    """Format a quality report as a string.
+
+    `report` is a report as returned by :func:`qualityReport`.
+    """
+    s = []
+    for m, r in report.items():
+        s.append("%s: min %s, max %s, mean %s" % (m, r.min, r.max, r.mean))
+        if r.nbad:
+            s.append("  %s elements with undefined value" % r.nbad)
+        for i in range(len(r.hist)):
+            s.append("  [%12.5g, %12.5g]: %s" % (r.bins[i], r.bins[i+1], r.hist[i]))
+        s.append("  worst elements: %s" % ', '.join([ "%s (%.5g)" % (e, v) for e, v in zip(r.worst, r.qworst) ]))
+    return '\n'.join(s)
+
+
+# End
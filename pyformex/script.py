@@ -968,6 +968,9 @@ def writeGeomFile(filename,objects,sep=' ',mode='w',shortlines=False,**kargs):
     - `sep`: the string used to separate data. If set to an empty
       string, the data will be written in binary format and the resulting file
       will be smaller but less portable.
+    - `codec`: 'zlib', 'bz2' or 'lzma': if specified, the data are written
+      as chunked compressed blocks. This gives much smaller files than
+      `sep=''`, while remaining portable.
     - `kargs`: more arguments are passed to :meth:`geomfile.GeometryFile.write`.
 
     Returns the number of objects written to the file.
@@ -33,10 +33,21 @@ from __future__ import absolute_import, division, print_function
 
 import pyformex as pf
 from pyformex.odict import OrderedDict
-from distutils.version import LooseVersion as SaneVersion
 import os
 import sys
 import re
+from types import ModuleType
+
+
+def SaneVersion(version):
+    """Return a comparable version object for a version string.
+
+    This is distutils.version.LooseVersion. The distutils module is only
+    imported on first use, because that import is expensive (it pulls in
+    setuptools) and is not needed during a normal startup.
+    """
+    from distutils.version import LooseVersion
+    return LooseVersion(version)
 
 # Python modules we know how to use
 # Do not include pyformex or python here: they are predefined
@@ -206,6 +217,88 @@ However, the required version for that module could not be loaded.
                 raise ValueError(errmsg)
 
 
+class LazyModule(ModuleType):
+    """A proxy for a module that is imported on first use.
+
+    The LazyModule can be used in place of the module itself. The real
+    module is only imported when one of its attributes is accessed.
+    This avoids the cost of importing (and initializing) modules that
+    may not be needed in a session.
+
+    Parameters:
+
+    - `name`: the full (dotted) name of the module.
+
+    All public attributes are forwarded to the real module. The proxy's
+    own methods have private names, so that they never hide an attribute
+    of the module.
+
+    Example:
+
+    >>> m = LazyModule('json')
+    >>> m._lazy_loaded_()
+    False
+    >>> m.dumps([1, 2])
+    '[1, 2]'
+    >>> m._lazy_loaded_()
+    True
+    """
+    def __init__(self, name):
+        ModuleType.__init__(self, name)
+        self.__dict__['_module_'] = None
+
+
+    def _lazy_loaded_(self):
+        """Return True if the real module has been imported."""
+        return self.__dict__['_module_'] is not None
+
+
+    def _lazy_load_(self):
+        """Import the real module and return it."""
+        module = self.__dict__['_module_']
+        if module is None:
+            pf.debug("Lazy loading module %s" % self.__name__, pf.DEBUG.INFO)
+            __import__(self.__name__)
+            module = self.__dict__['_module_'] = sys.modules[self.__name__]
+        return module
+
+
+    def __getattr__(self, name):
+        return getattr(self._lazy_load_(), name)
+
+
+    def __setattr__(self, name, value):
+        setattr(self._lazy_load_(), name, value)
+
+
+    def __dir__(self):
+        return dir(self._lazy_load_())
+
+
+    def __repr__(self):
+        if self._lazy_loaded_():
+            return repr(self._lazy_load_())
+        return "<lazy module '%s'>" % self.__name__
+
+
+def lazyImport(name):
+    """Import a module on first use.
+
+    Returns the module if it was already imported, else a
+    :class:`LazyModule` proxy that will import the module when one of its
+    attributes is accessed. This is intended for modules that are costly
+    to import and that are only used in some functions of a module.
+
+    Example:
+
+    >>> lazyImport('sys') is sys
+    True
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
 def checkAllModules():
     """Check the existence of all known modules.
 
@@ -280,12 +373,16 @@ def hasExternal(name,force=False):
     or an empty string if it is not.
 
     The external command is only checked on the first call.
-    The result is remembered in the the_external dict.
+    The result is remembered in the the_external dict and in the
+    on-disk cache (see :func:`externalCache`), so that later sessions
+    do not have to run the command again, as long as neither the PATH
+    nor the executable have changed.
+    If force is True, the command is always run.
     """
     if name in the_external and not force:
         return the_external[name]
     else:
-        return checkExternal(name)
+        return checkExternal(name, force=force)
 
 
 def requireExternal(name):
@@ -317,18 +414,51 @@ However, '%s' was not found on your system.
         raise ValueError(errmsg)
 
 
-def checkAllExternals():
+def checkAllExternals(force=False,nproc=-1):
     """Check the existence of all known externals.
 
+    Parameters:
+
+    - `force`: bool. If True, all externals are probed by running their
+      command. The default only probes those that have no valid entry in
+      the detection cache.
+    - `nproc`: int. The number of probes to run simultaneously. The
+      default (-1) uses the number of processors. The probes
+      spend most of their time waiting for the subprocess, so they
+      are run from a pool of threads.
+
     Returns a dict with all the known externals, detected or not.
     The detected ones have a non-zero value, usually the version number.
     """
     #print("CHECKING ALL EXTERNALS")
-    [ checkExternal(n, quiet=True) for n in known_externals.keys() ]
+    cache = externalCache()
+    names = []
+    for n in known_externals:
+        if force or _cachedExternal(cache, n, known_externals[n]) is None:
+            names.append(n)
+        else:
+            the_external[n] = cache['externals'][n]['version']
+    if names:
+        if nproc < 0:
+            from pyformex.multi import cpu_count
+            nproc = cpu_count()
+        nproc = min(nproc, len(names))
+        probe = lambda n: checkExternal(n, quiet=True, force=True, save=False)
+        if nproc > 1:
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(nproc)
+            try:
+                pool.map(probe, names)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            [ probe(n) for n in names ]
+        saveExternalCache()
     return the_external
 
 
-def checkExternal(name,command=None,answer=None,quiet=False):
+def checkExternal(name,command=None,answer=None,quiet=False,force=False,save=True):
     """Check if the named external command is available on the system.
 
     name is the generic command name,
@@ -345,6 +475,14 @@ def checkExternal(name,command=None,answer=None,quiet=False):
 
     As a convenience, we provide a list of predeclared external commands,
     that can be checked by their name alone.
+
+    The result is looked up in the detection cache first: the command
+    is only run if there is no entry for the same command and answer,
+    or if the PATH or the modification time of the executable have
+    changed since it was stored, or if force is True.
+    If the executable can not be found on the PATH, the command is not
+    run at all. New results are added to the cache, which is saved
+    to disk if save is True.
     """
     from pyformex import utils
 
@@ -355,23 +493,165 @@ def checkExternal(name,command=None,answer=None,quiet=False):
         if answer is None:
             answer = ans
 
-    pf.debug("Check %s\n%s" % (name, command), pf.DEBUG.DETECT)
-    P = utils.system(command)
-    pf.debug("Status:\n%s\nStdout:\n%s\nStderr:\n%s" % (P.sta, P.out, P.err), pf.DEBUG.DETECT)
+    cache = externalCache()
+    if not force:
+        version = _cachedExternal(cache, name, (command, answer))
+        if version is not None:
+            pf.debug("Cached %s: %s" % (name, version), pf.DEBUG.DETECT)
+            the_external[name] = version
+            return str(version)
+
+    exe = _which(_executable(command))
     version = ''
-    # Beware: some programs write their version to stderr, others to stdout
-    m = None
-    if P.out:
-        m = re.match(answer, P.out)
-    if m is None and P.err:
-        m = re.match(answer, P.err)
-    if m:
-        version = str(m.group(1))
+    if exe:
+        pf.debug("Check %s\n%s" % (name, command), pf.DEBUG.DETECT)
+        P = utils.system(command)
+        pf.debug("Status:\n%s\nStdout:\n%s\nStderr:\n%s" % (P.sta, P.out, P.err), pf.DEBUG.DETECT)
+        # Beware: some programs write their version to stderr, others to stdout
+        m = None
+        if P.out:
+            m = re.match(answer, P.out)
+        if m is None and P.err:
+            m = re.match(answer, P.err)
+        if m:
+            version = str(m.group(1))
     _congratulations(name, version, 'program', quiet=quiet)
     the_external[name] = version
+    cache['externals'][name] = {
+        'command': command,
+        'answer': answer,
+        'exe': exe,
+        'mtime': _mtime(exe),
+        'version': version,
+        }
+    if save:
+        saveExternalCache()
     return str(version)
 
 
+############ Detection cache for external commands ############
+
+_external_cache = None
+
+
+def _executable(command):
+    """Return the name of the executable run by a check command.
+
+    For commands of the form "sh -c 'cmd ...'", the executable of the
+    inner command is returned.
+
+    >>> _executable('admesh --version')
+    'admesh'
+    >>> _executable("sh -c 'tetgen -h |fgrep Version'")
+    'tetgen'
+    """
+    words = command.split()
+    if len(words) > 2 and words[0] == 'sh' and words[1] == '-c':
+        return words[2].strip('\'"')
+    return words[0] if words else ''
+
+
+def _which(exe):
+    """Return the full path of an executable, or '' if it is not found.
+
+    If exe contains a path separator, it is checked as is. Else the
+    directories in the PATH environment variable are searched.
+    """
+    if not exe:
+        return ''
+    if os.sep in exe:
+        paths = [ exe ]
+    else:
+        paths = [ os.path.join(d, exe) for d in
+                  os.environ.get('PATH', '').split(os.pathsep) if d ]
+    for p in paths:
+        if os.path.isfile(p) and os.access(p, os.X_OK):
+            return os.path.abspath(p)
+    return ''
+
+
+def _mtime(path):
+    """Return the modification time of a file, or 0 if it does not exist."""
+    try:
+        return os.stat(path).st_mtime
+    except:
+        return 0
+
+
+def _cachedExternal(cache,name,check):
+    """Return the cached version of an external, or None if not valid.
+
+    An entry is valid if it was created by the same (command,answer)
+    check, and its executable still resolves to the same path with
+    the same modification time.
+    """
+    entry = cache['externals'].get(name, None)
+    if entry is None or (entry.get('command'), entry.get('answer')) != tuple(check):
+        return None
+    exe = _which(_executable(entry['command']))
+    if exe != entry.get('exe', '') or _mtime(exe) != entry.get('mtime', 0):
+        return None
+    return entry.get('version', '')
+
+
+def externalCacheFile():
+    """Return the name of the file with the external detection cache.
+
+    This is set by the 'externalcache' configuration variable. If it is
+    empty, the cache is not stored on disk.
+    """
+    return pf.cfg.get('externalcache', '')
+
+
+def externalCache():
+    """Return the detection cache for the external commands.
+
+    The cache is a dict with the PATH it is valid for and a dict
+    'externals' with an entry per checked external. It is loaded from
+    :func:`externalCacheFile` on first use. A cache stored with another
+    PATH is discarded.
+    """
+    global _external_cache
+    path = os.environ.get('PATH', '')
+    if _external_cache is None or _external_cache['PATH'] != path:
+        _external_cache = None
+        fn = externalCacheFile()
+        if fn and os.path.exists(fn):
+            import json
+            try:
+                with open(fn) as fil:
+                    cache = json.load(fil)
+                if cache.get('PATH', None) == path:
+                    _external_cache = cache
+            except:
+                pf.debug("Invalid external cache %s" % fn, pf.DEBUG.DETECT)
+        if _external_cache is None:
+            _external_cache = { 'PATH': path, 'externals': {} }
+    return _external_cache
+
+
+def saveExternalCache():
+    """Save the external detection cache to disk.
+
+    Failure to write the file is not an error: the cache will then
+    simply be rebuilt in the next session.
+    """
+    fn = externalCacheFile()
+    if not fn or _external_cache is None:
+        return
+    import json
+    try:
+        dirname = os.path.dirname(fn)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        tmp = fn + '.%s' % os.getpid()
+        with open(tmp, 'w') as fil:
+            json.dump(_external_cache, fil, indent=1, sort_keys=True)
+        os.rename(tmp, fn)
+    except:
+        pf.debug("Could not write external cache %s" % fn, pf.DEBUG.DETECT)
+
+
 def _congratulations(name,version,typ='module',fatal=False,quiet=False,severity=2):
     """Report a detected module/program."""
     if version:
@@ -0,0 +1,117 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+"""Unittests for the pyformex.fe.eigen module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import numpy as np
+import pytest
+from pyformex.fe import eigen, beam2d
+
+
+def beam(nel,sparse):
+    lt = 5.
+    K,M = beam2d.createBeam(lt,nel,sparse=sparse)
+    fth = beam2d.cantilever_frequencies(
+        beam2d.IPE100.rho,beam2d.IPE100.A,lt,beam2d.steel.E,beam2d.IPE100.I)
+    return K,M,fth
+
+
+def test_lu_decomp():
+    K,M,fth = beam(10,False)
+    L,U = eigen.lu_decomp(K)
+    assert np.allclose(np.dot(L,U),K)
+    assert np.allclose(L,np.tril(L)) and np.allclose(U,np.triu(U))
+
+
+def test_sparse_assembly():
+    Ks,Ms,fth = beam(20,True)
+    Kd,Md,fth = beam(20,False)
+    assert np.allclose(Ks.toarray(),Kd)
+    assert np.allclose(Ms.toarray(),Md)
+
+
+@pytest.mark.parametrize("sparse",[False,True])
+@pytest.mark.parametrize("nel",[40,200])
+def test_subspace(nel,sparse):
+    if sparse:
+        pytest.importorskip('scipy')
+    K,M,fth = beam(nel,sparse)
+    e,x = eigen.subspace(K,M,4)
+    f = np.sqrt(e)/2/np.pi
+    assert np.allclose(f,fth[:4],rtol=1.e-4)
+    assert eigen.sturm_check(K,M,e,bound='lu',group=False)
+
+
+def membrane(nx,ny,c):
+    """Stiffness and mass matrix of a finite difference membrane model
+
+    The model has nx*ny DOFs. The tension in y-direction is c times that
+    in x-direction. Returns the matrices and the four lowest eigenvalues.
+    """
+    from scipy import sparse
+    def laplace(n):
+        h = 1./(n+1)
+        return sparse.diags([-np.ones(n-1),2*np.ones(n),-np.ones(n-1)],[-1,0,1]) / h**2
+    def ev(n,i):
+        h = 1./(n+1)
+        return 4./h**2 * np.sin(i*np.pi*h/2)**2
+    K = sparse.kronsum(laplace(nx),c*laplace(ny)).tocsr()
+    M = sparse.identity(nx*ny,format='csr')
+    e = [ ev(nx,i)+c*ev(ny,j) for i in range(1,5) for j in range(1,5) ]
+    return K,M,np.sort(e)[:4]
+
+
+def test_subspace_large():
+    pytest.importorskip('scipy')
+    K,M,eth = membrane(250,200,0.7)
+    assert K.shape == (50000,50000)
+    e,x = eigen.subspace(K,M,4,tol=1.e-6)
+    assert np.allclose(e,eth,rtol=1.e-5)
+    assert eigen.sturm_check(K,M,e,bound='lu',group=False)
+
+
+def test_count_neg_diag_sparse():
+    pytest.importorskip('scipy')
+    K,M,eth = membrane(30,20,0.7)
+    for s,n in [(0.,0),(0.5*(eth[1]+eth[2]),2),(eth[3]+1.,4)]:
+        assert eigen.count_neg_diag(K-s*M) == n
+        assert eigen.count_neg_diag((K-s*M).toarray()) == n
+    with pytest.raises(ValueError):
+        eigen.count_neg_diag(0.*K)
+
+
+def test_lanczos_sparse():
+    pytest.importorskip('scipy')
+    K,M,fth = beam(200,True)
+    e,x = eigen.lanczos(K,M,4)
+    f = np.sqrt(e)/2/np.pi
+    assert np.allclose(f,fth[:4],rtol=1.e-4)
+
+
+# End
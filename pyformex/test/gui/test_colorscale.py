@@ -0,0 +1,61 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+"""Unittests for the pyformex.gui.colorscale module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import numpy as np
+import pytest
+
+try:
+    from pyformex.gui.colorscale import ColorScale, ColorLegend
+except (ImportError, ValueError):
+    # ValueError is raised if no Qt bindings are found
+    pytest.skip("The pyFormex GUI is not available", allow_module_level=True)
+
+
+def test_colorarray_scalar():
+    CS = ColorScale('RGB', 0., 4.)
+    assert CS.colorArray(2.).shape == (3,)
+    assert np.allclose(CS.colorArray(np.nan), CS.nancolor)
+    CL = ColorLegend(CS, 4)
+    assert CL.colorArray(2.5).shape == (3,)
+    assert np.allclose(CL.colorArray(np.nan), CS.nancolor)
+    assert CL.colorArray(np.ones((2, 5))).shape == (2, 5, 3)
+
+
+def test_colorlegend_log():
+    CS = ColorScale('RGB', 1., 1000., log=True)
+    CL = ColorLegend(CS, 3)
+    assert np.allclose(CL.limits, [1., 10., 100., 1000.])
+    data = [5., 50., 500.]
+    assert np.allclose(CL.colorArray(data), [CL.color(v) for v in data])
+    # NaN is not mapped to -inf on a log scale
+    assert np.allclose(CS.colorArray([np.nan]), [CS.nancolor])
+
+
+# End
@@ -0,0 +1,80 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+"""Unittests for the pyformex.gui.image module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import sys
+import pyformex as pf
+import pytest
+
+try:
+    from pyformex.gui import image
+except (ImportError, ValueError):
+    # ValueError is raised if no Qt bindings are found
+    pytest.skip("The pyFormex GUI is not available", allow_module_level=True)
+
+
+class DummyCanvas(object):
+    def getSize(self):
+        return 5, 3
+
+
+# A chatty encoder, writing the number of bytes received to its output file
+encoder = """import sys
+sys.stderr.write('x' * 1000000)
+sys.stderr.flush()
+data = sys.stdin.buffer.read() if hasattr(sys.stdin, 'buffer') else sys.stdin.read()
+open(sys.argv[-1], 'w').write(str(len(data)))
+"""
+
+
+def test_command():
+    R = image.MovieRecorder('my movie.mp4', fps=10, encoder='ffmpeg',
+                            options='-c:v libx264 -crf 18')
+    cmd = R.command(64, 48)
+    assert cmd[0] == 'ffmpeg'
+    assert cmd[-1] == 'my movie.mp4'
+    assert cmd[cmd.index('-s')+1] == '64x48'
+    assert cmd[cmd.index('-r')+1] == '10'
+    assert cmd[-5:-1] == ['-c:v', 'libx264', '-crf', '18']
+
+
+def test_writer(tmpdir):
+    script = tmpdir.join('encoder.py')
+    script.write(encoder)
+    out = tmpdir.join('movie file.raw')
+    R = image.MovieRecorder(str(out), canvas=DummyCanvas(), options='',
+                            encoder="'%s' '%s'" % (sys.executable, script))
+    R.start()
+    assert (R.w, R.h) == (4, 2)
+    for i in range(5):
+        R.queue.put(b'\x00' * (R.w*R.h*3))
+    assert R.stop() == 0
+    assert R.error is None
+    assert out.read() == str(5*4*2*3)
@@ -0,0 +1,80 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+"""Unittests for the pyformex.plugins.centerline module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import pyformex as pf
+import numpy as np
+import pytest
+from pyformex import simple
+
+pytest.importorskip('scipy')
+
+from pyformex.plugins import centerline
+
+
+def test_circumcenter():
+    np.random.seed(0)
+    x = np.random.rand(10, 3)
+    elems = np.array([[0, 1, 2, 3], [4, 5, 6, 7], [1, 3, 8, 9]])
+    C, R = centerline.circumcenter(x, elems)
+    d = np.sqrt(((x[elems]-C[:, np.newaxis])**2).sum(axis=-1))
+    assert np.allclose(d, R[:, np.newaxis])
+
+
+def test_skeleton():
+    np.random.seed(0)
+    S = simple.sphere(8).scale([5., 1., 1.])
+    S.coords += (np.random.rand(*S.coords.shape)-0.5) * 0.01
+    M = centerline.skeleton(S)
+    R = M.getField('radius').data
+    assert M.elName() == 'line2'
+    assert R.shape == (M.ncoords(),)
+    # the skeleton of an ellipsoid is a chain along its long axis
+    assert M.nelems() == M.ncoords() - 1
+    assert np.bincount(M.elems.ravel()).max() == 2
+    assert abs(M.coords[:, 1:]).max() < 0.05
+    assert (R > 0.5).all() and (R < 1.05).all()
+
+
+def test_innerVoronoi_flat():
+    # a strongly elongated ellipsoid has many nearly flat tetrahedrons
+    # in its Delaunay triangulation: their poles are skipped
+    S = simple.sphere(20).scale([100., 1., 1.])
+    X, R = centerline.innerVoronoi(S)
+    assert (((X / [100., 1., 1.])**2).sum(axis=-1) <= 1. + 1.e-6).all()
+
+
+def test_insidePoints():
+    S = simple.sphere(8)
+    X = [[0., 0., 0.], [0.5, 0.5, 0.], [2., 0., 0.], [0., 0., -1.1]]
+    assert (centerline.insidePoints(S, X) == [True, True, False, False]).all()
+
+
+# End
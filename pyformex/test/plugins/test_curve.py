@@ -0,0 +1,63 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+"""Unittests for the pyformex.plugins.curve module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import pyformex as pf
+import numpy as np
+from pyformex.plugins.curve import BezierSpline
+
+
+def test_bezier_lengths():
+    # a straight line with non-uniform speed
+    B = BezierSpline(control=[[0.,0.,0.],[0.1,0.,0.],[0.2,0.,0.],[3.,0.,0.]])
+    assert np.allclose(B.lengths(), [3.])
+    at = B.atLength(6)
+    X = B.pointsAt(at)
+    assert np.allclose(X[:,0], np.arange(7)*0.5, atol=1.e-5)
+
+
+def test_atLength():
+    np.random.seed(0)
+    B = BezierSpline(np.random.rand(20,3))
+    A = B.arcLength()
+    at = B.atLength(100)
+    assert np.allclose(np.diff(A.length(at)), B.length()/100)
+    # compare with the PolyLine approximation
+    assert np.allclose(at, B.atLength(100, approx=500), atol=1.e-3)
+
+
+def test_atChordal():
+    np.random.seed(1)
+    B = BezierSpline(np.random.rand(10,3))
+    chordal = 0.001
+    at = np.array(B.atChordal(chordal))
+    X = B.pointsAt(at)
+    XM = B.pointsAt(0.5*(at[:-1]+at[1:]))
+    d = np.linalg.norm(XM - 0.5*(X[:-1]+X[1:]), axis=-1)
+    assert (d < chordal * B.approxAt(B.atApproximate(nseg=3*B.nparts)).charLength()).all()
@@ -0,0 +1,168 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+"""Unittests for the pyformex.plugins.dxf module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import pyformex as pf
+import numpy as np
+from pyformex.plugins import dxf
+
+
+def groups(*pairs):
+    return ''.join(['%3s\n%s\n' % p for p in pairs])
+
+
+def entity(typ, layer, *pairs):
+    return groups((0, typ), (8, layer), *pairs)
+
+
+def write_dxf(fn):
+    s = groups((0, 'SECTION'), (2, 'BLOCKS'),
+               (0, 'BLOCK'), (8, '0'), (2, 'B1'), (10, 0.), (20, 0.), (30, 0.))
+    s += entity('LINE', '0', (10, 0.), (20, 0.), (30, 0.),
+                (11, 1.), (21, 0.), (31, 0.))
+    s += groups((0, 'ENDBLK'), (0, 'ENDSEC'), (0, 'SECTION'), (2, 'ENTITIES'))
+    s += entity('LINE', 'A', (10, 0.), (20, 0.), (30, 0.),
+                (11, 1.), (21, 1.), (31, 0.))
+    # an arc in a mirrored object coordinate system
+    s += entity('ARC', 'A', (10, 1.), (20, 0.), (30, 2.), (40, 2.),
+                (50, 0.), (51, 90.), (210, 0.), (220, 0.), (230, -1.))
+    # a closed polyline with a semicircular segment
+    s += entity('LWPOLYLINE', 'B', (90, 3), (70, 1),
+                (10, 0.), (20, 0.), (42, 1.), (10, 2.), (20, 0.),
+                (10, 2.), (20, 2.))
+    # an array of 3 rotated block inserts
+    s += entity('INSERT', 'C', (2, 'B1'), (10, 5.), (20, 0.), (30, 0.),
+                (50, 90.), (70, 3), (44, 2.))
+    s += groups((0, 'ENDSEC'), (0, 'EOF'))
+    with open(fn, 'w') as f:
+        f.write(s)
+
+
+def test_parseDXF(tmpdir):
+    fn = str(tmpdir.join('test.dxf'))
+    write_dxf(fn)
+    layers = dxf.parseDXF(fn, chordal=0.001)
+    assert list(layers.keys()) == ['A', 'B', 'C']
+    A, L = layers['A']
+    assert L.nelems() == 1
+    assert np.allclose(A.getCenter(), [-1., 0., -2.])
+    assert np.allclose(A.coords[[0, 2]], [[-3., 0., -2.], [-1., 2., -2.]],
+                       atol=1.e-5)
+    P, = layers['B']
+    assert P.closed
+    assert np.allclose(P.coords[[0, -1]], [[0., 0., 0.], [2., 2., 0.]])
+    # the bulge points lie on the circle with center (1,0)
+    assert np.allclose(P.coords[1:-2].distanceFromPoint([1., 0., 0.]), 1.)
+    assert (P.coords[1:-2, 1] < 0.).all()
+    # the array columns follow the rotated block x-axis
+    C, = layers['C']
+    assert np.allclose(C.toFormex().coords,
+                       [[[5., 0., 0.], [5., 1., 0.]],
+                        [[5., 2., 0.], [5., 3., 0.]],
+                        [[5., 4., 0.], [5., 5., 0.]]], atol=1.e-6)
+
+
+def vertex(layer, x, y, z, flag, *pairs):
+    return entity('VERTEX', layer, (10, x), (20, y), (30, z), (70, flag), *pairs)
+
+
+def write_dxf_polylines(fn):
+    s = groups((0, 'SECTION'), (2, 'ENTITIES'))
+    # a 2D polyline with a bulge
+    s += entity('POLYLINE', 'P', (66, 1), (70, 0), (30, 1.))
+    s += vertex('P', 0., 0., 0., 0, (42, 1.))
+    s += vertex('P', 2., 0., 0., 0)
+    s += vertex('P', 2., 2., 0., 0)
+    s += groups((0, 'SEQEND'))
+    # a polyface mesh with 4 vertices, a quad and a triangle
+    s += entity('POLYLINE', 'F', (66, 1), (70, 64), (71, 4), (72, 2))
+    for x, y in [(0., 0.), (1., 0.), (1., 1.), (0., 1.)]:
+        s += vertex('F', x, y, 0., 192)
+    s += vertex('F', 0., 0., 0., 128, (71, 1), (72, 2), (73, -3), (74, 4))
+    s += vertex('F', 0., 0., 0., 128, (71, 2), (72, 3), (73, 4))
+    s += groups((0, 'SEQEND'))
+    # a 2x3 polygon mesh
+    s += entity('POLYLINE', 'G', (66, 1), (70, 16), (71, 2), (72, 3))
+    for i in range(2):
+        for j in range(3):
+            s += vertex('G', float(j), float(i), 0., 64)
+    s += groups((0, 'SEQEND'))
+    # a quadratic spline
+    s += entity('SPLINE', 'S', (70, 8), (71, 2), (72, 6), (73, 3),
+                (40, 0.), (40, 0.), (40, 0.), (40, 1.), (40, 1.), (40, 1.),
+                (10, 0.), (20, 0.), (30, 0.), (10, 1.), (20, 1.), (30, 0.),
+                (10, 2.), (20, 0.), (30, 0.))
+    # a quadrilateral and a triangular 3D face
+    s += entity('3DFACE', 'T', (10, 0.), (20, 0.), (30, 0.),
+                (11, 1.), (21, 0.), (31, 0.), (12, 1.), (22, 1.), (32, 0.),
+                (13, 0.), (23, 1.), (33, 0.))
+    s += entity('3DFACE', 'T', (10, 0.), (20, 0.), (30, 1.),
+                (11, 1.), (21, 0.), (31, 1.), (12, 1.), (22, 1.), (32, 1.),
+                (13, 1.), (23, 1.), (33, 1.))
+    s += groups((0, 'ENDSEC'), (0, 'EOF'))
+    with open(fn, 'w') as f:
+        f.write(s)
+
+
+def test_parseDXF_polylines(tmpdir):
+    fn = str(tmpdir.join('test.dxf'))
+    write_dxf_polylines(fn)
+    layers = dxf.parseDXF(fn)
+    assert list(layers.keys()) == ['P', 'F', 'G', 'S', 'T']
+    P, = layers['P']
+    assert not P.closed
+    assert np.allclose(P.coords[[0, -1]], [[0., 0., 1.], [2., 2., 1.]])
+    assert np.allclose(P.coords[1:-2].distanceFromPoint([1., 0., 1.]), 1.)
+    F, = layers['F']
+    assert F.elName() == 'tri3'
+    assert F.nelems() == 3
+    assert np.isclose(F.areas().sum(), 1.5)
+    G, = layers['G']
+    assert G.elName() == 'quad4'
+    assert G.nelems() == 2
+    assert np.isclose(G.areas().sum(), 2.)
+    S, = layers['S']
+    assert S.degree == 2
+    assert np.allclose(S.knots, [0., 0., 0., 1., 1., 1.])
+    assert np.allclose(S.coords.toCoords(), [[0., 0., 0.], [1., 1., 0.], [2., 0., 0.]])
+    T = layers['T']
+    assert [ t.elName() for t in T ] == ['tri3', 'quad4']
+    assert [ t.prop[0] for t in T ] == [5, 4]
+    parts = dxf.parseDXF(fn, merge=False)['T']
+    assert [ p.elName() for p in parts ] == ['quad4', 'tri3']
+
+
+def test_importDXF(tmpdir):
+    fn = str(tmpdir.join('test.dxf'))
+    write_dxf_polylines(fn)
+    parts = dxf.importDXF(fn)
+    assert len(parts) == 6
+    assert [ p.dxftype for p in parts ] == ['Polyline']*3 + ['Spline'] + ['3DFace']*2
+    assert [ int(np.min(p.prop)) for p in parts ] == list(range(6))
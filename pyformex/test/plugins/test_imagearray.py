@@ -0,0 +1,94 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+"""Unittests for the pyformex.plugins.imagearray module
+
+These unittest are based on the pytest framework.
+The DICOM reading functions are replaced with fakes, so that the
+DicomVolume can be tested without any DICOM files.
+
+"""
+from __future__ import print_function
+import numpy as np
+import pytest
+
+try:
+    from pyformex.plugins import imagearray
+except (ImportError, ValueError):
+    # ValueError is raised if no Qt bindings are found
+    pytest.skip("The pyFormex GUI is not available", allow_module_level=True)
+
+if not hasattr(imagearray, 'DicomVolume'):
+    pytest.skip("python-gdcm is not available", allow_module_level=True)
+
+
+# nz slices of ny rows and nx columns, stored in reverse z order
+nz, ny, nx = 7, 3, 5
+slices = dict([ ('slice%s.dcm' % i, np.full((ny, nx), i, dtype=np.int16))
+                for i in range(nz) ])
+
+
+@pytest.fixture
+def fake_dicom(monkeypatch):
+    shape = {}
+    def scan(files):
+        return [ (ny, nx, -float(f[5:-4])) if f in slices else None for f in files ]
+    def read(fn):
+        pix = slices[fn]
+        if fn in shape:
+            pix = pix.reshape(shape[fn])
+        return pix, np.ones(3), np.zeros(3), 1., 0.
+    monkeypatch.setattr(imagearray, 'scanDicomHeaders', scan)
+    monkeypatch.setattr(imagearray, 'readDicomSlice', read)
+    return shape
+
+
+def test_dicomvolume(fake_dicom):
+    files = sorted(slices) + ['notdicom.txt']
+    with imagearray.DicomVolume(files, nproc=3) as V:
+        assert V.rejected == ['notdicom.txt']
+        assert V.shape == (nz, ny, nx) and len(V) == nz
+        assert V[0].shape == (ny, nx) and V[0][0, 0] == nz-1
+        assert (V[2:5, 1, 2] == [4, 3, 2]).all()
+        data = V.load()
+        assert (data[:, 0, 0] == np.arange(nz)[::-1]).all()
+        pool = V._pool
+        assert pool is not None
+        blocks = list(V.blocks(3))
+        assert [ z0 for z0, b in blocks ] == [0, 2, 4]
+        assert all([ (b == data[z0:z0+3]).all() for z0, b in blocks ])
+        # the threads are reused
+        assert V._pool is pool
+    assert V._pool is None
+
+
+def test_dicomvolume_shape(fake_dicom):
+    fake_dicom['slice3.dcm'] = (nx, ny)
+    V = imagearray.DicomVolume(sorted(slices), nproc=1)
+    assert V[0].shape == (ny, nx)
+    with pytest.raises(ValueError):
+        V.load()
+
+
+# End
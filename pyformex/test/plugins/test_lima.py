@@ -0,0 +1,100 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+"""Unittests for the pyformex.plugins.lima and turtle modules
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import pyformex as pf
+import numpy as np
+import pytest
+from pyformex.plugins import lima, turtle
+
+turtlecmds = { 'F': 'fd();', '*': 'ro(25);', '/': 'ro(-25);',
+               '[': 'push();', ']': 'pop();' }
+
+
+def test_lsystem_matches_script():
+    axiom, rules = "+Y", {"Y": "YFX[*Y][/Y]", "X": "[/F][*F]FX"}
+    L = lima.Lima(axiom, rules)
+    L.grow(5)
+    old = np.array(turtle.play("reset();" + L.translate(turtlecmds)))
+    S = lima.LSystem(axiom, rules)
+    assert S.grow(5) == L.product
+    seg = S.segments(turtlecmds)
+    assert seg.shape == (old.shape[0], 2, 3)
+    assert np.allclose(seg[..., :2], old)
+
+
+def test_lsystem_stochastic():
+    rules = {'F': [(0.5, 'F[*F]F'), (0.5, 'F[/F]F')]}
+    A = lima.LSystem('F', rules, seed=1)
+    B = lima.LSystem('F', rules, seed=1)
+    assert A.grow(4) == B.grow(4)
+    assert set(A.product()) == set('F[*/]')
+
+
+def test_lsystem_parametric():
+    L = lima.LSystem([('F', 1.)], {'F': [('F', lambda x: x/3.), '*',
+                                          ('F', lambda x: x/3.)]})
+    L.grow(2)
+    seg = L.segments({'F': 'fd()', '*': 'ro(90)'})
+    assert len(seg) == 4
+    assert np.allclose(np.linalg.norm(seg[:, 1]-seg[:, 0], axis=-1), 1./9.)
+
+
+def test_turtle_unbalanced():
+    with pytest.raises(ValueError):
+        turtle.segments([turtle.FD, turtle.POP], [1., 0.])
+    with pytest.raises(ValueError):
+        turtle.compileCommand('go((1,1))')
+
+
+@pytest.mark.parametrize('script', [
+    "fd(0.5);fd();ro(90);fd()",
+    "fd(2);push();ro(90);fd(0.5);fd();pop();fd();ro(-45);mv();fd()",
+    "push();st(3);push();fd();pop();ro(30);fd(0.25);pop();fd()",
+    "fd(0.5);push();push();fd(2);pop();fd();pop();ro(60);fd(0);fd(3);fd()",
+    ])
+def test_turtle_step(script):
+    old = np.array(turtle.play("reset();" + script))
+    cmds = script.split(';')
+    k, v = zip(*[ turtle.compileCommand(c) for c in cmds ])
+    seg = turtle.segments(k, v)
+    assert seg.shape == (old.shape[0], 2, 3)
+    assert np.allclose(seg[..., :2], old)
+
+
+def test_lima_step():
+    cmds = { 'F': 'fd();', 'G': 'fd(0.5);', '*': 'ro(60);', '/': 'ro(-60);',
+             '[': 'push();', ']': 'pop();' }
+    axiom, rules = "F", {"F": "F[*G]F[/F]G"}
+    seg = lima.lima(axiom, rules, 3, cmds)
+    L = lima.Lima(axiom, rules)
+    L.grow(3)
+    old = turtle.play("reset();" + L.translate(cmds))
+    assert isinstance(seg, list)
+    assert np.allclose(seg, old)
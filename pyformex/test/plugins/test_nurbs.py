@@ -0,0 +1,72 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+"""Unittests for the pyformex.plugins.nurbs module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import pyformex as pf
+import numpy as np
+import pytest
+from pyformex.plugins import nurbs
+
+
+@pytest.fixture(autouse=True)
+def compiled_nurbs(monkeypatch):
+    """Use the compiled nurbs library, like pyFormex does with --uselib"""
+    lib = pytest.importorskip('pyformex.lib.nurbs_')
+    monkeypatch.setattr(nurbs, 'nurbs', lib)
+
+
+def test_curve_projectPoints():
+    # a rational curve, with coinciding end points
+    C = nurbs.NurbsCircle(r=2.)
+    P = np.random.RandomState(6).rand(1000, 3) * 6. - 3.
+    u, X, d, conv = C.projectPoints(P)
+    assert conv.all()
+    r = np.sqrt((P[:, :2]**2).sum(axis=-1))
+    assert np.allclose(d, np.sqrt((r-2.)**2 + P[:, 2]**2), atol=1.e-4)
+    assert np.allclose(C.pointsAt(u), X)
+    u0, X0 = C.projectPoint(P[0])
+    assert np.isclose(u0, u[0])
+
+
+def test_surface_projectPoints():
+    x, y = np.meshgrid(np.arange(5.), np.arange(4.))
+    ctrl = np.stack([x, y, np.sin(x+y)], axis=-1)
+    S = nurbs.NurbsSurface(ctrl, degree=(3, 2))
+    # point inversion
+    uv = np.random.RandomState(7).rand(1000, 2)
+    u, X, d, conv = S.projectPoints(S.pointsAt(uv))
+    assert conv.all()
+    assert np.allclose(u, uv, atol=1.e-4)
+    assert d.max() < 1.e-4
+    # points moved along the normal project back on the surface
+    D = S.derivs(uv, (1, 1))
+    n = np.cross(D[1, 0], D[0, 1])
+    n /= np.linalg.norm(n, axis=-1)[:, np.newaxis]
+    u, X, d, conv = S.projectPoints(S.pointsAt(uv) + 0.01 * n)
+    assert np.allclose(d, 0.01, atol=1.e-4)
@@ -0,0 +1,57 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+"""Unittests for the pyformex.plugins.postproc module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import pyformex as pf
+import numpy as np
+from pyformex.plugins.postproc import *
+
+
+def test_deformedCoords():
+    X = np.random.rand(10,3)
+    D = np.random.rand(10,3)
+    Y = deformedCoords(X, D, 2.)
+    assert Y.dtype == np.float32
+    assert np.allclose(Y, X+2.*D, atol=1.e-6)
+    assert np.allclose(deformedCoords(X, D, 0.), X, atol=1.e-6)
+
+
+def test_scalarColors():
+    palet = np.array([[1.,0.,0.],[0.,1.,0.],[0.,0.,1.]])
+    val = np.linspace(-1., 3., 41)
+    C = scalarColors(val, (0.,1.,2.), palet)
+    assert C.shape == (41,3)
+    # ends are clipped
+    assert (C[val <= 0.] == palet[0]).all()
+    assert (C[val >= 2.] == palet[2]).all()
+    # colors interpolate linearly between the palet colors
+    assert np.allclose(C.sum(axis=-1), 1.)
+    # a zero length range gives the end colors beyond vmid
+    C = scalarColors([0.,1.,2.], (1.,1.,1.), palet)
+    assert (C == palet).all()
@@ -0,0 +1,115 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+"""Unittests for the pyformex.plugins.properties module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import pickle
+import numpy as np
+from pyformex.mydict import CDict
+from pyformex.plugins.properties import PropertyDB
+
+
+def nrs(props):
+    return [ p.nr for p in props ]
+
+
+def test_getProp():
+    P = PropertyDB()
+    a = P.Prop(tag='step1', color='red')
+    b = P.Prop(set=[1, 2], name='top', color='blue')
+    c = P.Prop(tag=1)
+    assert nrs(P.getProp(attr=['color'])) == [0, 1]
+    assert nrs(P.getProp(noattr=['color'])) == [2]
+    assert nrs(P.getProp(tag=['step1', 1])) == [0, 2]
+    assert nrs(P.getProp(set=2)) == [1]
+    assert nrs(P.getProp(name='top')) == [1]
+    assert nrs(P.getProp(rec=[2, 0, 5])) == [2, 0]
+    assert nrs(P.getProp(rec=[2, 0], attr=['color'])) == [0]
+
+
+def test_modify():
+    P = PropertyDB()
+    a = P.Prop(tag='step1', color='red')
+    b = P.Prop(set=[1, 2], color='blue')
+    a.color = None
+    b.set = [3]
+    b.update(tag='step1')
+    del b['color']
+    assert nrs(P.getProp(attr=['color'])) == []
+    assert nrs(P.getProp(set=3)) == [1]
+    assert nrs(P.getProp(set=1)) == []
+    assert nrs(P.getProp(tag='step1')) == [0, 1]
+    # a plain record appended to the list is found as well
+    P.prop.append(CDict({'nr': 2, 'color': 'green'}))
+    assert nrs(P.getProp(attr=['color'])) == [2]
+
+
+def test_delete():
+    P = PropertyDB()
+    for i in range(5):
+        P.nodeProp(set=i, tag=i%2, bound=[1, 1, 1, 0, 0, 0])
+    deleted = P.delProp('n', tag=1)
+    assert [ p.set[0] for p in deleted ] == [1, 3]
+    assert nrs(P.getProp('n')) == [0, 1, 2]
+    assert [ p.set[0] for p in P.getProp('n', attr=['bound']) ] == [0, 2, 4]
+    assert nrs(P.getProp('n', set=4)) == [2]
+
+
+def test_bulkProp():
+    P = PropertyDB()
+    P.nodeProp(set=[0, 1], bound='pinned')
+    cload = np.zeros((3, 6))
+    cload[:, 2] = [1., 2., 3.]
+    props = P.bulkProp('n', set=np.arange(3, 6), tag='step1', cload=cload)
+    assert nrs(props) == [1, 2, 3]
+    assert props[1].name == 'Nset_2'
+    assert props[1].cload == [(2, 2.0)]
+    assert nrs(P.getProp('n', tag='step1', attr=['cload'])) == [1, 2, 3]
+    assert nrs(P.getProp('n', set=[0, 4])) == [0, 2]
+
+
+def test_groupProp():
+    P = PropertyDB()
+    for i in range(6):
+        P.Prop(tag='step%s' % (2-i%3), value=i)
+    G = P.groupProp(by='tag')
+    assert list(G.keys()) == ['step0', 'step1', 'step2']
+    assert nrs(G['step0']) == [2, 5]
+
+
+def test_pickle():
+    P = PropertyDB()
+    P.Prop(tag='a', color='red')
+    P.Prop(tag='b')
+    Q = pickle.loads(pickle.dumps(P))
+    Q.prop[1].color = 'blue'
+    assert nrs(Q.getProp(attr=['color'])) == [0, 1]
+    assert nrs(P.getProp(attr=['color'])) == [0]
+
+# End
@@ -0,0 +1,133 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+"""Unittests for the pyformex.plugins.surface_boolean module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import numpy as np
+import pytest
+from pyformex.simple import sphere, cuboid
+from pyformex.trisurface import TriSurface
+from pyformex.plugins import surface_boolean
+
+
+def box(n):
+    """A unit cube with n*n*n subdivisions"""
+    M = cuboid().toMesh().subdivide(n, n, n).getBorderMesh()
+    return TriSurface(M.convert('tri3')).fuse().compact().fixNormals()
+
+
+def check_booleans(A, B, tol=1.e-7):
+    """Check the consistency of the three boolean operations"""
+    vol = {}
+    for op in '+*-':
+        S = A.boolean(B, op)
+        if S.nelems() > 0:
+            assert S.isClosedManifold()
+            assert (S.areas() > tol).all()
+            vol[op] = S.volume()
+        else:
+            vol[op] = 0.
+    assert np.isclose(vol['+'] + vol['*'], A.volume() + B.volume(), atol=1.e-5)
+    assert np.isclose(vol['-'], A.volume() - vol['*'], atol=1.e-5)
+    return vol
+
+
+def test_boolean_generic():
+    A = sphere(8)
+    vol = check_booleans(A, A.trl([0.3, 0.2, 0.1]))
+    assert vol['*'] > 0.
+
+
+@pytest.mark.parametrize("d,inter", [
+    ([0.5, 0.5, 0.5], 0.125),   # generic
+    ([0.5, 0.25, 0.], 0.375),   # coplanar faces
+    ([1., 0., 0.], 0.),         # touching faces
+    ([0., 0., 0.], 1.),         # coincident
+    ])
+def test_boolean_degenerate(d, inter):
+    A = cuboid().toMesh().toSurface()
+    vol = check_booleans(A, A.trl(d))
+    assert np.isclose(vol['*'], inter, atol=1.e-5)
+
+
+@pytest.mark.parametrize("na,nb,d,inter", [
+    (3, 2, [0.5, 0., 0.], 0.5),         # coplanar, different tessellation
+    (2, 1, [0.5, 0., 0.], 0.5),
+    (1, 1, [0.5, 0.3, 0.], 0.35),       # coplanar, crossing diagonals
+    (1, 2, [-0.5, 0.25, 0.], 0.375),
+    (3, 2, [1., 0., 0.], 0.),           # touching faces
+    (3, 1, [0., 0., 0.], 1.),           # coincident
+    ])
+def test_boolean_tessellation(na, nb, d, inter):
+    vol = check_booleans(box(na), box(nb).trl(d))
+    assert np.isclose(vol['*'], inter, atol=1.e-5)
+
+
+def test_boolean_coplanar_area():
+    # the coplanar contact faces are merged
+    A = box(1)
+    assert np.isclose(A.boolean(A.trl([0.5, 0.3, 0.]), '-').area(), 5.3)
+    assert np.isclose(box(3).boolean(box(2).trl([1., 0., 0.]), '+').area(), 10.)
+
+
+def test_boolean_vertex_on_edge():
+    # vertices of B lie exactly on edges of A
+    A = sphere(8)
+    check_booleans(A, A.trl(0, 1.))
+
+
+def test_intersection_curve():
+    A = sphere(8)
+    C = A.intersection(A.trl(0, 1.))
+    # the curve is closed
+    assert (np.bincount(C.elems.ravel()) == 2).all()
+
+
+def test_orient3d():
+    a = np.zeros((2, 3))
+    x = np.array([[0.1, 0.2, 0.], [0.1, 0.2, 1.e-300]])
+    s = surface_boolean.orient3d(a, a+[1., 0., 0.], a+[0., 1., 0.], x)
+    assert (s == [0, 1]).all()
+
+
+def test_boolean_large():
+    # more than 46341 vertices: the edge keys overflow int32
+    A = sphere(60)
+    B = A.rot(17., axis=1).trl([0.3, 0.2, 0.1])
+    assert A.ncoords() + B.ncoords() > 46341
+    U = A.boolean(B, '+')
+    assert U.isClosedManifold()
+    assert np.isclose(U.volume(), 5.3498, atol=1.e-3)
+
+
+def test_self_intersecting():
+    A = sphere(8)
+    assert not surface_boolean.selfIntersecting(A, A.trl(0, 1.))
+    assert surface_boolean.selfIntersecting(A + A.trl(0, 1.))
+    assert A.boolean(A + A.trl(0, 1.), '+', check=True) is None
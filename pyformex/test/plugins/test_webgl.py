@@ -0,0 +1,67 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+"""Unittests for the pyformex.plugins.webgl module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import pyformex as pf
+import numpy as np
+from pyformex.plugins.webgl import *
+
+
+# Two triangles with a shared edge, in unindexed form
+X = np.array([[0.,0.,0.],[1.,0.,0.],[1.,1.,0.],
+              [0.,0.,0.],[1.,1.,0.],[0.,1.,0.]])
+E = np.arange(6).reshape(2,3)
+
+
+def test_weldVertices():
+    data, elems = weldVertices([X], E)
+    assert data[0].shape == (4,3)
+    assert (data[0][elems] == X[E]).all()
+
+
+def test_packDrawable():
+    d = packDrawable(X, E)
+    assert d['coords'].dtype == np.dtype('<f4')
+    assert d['elems'].dtype == np.dtype('<u2')
+    assert d['coords'].shape == (4,3)
+    d = packDrawable(X, E, normals=np.zeros_like(X), quantize=True)
+    assert d['coords'].dtype == np.dtype('<u2')
+    assert d['normals'].dtype == np.dtype('<i2')
+    x = np.array(d['offset']) + np.array(d['scale']) * d['coords']
+    assert np.allclose(x[d['elems']], X[E])
+
+
+def test_binaryScene(tmpdir):
+    fn = str(tmpdir.join('test.pfwb.gz'))
+    colors = np.array([[1.,0.,0.]]*6)
+    d = packDrawable(X, E, colors=colors, quantize=True)
+    writeBinaryScene(fn, {'a': d})
+    r = readBinaryScene(fn)['a']
+    for key in d:
+        assert np.all(np.asarray(r[key]) == np.asarray(d[key]))
@@ -0,0 +1,78 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+"""Unittests for the pyformex.bench module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import copy
+import tempfile
+import pyformex as pf
+from pyformex import bench
+
+
+def test_listBenchmarks():
+    names = [ b.name for b in bench.listBenchmarks(['mesh.*']) ]
+    assert names == ['mesh.getBorder', 'mesh.fuse']
+    assert all([ b.group == 'example' for b in bench.listBenchmarks(['example']) ])
+
+
+def test_runBenchmarks(tmpdir):
+    res = bench.runBenchmarks(['mesh.fuse'], scale=0.1, repeat=2, verbose=False)
+    r = res['results']['mesh.fuse']
+    assert r['status'] == 'ok'
+    assert r['size'] == 3
+    assert r['nitems'] == 27
+    assert len(r['times']) == 2
+    assert r['time'] == min(r['times'])
+    fn = str(tmpdir.join('bench.json'))
+    bench.saveResults(res, fn)
+    assert bench.loadResults(fn) == res
+
+
+def test_compare():
+    base = bench.runBenchmarks(['mesh.fuse'], scale=0.1, repeat=1, verbose=False)
+    new = copy.deepcopy(base)
+    r = new['results']['mesh.fuse']
+    r['time'] *= 2.
+    cmp = bench.compare(base, new, tolerance=0.2)
+    assert ('mesh.fuse', 'time', 2., 'REGRESSION') in cmp
+    r['time'] /= 4.
+    assert bench.compare(base, new, 0.2, memory=False) == [('mesh.fuse', 'time', 0.5, 'improved')]
+    r['size'] += 1
+    assert bench.compare(base, new) == []
+
+
+def test_file_benchmarks(tmpdir, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmpdir))
+    res = bench.runBenchmarks(['stl.*', 'pgf.*'], scale=0.01, repeat=1, verbose=False)
+    for name in ['stl.write', 'stl.read', 'pgf.write', 'pgf.read']:
+        assert res['results'][name]['status'] == 'ok'
+    # the temporary files are removed
+    assert tmpdir.listdir() == []
+
+# End
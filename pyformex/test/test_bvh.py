@@ -0,0 +1,74 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+"""Unittests for the pyformex.bvh module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import numpy as np
+from pyformex.bvh import BVH, boxes
+
+
+def bruteForcePairs(b1, b2, atol=0.):
+    ok = ((b1[:, np.newaxis, 0] <= b2[np.newaxis, :, 1]+atol) &
+          (b2[np.newaxis, :, 0] <= b1[:, np.newaxis, 1]+atol)).all(axis=-1)
+    return np.column_stack(np.where(ok))
+
+
+def test_overlapPairs():
+    rand = np.random.RandomState(3)
+    x1 = rand.rand(300, 3, 3) * 0.1 + rand.rand(300, 1, 3)
+    x2 = rand.rand(77, 3, 3) * 0.2 + rand.rand(77, 1, 3)
+    b1, b2 = boxes(x1), boxes(x2)
+    for leafsize in [1, 4, 16]:
+        B1 = BVH(b1, leafsize=leafsize)
+        B2 = BVH(b2, leafsize=5)
+        ref = bruteForcePairs(b1, b2, 0.01)
+        assert (B1.overlapPairs(B2, atol=0.01) == ref).all()
+        ref = bruteForcePairs(b2, b1, 0.01)
+        assert (B2.overlapPairs(B1, atol=0.01) == ref).all()
+        ref = bruteForcePairs(b1, b1)
+        ref = ref[ref[:, 0] < ref[:, 1]]
+        assert (B1.overlapPairs() == ref).all()
+
+def test_linePairs():
+    rand = np.random.RandomState(4)
+    x = rand.rand(500, 3, 3) * 0.1 + rand.rand(500, 1, 3)
+    b = boxes(x)
+    q = rand.rand(50, 3)
+    m = rand.randn(50, 3)
+    m[:5, 0] = 0.
+    B = BVH(b)
+    # brute force: sample the segments densely
+    t = np.linspace(0., 1., 2001)
+    p = q[:, np.newaxis] + t[:, np.newaxis] * m[:, np.newaxis]
+    inside = ((p[:, :, np.newaxis] >= b[:, 0]) & (p[:, :, np.newaxis] <= b[:, 1])).all(axis=-1).any(axis=1)
+    pairs = B.linePairs(q, m, tmin=0., tmax=1.)
+    assert set(map(tuple, pairs)) >= set(zip(*np.where(inside)))
+    assert (np.diff(pairs[:, 0]) >= 0).all()
+
+# End
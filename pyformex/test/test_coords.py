@@ -0,0 +1,62 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+"""Unittests for the pyformex.coords module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import numpy as np
+from pyformex.coords import Coords
+
+
+def test_cluster():
+    X = Coords(np.random.RandomState(7).rand(1000, 3))
+    for ppb in [1, 8, 64]:
+        x, e = X.cluster(ppb=ppb)
+        assert e.shape == (1000,)
+        assert e.min() == 0 and e.max() == x.shape[0]-1
+        # every cluster point is the centroid of its points
+        cnt = np.bincount(e)
+        assert (cnt > 0).all()
+        c = np.column_stack([np.bincount(e, weights=X[:, i]) for i in range(3)]) / cnt[:, np.newaxis]
+        assert np.allclose(x, c, atol=1.e-6)
+    # coarser clustering for larger ppb
+    assert X.cluster(ppb=64)[0].shape[0] < X.cluster(ppb=8)[0].shape[0] < 1000
+    # the index keeps the point shape
+    x, e = X.reshape(10, 100, 3).cluster(ppb=8)
+    assert e.shape == (10, 100)
+
+
+def test_cluster_degenerate():
+    # coincident points form a single cluster
+    x, e = Coords(np.ones((5, 3))).cluster()
+    assert x.shape == (1, 3) and (e == 0).all()
+    # empty input
+    x, e = Coords(np.zeros((0, 3))).cluster()
+    assert x.shape == (0, 3) and e.shape == (0,)
+
+
+# End
@@ -0,0 +1,86 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+
+"""Unittests for the pyformex.geomfile module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import numpy as np
+import pytest
+from pyformex.formex import Formex
+from pyformex.geomfile import GeometryFile, DataBlock
+
+
+def _mesh():
+    return Formex('4:0123').replic2(20, 20).toMesh().extrude(5, dir=2)
+
+
+@pytest.mark.parametrize("codec", ['zlib', 'bz2'])
+def test_codec_roundtrip(tmpdir, codec):
+    M = _mesh().setProp(1)
+    fn = str(tmpdir.join('test.pgf'))
+    f = GeometryFile(fn, 'w', codec=codec, chunksize=1000)
+    assert f.version == '2.1'
+    f.write({'M': M, 'F': Formex('3:012').replic(5)})
+    f.close()
+    g = GeometryFile(fn, 'r')
+    res = g.read()
+    N = res['M']
+    assert np.allclose(N.coords, M.coords)
+    assert (N.elems == M.elems).all()
+    assert (N.prop == M.prop).all()
+    assert res['F'].shape == (5, 3, 3)
+    with pytest.raises(ValueError):
+        GeometryFile(fn, 'w', codec=codec, version='2.0')
+
+
+def test_datablock(tmpdir):
+    a = np.arange(30000, dtype=np.int32).reshape(-1, 3)
+    fn = str(tmpdir.join('test.pgf'))
+    f = GeometryFile(fn, 'w', codec='zlib', chunksize=1200)
+    f.writeData(a, ' ')
+    f.close()
+    g = GeometryFile(fn, 'r')
+    s = g.fil.readline()
+    block = DataBlock(g.fil, **g.decode(s[1:].strip()))
+    assert block.nchunks == 100
+    assert (block.read(rows=(1234, 2345)) == a[1234:2345]).all()
+    assert (block.read(nproc=1) == a).all()
+    g.close()
+    # corrupt the data
+    data = bytearray(open(fn, 'rb').read())
+    data[-100] ^= 0xff
+    open(fn, 'wb').write(bytes(data))
+    g = GeometryFile(fn, 'r')
+    s = g.fil.readline()
+    block = DataBlock(g.fil, **g.decode(s[1:].strip()))
+    with pytest.raises(ValueError):
+        block.read()
+    g.close()
+
+# End
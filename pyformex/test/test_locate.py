@@ -0,0 +1,89 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+"""Unittests for the pyformex.locate module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import pyformex as pf
+import numpy as np
+import pytest
+from pyformex import elements
+from pyformex import locate
+from pyformex.mesh import Mesh
+from pyformex.field import Field
+
+
+def linear(X):
+    return X[...,0] + 2*X[...,1] - 3*X[...,2]
+
+
+@pytest.mark.parametrize('eltype',['tri6','quad8','tet4','tet10','wedge6','hex8','hex20'])
+def test_roundtrip(eltype):
+    M = Mesh(eltype=eltype).rot(30.,axis=2).scale(2.)
+    el = M.elType()
+    xi = el.vertices[:,:el.ndim] * 0.8 + 0.1 * el.vertices[:,:el.ndim].mean(axis=0)
+    P = locate.elementPoints(M.coords,M.elems,el,xi)[0]
+    e,x,d = locate.locatePoints(M.coords,M.elems,el,P)
+    assert (e == 0).all()
+    assert np.allclose(x,xi)
+    assert np.allclose(d,0.,atol=1.e-6)
+
+
+def test_outside():
+    M = Mesh(eltype='hex8').subdivide(2,2,2)
+    e,xi,d = M.locate([[0.6,0.3,0.8],[1.5,0.5,0.5]])
+    assert e[0] >= 0
+    assert np.allclose(locate.mapNatural(M.coords[M.elems[e[0]]],M.elType(),xi[:1]),[0.6,0.3,0.8])
+    assert e[1] == -1
+    assert d[1] == np.inf
+
+
+@pytest.mark.parametrize('totype',['node','elemc','elemn','elemg'])
+def test_transfer(totype):
+    M = Mesh(eltype='hex8').subdivide(3,3,3)
+    T = Mesh(eltype='hex8').subdivide(2,2,2).convert('tet4').scale(0.9).trl([0.05,0.05,0.05])
+    f = Field(M,'node',linear(M.coords))
+    g = f.transfer(T,totype)
+    if totype == 'node':
+        P = T.coords
+    elif totype == 'elemc':
+        P = T.coords[T.elems].mean(axis=1)
+    elif totype == 'elemn':
+        P = T.coords[T.elems]
+    else:
+        P = locate.elementPoints(T.coords,T.elems,T.elType(),T.elType().gaussPoints()[0])
+    assert np.allclose(g.data,linear(P),atol=1.e-5)
+
+
+def test_gauss_fields():
+    M = Mesh(eltype='hex8').subdivide(2,2,2).convert('hex20')
+    f = Field(M,'node',linear(M.coords))
+    g = f.convert('elemg')
+    assert g.data.shape == (M.nelems(),27)
+    assert np.allclose(g.convert('elemn').data,linear(M.coords[M.elems]),atol=1.e-5)
+    assert np.allclose(g.convert('elemc').data,f.convert('elemc').data,atol=1.e-5)
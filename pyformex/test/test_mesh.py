@@ -0,0 +1,136 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+
+"""Unittests for the pyformex.mesh module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import itertools
+import numpy as np
+from pyformex.mesh import Mesh, cutElementsAtPlane
+from pyformex.formex import Formex
+from pyformex.simple import sphere
+
+
+def kuhn(n):
+    """A conforming tet4 Mesh of the unit cube"""
+    x = np.array(list(itertools.product(range(n+1), repeat=3)), dtype=float) / n
+    elems = []
+    for c in itertools.product(range(n), repeat=3):
+        for perm in itertools.permutations(range(3)):
+            c1 = np.array(c)
+            el = [c1.copy()]
+            for a in perm:
+                c1[a] += 1
+                el.append(c1.copy())
+            el = np.dot(el, [(n+1)**2, n+1, 1])
+            if np.linalg.det(x[el[1:]] - x[el[0]]) < 0:
+                el = el[[0, 2, 1, 3]]
+            elems.append(el)
+    return Mesh(x, np.array(elems), eltype='tet4')
+
+
+def faceCount(elems, faces):
+    """Count the occurrence of the sorted faces of the elements"""
+    f = np.sort(elems[:, faces].reshape(-1, faces.shape[-1]), axis=-1)
+    return np.unique(f, axis=0, return_counts=True)
+
+
+def test_cutElementsAtPlane_tri3():
+    S = sphere(8)
+    R = cutElementsAtPlane(S.coords, S.elems, 'tri3', [0.1, 0.2, 0.05], [0.3, 1., 0.2], 1.e-6)
+    P = Mesh(R.coords, R.pos, eltype='tri3')
+    N = Mesh(R.coords, R.neg, eltype='tri3')
+    assert abs(P.area() + N.area() - S.area()) < 1.e-5
+    # the border of the positive part is the section
+    e, c = faceCount(R.pos, np.array([[0, 1], [1, 2], [2, 0]]))
+    assert (e[c == 1] == np.unique(np.sort(R.section, axis=-1), axis=0)).all()
+    # the normals keep pointing outward
+    X = R.coords[R.pos]
+    assert (np.cross(X[:, 1]-X[:, 0], X[:, 2]-X[:, 0]) * X.mean(axis=1)).sum(axis=-1).min() > 0.
+    assert (R.posorg == np.sort(R.posorg)).all()
+
+
+def test_cutElementsAtPlane_tet4():
+    M = kuhn(4)
+    faces = np.array([[0, 2, 1], [0, 1, 3], [1, 2, 3], [2, 0, 3]])
+    nfree = (faceCount(M.elems, faces)[1] == 1).sum()
+    for p, n in [
+            ([0.5, 0.5, 0.5], [1., 0.3, 0.7]),   # generic
+            ([0.25, 0., 0.], [1., 0., 0.]),      # along element faces
+            ([0.5, 0.5, 0.5], [1., 1., 1.]),     # through nodes
+            ]:
+        R = cutElementsAtPlane(M.coords, M.elems, 'tet4', p, n, 1.e-6)
+        vp = Mesh(R.coords, R.pos, eltype='tet4').levelVolumes()
+        vn = Mesh(R.coords, R.neg, eltype='tet4').levelVolumes()
+        assert abs(vp.sum() + vn.sum() - 1.) < 1.e-5
+        assert vp.min() > 0. and vn.min() > 0.
+        # both parts together are conforming: free faces are on the border
+        e, c = faceCount(np.concatenate([R.pos, R.neg]), faces)
+        X = R.coords[e[c == 1]].mean(axis=1)
+        assert ((X < 1.e-6) | (X > 1.-1.e-6)).any(axis=-1).all()
+        assert (c <= 2).all()
+        # the section is oriented along the normal
+        X = R.coords[R.section]
+        if len(X) > 0:
+            assert (np.dot(np.cross(X[:, 1]-X[:, 0], X[:, 2]-X[:, 0]), n) > 0.).all()
+
+
+def test_cutWithPlane():
+    M = Mesh(eltype='quad4').subdivide(4, 4)
+    P, N = M.cutWithPlane([[0.3, 0., 0.], [0., 0.6, 0.]], [[1., 0., 0.], [0., -1., 0.]])
+    assert P.elName() == 'tri3' and N.elName() == 'tri3'
+    assert abs(P.area() - 0.42) < 1.e-6
+    assert abs(N.area() - 0.58) < 1.e-6
+    # props and newprops
+    F = sphere(8).setProp(np.arange(3)).toFormex()
+    P, N = F.cutWithPlane([0., 0., 0.], [1., 0., 0.], newprops=list(range(1, 8)))
+    assert P.nelems() == N.nelems() == 656
+    assert np.bincount(P.prop).tolist() == [186, 188, 188, 0, 46, 32, 16]
+    L = Formex('l:1').replic(5)
+    P, N = L.cutWithPlane([2.5, 0., 0.], [1., 0., 0.], newprops=[1, 2, 3, 4])
+    assert P.prop.tolist() == [3, 1, 1] and N.prop.tolist() == [2, 2, 4]
+    assert abs(P.lengths().sum() - 2.5) < 1.e-6
+
+
+def test_cluster():
+    S = sphere(16).setProp(np.arange(4))
+    M, index = S.cluster(ppb=8, return_index=True)
+    assert M.elName() == 'tri3'
+    assert 0 < M.nelems() < S.nelems() and M.ncoords() < S.ncoords()
+    assert (index == np.sort(index)).all()
+    assert (M.prop == S.prop[index]).all()
+    # no degenerate or duplicate elements
+    assert not M.elems.testDegenerate().any()
+    assert len(np.unique(np.sort(M.elems, axis=-1), axis=0)) == M.nelems()
+    # the proxy stays close to the original
+    assert abs(M.area() - S.area()) < 0.1 * S.area()
+    assert M.cluster(ppb=1).nelems() <= M.nelems()
+
+
+# End
@@ -0,0 +1,107 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+"""Unittests for the pyformex.quality module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import pyformex as pf
+import numpy as np
+import pytest
+from pyformex import elements
+from pyformex import quality
+from pyformex.mesh import Mesh
+
+
+def ideal(eltype):
+    # the element type with equilateral triangles or tetrahedrons
+    T = elements.elementType(eltype)
+    M = Mesh(T.vertices, T.getElement(), eltype=eltype)
+    if T.shape[0] == 2:
+        M = M.affine(np.array([[1., 0., 0.], [0.5, np.sqrt(3.)/2., 0.], [0., 0., 1.]]))
+    elif T.shape[0] == 3:
+        M = M.affine(np.array([[1., 0., 0.], [0.5, np.sqrt(3.)/2., 0.],
+                               [0.5, np.sqrt(3.)/6., np.sqrt(2./3.)]]))
+    return M
+
+
+@pytest.mark.parametrize("eltype", ['line3', 'tri6', 'quad8', 'quad9', 'tet10',
+                                    'wedge6', 'hex20', 'hex27'])
+def test_ideal(eltype):
+    M = ideal(eltype)
+    for m, v in [('scaledjacobian', 1.), ('aspectratio', 1.), ('skew', 0.),
+                 ('warpage', 0.), ('taper', 0.), ('edgeratio', 1.)]:
+        if m in quality.metrics(M.level()):
+            assert np.allclose(M.quality(m), v, atol=1.e-6)
+    assert np.allclose(M.quality('scaledjacobian', at='gauss'), 1., atol=1.e-6)
+
+
+def test_shape_functions():
+    for eltype in ['line4', 'tri6', 'quad6', 'quad12', 'tet15', 'hex16', 'hex20']:
+        T = elements.elementType(eltype)
+        x = np.random.RandomState(7).rand(5, T.ndim)
+        N, dN = T.shapeFunctions(x, deriv=True)
+        v = T.vertices[:, :T.ndim]
+        assert np.allclose(T.shapeFunctions(v), np.eye(T.nplex()))
+        assert np.allclose(np.dot(N, v), x)
+        assert np.allclose(np.einsum('pnd,ne->pde', dN, v), np.eye(T.ndim))
+
+
+@pytest.mark.parametrize("eltype,sj", [('tri3', np.sqrt(2./3.)), ('tri6', np.sqrt(2./3.)),
+                                       ('tet4', np.sqrt(0.5)), ('tet10', np.sqrt(0.5)),
+                                       ('wedge6', np.sqrt(2./3.)), ('hex8', 1.)])
+def test_simplex_scaledjacobian(eltype, sj):
+    # the pyFormex reference elements have right angles;
+    # mirroring the coordinates inverts them
+    M = Mesh(eltype=eltype)
+    R = Mesh(M.coords.reflect(0), M.elems, eltype=eltype)
+    for at in ['corners', 'gauss']:
+        assert np.allclose(M.quality('scaledjacobian', at=at), sj)
+        assert np.allclose(R.quality('scaledjacobian', at=at), -sj)
+    # the value does not depend on the node numbering
+    T = Mesh(eltype='tri3')
+    T = Mesh(T.coords, T.elems[:, [1, 2, 0]], eltype='tri3')
+    assert np.allclose(T.quality('scaledjacobian', at='all'), np.sqrt(2./3.))
+
+
+def test_distorted():
+    # a sheared quad, a trapezoid, a warped and a non-convex quad
+    X = [[0., 0., 0.], [1., 0., 0.], [1.5, 1., 0.], [0.5, 1., 0.],
+         [2., 0., 0.], [1., 1., 0.2], [0.2, 0.2, 0.], [0., 1., 0.]]
+    M = Mesh(X, [[0, 1, 2, 3], [0, 4, 2, 3], [0, 1, 5, 7], [0, 1, 6, 7]], eltype='quad4')
+    assert np.allclose(M.quality('minangle')[0], np.arctan(2.)/np.pi*180.)
+    assert np.allclose(M.quality('taper')[[0, 1]], [0., 0.5])
+    assert M.quality('warpage')[2] > 10.
+    sj = M.quality('scaledjacobian')
+    assert (sj[:3] > 0.).all() and sj[3] < 0.
+    assert quality.worst(sj, 1)[0] == 3
+    R = M.qualityReport(['skew', 'scaledjacobian'], bins=4, nworst=2)
+    assert R['skew'].hist.sum() == 4
+    assert R['scaledjacobian'].worst[0] == 3
+
+
+# End
@@ -0,0 +1,85 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+"""Unittests for the pyformex.software module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import io
+import os
+import sys
+import pyformex as pf
+from pyformex import software
+
+
+def test_external_cache(tmpdir):
+    fn = str(tmpdir.join('externals.json'))
+    save = pf.cfg.get('externalcache', '')
+    pf.cfg['externalcache'] = fn
+    software._external_cache = None
+    try:
+        ver = software.checkExternal('python')
+        assert os.path.exists(fn)
+        entry = software.externalCache()['externals']['python']
+        assert entry['version'] == ver
+        # a fresh session reads the result from disk
+        software._external_cache = None
+        assert software._cachedExternal(software.externalCache(), 'python',
+                                        software.known_externals['python']) == ver
+        # a changed executable invalidates the entry
+        entry = software.externalCache()['externals']['python']
+        entry['mtime'] -= 1
+        assert software._cachedExternal(software.externalCache(), 'python',
+                                        software.known_externals['python']) is None
+        # missing programs are not run at all
+        assert software.checkExternal('no-such-program-xyz') == ''
+    finally:
+        pf.cfg['externalcache'] = save
+        software._external_cache = None
+
+
+def test_executable():
+    assert software._executable('admesh --version') == 'admesh'
+    assert software._executable("sh -c 'tetgen -h |fgrep Version'") == 'tetgen'
+
+
+def test_lazy_module():
+    # attributes named like the proxy's own methods are forwarded
+    name = 'tomllib' if sys.version_info >= (3, 11) else 'pickle'
+    sys.modules.pop(name, None)
+    m = software.lazyImport(name)
+    assert isinstance(m, software.LazyModule)
+    assert not m._lazy_loaded_()
+    if name == 'tomllib':
+        assert m.load(io.BytesIO(b'a=1')) == {'a': 1}
+    else:
+        assert m.load(io.BytesIO(m.dumps(1))) == 1
+    assert m._lazy_loaded_()
+    assert m.loads is sys.modules[name].loads
+
+
+# End
@@ -0,0 +1,139 @@
+# $Id$
+##
+##  This file is part of pyFormex 1.0.2  (Thu Jun 18 15:35:31 CEST 2015)
+##  pyFormex is a tool for generating, manipulating and transforming 3D
+##  geometrical models by sequences of mathematical operations.
+##  Home page: http://pyformex.org
+##  Project page:  http://savannah.nongnu.org/projects/pyformex/
+##  Copyright 2004-2015 (C) Benedict Verhegghe (benedict.verhegghe@feops.com)
+##  Distributed under the GNU General Public License version 3 or later.
+##
+##  This program is free software: you can redistribute it and/or modify
+##  it under the terms of the GNU General Public License as published by
+##  the Free Software Foundation, either version 3 of the License, or
+##  (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see http://www.gnu.org/licenses/.
+##
+
+
+
+"""Unittests for the pyformex.trisurface module
+
+These unittest are based on the pytest framework.
+
+"""
+from __future__ import print_function
+import numpy as np
+from pyformex.trisurface import TriSurface
+from pyformex.simple import sphere
+
+
+def moebius(n=30,w=0.3):
+    """A Moebius strip"""
+    a = np.linspace(0., 2*np.pi, n, endpoint=False).reshape(-1, 1)
+    w = np.array([-w, w])
+    r = 1. + w * np.cos(a/2)
+    x = np.dstack([r*np.cos(a), r*np.sin(a), w*np.sin(a/2)]).reshape(-1, 3)
+    i = np.arange(n)
+    a, b = 2*i, 2*i+1
+    c, d = 2*((i+1) % n), 2*((i+1) % n)+1
+    # the last strip connects with a half twist
+    c[-1], d[-1] = 1, 0
+    elems = np.concatenate([np.column_stack([a, c, b]), np.column_stack([b, c, d])])
+    return TriSurface(x, elems)
+
+
+def test_fixNormals():
+    S = sphere(8)
+    rev = np.random.RandomState(1).rand(S.nelems()) < 0.5
+    S1 = TriSurface(S.coords, np.where(rev.reshape(-1, 1), S.elems[:, ::-1], S.elems))
+    S1.setProp(np.arange(S.nelems()) % 5)
+    S2 = TriSurface(S.trl(0, 3.).coords, S.elems[:, ::-1])
+    S3 = S1 + S2
+    reverse, comp, orientable, closed = S3.faceOrientation()
+    assert comp.max() == 1
+    assert orientable.all()
+    assert closed.all()
+    F = S3.fixNormals()
+    assert np.allclose(F.volume(), 2*S.volume())
+    assert (F.prop[:S1.nelems()] == S1.prop).all()
+    reverse, comp, orientable, closed = moebius().faceOrientation()
+    assert not orientable.any()
+    assert not closed.any()
+
+def test_decimate():
+    S = sphere(16)
+    S1, vmap = S.decimate(nfaces=800, return_map=True)
+    assert 700 < S1.nelems() <= 800
+    assert S1.isClosedManifold()
+    assert abs(S1.volume() - S.volume()) < 0.01 * S.volume()
+    assert (vmap >= 0).all()
+    # an open surface keeps its border
+    x, y = np.meshgrid(np.linspace(0., 1., 21), np.linspace(0., 1., 21))
+    X = np.column_stack([x.ravel(), y.ravel(), 0.1*np.sin(3*x*y).ravel()])
+    i, j = np.meshgrid(np.arange(20), np.arange(20))
+    a = (21*j+i).ravel()
+    E = np.concatenate([np.column_stack([a, a+1, a+22]), np.column_stack([a, a+22, a+21])])
+    P = TriSurface(X, E).setProp((E[:, 0] % 21 < 10).astype(int))
+    P1, vmap = P.decimate(nfaces=200, keepprop=True, return_map=True)
+    assert P1.nelems() <= 200
+    border = P.getBorderNodes()
+    assert np.allclose(P1.coords[vmap[border]], P.coords[border])
+    assert (P1.prop == 0).any() and (P1.prop == 1).any()
+
+def test_diagnose():
+    S = sphere(8)
+    D = S.diagnose()
+    assert sum(D.counts.values()) == 0
+    # push a vertex through the opposite side
+    x = S.coords.copy()
+    x[5] *= -1.5
+    D = TriSurface(x, S.elems).diagnose()
+    assert D.counts['intersecting'] > 0
+    assert D.intersecting[D.pairs].all()
+    assert D.counts['nonmanifold_vertex'] == 0
+    # two cones touching at the tip
+    n = 8
+    a = np.linspace(0., 2*np.pi, n, endpoint=False)
+    ring = np.column_stack([np.cos(a), np.sin(a), np.ones(n)])
+    x = np.concatenate([[[0., 0., 0.]], ring, ring*[1., 1., -1.]])
+    i = np.arange(n)
+    e = np.concatenate([np.column_stack([0*i, 1+i, 1+(i+1) % n]),
+                        np.column_stack([0*i, 1+n+(i+1) % n, 1+n+i])])
+    D = TriSurface(x, e).diagnose()
+    assert D.nonmanifold_vertex.all()
+    assert D.counts['nonmanifold_edge'] == 0
+    assert D.counts['intersecting'] == 0
+    assert D.counts['border'] == 2*n
+
+def test_castRays():
+    from pyformex import geomtools
+    S = sphere(8)
+    rand = np.random.RandomState(5)
+    q = rand.rand(200, 3) - 0.5
+    m = rand.randn(200, 3)
+    # every ray from the inside hits the surface
+    ray, elem, t, bc = S.castRays(q, m, first=True)
+    assert (ray == np.arange(200)).all()
+    x = q + t.reshape(-1, 1) * m
+    assert np.allclose((bc[:, :, np.newaxis] * S.coords[S.elems[elem]]).sum(axis=1), x)
+    # all hits of full lines, compared with brute force
+    ray, elem, t, bc = S.castRays(q, m, method='line')
+    nt = S.nelems()
+    hit, tt, bb = geomtools.lineHitsTriangle(q.repeat(nt, axis=0), m.repeat(nt, axis=0),
+                                             np.tile(S.coords[S.elems], (200, 1, 1)))
+    r, e = np.divmod(np.where(hit)[0], nt)
+    assert set(zip(ray, elem)) == set(zip(r, e))
+    # lines through a vertex hit all triangles around it
+    ray, elem, t, bc = S.castRays([[0., 0., 0.]], S.coords[:1], method='ray')
+    assert (np.sort(elem) == np.where((S.elems == 0).any(axis=1))[0]).all()
+    assert np.allclose(t, 1.)
+
+# End
@@ -30,11 +30,12 @@ a triangulated surface.
 from __future__ import absolute_import, division, print_function
 
 import pyformex as pf
-from pyformex import fileread, filewrite, geomtools, inertia, utils
+from pyformex import bvh, fileread, filewrite, geomtools, inertia, utils
 from pyformex.coords import Coords
 from pyformex.connectivity import Connectivity, connectedLineElems, adjacencyArrays
-from pyformex.mesh import Mesh
+from pyformex.mesh import Mesh, cutElementsAtPlane
 from pyformex.formex import Formex
+from pyformex.mydict import Dict
 from pyformex.arraytools import *
 
 import os
@@ -42,7 +43,7 @@ import os
 
 #
 # gts commands used:
-#   in Debian package: stl2gts gts2stl gtscheck
+#   in Debian package: stl2gts gts2stl
 #   not in Debian package: gtssplit gtscoarsen gtsrefine gtssmooth gtsinside
 #
 
@@ -217,6 +218,288 @@ def curvature(coords,elems,edges,neighbours=1):
     return K, H, S, C, k1, k2, e1, e2
 
 
+def _expand(start, count):
+    """Expand ranges of a CSR structure.
+
+    Returns a tuple (row, pos) where row is the index in start/count
+    and pos runs over the positions start[row]:start[row]+count[row].
+    """
+    row = repeat(arange(len(count)), count)
+    pos = arange(count.sum()) - repeat(cumsum(count)-count, count) + start[row]
+    return row, pos
+
+
+def _quadricCost(Q, p):
+    """Evaluate the quadrics Q (n,10) at the points p (n,3)"""
+    x, y, z = p.T
+    a2, ab, ac, ad, b2, bc, bd, c2, cd, d2 = Q.T
+    return (a2*x*x + b2*y*y + c2*z*z + d2 +
+            2.*(ab*x*y + ac*x*z + bc*y*z + ad*x + bd*y + cd*z))
+
+
+def quadricDecimate(coords,elems,nfaces=None,maxerror=None,border=True,
+                    feature=None,prop=None,maxangle=90.,maxpass=100):
+    """Reduce the number of triangles by quadric error edge collapses.
+
+    This implements the quadric error metric (QEM) decimation of Garland
+    and Heckbert. Each vertex carries a quadric, the sum of the squared
+    distances to the planes of the (original) faces around it. Collapsing
+    an edge moves its two vertices to the point minimizing the sum of
+    their quadrics, and the value at that point is the cost of the collapse.
+
+    The edges are collapsed in passes. In each pass, all edges are ordered
+    by their cost, and from the cheapest ones a set of collapses is
+    selected that do not interfere with each other: no two selected edges
+    have vertices that are connected. These are then collapsed
+    together. Thus the priority order is only approximated within a pass,
+    but all the work in a pass is vectorized.
+
+    A collapse is rejected if it would make the surface non-manifold
+    (the end points of the edge share more neighbours than the faces
+    on the edge) or if it rotates the normal of any of the remaining
+    faces over more than `maxangle` degrees.
+
+    Parameters:
+
+    - `coords`: float array (ncoords,3): the vertex coordinates.
+    - `elems`: int array (nelems,3): the triangles.
+    - `nfaces`: int: the target number of triangles. The decimation stops
+      when the number of triangles has dropped to this value.
+    - `maxerror`: float: maximum cost of a collapse. This is the sum of
+      squared distances to the original planes, weighted by the areas of
+      the original triangles. If neither `nfaces` nor `maxerror` is
+      specified, `nfaces` is set to half the number of triangles.
+    - `border`: bool: if True (default), the vertices on the border are
+      kept unchanged.
+    - `feature`: float: if specified, the vertices on edges where the
+      normals of the adjacent triangles differ more than this angle
+      (in degrees) are kept unchanged.
+    - `prop`: int array (nelems,): if specified, the vertices on edges
+      between triangles with a different prop value are kept unchanged,
+      thus preserving the borders of the property regions.
+    - `maxangle`: float: maximum rotation of a triangle normal (in degrees)
+      caused by a collapse.
+    - `maxpass`: int: maximum number of passes.
+
+    Kept vertices do not move, but an edge from a kept to another vertex
+    is collapsed into the kept vertex. Edges between two kept vertices are
+    not collapsed. The specified target may therefore not be reached.
+
+    Returns a tuple (coords, elems, faces, vmap), where:
+
+    - `coords`: float array (n,3): the new vertex coordinates,
+    - `elems`: int array (m,3): the new triangles,
+    - `faces`: int array (m,): the index of the original triangle
+      that each new triangle derives from (useful to transfer properties),
+    - `vmap`: int array (ncoords,): for each original vertex the index of
+      the new vertex it was merged into, or -1 for unused vertices.
+
+    Example:
+
+    >>> from pyformex.simple import sphere
+    >>> S = sphere(16)
+    >>> x, e, faces, vmap = quadricDecimate(S.coords, S.elems, nfaces=500)
+    >>> len(e) <= 500, len(e) > 400
+    (True, True)
+    >>> vmap.min() >= 0, vmap.max() == len(x)-1
+    (True, True)
+    """
+    X = asarray(coords, dtype=float64).copy()
+    F = asarray(elems).astype(int64)
+    nc = len(X)
+    face = arange(len(F))
+    if nfaces is None and maxerror is None:
+        nfaces = len(F) // 2
+    if nfaces is None:
+        nfaces = 0
+    mincos = cos(maxangle*DEG)
+
+    # Face planes and vertex quadrics
+    N = cross(X[F[:, 1]]-X[F[:, 0]], X[F[:, 2]]-X[F[:, 0]])
+    area = length(N)
+    ok = area > 0.
+    n = zeros_like(N)
+    n[ok] = N[ok] / area[ok].reshape(-1, 1)
+    d = -(n*X[F[:, 0]]).sum(axis=-1)
+    a, b, c = n.T
+    q = column_stack([a*a, a*b, a*c, a*d, b*b, b*c, b*d, c*c, c*d, d*d]) * (0.5*area).reshape(-1, 1)
+    Q = column_stack([ bincount(F.ravel(), weights=repeat(q[:, j], 3), minlength=nc) for j in range(10) ])
+
+    # Locked vertices
+    key = sort(F[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=-1)
+    key = key[:, 0] * nc + key[:, 1]
+    ukey, inv, cnt = unique(key, return_inverse=True, return_counts=True)
+    eu, ev = ukey // nc, ukey % nc
+    locked = zeros(nc, dtype=bool)
+    if border:
+        locked[eu[cnt == 1]] = locked[ev[cnt == 1]] = True
+    if feature is not None or prop is not None:
+        # Find the two faces of the manifold edges
+        order = argsort(inv, kind='mergesort')
+        first = (cumsum(cnt) - cnt)[cnt == 2]
+        f0, f1 = order[first] // 3, order[first+1] // 3
+        sharp = zeros(len(f0), dtype=bool)
+        if feature is not None:
+            sharp |= (n[f0]*n[f1]).sum(axis=-1) < cos(feature*DEG)
+        if prop is not None:
+            prop = asarray(prop)
+            sharp |= prop[f0] != prop[f1]
+        e2 = where(cnt == 2)[0][sharp]
+        locked[eu[e2]] = locked[ev[e2]] = True
+
+    vmap = arange(nc)
+    for npass in range(maxpass):
+        nf = len(F)
+        if nf <= nfaces:
+            break
+        # The edges and the number of faces on them
+        key = sort(F[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=-1)
+        key = key[:, 0] * nc + key[:, 1]
+        ukey, cnt = unique(key, return_counts=True)
+        eu, ev = ukey // nc, ukey % nc
+        onborder = zeros(nc, dtype=bool)
+        onborder[eu[cnt == 1]] = onborder[ev[cnt == 1]] = True
+        cand = (cnt <= 2) & ~(locked[eu] & locked[ev])
+        # a non-border edge between border vertices would pinch the surface
+        cand &= (cnt == 1) | ~(onborder[eu] & onborder[ev])
+        cand = where(cand)[0]
+        if len(cand) == 0:
+            break
+        # Survivor s and removed vertex r: collapse into a locked vertex
+        s, r = eu[cand], ev[cand]
+        swap = locked[r]
+        s[swap], r[swap] = r[swap], s[swap]
+        Qe = Q[s] + Q[r]
+        # Optimal position: minimize the quadric by solving the symmetric
+        # 3x3 system with its cofactors. Fall back to the best of the end
+        # points and the midpoint if that is ill-conditioned or far away.
+        a2, ab, ac, ad, b2, bc, bd, c2, cd, d2 = Qe.T
+        C = column_stack([b2*c2-bc*bc, ac*bc-ab*c2, ab*bc-ac*b2,
+                          ac*bc-ab*c2, a2*c2-ac*ac, ab*ac-a2*bc,
+                          ab*bc-ac*b2, ab*ac-a2*bc, a2*b2-ab*ab]).reshape(-1, 3, 3)
+        det = a2*C[:, 0, 0] + ab*C[:, 0, 1] + ac*C[:, 0, 2]
+        tr = (a2+b2+c2) / 3.
+        good = abs(det) > 1.e-6 * tr**3
+        g = column_stack([ad, bd, cd])
+        P = 0.5 * (X[s]+X[r])
+        P[good] = -(C[good]*g[good].reshape(-1, 1, 3)).sum(axis=-1) / det[good].reshape(-1, 1)
+        good &= length(P - 0.5*(X[s]+X[r])) <= length(X[s]-X[r])
+        good &= ~locked[s]
+        cost = _quadricCost(Qe, P)
+        bad = where(~good)[0]
+        if len(bad) > 0:
+            pts = [X[s[bad]], X[r[bad]], 0.5*(X[s[bad]]+X[r[bad]])]
+            c = column_stack([ _quadricCost(Qe[bad], p) for p in pts ])
+            best = c.argmin(axis=-1)
+            best[locked[s[bad]]] = 0
+            for i in range(3):
+                P[bad[best == i]] = pts[i][best == i]
+            cost[bad] = c[arange(len(bad)), best]
+        # Only consider the cheapest edges
+        nodes = cnt[cand]
+        order = argsort(cost, kind='mergesort')
+        if maxerror is not None:
+            order = order[cost[order] <= maxerror]
+        order = order[:len(order) // 2 + 1]
+        if len(order) == 0:
+            break
+        cand, s, r, P, nodes = cand[order], s[order], r[order], P[order], nodes[order]
+
+        # Vertex adjacency and vertex to face tables, for the checks
+        adj = concatenate([eu, ev])
+        nb = concatenate([ev, eu])[argsort(adj, kind='mergesort')]
+        deg = bincount(adj, minlength=nc)
+        start = cumsum(deg) - deg
+        fv = F.ravel()
+        fsrt = argsort(fv, kind='mergesort')
+        fdeg = bincount(fv, minlength=nc)
+        fstart = cumsum(fdeg) - fdeg
+
+        def valid(i):
+            """Check the collapses i for topology and normal flips"""
+            si, ri, Pi = s[i], r[i], P[i]
+            # Link condition: the common neighbours of s and r must be the
+            # opposite vertices of the faces on the edge
+            row, pos = _expand(start[si], deg[si])
+            w, other = nb[pos], ri[row]
+            ok = w != other
+            row, w, other = row[ok], w[ok], other[ok]
+            k = minimum(w, other) * nc + maximum(w, other)
+            j = searchsorted(ukey, k).clip(max=len(ukey)-1)
+            ok = bincount(row[ukey[j] == k], minlength=len(i)) == nodes[i]
+            # Normal rotation of the faces around s and r
+            for v, o in [(si, ri), (ri, si)]:
+                row, pos = _expand(fstart[v], fdeg[v])
+                f, corner = fsrt[pos] // 3, fsrt[pos] % 3
+                keep = ~(F[f] == o[row].reshape(-1, 1)).any(axis=-1)
+                row, f, corner = row[keep], f[keep], corner[keep]
+                Y = X[F[f]]
+                No = cross(Y[:, 1]-Y[:, 0], Y[:, 2]-Y[:, 0])
+                Y[arange(len(f)), corner] = Pi[row]
+                Nn = cross(Y[:, 1]-Y[:, 0], Y[:, 2]-Y[:, 0])
+                bad = (No*Nn).sum(axis=-1) <= mincos * length(No) * length(Nn)
+                ok &= bincount(row[bad], minlength=len(i)) == 0
+            return ok
+
+        # Select independent collapses: an edge is selected if it is the
+        # cheapest of all edges touching its own and neighbouring vertices.
+        # The selected edges are checked, and the selection is repeated
+        # on the edges that are not near an accepted one.
+        avail = ones(len(cand), dtype=bool)
+        sel = []
+        nremove = 0
+        while nremove < nf - nfaces:
+            rank = where(avail)[0]
+            if len(rank) == 0:
+                break
+            m1 = full(nc, len(cand))
+            minimum.at(m1, s[rank], rank)
+            minimum.at(m1, r[rank], rank)
+            m2 = m1.copy()
+            minimum.at(m2, eu, m1[ev])
+            minimum.at(m2, ev, m1[eu])
+            ok = rank[(m2[s[rank]] == rank) & (m2[r[rank]] == rank)]
+            if len(ok) == 0:
+                break
+            good = valid(ok)
+            avail[ok[~good]] = False
+            ok = ok[good]
+            # Do not remove more faces than needed
+            ok = ok[cumsum(nodes[ok]) - nodes[ok] < nf - nfaces - nremove]
+            if len(ok) == 0:
+                continue
+            sel.append(ok)
+            nremove += nodes[ok].sum()
+            hit = zeros(nc, dtype=bool)
+            hit[s[ok]] = hit[r[ok]] = True
+            near = hit.copy()
+            near[eu[hit[ev]]] = True
+            near[ev[hit[eu]]] = True
+            avail &= ~(near[s] | near[r])
+        if len(sel) == 0:
+            break
+        sel = concatenate(sel)
+        s, r = s[sel], r[sel]
+        X[s] = P[sel]
+        Q[s] += Q[r]
+        locked[s] |= locked[r]
+        rep = arange(nc)
+        rep[r] = s
+        vmap = rep[vmap]
+        F = rep[F]
+        ok = (F[:, 0] != F[:, 1]) & (F[:, 1] != F[:, 2]) & (F[:, 2] != F[:, 0])
+        F = F[ok]
+        face = face[ok]
+
+    # Compact the vertices
+    used = zeros(nc, dtype=bool)
+    used[F] = True
+    newnr = -ones(nc, dtype=Int)
+    newnr[used] = arange(used.sum())
+    vmap = where(used[vmap], newnr[vmap], -1)
+    return X[used], newnr[F], face, vmap
+
+
 ############################################################################
 
 
@@ -363,6 +646,7 @@ class TriSurface(Mesh):
     def __init__(self,*args,**kargs):
         """Create a new surface."""
         self._areas = self._fnormals = None
+        self._bvh = None
         self.adj = None
         if hasattr(self, 'edglen'):
             del self.edglen
@@ -663,6 +947,45 @@ class TriSurface(Mesh):
         return inertia.surface_volume(x).sum()
 
 
+    def windingNumber(self,X,chunk=1<<22):
+        """Compute the winding number of the surface around points.
+
+        The (generalized) winding number is the sum of the solid angles
+        under which the triangles are seen from the point, divided by 4*pi.
+        For a closed manifold with outward normals, it is 1 for points
+        inside and 0 for points outside the surface. Unlike ray casting
+        methods, it degrades gracefully for surfaces with small holes or
+        other defects, where it takes intermediate values.
+
+        Parameters:
+
+        - `X`: Coords (npts,3): the points.
+        - `chunk`: int: the maximum number of point-triangle combinations
+          that are computed at once. This limits the memory usage.
+
+        Returns a float array (npts,) with the winding numbers.
+
+        Example:
+
+        >>> from pyformex.simple import sphere
+        >>> S = sphere(8)
+        >>> S.windingNumber([[0., 0., 0.], [0.5, 0.5, 0.], [2., 0., 0.]]).round(6)
+        array([ 1.,  1.,  0.])
+        """
+        x = asarray(self.coords[self.elems], dtype=float64)
+        X = asarray(X, dtype=float64).reshape(-1, 3)
+        w = zeros(len(X))
+        step = max(1, chunk // max(1, len(x)))
+        for i in range(0, len(X), step):
+            d = x - X[i:i+step].reshape(-1, 1, 1, 3)
+            a, b, c = d[:, :, 0], d[:, :, 1], d[:, :, 2]
+            la, lb, lc = length(a), length(b), length(c)
+            num = (a*cross(b, c)).sum(axis=-1)
+            den = la*lb*lc + (a*b).sum(axis=-1)*lc + (b*c).sum(axis=-1)*la + (c*a).sum(axis=-1)*lb
+            w[i:i+step] = arctan2(num, den).sum(axis=-1)
+        return w / (2*pi)
+
+
     def volumeInertia(self,density=1.0):
         """Return the inertia properties of the enclosed volume of the surface.
 
@@ -843,6 +1166,114 @@ class TriSurface(Mesh):
         return S
 
 
+    def faceOrientation(self,outwards=True):
+        """Compute a consistent orientation of the faces.
+
+        The orientation is propagated from a seed face over the edges that
+        are shared by exactly two faces: a neighbour face is reversed if it
+        traverses the common edge in the same direction as the face it was
+        reached from. The propagation is a breadth-first traversal,
+        processing a full front of faces at each step. Each connected
+        component (connected over manifold edges) is handled separately.
+
+        A component is non-orientable (like a Moebius strip) if the
+        traversal yields a conflicting orientation over some edge.
+        Such components get the orientation of the traversal, which is
+        consistent everywhere except over the conflicting edges.
+
+        Parameters:
+
+        - `outwards`: bool: if True (default), the closed orientable
+          components are oriented such that their normals point outwards,
+          i.e. such that their enclosed volume is positive.
+
+        Returns a tuple (reverse, comp, orientable, closed), where:
+
+        - `reverse`: bool array (nelems,): the faces that need to be reversed,
+        - `comp`: int array (nelems,): the component number of each face,
+        - `orientable`: bool array (ncomp,): whether the components are
+          orientable,
+        - `closed`: bool array (ncomp,): whether the components are
+          closed.
+
+        Example:
+
+        >>> from pyformex.simple import sphere
+        >>> S = sphere(4)
+        >>> rev, comp, orientable, closed = S.faceOrientation()
+        >>> rev.any(), comp.max(), orientable, closed
+        (False, 0, array([ True], dtype=bool), array([ True], dtype=bool))
+        >>> S1 = S.reverse(sel=arange(0, S.nelems(), 3))
+        >>> rev, comp, orientable, closed = S1.faceOrientation()
+        >>> (where(rev)[0] == arange(0, S.nelems(), 3)).all()
+        True
+        """
+        nfaces = self.nelems()
+        elem_edges = self.getElemEdges()
+        edges = self.getEdges()
+        ee = elem_edges.ravel()
+        nconn = bincount(ee, minlength=len(edges))
+        # For each face edge: is it traversed from edges[e,0] to edges[e,1]?
+        fwd = edges[elem_edges, 0] == self.elems
+        nfwd = bincount(ee, weights=fwd.ravel(), minlength=len(edges))
+        # Neighbour over each face edge, and whether it is inconsistent.
+        # Sorting the face edges puts the two faces of an edge together.
+        order = argsort(ee, kind='mergesort')
+        first = (cumsum(nconn) - nconn)[nconn == 2]
+        s0, s1 = order[first], order[first+1]
+        nbr = -ones(3*nfaces, dtype=Int)
+        nbr[s0] = s1 // 3
+        nbr[s1] = s0 // 3
+        nbr = nbr.reshape(-1, 3)
+        par = nfwd[elem_edges] != 1
+
+        # Label the components with the lowest face number
+        faces = arange(nfaces)
+        label = faces.copy()
+        while True:
+            nlabel = where(nbr >= 0, label[nbr], nfaces).min(axis=-1)
+            nlabel = minimum(label, nlabel)
+            nlabel = nlabel[nlabel]
+            if (nlabel == label).all():
+                break
+            label = nlabel
+        seeds, comp = unique(label, return_inverse=True)
+
+        # Propagate the orientation from the seeds
+        flip = zeros(nfaces, dtype=bool)
+        done = zeros(nfaces, dtype=bool)
+        done[seeds] = True
+        front = seeds
+        while len(front) > 0:
+            nb = nbr[front]
+            pa = par[front] ^ flip[front].reshape(-1, 1)
+            ok = nb >= 0
+            nb, pa = nb[ok], pa[ok]
+            ok = ~done[nb]
+            nb, ind = unique(nb[ok], return_index=True)
+            flip[nb] = pa[ok][ind]
+            done[nb] = True
+            front = nb
+
+        # Check the orientation
+        ncomp = len(seeds)
+        fa, ed = where(nbr >= 0)
+        conflict = (flip[fa] ^ flip[nbr[fa, ed]]) != par[fa, ed]
+        orientable = ones(ncomp, dtype=bool)
+        orientable[comp[fa[conflict]]] = False
+        closed = ones(ncomp, dtype=bool)
+        closed[comp[(nconn[elem_edges] != 2).any(axis=-1)]] = False
+
+        if outwards:
+            vol = inertia.surface_volume(self.coords[self.elems])
+            vol = where(flip, -vol, vol)
+            vol = bincount(comp, weights=vol, minlength=ncomp)
+            inside = closed & orientable & (vol < 0.)
+            flip ^= inside[comp]
+
+        return flip, comp, orientable, closed
+
+
     ###### BORDER ######################
 
     def checkBorder(self):
@@ -1337,8 +1768,6 @@ Quality: %s .. %s
         return p
 
 
-    # This may replace CutWithPlane after it has been proved stable
-    # and has been expanded to multiple planes
     def cutWithPlane1(self,p,n,side='',return_intersection=False,atol=0.):
         """Cut a surface with a plane.
 
@@ -1352,34 +1781,21 @@ Quality: %s .. %s
           is to return a tuple of two surfaces, with the parts at the positive,
           resp. negative side of the plane as defined by the normal vector.
           If a '+' or '-' is specified, only the corresponding part is returned.
+        - `return_intersection`: bool: if True, the intersection of the
+          surface with the plane is returned as well, as a 'line2' Mesh.
+        - `atol`: float: tolerance for points to be considered in the plane.
 
         Returns:
 
         A tuple of two TriSurfaces, or a single TriSurface,
-        depending on the value of `side`. The returned surfaces will have
-        their normals fixed wherever possible. Property values will be set
+        depending on the value of `side`, followed by the intersection
+        if `return_intersection` is True. The returned surfaces have the
+        orientation of the original surface. Property values will be set
         containing the triangle number of the original surface from which
-        the elements resulted.
+        the elements resulted. The intersection has the same property
+        values.
         """
-        def finalize(Sp, Sn, I):
-            # Result
-            res = []
-            if side in '+':
-                Sp = Sp.compact()#.fixNormals()
-                res.append(Sp)
-            if side in '-':
-                Sn = Sn.compact()#.fixNormals()
-                res.append(Sn)
-            if return_intersection:
-                res.append(I)
-            if len(res) == 1:
-                res = res[0]
-            else:
-                res = tuple(res)
-            return res
-
-
-        from pyformex.formex import _sane_side, _select_side
+        from pyformex.formex import _sane_side
         side = _sane_side(side)
 
         try:
@@ -1388,214 +1804,22 @@ Quality: %s .. %s
         except:
             raise ValueError("Expected a (3) shaped float array for both `p` and `n`")
 
-        # Make sure we inherit element number
-        save_prop = self.prop
-        self.prop = arange(self.elems.shape[0])
-
-        # Compute distance to plane of all vertices
-        d = self.distanceFromPlane(p, n)
-
-        p_pos = d > 0.
-        p_neg = d < 0.
-        p_in = ~(p_pos+p_neg)
-        p_posin = p_pos + p_in
-        p_negin = p_neg + p_in
-
-        # Reduce the surface to the part intersecting with the plane:
-        # Remember triangles with all vertices at same side
-        # Elements completely in the plane end up in both parts.
-        # BV: SHOULD WE CHANGE THIS???
-        all_p = p_posin[self.elems].all(axis=-1)
-        all_n = p_negin[self.elems].all(axis=-1)
-        S = self.cclip(all_p+all_n, compact=False)  # DOES THIS COMPACT? NO
-        Sp = self.clip(all_p, compact=False)
-        Sn = self.clip(all_n, compact=False)
-        # Restore properties
-        self.prop = save_prop
-
-        #print "POS: %s; NEG: %s; CUT: %s" % (Sp.nelems(),Sn.nelems(),S.nelems())
-        #clear()
-        #drawPlane(p,n,((4.,4.),(4.,4.)))
-        #draw(S,color='green')
-        #drawNumbers(S.coords)
-
-        # If there is no intersection, we're done
-        # (we might have cut right along facet edges!)
-        if S.nelems() == 0:
-            res = _select_side(side, [Sp, Sn])
-            return res
-
-        #######################
-        # Cut S with the plane.
-        #######################
-        # First define facets in terms of edges
-        coords = S.coords
-        edg = S.getEdges()
-        fac = S.getElemEdges()
-        ele = S.elems
-
-        # Get the edges intersecting with the plane: 1 up and 1 down vertex
-        d_edg = d[edg]
-        edg_1_up = (d_edg > 0.).sum(axis=1) == 1
-        edg_1_do = (d_edg < 0.).sum(axis=1) == 1
-        cutedg = edg_1_up * edg_1_do
-        ind = where(cutedg)[0]
-        if ind.size == 0:
-            raise ValueError("This really should not happen!")
-
-        # Compute the intersection points
-        M = Mesh(S.coords, edg[cutedg])
-        x = geomtools.intersectionPointsSWP(M.toFormex().coords, p, n, mode='pair', return_all=True, atol=atol).reshape(-1, 3)
-        # Create inverse index to lookup the point using the edge number
-        rev = inverseUniqueIndex(ind) + coords.shape[0]
-        # Concatenate the coords arrays
-        coords = coords.concatenate([coords, x])
-
-        # For each triangle, compute the number of cutting edges
-        cut = cutedg[fac]
-        ncut = cut.sum(axis=1)
-        #print 'ncut',ncut
-
-        if (ncut < 1).any() or (ncut > 2).any():
-            # Maybe we should issue a warning and ignore these cases?
-            print("NCUT: ", ncut)
-            raise ValueError("I expected all triangles to be cut along 1 or 2 edges. I do not know how to proceed now.")
-
-        if return_intersection:
-            I = Mesh(eltype='line2')
-
-        # Process the elements cutting one edge
-        #######################################
-        #print "Cutting 1 edge"
-        ncut1 = ncut==1
-        if ncut1.any():
-            prop1 = where(ncut1)[0]
-            fac1 = fac[ncut1]
-            ele1 = ele[ncut1]
-            #print ele1
-
-
-            cutedg1 = cutedg[fac1]
-            cut_edges =  fac1[cutedg1]
-
-            # Identify the node numbers
-            # 0 : vertex on positive side
-            # 1 : vertex in plane
-            # 2 : new point dividing edge
-            # 3 : vertex on negative side
-            elems = column_stack([
-                ele1[p_pos[ele1]],
-                ele1[p_in[ele1]],
-                rev[cut_edges],
-                ele1[p_neg[ele1]],
-                ])
-
-            if side in '+':
-                Sp += TriSurface(coords, elems[:, 0:3], prop=prop1)
-            if side in '-':
-                Sn += TriSurface(coords, elems[:, 1:4], prop=prop1)
-
-        # Process the elements cutting two edges
-        ########################################
-        print("Cutting 2 edges")
-        ncut2 = ncut==2     # selector over whole range
-        print(ncut)
-        print(ncut2)
-        print(p_pos.sum(axis=-1)==2)
-        if ncut2.any():
-            prop2 = where(ncut2)[0]
-            fac2 = fac[ncut2]
-            ele2 = ele[ncut2]
-            pp2 = p_pos[ele2]
-            print("ele", ele2, pp2)
-            ncut2p = pp2.sum(axis=-1)==1   # selector over ncut2 elems
-            ncut2n = pp2.sum(axis=-1)==2
-            print(ncut2p, ncut2n)
-
-            if ncut2p.any():
-                #print "# one vertex at positive side"
-                prop1 = prop2[ncut2p]
-                fac1 = fac2[ncut2p]
-                ele1 = ele2[ncut2p]
-
-                print("ele1,1p", ele1)
-                cutedg1 = cutedg[fac1]
-                print(cutedg, fac1, cutedg1, fac1[cutedg1])
-                cut_edges =  fac1[cutedg1].reshape(-1, 2)
-                #print cut_edges
-
-                corner = ele1[p_pos[ele1]]
-                #print corner
-                quad = edg[cut_edges].reshape(-1, 4)
-                #print quad
-                #print quad != corner.reshape(-1,1)
-                quad2 = quad[ quad != corner.reshape(-1, 1) ]
-                #print quad2
-                # Identify the node numbers
-                # 0   : vertex on positive side
-                # 1,2 : new points dividing edges
-                # 3,4 : vertices on negative side
-                elems = column_stack([
-                    ele1[p_pos[ele1]],
-                    rev[cut_edges],
-                    quad2.reshape(-1, 2)
-                    # ele1[p_neg[ele1]].reshape(-1,2),
-                    ])
-                #print elems
-
-                if side in '+':
-                    Sp += TriSurface(coords, elems[:, 0:3], prop=prop1)
-                if side in '-':
-                    Sn += TriSurface(coords, elems[:, 1:4], prop=prop1)
-                    Sn += TriSurface(coords, elems[:, 2:5], prop=prop1)
-
-            if ncut2n.any():
-                #print "# one vertex at negative side"
-                prop1 = where(ncut2n)[0]
-                fac1 = fac[ncut2n]
-                ele1 = ele[ncut2n]
-
-                cutedg1 = cutedg[fac1]
-                cut_edges =  fac1[cutedg1].reshape(-1, 2)
-                #print cut_edges
-
-                corner = ele1[p_neg[ele1]]
-                #print corner
-                quad = edg[cut_edges].reshape(-1, 4)
-                #print quad
-                #print quad != corner.reshape(-1,1)
-                quad2 = quad[ quad != corner.reshape(-1, 1) ]
-                #print quad2
-
-                # 0   : vertex on negative side
-                # 1,2 : new points dividing edges
-                # 3,4 : vertices on positive side
-                elems = column_stack([
-                    quad2.reshape(-1, 2),
-                    # we can not use this, because order of the 2 vertices
-                    # is importtant
-                    # ele1[p_pos[ele1]].reshape(-1,2),
-                    rev[cut_edges],
-                    ele1[p_neg[ele1]],
-                    ])
-                #print elems
-
-                if side in '+':
-                    Sp += TriSurface(coords, elems[:, 0:3], prop=prop1)
-                    Sp += TriSurface(coords, elems[:, 1:4], prop=prop1)
-                if side in '-':
-                    Sn += TriSurface(coords, elems[:, 2:5], prop=prop1)
-
-        return finalize(Sp, Sn, I)
-        # Result
+        R = cutElementsAtPlane(self.coords, self.elems, 'tri3', p, n, atol)
+        res = []
         if side in '+':
-            Sp = Sp.compact()#.fixNormals()
+            res.append(TriSurface(R.coords, R.pos, prop=R.posorg).compact())
         if side in '-':
-            Sn = Sn.compact()#.fixNormals()
-        return _select_side(side, [Sp, Sn])
+            res.append(TriSurface(R.coords, R.neg, prop=R.negorg).compact())
+        if return_intersection:
+            res.append(Mesh(R.coords, R.section, prop=R.sectionorg, eltype='line2').compact())
+        if len(res) == 1:
+            res = res[0]
+        else:
+            res = tuple(res)
+        return res
 
 
-    def cutWithPlane(self,*args,**kargs):
+    def cutWithPlane(self,p,n,side='',atol=None,newprops=None):
         """Cut a surface with a plane or a set of planes.
 
         Cuts the surface with one or more plane and returns either one side
@@ -1609,14 +1833,103 @@ Quality: %s .. %s
           Both p and n have shape (3) or (npoints,3).
 
         The parameters are the same as in :meth:`Formex.CutWithPlane`.
-        The returned surface will have its normals fixed wherever possible.
+        The returned surfaces have the orientation of the original surface.
         """
-        F = self.toFormex()
-        R = F.cutWithPlane(*args,**kargs)
+        if atol is None:
+            atol = 1.e-5*self.dsize()
+        R = Mesh.cutWithPlane(self, p, n, side, atol, newprops)
         if isinstance(R, list):
-            return [ TriSurface(r).fixNormals() for r in R ]
+            return [ TriSurface(r) for r in R ]
+        else:
+            return TriSurface(R)
+
+
+    def bvh(self):
+        """Return a bounding volume hierarchy of the triangles.
+
+        The hierarchy (see :class:`bvh.BVH`) is built from the bounding
+        boxes of the triangles on first use and then saved in the object.
+        """
+        if self._bvh is None:
+            self._bvh = bvh.BVH(bvh.boxes(self.coords[self.elems]))
+        return self._bvh
+
+
+    def castRays(self,q,m,method='ray',first=False,chunk=1<<16):
+        """Intersect the surface with a set of lines, rays or segments.
+
+        Parameters:
+
+        - `q`, `m`: Coords (nrays,3): points and direction vectors,
+          defining the lines q + t*m.
+        - `method`: string: one of 'line' (full lines), 'ray' (half lines
+          from q in the direction of m: t >= 0) or 'segment' (the segments
+          from q to q+m: 0 <= t <= 1).
+        - `first`: bool: if True, only the first hit (the one with the lowest
+          value of t) of every ray is returned. The default is to return
+          all hits.
+        - `chunk`: int: the number of rays that are processed at once.
+          This limits the memory usage.
+
+        The candidate triangles are found from the bounding volume
+        hierarchy of the surface (:meth:`bvh`) and the intersections are
+        computed with a watertight test (:func:`geomtools.lineHitsTriangle`):
+        a ray crossing the surface through an edge or vertex is never lost.
+        It hits all the triangles sharing that edge or vertex though.
+
+        Returns a tuple of arrays (ray, elem, t, bc), one entry per hit,
+        sorted on ray number and t:
+
+        - `ray`: int array (nhits,): the ray number,
+        - `elem`: int array (nhits,): the triangle number,
+        - `t`: float array (nhits,): the parameter value along the ray,
+        - `bc`: float array (nhits,3): the barycentric coordinates of the
+          hit point in the triangle.
+
+        The hit points can be found from ``q[ray] + t.reshape(-1,1) * m[ray]``.
+
+        Example:
+
+        >>> from pyformex.simple import sphere
+        >>> S = sphere(8)
+        >>> q = [[0., 0.1, 0.2], [2., 0.1, 0.2]]
+        >>> ray, elem, t, bc = S.castRays(q, [[1., 0., 0.]] * 2, method='line')
+        >>> ray, elem, t.round(3)
+        (array([0, 0, 1, 1]), array([744, 550, 744, 550]), array([-0.972,  0.972, -2.972, -1.028]))
+        >>> ray, elem, t, bc = S.castRays(q, [[1., 0., 0.]] * 2, first=True)
+        >>> ray, elem, t.round(3), bc.sum(axis=-1)
+        (array([0]), array([550]), array([ 0.972]), array([ 1.]))
+        """
+        q = asarray(q, dtype=float64).reshape(-1, 3)
+        m = asarray(m, dtype=float64).reshape(-1, 3)
+        if method == 'line':
+            tmin, tmax = -inf, inf
+        elif method == 'ray':
+            tmin, tmax = 0., inf
+        elif method == 'segment':
+            tmin, tmax = 0., 1.
         else:
-            return TriSurface(R).fixNormals()
+            raise ValueError("Invalid method: %s" % method)
+        tree = self.bvh()
+        x = self.coords[self.elems]
+        atol = 1.e-7 * self.dsize()
+        res = []
+        for i in range(0, len(q), chunk):
+            qi, mi = q[i:i+chunk], m[i:i+chunk]
+            r, e = tree.linePairs(qi, mi, tmin, tmax, atol).T
+            hit, t, bc = geomtools.lineHitsTriangle(qi[r], mi[r], x[e])
+            hit &= (t >= tmin) & (t <= tmax)
+            r, e, t, bc = r[hit], e[hit], t[hit], bc[hit]
+            srt = lexsort([t, r])
+            r, e, t, bc = r[srt], e[srt], t[srt], bc[srt]
+            if first:
+                ok = ones(len(r), dtype=bool)
+                ok[1:] = r[1:] != r[:-1]
+                r, e, t, bc = r[ok], e[ok], t[ok], bc[ok]
+            res.append((r+i, e, t, bc))
+        if not res:
+            return (zeros(0, dtype=Int), zeros(0, dtype=Int), zeros(0), zeros((0, 3)))
+        return tuple(concatenate(a) for a in zip(*res))
 
 
 # TODO:
@@ -1639,8 +1952,9 @@ Quality: %s .. %s
           a set of lines.
         - `method`: a string (line, segment or ray) defining if the line
           is either a full-line or a line-segment (q-q2) or a line-ray (q->q2)
-        - `atol` : detected intersection points on the border edges (otherwise
-          geomtools.insideTriangle could fail)
+        - `atol` : tolerance for fusing the intersection points. A line
+          crossing the surface through an edge or a vertex hits all the
+          triangles sharing it.
 
         Returns:
         - a fused set of intersection points (Coords)
@@ -1648,52 +1962,17 @@ Quality: %s .. %s
           triangle
 
         If a line is laying (parallel) on a triangle it will not generate
-        intersections.
-        There is a similar function in geomtools.intersectionPointsLWT but
-        this one seems faster.
+        intersections. The intersections are computed with
+        :meth:`castRays`.
         """
-
-
-        def insideLine(v,v0,v1,atol, method='segment'):
-            """
-            Check points inside a segments or a ray
-
-            if method=='segment' check points inside segments v0,v1
-            if method=='ray' check points inside ray v0->v1
-            """
-            if method=='segment':
-                ir=length(v-v0)+ length(v-v1)< length(v1-v0)+atol
-            if method=='ray':
-                ir0 = dotpr(v-v0, normalize(v1-v0))>0#equivalent to ir0=length(normalize(v-v0)-m)<atol
-                ir1 = length(v-v0)<atol#point close to the ray's end
-                ir=ir0+ir1
-            return ir
-
-        r, C, n = geomtools.triangleBoundingCircle(self.coords[self.elems])#triangles' bounding sphere
-        m = normalize(q2-q)
-        ip = geomtools.pointNearLine(C, q, m, r, -1)#detects candidate lines/triangles (slow part)
-        il = [ [ i ] * len(ip[i]) for i in range(len(ip)) ]
-        t, l = concatenate(ip),concatenate(il).astype(Int)
-        p = geomtools.intersectionPointsLWP(q[l], m[l], C[t], self.areaNormals()[1][t],  mode='pair')#intersects candidate lines/triangles
-        prl=where(sum(isinf(p) + isnan(p), axis=1)>0)[0]#remove nan/inf (lines parallel to triangles)
-        i1 = complement(prl, len(p))
-        if len(i1)==0:
+        q = asarray(q).reshape(-1, 3)
+        m = asarray(q2).reshape(-1, 3) - q
+        l, t, tt, bc = self.castRays(q, m, method=method)
+        if len(l) == 0:
             return Coords(), []
-        #
-        # TODO
-        # The use of shrink here is not a good technique!!!
-        # Better is to include a tolerance in geomtools.insideTriangle
-        #
-        xt = self.select(t).toFormex().shrink(1.+atol)[:]#atol: insideTriangle sometimes fails on border!!
-        xt, xp, xl = xt[i1], p[i1], l[i1]
-        i2 = geomtools.insideTriangle(xt, xp[newaxis, ...]).reshape(-1)#remove intersections outside triangles
-        i=i1[i2]
-        if method!='line':
-            xp, xl=xp[i2], xl[i2]
-            i3=insideLine(xp, q[xl], q2[xl], atol, method)
-            i=i[i3]
-        p, j=p[i].fuse()
-        return p, column_stack([j, l[i], t[i]])
+        p = Coords(q[l] + tt.reshape(-1, 1) * m[l])
+        p, j = p.fuse(atol=atol)
+        return p, column_stack([j, l, t])
 
 
     def intersectionWithPlane(self,p,n,atol=0.,sort='number'):
@@ -2003,61 +2282,215 @@ Quality: %s .. %s
         This method tries to reverse improperly oriented normals so that a
         singly oriented surface is achieved.
 
-        .. note: In the current version, this uses the external program
-           `admesh`, so this should be installed on the machine.
+        The orientation is computed by :meth:`faceOrientation`, separately
+        for each component of the surface (connected over edges
+        having exactly two faces). If a component is not orientable,
+        a warning is given.
 
-        If the surface is a (possibly non-orientable) manifold, the result
-        will be an orientable manifold.
-
-        If the surface is a closed manifold, the normals will be
+        If a component is a closed manifold, its normals will be
         oriented to the outside. This is done by computing the volume
-        inside the surface and reversing the normals if that turns out
+        inside the component and reversing the normals if that turns out
         to be negative.
 
         Parameters:
 
-        - `outwards`: boolean: if True (default), a test is done whether
-          the surface is a closed manifold, and if so, the normals are
-          oriented outwards. Setting this value to False will skip this
-          test and the (possible) reversal of the normals.
+        - `outwards`: boolean: if True (default), the normals of closed
+          components are oriented outwards. Setting this value to False
+          will skip this test and the (possible) reversal of the normals.
+
+        Returns a TriSurface with the same nodes and properties, and
+        some elements reversed.
         """
         if self.nelems() == 0:
-            # Protect against impossible file handling for empty surfaces
             return self
-        tmp = utils.tempName('.stl')
-        tmp1 = utils.tempName('.off')
-        print("Writing temp file %s" % tmp)
-        self.write(tmp, 'stl')
-        print("Fixing surface while converting to OFF format %s" % tmp1)
-        stlConvert(tmp, tmp1)
-        print("Reading result from %s" % tmp1)
-        S = TriSurface.read(tmp1)
-        os.remove(tmp)
-        os.remove(tmp1)
-        S.setProp(self.prop)
+        reverse, comp, orientable, closed = self.faceOrientation(outwards)
+        if not orientable.all():
+            utils.warn("warn_fixnormals_nonorientable", data=((~orientable).sum(), len(orientable)))
+        elems = self.elems.copy()
+        elems[reverse] = elems[reverse][:, ::-1]
+        return TriSurface(self.coords, elems, prop=self.prop)
 
-        if outwards and S.isClosedManifold() and S.volume() < 0.:
-            S = S.reverse()
 
-        return S
+    def intersectingFaces(self,atol=0.,chunk=1<<18):
+        """Find the pairs of intersecting faces.
 
+        Finds the pairs of faces of the surface that intersect each other.
+        The candidate pairs are found from a bounding volume hierarchy
+        (see :mod:`bvh`) and then checked with
+        :func:`geomtools.trianglesIntersect`. Faces that share an edge are
+        not checked. For faces sharing a single vertex, the edges opposite
+        to that vertex are checked for crossing the other face.
 
-    def check(self,matched=True,verbose=False):
-        """Check the surface using gtscheck.
+        Parameters:
+
+        - `atol`: float: faces touching each other within this distance
+          are not considered to intersect.
+        - `chunk`: int: the number of candidate pairs that are checked at
+          once. This limits the memory usage.
+
+        Returns an int array (npairs,2) with the face numbers of the
+        intersecting pairs, lowest number first.
+
+        Example:
+
+        >>> from pyformex.simple import sphere
+        >>> S = sphere(4)
+        >>> S.intersectingFaces().shape
+        (0, 2)
+        >>> S1 = S + S.trl(0, 1.)
+        >>> len(S1.intersectingFaces()) > 0
+        True
+        """
+        x = asarray(self.coords[self.elems], dtype=float64)
+        pairs = bvh.BVH(bvh.boxes(x)).overlapPairs(atol=atol)
+        res = zeros(len(pairs), dtype=bool)
+        for i in range(0, len(pairs), chunk):
+            p, q = pairs[i:i+chunk].T
+            shared = self.elems[p].reshape(-1, 3, 1) == self.elems[q].reshape(-1, 1, 3)
+            nshared = shared.sum(axis=(1, 2))
+            ok = zeros(len(p), dtype=bool)
+            j = where(nshared == 0)[0]
+            ok[j] = geomtools.trianglesIntersect(x[p[j]], x[q[j]], atol)
+            j = where(nshared == 1)[0]
+            if len(j) > 0:
+                # the edges opposite to the shared vertex
+                rows = arange(len(j)).reshape(-1, 1)
+                cp = shared[j].any(axis=2).argmax(axis=-1).reshape(-1, 1)
+                cq = shared[j].any(axis=1).argmax(axis=-1).reshape(-1, 1)
+                ep = x[p[j]][rows, (cp + [1, 2]) % 3]
+                eq = x[q[j]][rows, (cq + [1, 2]) % 3]
+                ok[j] = (geomtools.segmentCrossesTriangle(ep, x[q[j]], atol) |
+                         geomtools.segmentCrossesTriangle(eq, x[p[j]], atol))
+            res[i:i+chunk] = ok
+        return pairs[res]
+
+
+    def diagnose(self,intersections=True,atol=0.):
+        """Diagnose the surface for problems.
+
+        Checks the surface for the following problems and flags the
+        faces having them:
+
+        - `degenerate`: faces with repeated vertices or a zero area,
+        - `duplicate`: faces with the same vertices as a face with a lower
+          number,
+        - `nonmanifold_edge`: faces on an edge with more than two faces,
+        - `nonmanifold_vertex`: faces at a vertex where the faces do not
+          form a single fan connected over manifold edges (e.g. where two
+          cones touch at their tips),
+        - `misoriented`: faces on an edge with two faces that traverse the
+          edge in the same direction,
+        - `border`: faces having an edge on the border,
+        - `intersecting`: faces intersecting with another face (see
+          :meth:`intersectingFaces`).
+
+        Parameters:
+
+        - `intersections`: bool: if False, the (expensive) check for
+          intersecting faces is skipped.
+        - `atol`: float: tolerance for the intersection check.
+
+        Returns a Dict with the above names as keys and bool arrays
+        (nelems,) as values, and the following extra items:
+
+        - `pairs`: int array (npairs,2): the pairs of intersecting faces,
+        - `counts`: a Dict with the number of flagged faces for each of
+          the problems.
 
-        Uses `gtscheck` to check whether the surface is an orientable,
-        non self-intersecting manifold.
+        The flags can directly be used to select or draw the faces,
+        e.g. ``draw(S.select(D.intersecting), color=red)``.
+
+        Example:
+
+        >>> from pyformex.simple import sphere
+        >>> S = sphere(4)
+        >>> e = S.elems.copy()
+        >>> e[0] = e[0, ::-1]
+        >>> D = TriSurface(S.coords, e).diagnose()
+        >>> where(D.misoriented)[0]
+        array([  0,  10,  19, 192])
+        >>> D = TriSurface(S.coords, concatenate([S.elems, S.elems[:1]])).diagnose()
+        >>> print(sorted(D.counts.items()))
+        [('border', 0), ('degenerate', 0), ('duplicate', 1), \
+('intersecting', 0), ('misoriented', 0), ('nonmanifold_edge', 5), \
+('nonmanifold_vertex', 13)]
+        >>> where(D.duplicate)[0]
+        array([320])
+        """
+        nfaces = self.nelems()
+        elems = self.elems
+        D = Dict()
+        D.degenerate = elems.testDegenerate()
+        x = asarray(self.coords[elems], dtype=float64)
+        D.degenerate |= length(cross(x[:, 1]-x[:, 0], x[:, 2]-x[:, 0])) == 0.
+        D.duplicate = zeros(nfaces, dtype=bool)
+        D.duplicate[elems.listDuplicate()] = True
+
+        # Edges and the faces connected to them
+        elem_edges = self.getElemEdges()
+        edges = self.getEdges()
+        ee = elem_edges.ravel()
+        nconn = bincount(ee, minlength=len(edges))
+        D.nonmanifold_edge = (nconn[elem_edges] > 2).any(axis=-1)
+        D.border = (nconn[elem_edges] == 1).any(axis=-1)
+        fwd = edges[elem_edges, 0] == elems
+        nfwd = bincount(ee, weights=fwd.ravel(), minlength=len(edges))
+        D.misoriented = ((nconn[elem_edges] == 2) & (nfwd[elem_edges] != 1)).any(axis=-1)
+
+        # Non-manifold vertices: label the face corners at each vertex,
+        # connecting the corners of two faces sharing a manifold edge
+        order = argsort(ee, kind='mergesort')
+        first = (cumsum(nconn) - nconn)[nconn == 2]
+        s0, s1 = order[first], order[first+1]
+        f0, f1 = s0 // 3, s1 // 3
+        links = []
+        for v in edges[ee[s0]].T:
+            c0 = 3*f0 + (elems[f0] == v.reshape(-1, 1)).argmax(axis=-1)
+            c1 = 3*f1 + (elems[f1] == v.reshape(-1, 1)).argmax(axis=-1)
+            links.append((c0, c1))
+        a = concatenate([l[0] for l in links])
+        b = concatenate([l[1] for l in links])
+        label = arange(3*nfaces)
+        while True:
+            m = minimum(label[a], label[b])
+            nlabel = label.copy()
+            minimum.at(nlabel, a, m)
+            minimum.at(nlabel, b, m)
+            nlabel = nlabel[nlabel]
+            if (nlabel == label).all():
+                break
+            label = nlabel
+        fans = unique(elems.ravel().astype(int64) * 3*nfaces + label)
+        nfans = bincount(fans // (3*nfaces), minlength=self.ncoords())
+        D.nonmanifold_vertex = (nfans[elems] > 1).any(axis=-1)
+
+        D.intersecting = zeros(nfaces, dtype=bool)
+        D.pairs = zeros((0, 2), dtype=Int)
+        if intersections:
+            D.pairs = self.intersectingFaces(atol)
+            D.intersecting[D.pairs.ravel()] = True
+        keys = ['degenerate', 'duplicate', 'nonmanifold_edge', 'nonmanifold_vertex',
+                'misoriented', 'border', 'intersecting']
+        D.counts = Dict([ (k, int(D[k].sum())) for k in keys ])
+        return D
+
+
+    def check(self,matched=True,verbose=False):
+        """Check that the surface is an orientable non-intersecting manifold.
 
         This is a necessary condition for using the `gts` methods:
         split, coarsen, refine, boolean. (Additionally, the surface should be
         closed, wich can be checked with :meth:`isClosedManifold`).
 
+        The check is done in-process by :meth:`diagnose`. It used to be
+        done with the external program `gtscheck`, and the return codes
+        are still the same.
+
         Returns a tuple of:
 
         - an integer return code with the value:
 
           - 0: the surface is an orientable, non self-intersecting manifold.
-          - 1: the created GTS file is invalid: this should normally not occur.
           - 2: the surface is not an orientable manifold. This may be due to
             misoriented normals. The :meth:`fixNormals` and :meth:`reverse`
             methods may be used to help fixing the problem in such case.
@@ -2069,37 +2502,25 @@ Quality: %s .. %s
           If matched==True, intersecting triangles are returned as element
           indices of self, otherwise as a separate TriSurface object.
 
-        If verbose is True, prints the statistics reported by the gtscheck
-        command.
+        If verbose is True, prints the number of faces with each of the
+        problems checked by :meth:`diagnose`.
         """
-        tmp = utils.tempName('.gts')
-        self.write(tmp, 'gts')
-        P = utils.system("gtscheck -v",stdin=tmp)
+        D = self.diagnose()
         if verbose:
-            print(P.sta)
-        os.remove(tmp)
-        if P.sta == 0:
-            print('The surface is an orientable non self-intersecting manifold')
-            return P.sta, None
-        if P.sta==2:
+            for k in sorted(D.counts):
+                print("%s: %s" % (k, D.counts[k]))
+        if (D.nonmanifold_edge | D.nonmanifold_vertex | D.misoriented).any():
             print('The surface is not an orientable manifold (this may be due to badly oriented normals)')
-            return P.sta, None
-        if P.sta==3:
+            return 2, None
+        if D.intersecting.any():
             print('The surface is an orientable manifold but is self-intersecting')
-            tmp = utils.tempName('.gts')
-            print("Writing temp file %s" % tmp)
-            fil = open(tmp, 'w')
-            fil.write(P.out)
-            fil.close()
-            Si = TriSurface.read(tmp)
-            os.remove(tmp)
+            faces = where(D.intersecting)[0]
             if matched:
-                return P.sta, self.matchCentroids(Si)
+                return 3, faces
             else:
-                return P.sta, Si
-        else:
-            print('Status of gtscheck not understood')
-            return P.sta, None
+                return 3, self.select(faces)
+        print('The surface is an orientable non self-intersecting manifold')
+        return 0, None
 
 
     def split(self,base,verbose=False):
@@ -2130,6 +2551,57 @@ Quality: %s .. %s
         #
 
 
+    def decimate(self,nfaces=None,maxerror=None,border=True,feature=None,
+                 keepprop=False,maxangle=90.,return_map=False):
+        """Reduce the number of triangles by quadric error edge collapses.
+
+        This is an in-process alternative for :meth:`coarsen`. It uses
+        :func:`quadricDecimate`, which see for a more detailed description.
+
+        Parameters:
+
+        - `nfaces`: int: the target number of triangles.
+        - `maxerror`: float: maximum quadric error of a collapse.
+          If neither `nfaces` nor `maxerror` is specified, the number of
+          triangles is halved.
+        - `border`: bool: if True (default), the border is kept unchanged.
+        - `feature`: float: if specified, the feature edges, where the
+          triangle normals differ more than this angle (in degrees),
+          are kept unchanged.
+        - `keepprop`: bool: if True, the borders between regions with a
+          different prop value are kept unchanged. The props of the
+          remaining triangles are always kept.
+        - `maxangle`: float: maximum rotation of a triangle normal
+          (in degrees) by a collapse. This avoids folding the surface.
+        - `return_map`: bool: if True, also returns the vertex map.
+
+        Returns the decimated TriSurface. If `return_map` is True,
+        returns a tuple (S,vmap), where vmap is an int array holding
+        for each vertex of the original surface the index of the vertex
+        in S into which it was merged (-1 for unused vertices).
+
+        Example:
+
+        >>> from pyformex.simple import sphere
+        >>> S = sphere(16).setProp(1)
+        >>> S1, vmap = S.decimate(nfaces=1000, return_map=True)
+        >>> S1.nelems() <= 1000, S1.isClosedManifold(), S1.prop.max()
+        (True, True, 1)
+        >>> vmap.shape == (S.ncoords(),)
+        True
+        """
+        prop = self.prop if keepprop else None
+        x, e, faces, vmap = quadricDecimate(
+            self.coords, self.elems, nfaces=nfaces, maxerror=maxerror,
+            border=border, feature=feature, prop=prop, maxangle=maxangle)
+        S = TriSurface(Coords(x), e)
+        if self.prop is not None:
+            S.setProp(self.prop[faces])
+        if return_map:
+            return S, vmap
+        return S
+
+
     def coarsen(self,min_edges=None,max_cost=None,
                 mid_vertex=False, length_cost=False, max_fold=1.0,
                 volume_weight=0.5, boundary_weight=0.5, shape_weight=0.0,
@@ -2510,9 +2982,9 @@ def intersectSurfaceWithSegments(s1, segm, atol=1.e-5):
 
 # Set TriSurface methods defined elsewhere
 
-from pyformex.plugins import pyformex_gts
-TriSurface.boolean = pyformex_gts.boolean
-TriSurface.intersection = pyformex_gts.intersection
+from pyformex.plugins import pyformex_gts, surface_boolean
+TriSurface.boolean = surface_boolean.boolean
+TriSurface.intersection = surface_boolean.intersection
 TriSurface.gtsset = pyformex_gts.gtsset
 
 from pyformex.plugins import webgl
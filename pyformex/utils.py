@@ -39,7 +39,8 @@ from pyformex.process import Process
 # These are here to re-export them as utils functions
 from pyformex import (zip, round, isFile, isString)
 from pyformex.software import (hasModule, checkModule, requireModule,
-                               hasExternal, checkExternal, checkVersion)
+                               hasExternal, checkExternal, checkVersion,
+                               lazyImport)
 from pyformex.odict import OrderedDict
 from pyformex.config import formatDict
 